@@ -1,100 +1,172 @@
-from pathlib import Path
-import os
-BASE_DIR = Path(__file__).resolve().parent.parent
-
-SECRET_KEY = 'django-insecure-q7ynp#%t3c7hai5a&bvgp9atta+)@%v9d8i79&8=)hmy6^snyx'
-DEBUG = True
-ALLOWED_HOSTS = ['127.0.0.1', 'localhost', '0.0.0.0']  # 允许所有开发地址
-
-INSTALLED_APPS = [
-    'django.contrib.admin',
-    'django.contrib.auth',
-    'django.contrib.contenttypes',
-    'django.contrib.sessions',
-    'django.contrib.messages',
-    'django.contrib.staticfiles',
-    'corsheaders',
-    'myerpapp',
-]
-
-MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
-    'corsheaders.middleware.CorsMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    #'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
-]
-
-ROOT_URLCONF = 'erpdjango.urls'
-WSGI_APPLICATION = 'erpdjango.wsgi.application'
-
-TEMPLATES = [
-    {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
-        'OPTIONS': {
-            'context_processors': [
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
-            ],
-        },
-    },
-]
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
-
-AUTH_PASSWORD_VALIDATORS = [
-    {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
-    {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
-    {'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator'},
-    {'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator'},
-]
-
-LANGUAGE_CODE = 'zh-hans'
-TIME_ZONE = 'Asia/Shanghai'
-USE_I18N = True
-USE_TZ = False
-
-STATIC_URL = 'static/'
-
-
-# 跨域配置（关键）
-CORS_ALLOWED_ORIGINS = [
-    "http://localhost:5173", # 前端地址
-    "http://127.0.0.1:5173",
-]
-CORS_ALLOW_CREDENTIALS = True # 允许携带Cookie
-CORS_ALLOW_METHODS = ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS']
-CORS_ALLOW_HEADERS = ['Content-Type', 'Authorization']
-
-# Session配置
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
-SESSION_COOKIE_SAMESITE = 'Lax' # 允许跨域Cookie
-SESSION_COOKIE_HTTPONLY = False # 开发环境关闭HTTPONLY
-SESSION_COOKIE_SECURE = False # 开发环境关闭HTTPS
-SESSION_EXPIRE_AT_BROWSER_CLOSE = False
-SESSION_COOKIE_AGE = 86400 # 24小时过期
-
-
-import os
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')  # 项目根目录下的 media 文件夹
-MEDIA_URL = '/media/'
-
-# 大文件上传限制（必须配置）
-DATA_UPLOAD_MAX_MEMORY_SIZE = 1 * 1024 * 1024 * 1024  # 1GB
-FILE_UPLOAD_MAX_MEMORY_SIZE = 1 * 1024 * 1024 * 1024
-FILE_UPLOAD_HANDLERS = [
-    'django.core.files.uploadhandler.TemporaryFileUploadHandler',  # 大文件用临时文件处理
-]
+from pathlib import Path
+import os
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+SECRET_KEY = 'django-insecure-q7ynp#%t3c7hai5a&bvgp9atta+)@%v9d8i79&8=)hmy6^snyx'
+DEBUG = True
+ALLOWED_HOSTS = ['127.0.0.1', 'localhost', '0.0.0.0']  # 允许所有开发地址
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'myerpapp',
+]
+
+MIDDLEWARE = [
+    'myerpapp.middleware.ERPCorsMiddleware',  # 最前面：预检请求直接返回，不加载Session
+    'myerpapp.metrics.MetricsMiddleware',  # 接口指标；ERP_METRICS_ENABLED=False 时自动移除
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    #'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'myerpapp.middleware.ERPAuthMiddleware',  # 解析 request.erp_user + 统一登录校验
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'erpdjango.urls'
+WSGI_APPLICATION = 'erpdjango.wsgi.application'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [BASE_DIR / 'templates'],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    }
+}
+
+AUTH_PASSWORD_VALIDATORS = [
+    {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
+    {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
+    {'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator'},
+    {'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator'},
+]
+
+LANGUAGE_CODE = 'zh-hans'
+TIME_ZONE = 'Asia/Shanghai'
+USE_I18N = True
+USE_TZ = False
+
+STATIC_URL = 'static/'
+
+
+# 跨域配置（关键）
+CORS_ALLOWED_ORIGINS = [
+    "http://localhost:5173", # 前端地址
+    "http://127.0.0.1:5173",
+]
+CORS_ALLOW_CREDENTIALS = True # 允许携带Cookie
+CORS_ALLOW_METHODS = ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS']
+CORS_ALLOW_HEADERS = ['Content-Type', 'Authorization', 'X-CSRFToken', 'X-Requested-With',
+                      'Upload-Offset', 'Upload-Checksum',  # 附件断点续传
+                      'Range', 'If-Range', 'If-None-Match', 'If-Modified-Since']  # 附件断点下载
+CORS_PREFLIGHT_MAX_AGE = 86400  # 预检结果浏览器缓存24小时
+CORS_EXPOSE_HEADERS = ['Content-Disposition', 'Upload-Offset', 'Upload-Length',  # 前端读取导出/下载文件名、续传进度
+                       'Content-Range', 'Accept-Ranges', 'ETag', 'Last-Modified']
+
+# ERP登录校验（myerpapp.middleware.ERPAuthMiddleware）
+ERP_AUTH_PROTECTED_PREFIX = '/api/'
+ERP_AUTH_EXEMPT_PATHS = [  # 无需登录即可访问的接口
+    '/api/login/',
+    '/api/register/',
+    '/api/metrics/',  # 视图内自行校验：管理员登录态或 ERP_METRICS_TOKEN
+    # 审批实例接口用 JWT 认证（DRF JWTAuthentication + IsAuthenticated），不要求 ERP 登录态
+    '/api/approval/instances/create/',
+    '/api/approval/instances/operate/',
+    '/api/approval/instances/batch-operate/',
+    '/api/approval/inbox/',
+]
+
+# 接口性能指标（myerpapp/metrics.py）：按路由统计耗时/SQL条数/响应大小，/api/metrics/ 输出
+ERP_METRICS_ENABLED = os.environ.get('ERP_METRICS_ENABLED', '') == '1'
+ERP_METRICS_TOKEN = os.environ.get('ERP_METRICS_TOKEN', '')  # Prometheus 抓取用，留空则只允许管理员登录态
+
+# Session配置
+# 缓存优先 + 合并写回：已登录请求不再读 django_session，写库按批合并（见 myerpapp/session_backend.py）
+SESSION_ENGINE = 'myerpapp.session_backend'
+SESSION_CACHE_ALIAS = 'sessions'
+SESSION_WRITE_BEHIND_BATCH = 50  # 攒够多少条Session变更写一次库
+SESSION_WRITE_BEHIND_INTERVAL = 2.0  # 最长多少秒写一次库
+SESSION_COOKIE_SAMESITE = 'Lax' # 允许跨域Cookie
+SESSION_COOKIE_HTTPONLY = False # 开发环境关闭HTTPONLY
+SESSION_COOKIE_SECURE = False # 开发环境关闭HTTPS
+SESSION_EXPIRE_AT_BROWSER_CLOSE = False
+SESSION_COOKIE_AGE = 86400 # 24小时过期
+
+
+import os
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')  # 项目根目录下的 media 文件夹
+MEDIA_URL = '/media/'
+
+# 缓存配置：sessions 默认用本地文件缓存（多进程共享），生产环境可换成 Redis/Memcached
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'sessions'),
+        'TIMEOUT': SESSION_COOKIE_AGE,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    # 权限缓存版本号（myerpapp/permission_cache.py）：必须是所有 worker 共享的缓存，
+    # 否则角色权限修改后只有当前进程生效。多机部署换成 Redis/Memcached
+    'permissions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'permissions'),
+        'TIMEOUT': None,
+    },
+}
+PERMISSION_CACHE_ALIAS = 'permissions'
+PERMISSION_CACHE_CHECK_INTERVAL = 1.0  # 各进程最多每隔多少秒检查一次权限版本号
+
+# 大文件上传限制（必须配置）
+DATA_UPLOAD_MAX_MEMORY_SIZE = 1 * 1024 * 1024 * 1024  # 1GB
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1 * 1024 * 1024 * 1024
+MATERIAL_FILE_MAX_SIZE = 1 * 1024 * 1024 * 1024  # 附件普通上传单文件上限（myerpapp/attachments.py，边收边写盘）
+# 附件断点续传（myerpapp/upload_views.py）：分块上传不受上面两个内存限制影响
+MATERIAL_UPLOAD_MAX_SIZE = 5 * 1024 * 1024 * 1024  # 单个附件上限 5GB
+MATERIAL_UPLOAD_EXPIRE_HOURS = 24  # 未完成的上传会话保留时长
+IMPORT_REPORT_EXPIRE_HOURS = 72  # 物料导入错误报告保留时长（myerpapp/material_import.py）
+# 附件下载由前端代理发送文件（myerpapp/file_serving.py）：'' 由 Django 发送，'x-accel-redirect'（Nginx）或 'x-sendfile'
+# Nginx 示例：location /protected-media/ { internal; alias <MEDIA_ROOT>/; }
+ERP_SENDFILE_MODE = os.environ.get('ERP_SENDFILE_MODE', '')
+ERP_SENDFILE_PREFIX = '/protected-media/'
+# 附件压缩存储（myerpapp/attachments.py）：'zstd' 需要安装 zstandard，未安装时自动改用 'zlib'
+ATTACHMENT_COMPRESSION_CODEC = 'zstd'
+ATTACHMENT_COMPRESS_AT_UPLOAD = False  # True：上传后立即压缩；False：只由 compress_attachments 命令压缩冷数据
+ATTACHMENT_COLD_DAYS = 90  # 超过多少天未下载的附件视为冷数据
+# 附件存储后端（myerpapp/attachment_storage.py）：'local' 存 MEDIA_ROOT；'s3' 存 S3 兼容对象存储（需要安装 boto3），
+# 下载跳转到预签名地址，多个应用节点无需共享磁盘。MinIO 等自建服务配置 ATTACHMENT_S3_ENDPOINT_URL
+ATTACHMENT_STORAGE_BACKEND = os.environ.get('ATTACHMENT_STORAGE_BACKEND', 'local')
+ATTACHMENT_S3_BUCKET = os.environ.get('ATTACHMENT_S3_BUCKET', '')
+ATTACHMENT_S3_PREFIX = os.environ.get('ATTACHMENT_S3_PREFIX', '')  # 对象键前缀，如 'erp/'
+ATTACHMENT_S3_ENDPOINT_URL = os.environ.get('ATTACHMENT_S3_ENDPOINT_URL', '')
+ATTACHMENT_S3_REGION = os.environ.get('ATTACHMENT_S3_REGION', '')
+ATTACHMENT_S3_ACCESS_KEY = os.environ.get('ATTACHMENT_S3_ACCESS_KEY', '')  # 为空时按 boto3 默认方式查找凭证
+ATTACHMENT_S3_SECRET_KEY = os.environ.get('ATTACHMENT_S3_SECRET_KEY', '')
+ATTACHMENT_PRESIGNED_URL_EXPIRE = 300  # 预签名下载地址有效期（秒）
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',  # 大文件用临时文件处理
+]
 CORS_ALLOW_CREDENTIALS = True  # 允许携带 Cookie
\ No newline at end of file
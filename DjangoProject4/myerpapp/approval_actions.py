@@ -0,0 +1,223 @@
+# ===================== 审批流转 =====================
+# 单条审批（approval/instances/operate/）和批量审批（approval/instances/batch-operate/）共用这里的流转逻辑。
+#
+# 并行审批用令牌（ApprovalToken）表示：实例在每条分支上有一个 active 令牌，审批即消耗所在节点的令牌：
+# - 节点有多个后续节点时分叉，每个后续节点放一个新令牌，各分支的审批人可以同时审批
+# - 汇聚节点（node_type='join'）每个实例一个计数令牌，分支到达时 arrived + 1：
+#     会签 join_mode='all'  到达数等于汇聚节点的入度时放行
+#     或签 join_mode='any'  第一个分支到达即放行，取消上游其他分支上的令牌和待办
+#   入度、上游节点在编译流程时算好（approval_graph.py），每次到达只读写这一行，与分支数、实例数无关
+# - 到达结束节点（或节点没有后续节点）实例通过并取消其余令牌；任一分支驳回则实例驳回
+#
+# 并发控制：一次查询读出实例和活动令牌，处理每个实例时先条件更新实例行
+#   UPDATE ... WHERE id = ? AND status = 'running'
+# 同一实例的审批在这一行上串行（不依赖 select_for_update，SQLite 也成立），再条件更新令牌
+#   UPDATE ... WHERE id = ? AND status = 'active'
+# 令牌已被他人消耗则返回"已被他人处理"，不会重复流转。
+# 审批记录批量插入，待办批量关闭/生成（approval_tasks.py），全部在同一事务内；
+# 每个实例在自己的保存点内处理，失败不影响同批的其他实例，每个实例返回自己的结果。
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .approval_graph import get_flow_graph
+from .approval_tasks import close_tasks, open_tasks
+from .models import ApprovalInstance, ApprovalRecord, ApprovalToken
+
+ACTIONS = ('approve', 'reject')
+MAX_BATCH_SIZE = 200  # 单次批量审批的实例数上限
+
+
+class ActionRejected(Exception):
+    """单个实例无法执行审批操作：code 与接口返回的 code 一致"""
+
+    def __init__(self, code, msg):
+        super().__init__(msg)
+        self.code = code
+        self.msg = msg
+
+
+class Transition:
+    """一次审批的结果"""
+
+    def __init__(self, node, status):
+        self.node = node            # 审批的节点
+        self.status = status        # 实例的新状态
+        self.entered = []           # 新进入的审批节点（需要生成待办）
+        self.cancelled_ids = set()  # 或签放行后取消的上游节点
+
+
+def start_instance(instance):
+    """新建的实例：未指定当前节点时从开始节点自动流转到第一批审批节点，在所到节点放活动令牌并生成待办；
+    流程没有开始节点、指定的节点不属于实例的流程版本或不能作为起点时抛 ActionRejected"""
+    graph = get_flow_graph(instance.flow_id, instance.flow_version)
+    node_id = instance.current_node_id
+    node = graph.nodes.get(node_id if node_id is not None else graph.start_id)
+    if node is None:
+        raise ActionRejected(400, '流程没有开始节点，无法发起审批' if node_id is None else '当前节点不属于该流程的当前版本')
+    if node.node_type in ('end', 'join'):
+        raise ActionRejected(400, f'不能从节点「{node.name}」发起审批')
+    if node.node_type == 'start':
+        transition = advance(graph, instance.id, node, timezone.now())
+    else:
+        transition = Transition(node, 'running')
+        transition.entered.append(node)
+
+    if transition.status == 'running':
+        ApprovalToken.objects.bulk_create([
+            ApprovalToken(instance_id=instance.id, node_id=target.id) for target in transition.entered
+        ])
+        open_tasks([(instance.id, target) for target in transition.entered])
+    instance.status = transition.status
+    if transition.entered:
+        instance.current_node_id = transition.entered[-1].id
+    ApprovalInstance.objects.filter(id=instance.id).update(status=instance.status,
+                                                           current_node_id=instance.current_node_id)
+
+
+def pick_token(graph, tokens, user_id, node_id=None):
+    """在实例的活动令牌中选出当前用户可以审批的一个，返回 (令牌ID, 节点)"""
+    candidates = sorted(
+        ((token_id, graph.nodes[token_node]) for token_id, token_node in tokens if token_node in graph.nodes),
+        key=lambda item: (item[1].sort, item[1].id),
+    )
+    if node_id is not None:
+        candidates = [item for item in candidates if item[1].id == node_id]
+    if not candidates:
+        raise ActionRejected(400, '当前审批节点不存在，无法操作')
+    for token_id, node in candidates:
+        if node.can_approve(user_id):
+            return token_id, node
+    names = '、'.join(node.name for _, node in candidates)
+    raise ActionRejected(403, f'您不是节点「{names}」的审批人')
+
+
+def arrive_at_join(instance_id, join, now):
+    """一个分支到达汇聚节点，返回是否放行。
+    每个实例在汇聚节点只有一个计数令牌（部分唯一约束 approvaltoken_join_uniq）：先插入，第一个到达的分支成功；
+    与其他分支冲突则在数据库里 arrived + 1，再用条件更新放行，同时到达的分支也只有一个能放行"""
+    required = join.required_arrivals()
+    try:
+        with transaction.atomic():
+            ApprovalToken.objects.create(instance_id=instance_id, node_id=join.id, arrived=1,
+                                         status='done' if required <= 1 else 'waiting', update_time=now)
+        return required <= 1
+    except IntegrityError:
+        pass  # 已有分支到达过
+    token = ApprovalToken.objects.filter(instance_id=instance_id, node_id=join.id, arrived__gt=0)
+    if not token.filter(status='waiting').update(arrived=F('arrived') + 1, update_time=now):
+        return False  # 或签已放行，后到的分支不再继续
+    return bool(token.filter(status='waiting', arrived__gte=required).update(status='done', update_time=now))
+
+
+def advance(graph, instance_id, node, now):
+    """节点审批通过后的流转：分叉放令牌、汇聚计数、到结束节点则实例通过"""
+    transition = Transition(node, 'running')
+    try:
+        queue = graph.targets(node.id)
+        if not queue:
+            transition.status = 'approved'  # 没有后续节点，视为流程结束
+        while queue and transition.status == 'running':
+            target = queue.pop(0)
+            if target.node_type == 'end':
+                transition.status = 'approved'
+                transition.entered.append(target)
+            elif target.node_type == 'join':
+                if not arrive_at_join(instance_id, target, now):
+                    continue
+                if target.join_mode == 'any':
+                    transition.cancelled_ids |= target.upstream_ids
+                following = graph.targets(target.id)
+                if not following:
+                    transition.status = 'approved'
+                queue.extend(following)
+            else:
+                transition.entered.append(target)
+    except ValueError as e:
+        raise ActionRejected(400, str(e))
+    return transition
+
+
+def operate_one(instance_id, row, tokens, user, action, node_id, now):
+    """在当前保存点内处理一个实例，返回 Transition；失败抛 ActionRejected"""
+    if row is None:
+        raise ActionRejected(404, '审批实例不存在')
+    flow_id, flow_version, current_status = row
+    if current_status != 'running':
+        raise ActionRejected(400, '审批已结束，无法操作')
+    graph = get_flow_graph(flow_id, flow_version)
+    token_id, node = pick_token(graph, tokens, user.id, node_id)
+
+    # 先更新实例行：同一实例的并发审批在这里串行
+    if not ApprovalInstance.objects.filter(id=instance_id, status='running').update(update_time=now):
+        raise ActionRejected(409, '审批实例已被他人处理，请刷新后重试')
+    if not ApprovalToken.objects.filter(id=token_id, status='active').update(status='done', update_time=now):
+        raise ActionRejected(409, '审批实例已被他人处理，请刷新后重试')
+
+    if action == 'reject':
+        transition = Transition(node, 'rejected')
+    else:
+        transition = advance(graph, instance_id, node, now)
+
+    changes = {}
+    if transition.status != 'running':
+        changes['status'] = transition.status
+        ApprovalToken.objects.filter(instance_id=instance_id, status__in=('active', 'waiting')).update(
+            status='cancelled', update_time=now)
+    else:
+        if transition.cancelled_ids:
+            ApprovalToken.objects.filter(instance_id=instance_id, status__in=('active', 'waiting'),
+                                         node_id__in=transition.cancelled_ids).update(status='cancelled',
+                                                                                      update_time=now)
+        ApprovalToken.objects.bulk_create([
+            ApprovalToken(instance_id=instance_id, node_id=target.id) for target in transition.entered
+        ])
+    if transition.entered:
+        changes['current_node_id'] = transition.entered[-1].id
+    if changes:
+        ApprovalInstance.objects.filter(id=instance_id).update(**changes)
+    return transition
+
+
+def operate_instances(user, instance_ids, action, comment='', node_id=None):
+    """对一批实例执行同一审批操作，按 instance_ids 顺序返回每个实例的结果；
+    node_id 指定审批哪个节点（用户同时是多条并行分支的审批人时），不传则取第一个可审批的分支"""
+    rows = {
+        row[0]: row[1:] for row in ApprovalInstance.objects.filter(id__in=instance_ids).values_list(
+            'id', 'flow_id', 'flow_version', 'status')
+    }
+    tokens = {}
+    for token_id, instance_id, token_node in ApprovalToken.objects.filter(
+            instance_id__in=instance_ids, status='active').values_list('id', 'instance_id', 'node_id'):
+        tokens.setdefault(instance_id, []).append((token_id, token_node))
+
+    results = []
+    records, closed, cancelled, opened = [], [], [], []
+    now = timezone.now()
+    with transaction.atomic():
+        for instance_id in instance_ids:
+            try:
+                with transaction.atomic():
+                    transition = operate_one(instance_id, rows.get(instance_id), tokens.get(instance_id, []), user,
+                                             action, node_id, now)
+            except ActionRejected as e:
+                results.append({'instance_id': instance_id, 'code': e.code, 'msg': e.msg})
+                continue
+
+            records.append(ApprovalRecord(instance_id=instance_id, node_id=transition.node.id, approver=user,
+                                          action=action, comment=comment))
+            closed.append((instance_id, [transition.node.id]))
+            if transition.status != 'running':
+                cancelled.append((instance_id, None))
+            else:
+                if transition.cancelled_ids:
+                    cancelled.append((instance_id, transition.cancelled_ids))
+                opened.extend((instance_id, target) for target in transition.entered)
+            results.append({'instance_id': instance_id, 'code': 200, 'msg': '操作成功', 'status': transition.status})
+
+        ApprovalRecord.objects.bulk_create(records)
+        # 同步待办：审批的节点记为已处理，驳回/结束/或签取消的节点记为已取消，再为新进入的节点生成待办
+        close_tasks(closed, user.id)
+        close_tasks(cancelled)
+        open_tasks(opened)
+    return results
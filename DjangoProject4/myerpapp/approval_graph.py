@@ -0,0 +1,139 @@
+# ===================== 审批流程图编译缓存 =====================
+# 流程的每个版本只编译一次：节点类型、邻接表（next_nodes 中的 node_key 解析为本版本的节点ID）、审批人集合、
+# 汇聚节点的入度和上游节点，按 (flow_id, 版本号) 缓存在进程内。审批流转只查编译结果，不再逐个查询 ApprovalNode。
+# 已发布的版本不会再修改（见 approval_versions.py），缓存无需失效，只按最近使用淘汰。
+import logging
+import threading
+from collections import OrderedDict
+
+from .approval_versions import version_nodes
+
+logger = logging.getLogger(__name__)
+
+MAX_CACHED_FLOWS = 512  # 进程内最多缓存的流程版本数（按最近使用淘汰）
+
+_lock = threading.Lock()
+_graphs = OrderedDict()  # (flow_id, 版本号) -> FlowGraph
+
+
+def parse_user_id(value):
+    """审批人配置里的用户ID：整数或数字字符串，其他返回 None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return None
+
+
+def resolve_approvers(approver_config):
+    """预先解析审批人：'user' 类型返回用户ID集合；未指定用户或其他类型（部门主管、角色）返回 None，不限制审批人"""
+    if not isinstance(approver_config, dict) or approver_config.get('type', 'user') != 'user':
+        return None
+    user_ids = {parse_user_id(v) for v in approver_config.get('user_ids') or []}
+    user_ids.discard(None)
+    return frozenset(user_ids) or None
+
+
+class FlowNode:
+    """编译后的流程节点（只读）"""
+    __slots__ = ('id', 'key', 'name', 'node_type', 'join_mode', 'sort', 'next_ids', 'broken_refs', 'approver_ids',
+                 'in_degree', 'upstream_ids')
+
+    def __init__(self, node_id, key, name, node_type, join_mode, sort, next_ids, broken_refs, approver_ids):
+        self.id = node_id
+        self.key = key
+        self.name = name
+        self.node_type = node_type
+        self.join_mode = join_mode
+        self.sort = sort
+        self.next_ids = next_ids          # 解析成功的后续节点ID（保持配置顺序），多个即并行分支
+        self.broken_refs = broken_refs    # 指向不存在节点的引用，流转到这里视为流程配置错误
+        self.approver_ids = approver_ids  # frozenset 或 None（不限制）
+        self.in_degree = 0                # 汇聚节点：会签需要到达的分支数
+        self.upstream_ids = frozenset()   # 汇聚节点：能到达本节点的全部上游节点，或签通过后取消其中的分支
+
+    def can_approve(self, user_id):
+        return self.approver_ids is None or user_id in self.approver_ids
+
+    def required_arrivals(self):
+        """汇聚节点放行前需要到达的分支数"""
+        return 1 if self.join_mode == 'any' else max(self.in_degree, 1)
+
+
+class FlowGraph:
+    """编译后的审批流程：nodes 为 节点ID -> FlowNode"""
+
+    def __init__(self, flow_id, version, nodes):
+        self.flow_id = flow_id
+        self.version = version
+        self.nodes = nodes
+        starts = sorted((n for n in nodes.values() if n.node_type == 'start'), key=lambda n: (n.sort, n.id))
+        self.start_id = starts[0].id if starts else None
+
+        predecessors = {node_id: set() for node_id in nodes}
+        for node in nodes.values():
+            for next_id in node.next_ids:
+                predecessors[next_id].add(node.id)
+        for node in nodes.values():
+            if node.node_type == 'join':
+                node.in_degree = len(predecessors[node.id])
+                node.upstream_ids = self._upstream(node.id, predecessors)
+
+    @staticmethod
+    def _upstream(node_id, predecessors):
+        seen, stack = set(), list(predecessors[node_id])
+        while stack:
+            current = stack.pop()
+            if current != node_id and current not in seen:
+                seen.add(current)
+                stack.extend(predecessors[current])
+        return frozenset(seen)
+
+    def targets(self, node_id):
+        """节点通过后进入的节点（多个即并行分支）；没有后续节点返回空列表，有后续节点不存在抛 ValueError"""
+        node = self.nodes[node_id]
+        if node.broken_refs:
+            raise ValueError(f'流程配置错误：节点「{node.name}」的后续节点不存在')
+        return [self.nodes[next_id] for next_id in node.next_ids]
+
+
+def compile_flow(flow_id, version):
+    """一次查询编译流程的一个版本"""
+    rows = list(version_nodes(flow_id, version).values_list(
+        'id', 'node_key', 'name', 'node_type', 'join_mode', 'sort', 'next_nodes', 'approver_config'))
+    key_ids = {row[1]: row[0] for row in rows}
+    nodes = {}
+    for node_id, key, name, node_type, join_mode, sort, next_nodes, approver_config in rows:
+        refs = next_nodes.get('next', []) if isinstance(next_nodes, dict) else []
+        next_ids, broken = [], 0
+        for ref in refs if isinstance(refs, list) else []:
+            target = key_ids.get(ref) if isinstance(ref, str) else None
+            if target is not None and target != node_id:
+                if target not in next_ids:
+                    next_ids.append(target)
+            else:
+                broken += 1
+        nodes[node_id] = FlowNode(node_id, key, name, node_type, join_mode, sort, tuple(next_ids), broken,
+                                  resolve_approvers(approver_config))
+    logger.info(f"审批流程{flow_id}版本{version}已编译：{len(nodes)}个节点")
+    return FlowGraph(flow_id, version, nodes)
+
+
+def get_flow_graph(flow_id, version):
+    """返回流程某个版本的编译结果"""
+    cache_key = (flow_id, version)
+    graph = _graphs.get(cache_key)
+    if graph is not None:
+        with _lock:
+            if cache_key in _graphs:
+                _graphs.move_to_end(cache_key)
+        return graph
+
+    graph = compile_flow(flow_id, version)
+    with _lock:
+        _graphs[cache_key] = graph
+        while len(_graphs) > MAX_CACHED_FLOWS:
+            _graphs.popitem(last=False)
+    return graph
@@ -0,0 +1,70 @@
+# ===================== 审批待办 =====================
+# 节点审批人配置是自由 JSON，"谁能处理这个实例" 没法按索引查。实例每次流转时按编译好的流程图
+# （FlowNode.approver_ids）把审批人物化成 ApprovalTask 行，与流转在同一事务内写入：
+# - 进入节点（含并行分支上的各节点）：为节点的每个审批人插入一条 pending 待办
+# - 离开节点：该节点的 pending 待办一条 UPDATE 关闭，操作人的记为 done，其余记为 cancelled；
+#   驳回、流程结束、或签取消其他分支时，相应节点的待办记为 cancelled
+# 我的待办 = approver_id = ? AND status = 'pending'，走 (approver, status, id) 索引，
+# 开销只和自己的待办数有关，与审批中的实例总数无关。
+# 未指定审批人的节点（部门主管、角色等，approver_ids 为 None）任何人都可审批，不生成待办。
+# 升级前已有的实例、或直接改库后，执行 python manage.py rebuild_approval_tasks 重建。
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, Q, Value, When
+from django.utils import timezone
+
+from .approval_graph import get_flow_graph
+from .models import ApprovalTask, ApprovalToken
+
+
+def node_tasks(instance_id, node, active_ids):
+    """节点的待办行；active_ids 为可分配的用户ID集合（配置里已删除或停用的用户不分配）"""
+    if node is None or node.node_type == 'end' or node.approver_ids is None:
+        return []
+    return [ApprovalTask(instance_id=instance_id, node_id=node.id, approver_id=user_id)
+            for user_id in sorted(node.approver_ids & active_ids)]
+
+
+def open_tasks(entries):
+    """实例进入节点：entries 为 [(实例ID, 节点)]，一次查询用户、一次批量插入"""
+    entries = [(instance_id, node) for instance_id, node in entries
+               if node is not None and node.node_type != 'end' and node.approver_ids is not None]
+    if not entries:
+        return 0
+    user_ids = set().union(*(node.approver_ids for _, node in entries))
+    active_ids = set(User.objects.filter(id__in=user_ids, is_active=True).values_list('id', flat=True))
+    tasks = [task for instance_id, node in entries for task in node_tasks(instance_id, node, active_ids)]
+    return len(ApprovalTask.objects.bulk_create(tasks))
+
+
+def close_tasks(entries, actor_id=None):
+    """实例离开节点：entries 为 [(实例ID, 节点ID列表或 None 表示全部节点)]，关闭这些节点的待办，
+    操作人的记为已处理，其他审批人的（以及不传 actor_id 时的全部）记为已取消"""
+    condition = Q()
+    for instance_id, node_ids in entries:
+        condition |= Q(instance_id=instance_id) if node_ids is None else Q(instance_id=instance_id, node_id__in=node_ids)
+    if not condition:
+        return 0
+    return ApprovalTask.objects.filter(condition, status='pending').update(
+        status=Case(When(approver_id=actor_id, then=Value('done')), default=Value('cancelled')),
+        finish_time=timezone.now(),
+    )
+
+
+def rebuild_tasks(batch_size=2000):
+    """按审批中实例的活动令牌（各分支所在节点）重建全部 pending 待办，返回生成的待办数"""
+    active_ids = set(User.objects.filter(is_active=True).values_list('id', flat=True))
+    tokens = ApprovalToken.objects.filter(status='active', instance__status='running').order_by('id').values_list(
+        'instance_id', 'instance__flow_id', 'instance__flow_version', 'node_id')
+    created = 0
+    with transaction.atomic():
+        ApprovalTask.objects.filter(status='pending').delete()
+        batch = []
+        for instance_id, flow_id, flow_version, node_id in tokens.iterator(chunk_size=batch_size):
+            node = get_flow_graph(flow_id, flow_version).nodes.get(node_id)
+            batch.extend(node_tasks(instance_id, node, active_ids))
+            if len(batch) >= batch_size:
+                created += len(ApprovalTask.objects.bulk_create(batch))
+                batch = []
+        created += len(ApprovalTask.objects.bulk_create(batch))
+    return created
@@ -0,0 +1,121 @@
+# ===================== 审批流程版本与节点差量保存 =====================
+# 节点按 node_key 标识，每行带版本区间 [since_version, until_version)：
+# - 保存流程时按 node_key 与当前版本逐个比对，只写变化的节点：
+#     新增节点        插入一行（since_version = 新版本）
+#     审批语义变化    旧行写上 until_version = 新版本，插入一行新内容
+#     删除节点        旧行写上 until_version = 新版本
+#     只改了坐标/排序  原地更新，不产生新版本（画布布局不影响审批）
+#   有语义变化时流程版本号 +1，没有则版本号不变
+# - 已发布版本的行不再修改：审批中的实例固定在创建时的 flow_version，current_node 一直有效
+# - 编辑器里节点以行ID为画布ID、next_nodes 引用行ID；读取时把 node_key 换成行ID，保存时再换回来
+from django.db.models import Q
+
+from .models import ApprovalFlow, ApprovalInstance, ApprovalNode, new_node_key
+
+SEMANTIC_FIELDS = ('name', 'node_type', 'join_mode', 'approver_config', 'next_nodes')
+LAYOUT_FIELDS = ('sort', 'x', 'y')
+
+
+def version_nodes(flow_id, version):
+    """某个版本的全部节点"""
+    return ApprovalNode.objects.filter(flow_id=flow_id, since_version__lte=version).filter(
+        Q(until_version__isnull=True) | Q(until_version__gt=version))
+
+
+def current_nodes(flow_id):
+    return ApprovalNode.objects.filter(flow_id=flow_id, until_version__isnull=True).order_by('sort')
+
+
+def nodes_for_editor(nodes):
+    """序列化后的节点列表：next_nodes 中的 node_key 换成同一版本内的行ID，供编辑器画连线"""
+    ids = {node['node_key']: node['id'] for node in nodes}
+    for node in nodes:
+        next_nodes = node['next_nodes'] if isinstance(node['next_nodes'], dict) else {}
+        refs = next_nodes.get('next', [])
+        if isinstance(refs, list):
+            node['next_nodes'] = {**next_nodes, 'next': [ids.get(ref, ref) for ref in refs]}
+    return nodes
+
+
+def normalize_items(items, existing):
+    """把编辑器提交的节点转成 {node_key: 字段}；existing 为当前版本 行ID -> node_key"""
+    keys = []
+    ref_keys = {}  # 编辑器里的节点ID（行ID或新节点的临时ID）-> node_key
+    for item in items:
+        key = item.get('node_key') or existing.get(_as_int(item.get('id'))) or new_node_key()
+        keys.append(key)
+        if item.get('id') not in (None, ''):
+            ref_keys[str(item['id'])] = key
+        ref_keys[key] = key
+
+    normalized = {}
+    for idx, (item, key) in enumerate(zip(items, keys)):
+        approver_config = item.get('approver_config', {})
+        if not isinstance(approver_config, dict):  # 兼容前端传数组
+            approver_config = {}
+        next_nodes = item.get('next_nodes', {})
+        if not isinstance(next_nodes, dict):
+            next_nodes = {}
+        refs = next_nodes.get('next', [])
+        if isinstance(refs, list):
+            next_nodes = {**next_nodes, 'next': [ref_keys.get(str(ref), ref) for ref in refs]}
+        normalized[key] = {
+            'name': item.get('name', ''),
+            'node_type': item.get('node_type', 'approver'),
+            'join_mode': 'any' if item.get('join_mode') == 'any' else 'all',
+            'approver_config': approver_config,
+            'next_nodes': next_nodes,
+            'sort': item.get('sort', idx),
+            'x': item.get('x', 100),
+            'y': item.get('y', 100),
+        }
+    return normalized
+
+
+def _as_int(value):
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+
+def save_flow_nodes(flow, items):
+    """按差量保存流程节点（需在事务内调用，flow 应已 select_for_update），返回各类变更数量"""
+    current = {node.node_key: node for node in current_nodes(flow.id)}
+    incoming = normalize_items(items, {node.id: key for key, node in current.items()})
+
+    added = [key for key in incoming if key not in current]
+    removed = [key for key in current if key not in incoming]
+    changed, relaid = [], []
+    for key, fields in incoming.items():
+        node = current.get(key)
+        if node is None:
+            continue
+        if any(getattr(node, name) != fields[name] for name in SEMANTIC_FIELDS):
+            changed.append(key)
+        elif any(getattr(node, name) != fields[name] for name in LAYOUT_FIELDS):
+            for name in LAYOUT_FIELDS:
+                setattr(node, name, fields[name])
+            relaid.append(node)
+
+    if added and not current and not ApprovalInstance.objects.filter(
+            flow_id=flow.id, flow_version=flow.version).exists():
+        # 新建流程（当前版本还没有节点、也没有实例）：直接写入当前版本
+        ApprovalNode.objects.bulk_create([
+            ApprovalNode(flow=flow, node_key=key, since_version=flow.version, **incoming[key]) for key in added
+        ])
+    elif added or removed or changed:
+        version = flow.version + 1
+        ApprovalNode.objects.filter(id__in=[current[key].id for key in removed + changed]).update(
+            until_version=version)
+        ApprovalNode.objects.bulk_create([
+            ApprovalNode(flow=flow, node_key=key, since_version=version, **incoming[key])
+            for key in added + changed
+        ])
+        flow.version = version
+        ApprovalFlow.objects.filter(id=flow.id).update(version=version)
+    if relaid:
+        ApprovalNode.objects.bulk_update(relaid, LAYOUT_FIELDS)
+    return {'version': flow.version, 'added': len(added), 'changed': len(changed), 'removed': len(removed),
+            'relaid': len(relaid)}
@@ -1,6 +1,6 @@
-from django.apps import AppConfig
-
-
-class MyerpappConfig(AppConfig):
-    default_auto_field = 'django.db.models.BigAutoField'
-    name = 'myerpapp'
+from django.apps import AppConfig
+
+
+class MyerpappConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'myerpapp'
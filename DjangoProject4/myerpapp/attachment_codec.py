@@ -0,0 +1,172 @@
+# ===================== 附件压缩存储格式（可随机读取） =====================
+# 文件按 1MB 原始数据切成帧，每帧独立压缩后依次写出，文件末尾是帧索引和定长尾部：
+#   [帧0][帧1]...[帧N-1][索引：N 个 uint32 压缩后帧长][尾部 22 字节]
+#   尾部：magic 'ERPZ' | 版本 uint8 | 编码 uint8 | 帧大小 uint32 | 原始大小 uint64 | 帧数 uint32（小端）
+# 读取任意偏移只需解压覆盖该偏移的帧，Range 请求、ZIP 打包都不必解压整个文件。
+# 编码：zstd（安装了 zstandard 时）或 zlib（标准库，始终可用）。
+import io
+import os
+import struct
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd 为可选依赖，未安装时只能使用 zlib
+    zstandard = None
+
+MAGIC = b'ERPZ'
+VERSION = 1
+FRAME_SIZE = 1024 * 1024
+TRAILER = struct.Struct('<4sBBIQI')
+COMPRESSED_SUFFIX = '.erpz'
+CODEC_IDS = {'zlib': 1, 'zstd': 2}
+CODEC_NAMES = {v: k for k, v in CODEC_IDS.items()}
+DEFAULT_LEVELS = {'zlib': 6, 'zstd': 9}
+
+
+class CodecError(ValueError):
+    pass
+
+
+def available_codecs():
+    return ['zstd', 'zlib'] if zstandard is not None else ['zlib']
+
+
+def resolve_codec(codec):
+    """配置为 zstd 但未安装 zstandard 时退回 zlib"""
+    if codec == 'zstd' and zstandard is None:
+        return 'zlib'
+    if codec not in CODEC_IDS:
+        raise CodecError(f'不支持的压缩编码：{codec}')
+    return codec
+
+
+def _compressor(codec, level):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress
+    return lambda data: zlib.compress(data, level)
+
+
+def _decompressor(codec):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise CodecError('该附件以 zstd 压缩存储，需要安装 zstandard')
+        return zstandard.ZstdDecompressor().decompress
+    return zlib.decompress
+
+
+def compress_ratio(path, codec, level=None):
+    """压缩文件开头一帧估算压缩率（压缩后/原始），用于判断是否值得压缩"""
+    codec = resolve_codec(codec)
+    with open(path, 'rb') as fp:
+        sample = fp.read(FRAME_SIZE)
+    if not sample:
+        return 1.0
+    return len(_compressor(codec, level or DEFAULT_LEVELS[codec])(sample)) / len(sample)
+
+
+def compress_file(src, dst, codec, level=None):
+    """把 src 压缩为分帧格式写到 dst（写完 fsync），返回压缩后文件大小"""
+    codec = resolve_codec(codec)
+    compress = _compressor(codec, level or DEFAULT_LEVELS[codec])
+    frame_sizes = []
+    size = 0
+    with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+        for block in iter(lambda: fin.read(FRAME_SIZE), b''):
+            frame = compress(block)
+            fout.write(frame)
+            frame_sizes.append(len(frame))
+            size += len(block)
+        fout.write(struct.pack(f'<{len(frame_sizes)}I', *frame_sizes))
+        fout.write(TRAILER.pack(MAGIC, VERSION, CODEC_IDS[codec], FRAME_SIZE, size, len(frame_sizes)))
+        fout.flush()
+        os.fsync(fout.fileno())
+        return fout.tell()
+
+
+class SeekableFrameReader(io.RawIOBase):
+    """按原始内容读取分帧压缩文件：支持 seek/tell，只解压用到的帧（缓存最近一帧）"""
+
+    def __init__(self, source):
+        """source 为文件路径或已打开的可 seek 二进制文件对象（如对象存储的读取器），关闭时一并关闭"""
+        super().__init__()
+        if isinstance(source, (str, os.PathLike)):
+            path, self._fp = source, open(source, 'rb')
+        else:
+            path, self._fp = getattr(source, 'name', '附件'), source
+        try:
+            self._fp.seek(-TRAILER.size, io.SEEK_END)
+            magic, version, codec_id, frame_size, size, count = TRAILER.unpack(self._fp.read(TRAILER.size))
+            if magic != MAGIC or version != VERSION or codec_id not in CODEC_NAMES:
+                raise CodecError(f'不是有效的压缩附件：{path}')
+            self._fp.seek(-TRAILER.size - 4 * count, io.SEEK_END)
+            frame_sizes = struct.unpack(f'<{count}I', self._fp.read(4 * count))
+        except (OSError, struct.error):
+            self._fp.close()
+            raise CodecError(f'不是有效的压缩附件：{path}')
+        except CodecError:
+            self._fp.close()
+            raise
+        self.codec = CODEC_NAMES[codec_id]
+        self.size = size
+        self._decompress = _decompressor(self.codec)
+        self._frame_size = frame_size
+        self._frame_sizes = frame_sizes
+        self._offsets = [0] * count
+        for i in range(1, count):
+            self._offsets[i] = self._offsets[i - 1] + frame_sizes[i - 1]
+        self._pos = 0
+        self._cached_index = -1
+        self._cached = b''
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f'不支持的 whence：{whence}')
+        if pos < 0:
+            raise ValueError('seek 位置不能为负数')
+        self._pos = pos
+        return pos
+
+    def _frame(self, index):
+        if index != self._cached_index:
+            self._fp.seek(self._offsets[index])
+            self._cached = self._decompress(self._fp.read(self._frame_sizes[index]))
+            self._cached_index = index
+        return self._cached
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.size - self._pos
+        chunks = []
+        while size > 0 and self._pos < self.size:
+            index, start = divmod(self._pos, self._frame_size)
+            data = self._frame(index)[start:start + size]
+            chunks.append(data)
+            self._pos += len(data)
+            size -= len(data)
+        return b''.join(chunks)
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self._fp.close()
+        super().close()
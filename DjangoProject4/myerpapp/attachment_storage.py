@@ -0,0 +1,221 @@
+# ===================== 附件存储后端 =====================
+# 附件实体文件（AttachmentBlob.path / MaterialFile.file_path，形如 material_files/ab/cd/<sha256>）
+# 的读写删统一经过 get_attachment_storage() 返回的后端，由 ATTACHMENT_STORAGE_BACKEND 选择：
+#   'local'  MEDIA_ROOT 下的本地文件（默认，多节点部署需要共享磁盘）
+#   's3'     S3 兼容对象存储（AWS S3 / MinIO 等，需要安装 boto3），对象键为 ATTACHMENT_S3_PREFIX + 相对路径；
+#            下载返回短时有效的预签名 URL，浏览器直接从对象存储取字节，不经过 Django worker
+# 上传的字节始终先落到本节点 MEDIA_ROOT 下（边收边算 SHA-256），确定是新内容后再 save() 进存储。
+# 压缩存储、附件对账、旧附件迁移直接操作磁盘文件，只支持本地后端。
+import io
+import os
+
+from django.conf import settings
+from django.utils.http import content_disposition_header
+
+try:
+    import boto3
+    from botocore.config import Config
+    from botocore.exceptions import ClientError
+except ImportError:  # 对象存储为可选依赖，只用本地存储时不需要安装
+    boto3 = None
+    Config = ClientError = None
+
+S3_MISSING_CODES = ('404', 'NoSuchKey', 'NotFound')
+
+
+def fsync_dir(path):
+    """rename/新建文件后同步目录项，保证断电后文件仍在目录里（Windows 不支持，跳过）"""
+    if os.name != 'posix':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class LocalAttachmentStorage:
+    """MEDIA_ROOT 下的本地文件"""
+    is_local = True
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, relpath):
+        return os.path.join(self.root, *relpath.split('/'))
+
+    def save(self, local_path, relpath):
+        """把本地文件移入存储（同一文件系统内 rename，不拷贝）"""
+        target = self.path(relpath)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(local_path, target)
+        fsync_dir(os.path.dirname(target))
+
+    def open(self, relpath):
+        return open(self.path(relpath), 'rb')
+
+    def stat(self, relpath):
+        """返回 (大小, 修改时间纳秒)，文件不存在抛 FileNotFoundError"""
+        stat = os.stat(self.path(relpath))
+        return stat.st_size, stat.st_mtime_ns
+
+    def exists(self, relpath):
+        return os.path.isfile(self.path(relpath))
+
+    def delete(self, relpath):
+        try:
+            os.remove(self.path(relpath))
+        except FileNotFoundError:
+            pass
+
+    def url(self, relpath, file_name, expires=None):
+        """本地存储没有直链，由 Django 发送（或 X-Accel-Redirect 交给代理）"""
+        return None
+
+
+class S3ObjectReader(io.RawIOBase):
+    """按需 GET 对象（Range: bytes=<pos>-）的可 seek 只读文件：顺序读复用同一个响应流，seek 后重新请求"""
+
+    def __init__(self, client, bucket, key, size):
+        super().__init__()
+        self._client = client
+        self._bucket = bucket
+        self._key = key
+        self.size = size
+        self._pos = 0
+        self._body = None
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f'不支持的 whence：{whence}')
+        if pos < 0:
+            raise ValueError('seek 位置不能为负数')
+        if pos != self._pos:
+            self._close_body()
+            self._pos = pos
+        return pos
+
+    def read(self, size=-1):
+        if self._pos >= self.size or size == 0:
+            return b''
+        if self._body is None:
+            response = self._client.get_object(Bucket=self._bucket, Key=self._key, Range=f'bytes={self._pos}-')
+            self._body = response['Body']
+        data = self._body.read() if size is None or size < 0 else self._body.read(size)
+        self._pos += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def _close_body(self):
+        if self._body is not None:
+            self._body.close()
+            self._body = None
+
+    def close(self):
+        self._close_body()
+        super().close()
+
+
+class S3AttachmentStorage:
+    """S3 兼容对象存储"""
+    is_local = False
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None, access_key=None, secret_key=None,
+                 url_expire=300):
+        if boto3 is None:
+            raise RuntimeError('附件存储配置为 s3，需要安装 boto3')
+        if not bucket:
+            raise RuntimeError('附件存储配置为 s3，需要配置 ATTACHMENT_S3_BUCKET')
+        self.bucket = bucket
+        self.prefix = prefix
+        self.url_expire = url_expire
+        self.client = boto3.client(
+            's3', endpoint_url=endpoint_url or None, region_name=region or None,
+            aws_access_key_id=access_key or None, aws_secret_access_key=secret_key or None,
+            config=Config(signature_version='s3v4'),  # MinIO 和较新的 AWS 区域只接受 V4 签名
+        )
+
+    def key(self, relpath):
+        return self.prefix + relpath
+
+    def _head(self, relpath):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self.key(relpath))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in S3_MISSING_CODES:
+                raise FileNotFoundError(f'对象不存在：{self.key(relpath)}')
+            raise
+
+    def save(self, local_path, relpath):
+        """上传本地文件（大文件由 boto3 自动分片并发上传），成功后删除本地文件"""
+        self.client.upload_file(local_path, self.bucket, self.key(relpath))
+        os.remove(local_path)
+
+    def open(self, relpath):
+        head = self._head(relpath)
+        return S3ObjectReader(self.client, self.bucket, self.key(relpath), head['ContentLength'])
+
+    def stat(self, relpath):
+        head = self._head(relpath)
+        return head['ContentLength'], int(head['LastModified'].timestamp()) * 10 ** 9
+
+    def exists(self, relpath):
+        try:
+            self._head(relpath)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def delete(self, relpath):
+        self.client.delete_object(Bucket=self.bucket, Key=self.key(relpath))  # 对象不存在也返回成功
+
+    def url(self, relpath, file_name, expires=None):
+        """短时有效的预签名下载地址，响应头里带上原始文件名"""
+        return self.client.generate_presigned_url('get_object', Params={
+            'Bucket': self.bucket,
+            'Key': self.key(relpath),
+            'ResponseContentDisposition': content_disposition_header(True, file_name),
+            'ResponseContentType': 'application/octet-stream',
+        }, ExpiresIn=expires or self.url_expire)
+
+
+_storages = {}
+
+
+def get_attachment_storage():
+    """按当前配置返回附件存储后端（同一配置复用同一个实例，配置变化时重新创建）"""
+    backend = getattr(settings, 'ATTACHMENT_STORAGE_BACKEND', 'local') or 'local'
+    if backend == 'local':
+        config = ('local', str(settings.MEDIA_ROOT))
+    elif backend == 's3':
+        config = ('s3',) + tuple(getattr(settings, name, '') for name in (
+            'ATTACHMENT_S3_BUCKET', 'ATTACHMENT_S3_PREFIX', 'ATTACHMENT_S3_ENDPOINT_URL', 'ATTACHMENT_S3_REGION',
+            'ATTACHMENT_S3_ACCESS_KEY', 'ATTACHMENT_S3_SECRET_KEY',
+        )) + (getattr(settings, 'ATTACHMENT_PRESIGNED_URL_EXPIRE', 300),)
+    else:
+        raise RuntimeError(f'不支持的附件存储后端：{backend}')
+
+    storage = _storages.get(config)
+    if storage is None:
+        storage = LocalAttachmentStorage(config[1]) if backend == 'local' else S3AttachmentStorage(*config[1:])
+        _storages[config] = storage
+    return storage
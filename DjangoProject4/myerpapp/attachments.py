@@ -0,0 +1,340 @@
+# ===================== 物料附件存储 =====================
+# 附件目录按随机文件名的前两级十六进制分片：material_files/ab/cd/<uuid>.<ext>，
+# 单个目录的文件数保持在几百以内，目录遍历/备份不随附件总数变慢。
+#
+# MaterialFileUploadHandler 替代 TemporaryFileUploadHandler 处理附件上传：
+# multipart 解析时把字节直接写到最终位置，同时计算大小和 SHA-256，
+# 不再经过 /tmp 临时文件 + 二次拷贝；数据库只在字节落盘后用一次 bulk_create 写入，
+# 事务里不再包含磁盘写，SQLite 写锁只持有几毫秒。
+#
+# 去重存储：附件按内容存放为 material_files/ab/cd/<sha256>（AttachmentBlob），
+# 多个 MaterialFile 引用同一份内容时只占一份磁盘，ref_count 记录引用数：
+# - store_blob()：新文件写完后调用，内容已存在则删掉新文件、引用数 +1，否则改名为内容地址
+# - release_material_files()：删除 MaterialFile 时调用，引用数降到 0 的实体文件在事务提交后由 purge_blobs() 删除
+#
+# 压缩存储：compress_blob() 把实体文件转成可随机读取的分帧压缩格式（attachment_codec.py），
+# 路径加 .erpz 后缀；读取附件一律经过 open_attachment()，调用方不区分是否压缩。
+# 冷数据由 compress_attachments 命令定期压缩，ATTACHMENT_COMPRESS_AT_UPLOAD 开启时上传后立即压缩。
+#
+# 存储后端（attachment_storage.py）：实体文件的读写删经过 get_attachment_storage()，可配置为对象存储。
+# attachment_full_path() 始终指本节点磁盘：上传先写到这里，store_blob() 确认是新内容后移入存储后端；
+# 对象存储上传较慢，调用方先在事务外 stage_blob()，事务里只剩数据库操作。
+import hashlib
+import logging
+import os
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .attachment_codec import COMPRESSED_SUFFIX, SeekableFrameReader, compress_file, compress_ratio, resolve_codec
+from .attachment_storage import fsync_dir, get_attachment_storage
+from .models import AttachmentBlob, MaterialFile
+
+logger = logging.getLogger(__name__)
+
+ATTACHMENT_DIR = 'material_files'
+MAX_ATTACHMENT_SIZE = getattr(settings, 'MATERIAL_FILE_MAX_SIZE', 1 * 1024 * 1024 * 1024)
+COMPRESSED_CODECS = ('zlib', 'zstd')
+COMPRESS_MIN_SIZE = 64 * 1024  # 太小的文件压缩收益不抵元数据开销
+COMPRESS_MIN_SAVING = 0.1  # 至少省 10% 才压缩存储
+
+
+def new_attachment_relpath(file_name):
+    """新附件的相对路径（MEDIA_ROOT 下）：material_files/ab/cd/<uuid><ext>"""
+    token = uuid.uuid4().hex
+    ext = os.path.splitext(file_name)[1].lower()[:16]
+    return '/'.join([ATTACHMENT_DIR, token[:2], token[2:4], token + ext])
+
+
+def attachment_full_path(relpath):
+    """本节点磁盘上的完整路径（上传暂存；本地存储后端时也是实体文件所在位置）"""
+    return os.path.join(settings.MEDIA_ROOT, *relpath.split('/'))
+
+
+def blob_relpath(sha256):
+    """内容地址：material_files/ab/cd/<sha256>（与随机文件名共用分片目录，长度不同不会冲突）"""
+    return '/'.join([ATTACHMENT_DIR, sha256[:2], sha256[2:4], sha256])
+
+
+def open_attachment(relpath):
+    """从存储后端以二进制只读方式打开附件，压缩存储的附件返回按原始内容读取的 SeekableFrameReader"""
+    fp = get_attachment_storage().open(relpath)
+    if relpath.endswith(COMPRESSED_SUFFIX):
+        return SeekableFrameReader(fp)
+    return fp
+
+
+def remove_attachment_file(relpath):
+    """删除存储后端中的实体文件"""
+    get_attachment_storage().delete(relpath)
+
+
+def remove_staged_file(relpath):
+    """删除本节点磁盘上的暂存文件（上传后发现内容重复等）"""
+    try:
+        os.remove(attachment_full_path(relpath))
+    except FileNotFoundError:
+        pass
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    """流式计算已有文件的 (SHA-256, 大小)"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as fp:
+        for block in iter(lambda: fp.read(block_size), b''):
+            digest.update(block)
+            size += len(block)
+    return digest.hexdigest(), size
+
+
+class StoredUploadedFile(UploadedFile):
+    """已经写到最终位置的上传文件：只带元数据，不再持有文件句柄"""
+
+    def __init__(self, name, content_type, size, charset, content_type_extra, relpath, sha256):
+        super().__init__(None, name, content_type, size, charset, content_type_extra)
+        self.relpath = relpath
+        self.sha256 = sha256
+
+    def close(self):
+        pass
+
+
+class MaterialFileUploadHandler(FileUploadHandler):
+    """附件上传处理器：单次遍历完成 写盘 + 计算大小 + SHA-256
+
+    只用于附件上传接口（视图里替换 request.upload_handlers），其他接口仍走默认处理器。
+    单个文件超过 MAX_ATTACHMENT_SIZE 时中止整个上传，视图据 too_large 返回错误。
+    """
+
+    def __init__(self, request=None, max_size=MAX_ATTACHMENT_SIZE):
+        super().__init__(request)
+        self.max_size = max_size
+        self.written = []  # 本次请求写过的所有文件（完整路径），出错时统一清理
+        self.too_large = None
+        self._fp = None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        if self.content_length is not None and self.content_length > self.max_size:
+            self.too_large = self.file_name
+            raise StopUpload(connection_reset=True)
+        self.relpath = new_attachment_relpath(self.file_name)
+        full_path = attachment_full_path(self.relpath)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        self._fp = open(full_path, 'wb')
+        self.written.append(full_path)
+        self._digest = hashlib.sha256()
+        self._size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self._size += len(raw_data)
+        if self._size > self.max_size:
+            self.too_large = self.file_name
+            self._close()
+            raise StopUpload(connection_reset=True)
+        self._fp.write(raw_data)
+        self._digest.update(raw_data)
+        return None  # 已消费，不再交给后面的处理器
+
+    def file_complete(self, file_size):
+        self._fp.flush()
+        os.fsync(self._fp.fileno())
+        self._close()
+        fsync_dir(os.path.dirname(self.written[-1]))
+        return StoredUploadedFile(
+            self.file_name, self.content_type, file_size, self.charset, self.content_type_extra,
+            relpath=self.relpath, sha256=self._digest.hexdigest(),
+        )
+
+    def upload_interrupted(self):
+        self.discard()
+
+    def _close(self):
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+    def discard(self):
+        """删除本次请求写入的所有文件（上传中断、校验失败或入库失败时调用）"""
+        self._close()
+        for path in self.written:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        if self.written:
+            logger.info(f"已清理未入库的附件文件{len(self.written)}个")
+        self.written = []
+
+
+# ===================== 去重存储：引用计数 =====================
+def acquire_blob(sha256):
+    """内容已存在时引用数 +1 并返回 AttachmentBlob，否则返回 None（需在事务内调用）"""
+    if AttachmentBlob.objects.filter(sha256=sha256).update(ref_count=F('ref_count') + 1):
+        return AttachmentBlob.objects.get(sha256=sha256)
+    return None
+
+
+def stage_blob(relpath, sha256):
+    """事务外调用：对象存储后端先把新内容上传到内容地址，返回之后传给 store_blob() 的路径
+
+    本地存储后端 store_blob() 里只是一次 rename，原样返回 relpath；内容已存在时也不上传。
+    """
+    storage = get_attachment_storage()
+    if storage.is_local or AttachmentBlob.objects.filter(sha256=sha256).exists():
+        return relpath
+    target = blob_relpath(sha256)
+    storage.save(attachment_full_path(relpath), target)  # 上传成功后删除本地暂存文件
+    return target
+
+
+def discard_staged_blobs(staged):
+    """上传失败时调用（事务外）：删除 stage_blob() 已上传到存储后端、但最终没有建档的对象
+
+    staged 为 [(暂存路径, stage_blob() 的返回值)]；两者相同说明没有上传（本地存储或内容已存在）。
+    内容地址可能被同时上传相同内容的请求建档引用，有记录的不删。
+    """
+    storage = get_attachment_storage()
+    for relpath, target in staged:
+        if target != relpath and not AttachmentBlob.objects.filter(path=target).exists():
+            try:
+                storage.delete(target)
+            except Exception as e:
+                logger.error(f"清理未建档的附件对象{target}失败：{str(e)}")
+
+
+def store_blob(relpath, sha256, size):
+    """把刚写完的新文件收进去重存储（需在事务内调用），返回引用数已 +1 的 AttachmentBlob
+
+    relpath 为本节点磁盘上的暂存文件，或 stage_blob() 已上传到存储后端的内容地址。
+    """
+    target = blob_relpath(sha256)
+    blob = acquire_blob(sha256)
+    if blob is not None:
+        # 内容重复：只多一条引用，暂存文件在事务提交后删除（回滚时由调用方清理）
+        if relpath != target:
+            transaction.on_commit(lambda: remove_staged_file(relpath))
+        return blob
+
+    if relpath != target:
+        # 本地存储：同目录树内 rename，不拷贝；对象存储（调用方未 stage）：上传后删除暂存文件
+        get_attachment_storage().save(attachment_full_path(relpath), target)
+    try:
+        with transaction.atomic():
+            blob = AttachmentBlob.objects.create(
+                sha256=sha256, size=size, path=target, ref_count=1, stored_size=size)
+    except IntegrityError:
+        # 并发上传了相同内容，对方已建好记录（两边写入的字节相同，文件被覆盖也无妨）
+        return acquire_blob(sha256)
+    if (getattr(settings, 'ATTACHMENT_COMPRESS_AT_UPLOAD', False) and size >= COMPRESS_MIN_SIZE
+            and get_attachment_storage().is_local):
+        transaction.on_commit(lambda: compress_blob_quietly(blob.id))
+    return blob
+
+
+def release_material_files(rows):
+    """MaterialFile 删除后调用（与删除在同一事务内），rows 为 [(blob_id, file_path), ...]
+
+    去重存储的附件：引用数递减，降到 0 的实体文件在事务提交后由 purge_blobs() 删除；
+    去重上线前的旧附件（blob_id 为空）：文件独占，事务提交后直接删除。
+    """
+    refs = Counter(blob_id for blob_id, _ in rows if blob_id)
+    legacy_paths = [path for blob_id, path in rows if not blob_id and path]
+    for blob_id, count in refs.items():
+        AttachmentBlob.objects.filter(id=blob_id).update(ref_count=F('ref_count') - count)
+    dead_ids = list(AttachmentBlob.objects.filter(id__in=list(refs), ref_count__lte=0).values_list('id', flat=True))
+
+    def remove_files():
+        purge_blobs(dead_ids)
+        for path in legacy_paths:
+            remove_attachment_file(path)
+
+    if dead_ids or legacy_paths:
+        transaction.on_commit(remove_files)
+    return len(dead_ids) + len(legacy_paths)
+
+
+def purge_blobs(blob_ids):
+    """删除引用数为 0 的实体文件，返回删除数
+
+    每个实体文件单独一个事务：先按 ref_count <= 0 条件删除记录，删到了才删文件，文件删完才提交。
+    同时重新上传同样内容的请求在 acquire_blob() 里对同一行 +1，与这里的删除串行：
+    对方先到则引用数不再为 0，这里不删；这里先到则对方提交前看不到记录，会重新建档并写入新文件，
+    新文件落到内容地址时旧文件已经删完，不会被误删。删文件失败时整个事务回滚，记录保留（引用数 0），
+    由 reconcile_attachments --fix-refcounts 之后重试。
+    """
+    purged = 0
+    for blob_id in blob_ids:
+        with transaction.atomic():
+            path = AttachmentBlob.objects.filter(id=blob_id, ref_count__lte=0).values_list('path', flat=True).first()
+            if path is None or not AttachmentBlob.objects.filter(id=blob_id, ref_count__lte=0, path=path).delete()[0]:
+                continue
+            remove_attachment_file(path)
+        purged += 1
+    return purged
+
+
+# ===================== 压缩存储 =====================
+def touch_blob_access(blob):
+    """记录最近下载时间（每天最多写一次库），冷数据策略据此判断"""
+    now = datetime.now()
+    if blob is not None and (blob.last_access_time is None or blob.last_access_time < now - timedelta(days=1)):
+        AttachmentBlob.objects.filter(id=blob.id).update(last_access_time=now)
+
+
+def compress_blob(blob_id, codec=None, level=None, min_saving=COMPRESS_MIN_SAVING):
+    """把未压缩的实体文件转为分帧压缩存储，返回节省的字节数；不值得压缩返回 0，已被删除/处理返回 None
+
+    压缩在事务外进行，事务里只切换 AttachmentBlob.path 和对应 MaterialFile.file_path，
+    原文件在提交后删除（正在读取原文件的下载不受影响）。只支持本地存储后端。
+    """
+    blob = AttachmentBlob.objects.filter(id=blob_id, codec='').first()
+    if blob is None or not get_attachment_storage().is_local:
+        return None
+    codec = resolve_codec(codec or getattr(settings, 'ATTACHMENT_COMPRESSION_CODEC', 'zstd'))
+    source = attachment_full_path(blob.path)
+    target = blob.path + COMPRESSED_SUFFIX
+
+    # 先抽样开头 1MB：已压缩格式（图片、压缩包、PDF 等）直接跳过，不做整文件压缩
+    stored_size = None
+    if blob.size >= COMPRESS_MIN_SIZE and compress_ratio(source, codec, level) <= 1 - min_saving:
+        staged = attachment_full_path(target) + '.tmp'
+        stored_size = compress_file(source, staged, codec, level)
+        if stored_size > blob.size * (1 - min_saving):
+            os.remove(staged)
+            stored_size = None
+        else:
+            os.replace(staged, attachment_full_path(target))
+            fsync_dir(os.path.dirname(attachment_full_path(target)))
+    if stored_size is None:
+        AttachmentBlob.objects.filter(id=blob.id, codec='').update(codec='identity')
+        return 0
+
+    with transaction.atomic():
+        switched = AttachmentBlob.objects.filter(id=blob.id, codec='', path=blob.path).update(
+            path=target, codec=codec, stored_size=stored_size)
+        if not switched:  # 压缩期间实体文件被删除或已被其他进程处理（对方可能已切换到同名的压缩文件）
+            def discard():
+                if not AttachmentBlob.objects.filter(path=target).exists():
+                    remove_attachment_file(target)
+            transaction.on_commit(discard)
+            return None
+        MaterialFile.objects.filter(blob_id=blob.id).update(file_path=target)
+        transaction.on_commit(lambda: remove_attachment_file(blob.path))
+    logger.info(f"附件实体文件{blob.sha256[:12]}压缩存储（{codec}）：{blob.size}→{stored_size}字节")
+    return blob.size - stored_size
+
+
+def compress_blob_quietly(blob_id):
+    """上传后立即压缩：失败只记日志，附件仍按未压缩存储，不影响上传结果"""
+    try:
+        compress_blob(blob_id)
+    except Exception as e:
+        logger.error(f"附件实体文件{blob_id}压缩失败：{str(e)}", exc_info=True)
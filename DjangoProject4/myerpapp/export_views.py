@@ -0,0 +1,142 @@
+# ===================== 数据导出接口（CSV / XLSX 流式导出） =====================
+# 查询集用 values_list + iterator(chunk_size) 分批从数据库取数，
+# 由 StreamingHttpResponse 边生成边发送，百万行导出内存占用也保持平稳。
+# 筛选参数与对应列表接口一致；format=csv（默认）或 format=xlsx。
+import logging
+from datetime import datetime
+from urllib.parse import quote
+
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from .erp_user_views import erp_user_queryset
+from .models import ApprovalRecord, Role
+from .role_views import permission_required, FORM_CHOICES, ACTION_CHOICES
+from .streaming import iter_csv, iter_xlsx
+from .views import material_queryset, InvalidCursor
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def bad_request(msg):
+    return JsonResponse({
+        'code': 400,
+        'msg': msg,
+        'data': {}
+    }, status=200, json_dumps_params={'ensure_ascii': False})
+
+
+def export_response(request, filename, header, rows):
+    """按 format 参数返回流式下载响应；文件名自动追加时间戳"""
+    fmt = request.GET.get('format', 'csv').strip().lower() or 'csv'
+    if fmt not in EXPORT_FORMATS:
+        return bad_request(f'不支持的导出格式：{fmt}，可选 csv/xlsx')
+
+    if fmt == 'xlsx':
+        content = iter_xlsx(header, rows, sheet_name=filename)
+    else:
+        content = iter_csv(header, rows)
+
+    full_name = f"{filename}_{datetime.now().strftime('%Y%m%d%H%M%S')}.{fmt}"
+    response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[fmt])
+    response['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(full_name)}"
+    response['Cache-Control'] = 'no-store'
+    logger.info(f"用户{request.session.get('erp_user_id')}导出{filename}（{fmt}）")
+    return response
+
+
+# ===================== 1. 物料导出 =====================
+@csrf_exempt
+@require_http_methods(["GET"])
+@permission_required('material', 'export')
+def export_materials(request):
+    """物料导出，检索/排序参数同 get-materials（keyword、sort）"""
+    try:
+        queryset, _ = material_queryset(request.GET)
+    except InvalidCursor as e:
+        return bad_request(str(e))
+
+    header = ['ID', '物料名称', '物料编码', '物料分类', '单位', '供应商', '数量', '特征描述', '创建时间', '更新时间']
+    rows = queryset.values_list(
+        'id', 'name', 'code', 'category', 'unit', 'supplier', 'quantity', 'desc', 'create_time', 'update_time'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return export_response(request, '物料列表', header, rows)
+
+
+# ===================== 2. ERP用户导出 =====================
+@csrf_exempt
+@require_http_methods(["GET"])
+@permission_required('erp_user', 'export')
+def export_erp_users(request):
+    """ERP用户导出，筛选参数同 erp-users（keyword）；不导出密码"""
+    header = ['ID', '用户名', '邮箱', '所属角色', '是否激活', '创建时间']
+    rows = erp_user_queryset(request.GET).values_list(
+        'id', 'username', 'email', 'role__role_name', 'is_active', 'create_time'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return export_response(request, 'ERP用户列表', header, rows)
+
+
+# ===================== 3. 角色导出 =====================
+def iter_role_rows(queryset):
+    """角色行：权限配置随每批角色一次性预取，不逐个角色查询"""
+    form_labels = dict(FORM_CHOICES)
+    action_labels = dict(ACTION_CHOICES)
+    for role in queryset.prefetch_related('permissions').iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        permissions = '；'.join(
+            f"{form_labels.get(perm.form_name, perm.form_name)}-{action_labels.get(perm.action, perm.action)}"
+            for perm in role.permissions.all()
+        )
+        yield [role.id, role.role_name, role.role_code, role.desc, permissions, role.create_time]
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@permission_required('role', 'export')
+def export_roles(request):
+    """角色导出（含权限配置），排序同 roles 列表"""
+    header = ['ID', '角色名称', '角色编码', '角色描述', '权限配置', '创建时间']
+    queryset = Role.objects.all().order_by('-create_time')
+    return export_response(request, '角色列表', header, iter_role_rows(queryset))
+
+
+# ===================== 4. 审批记录导出 =====================
+@csrf_exempt
+@require_http_methods(["GET"])
+@permission_required('approval', 'export')
+def export_approval_records(request):
+    """
+    审批记录导出
+    GET参数：flow_id(流程ID)、instance_id(实例ID)、action(approve/reject)
+    """
+    queryset = ApprovalRecord.objects.all().order_by('-operate_time', '-id')
+    try:
+        flow_id = request.GET.get('flow_id')
+        instance_id = request.GET.get('instance_id')
+        if flow_id:
+            queryset = queryset.filter(instance__flow_id=int(flow_id))
+        if instance_id:
+            queryset = queryset.filter(instance_id=int(instance_id))
+    except ValueError:
+        return bad_request('flow_id/instance_id 必须是整数')
+    action = request.GET.get('action', '').strip()
+    if action:
+        queryset = queryset.filter(action=action)
+
+    action_labels = dict(ApprovalRecord._meta.get_field('action').choices)
+    header = ['ID', '审批实例', '流程名称', '审批节点', '审批人', '审批操作', '审批意见', '操作时间']
+    rows = (
+        (pk, instance_id, flow_name, node_name, approver, action_labels.get(act, act), comment, operate_time)
+        for pk, instance_id, flow_name, node_name, approver, act, comment, operate_time in queryset.values_list(
+            'id', 'instance_id', 'instance__flow__name', 'node__name', 'approver__username',
+            'action', 'comment', 'operate_time'
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    return export_response(request, '审批记录', header, rows)
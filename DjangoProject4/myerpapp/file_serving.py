@@ -0,0 +1,162 @@
+# ===================== 附件下载：断点续传 / 条件请求 / 代理卸载 =====================
+# serve_attachment() 统一处理附件下载响应：
+# - ETag / Last-Modified：去重存储的附件用内容 SHA-256 作强 ETag，旧附件用 大小-修改时间；
+#   If-None-Match / If-Modified-Since 命中返回 304，If-Match / If-Unmodified-Since 不满足返回 412
+# - Range：支持单个字节区间（bytes=a-b / a- / -n），返回 206 + Content-Range；
+#   If-Range 与当前版本不一致时按完整文件返回；多区间请求按完整文件返回（RFC 9110 允许）；
+#   区间越界返回 416
+# - ERP_SENDFILE_MODE：配置后 Django 只做鉴权和条件判断，文件字节交给前端代理发送，
+#   不再占用 worker；Range 也由代理处理
+#     'x-accel-redirect'  Nginx：X-Accel-Redirect: <ERP_SENDFILE_PREFIX><相对路径>，
+#                         需配置 internal 的 location 指向 MEDIA_ROOT
+#     'x-sendfile'        Apache mod_xsendfile / lighttpd：X-Sendfile: <完整路径>
+#   压缩存储的附件（.erpz，见 attachment_codec.py）代理无法直接发送，始终由 Django 边解压边发送，
+#   Range 只解压覆盖区间的帧
+# - 对象存储后端（attachment_storage.py）：返回 302 跳转到短时有效的预签名 URL，
+#   条件请求和 Range 由对象存储处理，字节不经过 Django
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+from .attachment_codec import COMPRESSED_SUFFIX
+from .attachment_storage import get_attachment_storage
+from .attachments import open_attachment
+
+SENDFILE_MODES = ('x-accel-redirect', 'x-sendfile')
+STREAM_BLOCK_SIZE = 1024 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def sendfile_mode():
+    mode = (getattr(settings, 'ERP_SENDFILE_MODE', '') or '').lower()
+    return mode if mode in SENDFILE_MODES else ''
+
+
+def attachment_etag(material_file, stored_size, mtime_ns):
+    """去重存储的附件内容不可变，SHA-256 即强 ETag；旧附件按 大小-修改时间（纳秒）生成"""
+    if material_file.sha256:
+        return quote_etag(material_file.sha256)
+    return quote_etag(f'{stored_size:x}-{mtime_ns:x}')
+
+
+def attachment_download_name(material_file):
+    return material_file.name or os.path.basename(material_file.file_path).removesuffix(COMPRESSED_SUFFIX)
+
+
+def attachment_url(material_file):
+    """对象存储后端返回预签名下载地址；本地存储或压缩存储的附件返回 None（需由 Django 发送）"""
+    if material_file.file_path.endswith(COMPRESSED_SUFFIX):
+        return None
+    return get_attachment_storage().url(material_file.file_path, attachment_download_name(material_file))
+
+
+def parse_range(header, size):
+    """解析 Range 请求头，返回 (start, end)（闭区间）；不支持或忽略时返回 None，区间无法满足时返回 False"""
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None  # 非 bytes 单位、多区间或格式错误：忽略 Range，返回完整文件
+    first, last = match.groups()
+    if first == '':
+        # 后缀区间 -n：最后 n 个字节
+        length = int(last)
+        if length == 0 or size == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None  # 结束位置小于起始位置是无效的区间，按规范忽略
+    if start >= size:
+        return False
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def if_range_matches(request, etag, last_modified):
+    """If-Range 缺省或与当前版本一致时才按 Range 返回部分内容"""
+    value = request.headers.get('If-Range')
+    if not value:
+        return True
+    value = value.strip()
+    if value.startswith(('"', 'W/')):
+        return value == etag  # If-Range 只允许强比较
+    since = parse_http_date_safe(value)
+    return since is not None and int(last_modified) <= since
+
+
+def iter_file_range(fp, start, length, block_size=STREAM_BLOCK_SIZE):
+    with fp:
+        fp.seek(start)
+        while length > 0:
+            block = fp.read(min(block_size, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def serve_attachment(request, material_file):
+    """返回附件下载响应；文件不存在时抛出 FileNotFoundError 由调用方处理"""
+    url = attachment_url(material_file)
+    if url:
+        response = HttpResponseRedirect(url)
+        response['Cache-Control'] = 'no-store'  # 预签名地址很快过期，不能被缓存
+        return response
+
+    relpath = material_file.file_path
+    storage = get_attachment_storage()
+    stored_size, mtime_ns = storage.stat(relpath)
+    compressed = relpath.endswith(COMPRESSED_SUFFIX)
+    if compressed:
+        with open_attachment(relpath) as reader:  # 原始大小记录在压缩文件尾部
+            size = reader.size
+    else:
+        size = stored_size
+    etag = attachment_etag(material_file, stored_size, mtime_ns)
+    last_modified = mtime_ns // 10 ** 9
+
+    # 304 / 412：只比较版本，不碰文件内容
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return response
+
+    mode = sendfile_mode() if storage.is_local and not compressed else ''
+    byte_range = None
+    if not mode and 'Range' in request.headers and if_range_matches(request, etag, last_modified):
+        byte_range = parse_range(request.headers['Range'], size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            response['Accept-Ranges'] = 'bytes'
+            return response
+
+    if mode == 'x-accel-redirect':
+        prefix = getattr(settings, 'ERP_SENDFILE_PREFIX', '/protected-media/')
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + relpath
+        response['Content-Type'] = 'application/octet-stream'
+    elif mode == 'x-sendfile':
+        response = HttpResponse()
+        response['X-Sendfile'] = storage.path(relpath)
+        response['Content-Type'] = 'application/octet-stream'
+    elif byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(iter_file_range(open_attachment(relpath), start, end - start + 1),
+                                         status=206, content_type='application/octet-stream')
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    else:
+        # FileResponse 在支持 wsgi.file_wrapper 的服务器上会走 sendfile 系统调用；
+        # 否则按 1MB 分块迭代（默认 4KB，1GB 要迭代 26 万次）
+        response = FileResponse(open_attachment(relpath), content_type='application/octet-stream')
+        response.block_size = STREAM_BLOCK_SIZE
+        response['Content-Length'] = str(size)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'  # 浏览器可缓存，但每次都要带验证器来确认
+    response['Content-Disposition'] = content_disposition_header(True, attachment_download_name(material_file))
+    return response
@@ -1,305 +1,317 @@
-# file_view.py（完整修复版）
-import os
-import time
-import logging
-from django.http import JsonResponse, FileResponse
-from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
-from django.utils.decorators import method_decorator
-from django.conf import settings
-from django.core.files.storage import default_storage
-from django.db import transaction
-from functools import wraps
-from .models import Material, MaterialFile
-
-# 初始化日志（增强：打印到控制台+文件）
-logger = logging.getLogger(__name__)
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler()]  # 控制台输出
-)
-
-# 复用跨域装饰器
-def add_cors_headers(view_func):
-    @wraps(view_func)
-    def wrapper(request, *args, **kwargs):
-        response = view_func(request, *args, **kwargs)
-        response['Access-Control-Allow-Origin'] = 'http://localhost:5173'
-        response['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-        response['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-        response['Access-Control-Allow-Credentials'] = 'true'
-        return response
-    return wrapper
-
-# 复用登录校验装饰器
-def erp_login_required(view_func):
-    @wraps(view_func)
-    def wrapper(request, *args, **kwargs):
-        if not request.session.get('erp_user_id'):
-            response = JsonResponse({
-                'code': 401,
-                'msg': '请先登录ERP系统！',
-                'data': {}
-            }, status=200)
-            response['Access-Control-Allow-Origin'] = 'http://localhost:5173'
-            response['Access-Control-Allow-Credentials'] = 'true'
-            return response
-        return view_func(request, *args, **kwargs)
-    return wrapper
-
-
-# 1. 上传物料附件（核心修复版：补全登录校验）
-@csrf_exempt
-@require_http_methods(["POST", "OPTIONS"])
-@erp_login_required  # 新增：补全登录校验，和其他接口保持一致
-@add_cors_headers
-def upload_material_files(request, material_id):
-    """上传物料附件，支持多文件（修复文件名重复+增强日志+补全登录校验）"""
-    # 处理OPTIONS预检
-    if request.method == 'OPTIONS':
-        logger.info("收到OPTIONS预检请求")
-        return JsonResponse({'code': 200, 'msg': '预检成功', 'data': {}})
-
-    try:
-        # ========== 新增：打印登录用户信息（调试） ==========
-        logger.info(f"登录用户ID：{request.session.get('erp_user_id')}，用户名：{request.session.get('erp_username')}")
-
-        # ========== 1. 打印请求基本信息（调试关键） ==========
-        logger.info(f"开始处理物料{material_id}的文件上传请求")
-        logger.info(f"请求方法：{request.method}")
-        logger.info(f"请求Content-Type：{request.content_type}")
-        logger.info(f"是否为multipart/form-data：{request.content_type.startswith('multipart/form-data')}")
-        logger.info(f"收到的文件数量：{len(request.FILES.getlist('files')) if 'files' in request.FILES else 0}")
-
-        # ========== 2. 校验物料是否存在 ==========
-        try:
-            material = Material.objects.get(id=material_id)
-            logger.info(f"找到物料：ID={material_id}，名称={material.name}")
-        except Material.DoesNotExist:
-            logger.error(f"物料{material_id}不存在，无法上传附件")
-            return JsonResponse({
-                'code': 404,
-                'msg': '物料不存在，无法上传附件',
-                'data': {}
-            }, status=200)
-
-        # ========== 3. 校验文件是否存在 ==========
-        if 'files' not in request.FILES:
-            logger.error("请求中未包含files字段")
-            return JsonResponse({
-                'code': 400,
-                'msg': '请选择要上传的文件',
-                'data': {}
-            }, status=200)
-
-        # ========== 4. 批量处理文件（修复文件名重复） ==========
-        files = request.FILES.getlist('files')
-        saved_files = []
-        media_root = settings.MEDIA_ROOT
-        # 新增：确保material_files目录存在
-        material_files_dir = os.path.join(media_root, "material_files")
-        if not os.path.exists(material_files_dir):
-            os.makedirs(material_files_dir, exist_ok=True)
-            logger.info(f"创建物料文件目录：{material_files_dir}")
-
-        logger.info(f"媒体文件根目录：{media_root}，是否存在：{os.path.exists(media_root)}")
-        logger.info(f"物料文件目录：{material_files_dir}，是否存在：{os.path.exists(material_files_dir)}")
-
-        with transaction.atomic():  # 事务保证
-            for file in files:
-                # 限制文件大小（1GB）
-                max_size = 1 * 1024 * 1024 * 1024
-                if file.size > max_size:
-                    logger.error(f"文件{file.name}超过1GB大小限制（实际大小：{file.size}字节）")
-                    return JsonResponse({
-                        'code': 400,
-                        'msg': f'文件{file.name}超过1GB大小限制',
-                        'data': {}
-                    }, status=200)
-
-                # 修复：文件名去重（添加时间戳）
-                file_name = file.name
-                file_ext = os.path.splitext(file_name)[1]  # 获取文件扩展名
-                file_name_no_ext = os.path.splitext(file_name)[0]
-                # 生成唯一文件名：原名称_时间戳.扩展名
-                unique_file_name = f"{file_name_no_ext}_{int(time.time())}{file_ext}"
-                file_path = os.path.join("material_files", unique_file_name)
-                full_file_path = os.path.join(media_root, file_path)
-
-                logger.info(f"准备保存文件：{unique_file_name}，路径：{full_file_path}")
-
-                # 保存文件到服务器（改用手动保存，更稳定）
-                try:
-                    with open(full_file_path, 'wb+') as destination:
-                        for chunk in file.chunks():
-                            destination.write(chunk)
-                    logger.info(f"文件手动保存成功，路径：{full_file_path}")
-                    logger.info(f"文件是否存在：{os.path.exists(full_file_path)}")
-
-                    # 创建文件记录
-                    material_file = MaterialFile.objects.create(
-                        material=material,
-                        name=file.name,  # 保存原始文件名
-                        file_path=file_path,  # 保存相对路径
-                        size=file.size
-                    )
-                    saved_files.append({
-                        'id': material_file.id,
-                        'name': material_file.name,
-                        'size': material_file.size,
-                        'upload_time': material_file.upload_time.strftime('%Y-%m-%d %H:%M:%S')
-                    })
-                    logger.info(f"文件记录已写入数据库：ID={material_file.id}")
-
-                except Exception as save_err:
-                    logger.error(f"保存文件{file.name}失败：{str(save_err)}", exc_info=True)
-                    raise save_err
-
-        # ========== 5. 返回结果 ==========
-        logger.info(f"用户{request.session['erp_username']}为物料{material_id}上传{len(saved_files)}个附件，全部成功")
-        return JsonResponse({
-            'code': 200,
-            'msg': '文件上传成功',
-            'data': saved_files
-        }, status=200)
-
-    except Exception as e:
-        logger.error(f"文件上传失败：{str(e)}", exc_info=True)
-        return JsonResponse({
-            'code': 500,
-            'msg': f'文件上传失败：{str(e)}',
-            'data': {}
-        }, status=200)
-
-# 2. 获取物料附件列表（保持不变）
-@csrf_exempt
-@require_http_methods(["GET", "OPTIONS"])
-@erp_login_required
-@add_cors_headers
-def get_material_files(request, material_id):
-    if request.method == 'OPTIONS':
-        return JsonResponse({'code':200, 'msg':'预检成功', 'data':{}})
-
-    try:
-        try:
-            material = Material.objects.get(id=material_id)
-        except Material.DoesNotExist:
-            return JsonResponse({
-                'code':404,
-                'msg':'物料不存在',
-                'data':[]
-            }, status=200)
-
-        files = MaterialFile.objects.filter(material=material).order_by('-upload_time')
-        file_list = []
-        for f in files:
-            file_list.append({
-                'id': f.id,
-                'name': f.name,
-                'size': f.size,
-                'upload_time': f.upload_time.strftime('%Y-%m-%d %H:%M:%S')
-            })
-
-        return JsonResponse({
-            'code':200,
-            'msg':'success',
-            'data': file_list
-        }, status=200)
-
-    except Exception as e:
-        logger.error(f"获取物料附件失败：{str(e)}", exc_info=True)
-        return JsonResponse({
-            'code':500,
-            'msg':'获取附件失败',
-            'data':[]
-        }, status=200)
-
-# 3. 下载物料附件（保持不变）
-@csrf_exempt
-@require_http_methods(["GET", "OPTIONS"])
-@erp_login_required
-@add_cors_headers
-def download_material_file(request, material_id, file_id):
-    if request.method == 'OPTIONS':
-        response = JsonResponse({'code':200, 'msg':'预检成功', 'data':{}})
-        return response
-
-    try:
-        try:
-            material_file = MaterialFile.objects.get(id=file_id, material_id=material_id)
-        except MaterialFile.DoesNotExist:
-            return JsonResponse({
-                'code':404,
-                'msg':'文件不存在',
-                'data':{}
-            }, status=200)
-
-        file_path = material_file.file_path
-        if not default_storage.exists(file_path):
-            return JsonResponse({
-                'code':404,
-                'msg':'文件已被删除',
-                'data':{}
-            }, status=200)
-
-        file = default_storage.open(file_path, 'rb')
-        response = FileResponse(file)
-        response['Content-Type'] = 'application/octet-stream'
-        response['Content-Disposition'] = f'attachment; filename="{material_file.name}"'
-        response['Access-Control-Allow-Origin'] = 'http://localhost:5173'
-        response['Access-Control-Allow-Credentials'] = 'true'
-
-        logger.info(f"用户{request.session['erp_username']}下载物料{material_id}的附件{file_id}")
-        return response
-
-    except Exception as e:
-        logger.error(f"文件下载失败：{str(e)}", exc_info=True)
-        response = JsonResponse({
-            'code':500,
-            'msg':f'下载失败：{str(e)}',
-            'data':{}
-        }, status=200)
-        response['Access-Control-Allow-Origin'] = 'http://localhost:5173'
-        response['Access-Control-Allow-Credentials'] = 'true'
-        return response
-
-# 4. 删除物料附件（保持不变）
-@csrf_exempt
-@require_http_methods(["DELETE", "OPTIONS"])
-@erp_login_required
-@add_cors_headers
-def delete_material_file(request, material_id, file_id):
-    if request.method == 'OPTIONS':
-        return JsonResponse({'code':200, 'msg':'预检成功', 'data':{}})
-
-    try:
-        try:
-            material_file = MaterialFile.objects.get(id=file_id, material_id=material_id)
-        except MaterialFile.DoesNotExist:
-            return JsonResponse({
-                'code':404,
-                'msg':'文件不存在',
-                'data':{}
-            }, status=200)
-
-        file_path = material_file.file_path
-        if default_storage.exists(file_path):
-            default_storage.delete(file_path)
-            logger.info(f"已删除文件：{file_path}")
-        material_file.delete()
-
-        logger.info(f"用户{request.session['erp_username']}删除物料{material_id}的附件{file_id}")
-        return JsonResponse({
-            'code':200,
-            'msg':'文件删除成功',
-            'data':{}
-        }, status=200)
-
-    except Exception as e:
-        logger.error(f"文件删除失败：{str(e)}", exc_info=True)
-        return JsonResponse({
-            'code':500,
-            'msg':f'删除失败：{str(e)}',
-            'data':{}
-        }, status=200)
\ No newline at end of file
+# file_view.py（完整修复版）
+import logging
+import posixpath
+from datetime import datetime
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from django.utils.decorators import method_decorator
+from django.db import transaction
+from .attachments import (MAX_ATTACHMENT_SIZE, MaterialFileUploadHandler, discard_staged_blobs, open_attachment,
+                          release_material_files, stage_blob, store_blob, touch_blob_access)
+from .file_serving import attachment_url, serve_attachment
+from .streaming import iter_zip
+from .models import Material, MaterialFile
+
+# 初始化日志（增强：打印到控制台+文件）
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]  # 控制台输出
+)
+
+ZIP_MAX_MATERIALS = 100  # 打包下载单次最多包含的物料数
+
+# 1. 上传物料附件：MaterialFileUploadHandler 解析时直接写入最终位置，字节落盘后一次 bulk_create 入库
+@csrf_exempt
+@require_http_methods(["POST"])
+def upload_material_files(request, material_id):
+    """上传物料附件，支持多文件"""
+    # 必须在首次访问 request.FILES 之前替换处理器
+    handler = MaterialFileUploadHandler(request)
+    request.upload_handlers = [handler]
+    staged = []  # [(暂存路径, stage_blob 返回的路径)]，失败时清理已上传的对象
+
+    try:
+        # ========== 1. 校验物料是否存在（此时请求体尚未解析，不会写盘） ==========
+        if not Material.objects.filter(id=material_id).exists():
+            logger.error(f"物料{material_id}不存在，无法上传附件")
+            return JsonResponse({
+                'code': 404,
+                'msg': '物料不存在，无法上传附件',
+                'data': {}
+            }, status=200)
+
+        # ========== 2. 解析请求体：文件边接收边写盘、边计算 SHA-256 ==========
+        files = request.FILES.getlist('files')
+        if handler.too_large:
+            handler.discard()
+            logger.error(f"文件{handler.too_large}超过{MAX_ATTACHMENT_SIZE}字节大小限制")
+            return JsonResponse({
+                'code': 400,
+                'msg': f'文件{handler.too_large}超过{MAX_ATTACHMENT_SIZE // (1024 * 1024)}MB大小限制',
+                'data': {}
+            }, status=200)
+        if not files:
+            logger.error("请求中未包含files字段")
+            return JsonResponse({
+                'code': 400,
+                'msg': '请选择要上传的文件',
+                'data': {}
+            }, status=200)
+
+        # ========== 3. 字节已落盘，一个短事务完成去重（只有 rename/引用计数）并批量写入记录 ==========
+        # 对象存储后端：新内容先在事务外上传，不在事务里等网络
+        for file in files:
+            staged.append((file.relpath, stage_blob(file.relpath, file.sha256)))
+        with transaction.atomic():
+            blobs = [store_blob(relpath, file.sha256, file.size) for file, (_, relpath) in zip(files, staged)]
+            material_files = MaterialFile.objects.bulk_create([
+                MaterialFile(
+                    material_id=material_id,
+                    blob=blob,
+                    name=file.name,  # 保存原始文件名
+                    file_path=blob.path,  # 保存相对路径（内容地址）
+                    size=file.size,
+                    sha256=file.sha256,
+                )
+                for file, blob in zip(files, blobs)
+            ])
+
+        saved_files = [{
+            'id': f.id,
+            'name': f.name,
+            'size': f.size,
+            'upload_time': f.upload_time.strftime('%Y-%m-%d %H:%M:%S')
+        } for f in material_files]
+
+        logger.info(f"用户{request.erp_user.username}为物料{material_id}上传{len(saved_files)}个附件，全部成功")
+        return JsonResponse({
+            'code': 200,
+            'msg': '文件上传成功',
+            'data': saved_files
+        }, status=200)
+
+    except Exception as e:
+        handler.discard()  # 入库失败：删除已写入的文件，不留孤儿文件
+        discard_staged_blobs(staged)  # 对象存储：删除已提前上传、但没有建档的对象
+        logger.error(f"文件上传失败：{str(e)}", exc_info=True)
+        return JsonResponse({
+            'code': 500,
+            'msg': f'文件上传失败：{str(e)}',
+            'data': {}
+        }, status=200)
+
+# 2. 获取物料附件列表（保持不变）
+@csrf_exempt
+@require_http_methods(["GET"])
+def get_material_files(request, material_id):
+    try:
+        try:
+            material = Material.objects.get(id=material_id)
+        except Material.DoesNotExist:
+            return JsonResponse({
+                'code':404,
+                'msg':'物料不存在',
+                'data':[]
+            }, status=200)
+
+        files = MaterialFile.objects.filter(material=material).order_by('-upload_time')
+        file_list = []
+        for f in files:
+            file_list.append({
+                'id': f.id,
+                'name': f.name,
+                'size': f.size,
+                'upload_time': f.upload_time.strftime('%Y-%m-%d %H:%M:%S'),
+                'file_missing': f.file_missing
+            })
+
+        return JsonResponse({
+            'code':200,
+            'msg':'success',
+            'data': file_list
+        }, status=200)
+
+    except Exception as e:
+        logger.error(f"获取物料附件失败：{str(e)}", exc_info=True)
+        return JsonResponse({
+            'code':500,
+            'msg':'获取附件失败',
+            'data':[]
+        }, status=200)
+
+# 3. 下载物料附件：支持 Range 断点续传、ETag/Last-Modified 条件请求，可配置由前端代理发送文件（见 file_serving.py）
+@csrf_exempt
+@require_http_methods(["GET", "HEAD"])
+def download_material_file(request, material_id, file_id):
+    try:
+        try:
+            material_file = MaterialFile.objects.select_related('blob').get(id=file_id, material_id=material_id)
+        except MaterialFile.DoesNotExist:
+            return JsonResponse({
+                'code':404,
+                'msg':'文件不存在',
+                'data':{}
+            }, status=200)
+
+        try:
+            try:
+                response = serve_attachment(request, material_file)
+            except FileNotFoundError:
+                # 读取记录后文件刚好被转为压缩存储（路径已变），按最新路径再试一次
+                material_file.refresh_from_db(fields=['file_path'])
+                response = serve_attachment(request, material_file)
+        except FileNotFoundError:
+            if not material_file.file_missing:
+                MaterialFile.objects.filter(id=material_file.id).update(file_missing=True)
+            logger.error(f"物料{material_id}的附件{file_id}在磁盘上不存在：{material_file.file_path}")
+            return JsonResponse({
+                'code':404,
+                'msg':'文件已被删除',
+                'data':{}
+            }, status=200)
+
+        if response.status_code in (200, 206, 302):
+            touch_blob_access(material_file.blob)
+        if response.status_code == 302:
+            logger.info(f"用户{request.session['erp_username']}通过预签名地址下载物料{material_id}的附件{file_id}")
+        elif response.status_code == 200:
+            logger.info(f"用户{request.session['erp_username']}下载物料{material_id}的附件{file_id}")
+        elif response.status_code == 206:
+            logger.info(f"用户{request.session['erp_username']}续传下载物料{material_id}的附件{file_id}："
+                        f"{response['Content-Range']}")
+        return response
+
+    except Exception as e:
+        logger.error(f"文件下载失败：{str(e)}", exc_info=True)
+        return JsonResponse({
+            'code':500,
+            'msg':f'下载失败：{str(e)}',
+            'data':{}
+        }, status=200)
+
+# 3.1 附件直链：对象存储后端返回短时有效的预签名地址，前端直接跳转下载；本地存储返回 url 为空，仍走下载接口
+@csrf_exempt
+@require_http_methods(["GET"])
+def get_material_file_url(request, material_id, file_id):
+    try:
+        material_file = MaterialFile.objects.select_related('blob').filter(
+            id=file_id, material_id=material_id).first()
+        if material_file is None:
+            return JsonResponse({'code': 404, 'msg': '文件不存在', 'data': {}}, status=200)
+        url = attachment_url(material_file)
+        if url:
+            touch_blob_access(material_file.blob)
+            logger.info(f"用户{request.session['erp_username']}获取物料{material_id}的附件{file_id}的预签名地址")
+        return JsonResponse({
+            'code': 200,
+            'msg': 'success',
+            'data': {
+                'url': url,
+                'expires_in': getattr(settings, 'ATTACHMENT_PRESIGNED_URL_EXPIRE', 300) if url else None,
+            }
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+    except Exception as e:
+        logger.error(f"获取附件下载地址失败：{str(e)}", exc_info=True)
+        return JsonResponse({'code': 500, 'msg': f'获取下载地址失败：{str(e)}', 'data': {}}, status=200)
+
+# 4. 删除物料附件
+@csrf_exempt
+@require_http_methods(["DELETE"])
+def delete_material_file(request, material_id, file_id):
+    try:
+        try:
+            material_file = MaterialFile.objects.get(id=file_id, material_id=material_id)
+        except MaterialFile.DoesNotExist:
+            return JsonResponse({
+                'code':404,
+                'msg':'文件不存在',
+                'data':{}
+            }, status=200)
+
+        # 去重存储：只有最后一个引用被删除时才删除实体文件
+        with transaction.atomic():
+            material_file.delete()
+            release_material_files([(material_file.blob_id, material_file.file_path)])
+
+        logger.info(f"用户{request.session['erp_username']}删除物料{material_id}的附件{file_id}")
+        return JsonResponse({
+            'code':200,
+            'msg':'文件删除成功',
+            'data':{}
+        }, status=200)
+
+    except Exception as e:
+        logger.error(f"文件删除失败：{str(e)}", exc_info=True)
+        return JsonResponse({
+            'code':500,
+            'msg':f'删除失败：{str(e)}',
+            'data':{}
+        }, status=200)
+
+# 5. 打包下载附件：单个物料 download-material-files-zip/<material_id>/，
+#    多个物料 download-material-files-zip/?material_ids=1,2,3（每个物料一个目录）。
+#    边读文件边压缩边发送，不在内存或磁盘上生成完整压缩包；已压缩格式直接存储（见 streaming.iter_zip）
+def zip_safe_name(name):
+    return name.replace('/', '_').replace('\\', '_').strip() or '未命名'
+
+
+def unique_arcname(arcname, used):
+    """同一目录下重名的文件加序号：图纸.dwg → 图纸 (2).dwg"""
+    candidate, n = arcname, 1
+    stem, ext = posixpath.splitext(arcname)
+    while candidate in used:
+        n += 1
+        candidate = f'{stem} ({n}){ext}'
+    used.add(candidate)
+    return candidate
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def download_material_files_zip(request, material_id=None):
+    if material_id is not None:
+        material_ids = [material_id]
+    else:
+        try:
+            material_ids = list(dict.fromkeys(
+                int(v) for v in request.GET.get('material_ids', '').split(',') if v.strip()))
+        except ValueError:
+            return JsonResponse({'code': 400, 'msg': 'material_ids 格式错误（逗号分隔的物料ID）', 'data': {}}, status=200)
+    if not material_ids:
+        return JsonResponse({'code': 400, 'msg': '请选择要打包下载的物料', 'data': {}}, status=200)
+    if len(material_ids) > ZIP_MAX_MATERIALS:
+        return JsonResponse({'code': 400, 'msg': f'单次最多打包{ZIP_MAX_MATERIALS}个物料', 'data': {}}, status=200)
+
+    materials = {m.id: m for m in Material.objects.filter(id__in=material_ids).only('id', 'code', 'name')}
+    if not materials:
+        return JsonResponse({'code': 404, 'msg': '物料不存在', 'data': {}}, status=200)
+    files = list(MaterialFile.objects.filter(material_id__in=materials)
+                 .order_by('material_id', 'id')
+                 .values_list('material_id', 'name', 'file_path', 'upload_time'))
+    if not files:
+        return JsonResponse({'code': 404, 'msg': '所选物料没有附件', 'data': {}}, status=200)
+
+    used = set()
+    entries = []
+    for mid, name, file_path, upload_time in files:
+        arcname = zip_safe_name(name or posixpath.basename(file_path))
+        if len(materials) > 1:
+            material = materials[mid]
+            arcname = f'{zip_safe_name(f"{material.code}_{material.name}")}/{arcname}'
+        entries.append((unique_arcname(arcname, used), file_path, upload_time.timetuple()[:6]))
+
+    if len(materials) == 1:
+        material = next(iter(materials.values()))
+        filename = f'{zip_safe_name(material.code)}_附件.zip'
+    else:
+        filename = f'物料附件_{len(materials)}个物料_{datetime.now().strftime("%Y%m%d%H%M%S")}.zip'
+
+    response = StreamingHttpResponse(iter_zip(entries, opener=open_attachment), content_type='application/zip')
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    logger.info(f"用户{request.session['erp_username']}打包下载物料{list(materials)}的附件{len(entries)}个")
+    return response
@@ -0,0 +1,92 @@
+# ===================== 附件去重统计 =====================
+# 用法：python manage.py attachment_report [--top 20] [--materials 20] [--json]
+# 统计附件的逻辑大小（所有 MaterialFile 之和）与实际占用磁盘（去重后的实体文件按压缩后大小之和），
+# 以及节省最多的重复文件。去重上线前的旧附件（未关联实体文件）单独列出，按独占磁盘计算。
+# --materials 列出压缩存储节省最多的物料（按该物料附件的原始大小与压缩后大小之差）。
+import json
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Sum
+
+from myerpapp.attachments import COMPRESSED_CODECS
+from myerpapp.models import AttachmentBlob, MaterialFile
+
+
+def human_size(size):
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if abs(size) < 1024 or unit == 'TB':
+            return f'{size:.1f}{unit}' if unit != 'B' else f'{size}B'
+        size /= 1024
+
+
+class Command(BaseCommand):
+    help = '统计附件去重节省的磁盘空间'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help='列出节省空间最多的前 N 个重复文件')
+        parser.add_argument('--materials', type=int, default=0, help='列出压缩节省空间最多的前 N 个物料')
+        parser.add_argument('--json', action='store_true', help='以 JSON 输出')
+
+    def handle(self, *args, **options):
+        deduped = MaterialFile.objects.filter(blob__isnull=False).aggregate(count=Count('id'), size=Sum('size'))
+        legacy = MaterialFile.objects.filter(blob__isnull=True).aggregate(count=Count('id'), size=Sum('size'))
+        blobs = AttachmentBlob.objects.aggregate(count=Count('id'), size=Sum('size'), stored=Sum('stored_size'))
+        compressed = AttachmentBlob.objects.filter(codec__in=COMPRESSED_CODECS).aggregate(
+            count=Count('id'), size=Sum('size'), stored=Sum('stored_size'))
+
+        logical = (deduped['size'] or 0) + (legacy['size'] or 0)
+        physical = (blobs['stored'] or 0) + (legacy['size'] or 0)
+        saved = logical - physical
+        dedup_saved = (deduped['size'] or 0) - (blobs['size'] or 0)
+        compress_saved = (compressed['size'] or 0) - (compressed['stored'] or 0)
+        top = list(
+            AttachmentBlob.objects.filter(ref_count__gt=1)
+            .annotate(saved=(F('ref_count') - 1) * F('size'))
+            .order_by('-saved')
+            .values('sha256', 'size', 'ref_count', 'saved')[:max(options['top'], 0)]
+        )
+        # 每个物料按自己的附件记录计：引用同一实体文件的多个物料各自计入节省
+        materials = list(
+            MaterialFile.objects.filter(blob__codec__in=COMPRESSED_CODECS)
+            .values('material_id', 'material__code', 'material__name')
+            .annotate(files=Count('id'), logical=Sum('size'), stored=Sum('blob__stored_size'))
+            .annotate(saved=F('logical') - F('stored'))
+            .order_by('-saved')[:max(options['materials'], 0)]
+        ) if options['materials'] > 0 else []
+        report = {
+            'files': deduped['count'] + legacy['count'],
+            'logical_size': logical,
+            'physical_size': physical,
+            'saved_size': saved,
+            'saved_ratio': round(saved / logical, 4) if logical else 0.0,
+            'blobs': blobs['count'],
+            'legacy_files': legacy['count'],
+            'legacy_size': legacy['size'] or 0,
+            'dedup_saved_size': dedup_saved,
+            'compressed_blobs': compressed['count'],
+            'compress_saved_size': compress_saved,
+            'top_duplicates': top,
+            'top_compressed_materials': materials,
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+
+        self.stdout.write(f"附件记录：{report['files']}个，逻辑大小{human_size(logical)}")
+        self.stdout.write(f"实际占用：{human_size(physical)}（去重实体文件{report['blobs']}个，"
+                          f"旧附件{report['legacy_files']}个/{human_size(report['legacy_size'])}）")
+        self.stdout.write(self.style.SUCCESS(f"共节省：{human_size(saved)}（{report['saved_ratio']:.1%}）"))
+        self.stdout.write(f"  去重节省{human_size(dedup_saved)}；压缩存储节省{human_size(compress_saved)}"
+                          f"（已压缩实体文件{compressed['count']}个）")
+        if top:
+            self.stdout.write('节省最多的重复文件：')
+            for item in top:
+                self.stdout.write(f"  {item['sha256'][:16]}…  {human_size(item['size']):>9} × {item['ref_count']}次引用"
+                                  f"  节省{human_size(item['saved'])}")
+        if materials:
+            self.stdout.write('压缩节省最多的物料：')
+            for item in materials:
+                self.stdout.write(f"  {item['material__code']} {item['material__name']}  {item['files']}个附件"
+                                  f"  {human_size(item['logical'])}→{human_size(item['stored'])}"
+                                  f"  节省{human_size(item['saved'])}")
@@ -0,0 +1,268 @@
+# ===================== 接口端到端压测 =====================
+# 用法：python manage.py bench_api --iterations 500 --concurrency 8
+#       python manage.py bench_api --base-url http://127.0.0.1:8000 --save-baseline   # 压测已启动的服务并保存基线
+#       python manage.py bench_api --max-regression 0.2                             # p95/p99 比基线慢 20% 以上则失败
+# 每次迭代按前端真实调用顺序回放一次用户访问：
+#   登录 → 获取权限 → 物料列表 → 物料详情 → 物料附件 → 审批操作
+# 默认在进程内用 django.test.Client 调用（不经过网络，含全部中间件）；指定 --base-url 时走真实 HTTP。
+# 输出每个接口的 p50/p95/p99，并与基线文件对比。
+# 注意：审批操作会真实推进审批实例，请在 generate_bench_data 生成的数据上运行。
+import json
+import logging
+import math
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.cookiejar import CookieJar
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from myerpapp.models import ApprovalInstance, ERPUser, Material
+
+from .generate_bench_data import BENCH_PASSWORD, NAME_PREFIX
+
+STEPS = ['login', 'get-user-permissions', 'get-materials', 'get-material', 'get-material-files', 'approval-operate']
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks', 'api_baseline.json')
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values, p):
+    """最近秩法百分位"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+class InProcessTransport:
+    """进程内调用：每次迭代一个 Client，相当于一个新的浏览器会话"""
+
+    def __init__(self):
+        self.client = Client()
+
+    def request(self, method, path, body=None, headers=None):
+        extra = {f"HTTP_{k.upper().replace('-', '_')}": v for k, v in (headers or {}).items()}
+        if method == 'GET':
+            response = self.client.get(path, **extra)
+        else:
+            response = self.client.post(path, data=json.dumps(body or {}), content_type='application/json', **extra)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, content
+
+
+class HTTPTransport:
+    """真实 HTTP：带 Cookie 的 urllib opener"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+
+    def request(self, method, path, body=None, headers=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method, headers=dict(headers or {}))
+        if data is not None:
+            req.add_header('Content-Type', 'application/json')
+        try:
+            with self.opener.open(req, timeout=30) as resp:
+                return resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+class Command(BaseCommand):
+    help = '按前端调用顺序并发回放接口，输出各接口 p50/p95/p99 并与基线对比'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help='回放的用户访问次数')
+        parser.add_argument('--concurrency', type=int, default=8, help='并发线程数')
+        parser.add_argument('--warmup', type=int, default=5, help='预热次数（不计入统计）')
+        parser.add_argument('--base-url', default='', help='压测已启动的服务，如 http://127.0.0.1:8000；默认进程内调用')
+        parser.add_argument('--username', default='', help='登录账号；默认轮换使用有物料查看权限的压测用户')
+        parser.add_argument('--password', default='', help='登录密码')
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基线文件路径')
+        parser.add_argument('--save-baseline', action='store_true', help='把本次结果保存为基线')
+        parser.add_argument('--max-regression', type=float, default=None,
+                            help='允许的 p95/p99 相对基线的最大变慢比例（如 0.2），超出则命令失败')
+        parser.add_argument('--output', default='', help='本次结果另存为 JSON')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--iterations 与 --concurrency 必须大于0')
+        self.base_url = options['base_url']
+        self.accounts = self.load_accounts(options['username'], options['password'])
+        self.material_ids = list(Material.objects.order_by('?').values_list('id', flat=True)[:1000])
+        if not self.material_ids:
+            raise CommandError('没有物料数据，请先运行 python manage.py generate_bench_data')
+        total = options['iterations'] + options['warmup']
+        self.instance_ids = list(ApprovalInstance.objects.filter(
+            status='running', current_node__isnull=False, flow__code__startswith=NAME_PREFIX,
+        ).order_by('?').values_list('id', flat=True)[:total])
+        approver, _ = User.objects.get_or_create(username=f'{NAME_PREFIX}approver', defaults={'password': '!'})
+        self.approver = approver
+
+        self.lock = threading.Lock()
+        self.cursor = 0
+        self.samples = {step: [] for step in STEPS}
+        self.errors = {step: 0 for step in STEPS}
+
+        self.stdout.write(
+            f"{'HTTP ' + self.base_url if self.base_url else '进程内'}回放：{options['iterations']}次访问，"
+            f"并发{options['concurrency']}，可用审批实例{len(self.instance_ids)}个"
+        )
+        logging.disable(logging.INFO)  # 登录等接口的 INFO 日志会淹没输出，也会影响耗时
+        try:
+            with override_settings(ALLOWED_HOSTS=['*']):
+                self.run(options['warmup'], 1, record=False)
+                started = time.monotonic()
+                self.run(options['iterations'], options['concurrency'], record=True)
+                elapsed = time.monotonic() - started
+        finally:
+            logging.disable(logging.NOTSET)
+
+        results = self.summarize(elapsed)
+        baseline = self.load_baseline(options['baseline'])
+        regressions = self.report(results, baseline, options['max_regression'])
+
+        if options['output']:
+            self.write_json(options['output'], results)
+        if options['save_baseline']:
+            self.write_json(options['baseline'], results)
+            self.stdout.write(self.style.SUCCESS(f"已保存基线：{options['baseline']}"))
+        if regressions:
+            raise CommandError(f"以下接口相对基线变慢超过{options['max_regression']:.0%}：{'、'.join(regressions)}")
+
+    # ---------- 准备 ----------
+    def load_accounts(self, username, password):
+        if username:
+            return [(username, password)]
+        usernames = list(ERPUser.objects.filter(
+            username__startswith=NAME_PREFIX, password=BENCH_PASSWORD,
+            role__permissions__form_name='material', role__permissions__action='view',
+        ).distinct().values_list('username', flat=True)[:200])
+        if not usernames:
+            self.stdout.write(self.style.WARNING('没有找到压测用户，使用默认管理员 admin/123456'))
+            return [('admin', '123456')]
+        return [(name, BENCH_PASSWORD) for name in usernames]
+
+    def next_iteration(self, limit):
+        with self.lock:
+            if self.cursor >= limit:
+                return None
+            self.cursor += 1
+            return self.cursor
+
+    # ---------- 回放 ----------
+    def run(self, iterations, concurrency, record):
+        limit = self.cursor + iterations
+        threads = [threading.Thread(target=self.worker, args=(limit, record)) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def worker(self, limit, record):
+        try:
+            while True:
+                index = self.next_iteration(limit)
+                if index is None:
+                    return
+                self.visit(index, record)
+        finally:
+            connection.close()  # 每个线程各自的数据库连接
+
+    def visit(self, index, record):
+        transport = HTTPTransport(self.base_url) if self.base_url else InProcessTransport()
+        username, password = self.accounts[index % len(self.accounts)]
+        material_id = self.material_ids[index % len(self.material_ids)]
+
+        calls = [
+            ('login', 'POST', '/api/login/', {'username': username, 'password': password}, None),
+            ('get-user-permissions', 'GET', '/api/get-user-permissions/', None, None),
+            ('get-materials', 'GET', '/api/get-materials/?page=1&page_size=10', None, None),
+            ('get-material', 'GET', f'/api/get-material/{material_id}/', None, None),
+            ('get-material-files', 'GET', f'/api/get-material-files/{material_id}/', None, None),
+        ]
+        if index - 1 < len(self.instance_ids):
+            token = str(AccessToken.for_user(self.approver))
+            calls.append(('approval-operate', 'POST', '/api/approval/instances/operate/',
+                          {'instance_id': self.instance_ids[index - 1], 'action': 'approve', 'comment': '压测'},
+                          {'Authorization': f'Bearer {token}'}))
+
+        for step, method, path, body, headers in calls:
+            started = time.perf_counter()
+            try:
+                status, content = transport.request(method, path, body, headers)
+                ok = status == 200 and json.loads(content).get('code') == 200
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - started
+            if not record:
+                continue
+            with self.lock:
+                self.samples[step].append(elapsed)
+                if not ok:
+                    self.errors[step] += 1
+            if step == 'login' and not ok:
+                return  # 登录失败，后续接口没有意义
+
+    # ---------- 统计/对比 ----------
+    def summarize(self, elapsed):
+        endpoints = {}
+        for step in STEPS:
+            values = sorted(self.samples[step])
+            if not values:
+                continue
+            endpoints[step] = {
+                'count': len(values),
+                'errors': self.errors[step],
+                **{f'p{p}': round(percentile(values, p) * 1000, 2) for p in PERCENTILES},
+                'max': round(values[-1] * 1000, 2),
+            }
+        return {
+            'meta': {
+                'mode': self.base_url or 'in-process',
+                'elapsed': round(elapsed, 2),
+                'materials': Material.objects.count(),
+                'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            },
+            'endpoints': endpoints,
+        }
+
+    def load_baseline(self, path):
+        if not os.path.isfile(path):
+            self.stdout.write(self.style.WARNING(f'基线文件不存在：{path}（可用 --save-baseline 生成）'))
+            return {}
+        with open(path, encoding='utf-8') as fp:
+            return json.load(fp).get('endpoints', {})
+
+    def report(self, results, baseline, max_regression):
+        """打印结果表，返回超出允许变慢比例的接口列表（单位：毫秒）"""
+        regressions = []
+        self.stdout.write(f"{'接口':<22}{'次数':>6}{'失败':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  对比基线(p95/p99)")
+        for step, stats in results['endpoints'].items():
+            line = (f"{step:<22}{stats['count']:>6}{stats['errors']:>6}"
+                    f"{stats['p50']:>9.1f}{stats['p95']:>9.1f}{stats['p99']:>9.1f}{stats['max']:>9.1f}")
+            base = baseline.get(step)
+            if base:
+                deltas = [(stats[k] - base[k]) / base[k] if base[k] else 0.0 for k in ('p95', 'p99')]
+                line += '  ' + ' / '.join(f'{d:+.0%}' for d in deltas)
+                if max_regression is not None and max(deltas) > max_regression:
+                    regressions.append(step)
+                    line = self.style.ERROR(line)
+            self.stdout.write(line)
+        total = sum(s['count'] for s in results['endpoints'].values())
+        elapsed = results['meta']['elapsed']
+        self.stdout.write(f"总请求{total}次，耗时{elapsed}秒（{total / elapsed if elapsed else total:.0f}请求/秒）")
+        return regressions
+
+    def write_json(self, path, results):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as fp:
+            json.dump(results, fp, ensure_ascii=False, indent=2)
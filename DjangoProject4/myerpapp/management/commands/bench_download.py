@@ -0,0 +1,133 @@
+# ===================== 附件下载压测：每 GB 占用的 worker 时间 =====================
+# 用法：python manage.py bench_download --size-mb 512 --repeat 3 [--json]
+# 临时生成一个附件（结束后删除文件、回滚数据库记录），在进程内直接调用下载视图，
+# 把响应体写到 /dev/null（模拟 WSGI 服务器写 socket），统计各场景下 worker 为每 GB 附件花费的时间：
+#   legacy            改造前的写法：default_storage.open + FileResponse（4KB 分块）
+#   full              完整下载（FileResponse，1MB 分块）
+#   resume-half       断点续传后半个文件（Range: bytes=<size/2>-，206）
+#   revalidate        浏览器带 If-None-Match 重新验证（304，不读文件）
+#   x-accel-redirect  ERP_SENDFILE_MODE='x-accel-redirect'，字节由 Nginx 发送
+# “worker 秒/GB”按附件大小折算：即用户拿到 1GB 附件，Django worker 被占用多少秒。
+import json
+import os
+import time
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished
+from django.db import close_old_connections, transaction
+from django.http import FileResponse
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from myerpapp.attachments import attachment_full_path, new_attachment_relpath, remove_attachment_file
+from myerpapp.file_view import download_material_file
+from myerpapp.models import Material, MaterialFile
+
+from .generate_bench_data import MATERIAL_CODE_PREFIX
+
+GB = 1024 ** 3
+WRITE_BLOCK_SIZE = 1024 * 1024
+
+
+def legacy_download(request, material_file):
+    """改造前 download_material_file 的响应方式，作为对比基线"""
+    response = FileResponse(default_storage.open(material_file.file_path, 'rb'))
+    response['Content-Type'] = 'application/octet-stream'
+    response['Content-Disposition'] = f'attachment; filename="{material_file.name}"'
+    return response
+
+
+class Command(BaseCommand):
+    help = '压测附件下载：统计完整下载/断点续传/304/代理发送各场景每 GB 占用的 worker 时间'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=int, default=256, help='测试附件大小（MB）')
+        parser.add_argument('--repeat', type=int, default=3, help='每个场景重复次数，取中位数')
+        parser.add_argument('--json', action='store_true', help='以 JSON 输出')
+
+    def handle(self, *args, **options):
+        size = max(options['size_mb'], 1) * 1024 * 1024
+        repeat = max(options['repeat'], 1)
+        relpath = new_attachment_relpath('bench.bin')
+        full_path = attachment_full_path(relpath)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        block = os.urandom(WRITE_BLOCK_SIZE)
+        with open(full_path, 'wb') as fp:
+            for _ in range(size // WRITE_BLOCK_SIZE):
+                fp.write(block)
+
+        # response.close() 会触发 request_finished 关闭数据库连接，压测期间要保留事务（同 django.test.Client）
+        request_finished.disconnect(close_old_connections)
+        try:
+            with transaction.atomic():
+                material = Material.objects.create(code=f'{MATERIAL_CODE_PREFIX}DOWNLOAD', name='下载压测')
+                material_file = MaterialFile.objects.create(
+                    material=material, file_path=relpath, name='bench.bin', size=size)
+                results = self.run_scenarios(material_file, size, repeat)
+                transaction.set_rollback(True)
+        finally:
+            request_finished.connect(close_old_connections)
+            remove_attachment_file(relpath)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, ensure_ascii=False, indent=2))
+            return
+        self.stdout.write(f'附件大小{size // (1024 * 1024)}MB，每个场景{repeat}次取中位数')
+        self.stdout.write(f"{'场景':<18}{'状态码':>6}{'Python发送字节':>16}{'耗时(s)':>10}{'CPU(s)':>10}{'worker秒/GB':>14}")
+        for name, item in results.items():
+            self.stdout.write(f"{name:<18}{item['status']:>6}{item['bytes']:>16}{item['wall_seconds']:>10.3f}"
+                              f"{item['cpu_seconds']:>10.3f}{item['worker_seconds_per_gb']:>14.4f}")
+
+    def run_scenarios(self, material_file, size, repeat):
+        factory = RequestFactory()
+        path = f'/api/download-material-file/{material_file.material_id}/{material_file.id}/'
+        probe = self.call(factory.get(path), material_file)
+        etag = probe['ETag']
+
+        scenarios = {
+            'legacy': (lambda: legacy_download(factory.get(path), material_file), ''),
+            'full': (lambda: self.call(factory.get(path), material_file), ''),
+            'resume-half': (lambda: self.call(factory.get(path, HTTP_RANGE=f'bytes={size // 2}-'),
+                                              material_file), ''),
+            'revalidate': (lambda: self.call(factory.get(path, HTTP_IF_NONE_MATCH=etag), material_file), ''),
+            'x-accel-redirect': (lambda: self.call(factory.get(path), material_file), 'x-accel-redirect'),
+        }
+        results = {}
+        for name, (respond, mode) in scenarios.items():
+            runs = []
+            with override_settings(ERP_SENDFILE_MODE=mode):
+                for _ in range(repeat):
+                    runs.append(self.measure(respond))
+            runs.sort(key=lambda run: run['wall_seconds'])
+            result = runs[len(runs) // 2]
+            result['worker_seconds_per_gb'] = round(result['wall_seconds'] * GB / size, 4)
+            results[name] = result
+        return results
+
+    @staticmethod
+    def call(request, material_file):
+        request.session = {'erp_username': 'bench'}
+        return download_material_file(request, material_file.material_id, material_file.id)
+
+    @staticmethod
+    def measure(respond):
+        """从调用视图到响应体全部写出的耗时（墙钟 + 进程 CPU）"""
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        response = respond()
+        sent = 0
+        with open(os.devnull, 'wb') as sink:
+            if response.streaming:
+                for chunk in response.streaming_content:
+                    sink.write(chunk)
+                    sent += len(chunk)
+            else:
+                sink.write(response.content)
+                sent = len(response.content)
+        response.close()
+        return {
+            'status': response.status_code,
+            'bytes': sent,
+            'wall_seconds': round(time.perf_counter() - wall_start, 4),
+            'cpu_seconds': round(time.process_time() - cpu_start, 4),
+        }
@@ -0,0 +1,112 @@
+# ===================== Session 引擎基准测试 =====================
+# 用法：python manage.py bench_sessions --logins 50 --requests 500
+# 对比 django.contrib.sessions.backends.db 与 myerpapp.session_backend：
+#   - 每次登录对 django_session 的写入次数
+#   - 每个已登录请求对 django_session 的读查询次数
+# 全程在事务中执行并回滚，不会在数据库里留下测试Session。
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from myerpapp.session_backend import write_behind_queue
+
+ENGINES = [
+    ('db', 'django.contrib.sessions.backends.db'),
+    ('cache+write-behind', 'myerpapp.session_backend'),
+]
+
+
+def count_session_queries(queries):
+    reads = writes = 0
+    for q in queries:
+        sql = q['sql']
+        if 'django_session' not in sql:
+            continue
+        if sql.lstrip().upper().startswith('SELECT'):
+            reads += 1
+        else:
+            writes += 1
+    return reads, writes
+
+
+class Command(BaseCommand):
+    help = '对比数据库Session与缓存+合并写回Session每个请求的 django_session 查询数'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=50, help='模拟登录次数')
+        parser.add_argument('--requests', type=int, default=500, help='已登录请求次数')
+        parser.add_argument('--path', default='/api/get-user-permissions/', help='已登录请求访问的接口')
+
+    def handle(self, *args, **options):
+        cache_dir = tempfile.mkdtemp(prefix='bench_sessions_')
+        caches = {
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'sessions': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': cache_dir,
+            },
+        }
+        results = []
+        try:
+            for label, engine in ENGINES:
+                with override_settings(
+                    SESSION_ENGINE=engine,
+                    CACHES=caches,
+                    ALLOWED_HOSTS=['*'],
+                    SESSION_WRITE_BEHIND_BATCH=options['logins'] + 1,
+                    SESSION_WRITE_BEHIND_INTERVAL=3600,
+                ):
+                    with transaction.atomic():
+                        results.append((label, self.run_engine(options)))
+                        transaction.set_rollback(True)
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+        self.stdout.write('')
+        self.stdout.write(f"{'引擎':<22}{'登录写入/次':>12}{'请求读取/次':>12}{'请求写入/次':>12}{'请求耗时ms':>12}")
+        for label, r in results:
+            self.stdout.write(
+                f"{label:<22}{r['login_writes']:>12.2f}{r['request_reads']:>12.2f}"
+                f"{r['request_writes']:>12.2f}{r['request_ms']:>12.3f}"
+            )
+        base, new = results[0][1], results[1][1]
+        self.stdout.write(self.style.SUCCESS(
+            f"每个已登录请求减少 {base['request_reads'] - new['request_reads']:.2f} 次 django_session 读查询；"
+            f"登录写入由 {base['login_writes']:.2f} 次/登录合并为 {new['login_writes']:.2f} 次/登录"
+        ))
+
+    def run_engine(self, options):
+        logins, requests = options['logins'], options['requests']
+
+        # 1. 登录：每次用新的客户端，模拟不同用户并发登录
+        clients = []
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(logins):
+                client = Client()
+                client.post('/api/login/', {'username': 'admin', 'password': '123456'},
+                            content_type='application/json')
+                clients.append(client)
+            write_behind_queue.flush()
+        _, login_writes = count_session_queries(ctx.captured_queries)
+
+        # 2. 已登录请求
+        client = clients[0]
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(requests):
+                client.get(options['path'])
+            write_behind_queue.flush()
+        elapsed = time.perf_counter() - started
+        reads, writes = count_session_queries(ctx.captured_queries)
+
+        return {
+            'login_writes': login_writes / max(logins, 1),
+            'request_reads': reads / max(requests, 1),
+            'request_writes': writes / max(requests, 1),
+            'request_ms': elapsed * 1000 / max(requests, 1),
+        }
@@ -0,0 +1,76 @@
+# ===================== 冷附件压缩存储 =====================
+# 用法：python manage.py compress_attachments [--cold-days 90] [--limit N] [--codec zstd] [--level 9] [--dry-run]
+# 挑出长期未下载（last_access_time，从未下载过按 create_time）的未压缩实体文件，逐个转为分帧压缩存储。
+# 图片、压缩包等已压缩格式抽样后直接标记为不压缩（codec='identity'），以后不再重复尝试。
+# 每个文件单独切换路径，可随时中断、重复执行；压缩期间下载照常进行。
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q, Sum
+
+from myerpapp.attachment_codec import available_codecs, resolve_codec
+from myerpapp.attachment_storage import get_attachment_storage
+from myerpapp.attachments import COMPRESS_MIN_SIZE, compress_blob
+from myerpapp.models import AttachmentBlob
+
+from .attachment_report import human_size
+
+
+class Command(BaseCommand):
+    help = '把长期未下载的附件转为压缩存储，节省磁盘空间'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cold-days', type=int, default=getattr(settings, 'ATTACHMENT_COLD_DAYS', 90),
+                            help='超过多少天未下载视为冷数据（0 为压缩全部未压缩附件）')
+        parser.add_argument('--limit', type=int, default=0, help='本次最多处理多少个实体文件（0 为不限）')
+        parser.add_argument('--codec', default='', help=f"压缩编码，可选：{'/'.join(available_codecs())}（默认按配置）")
+        parser.add_argument('--level', type=int, default=None, help='压缩级别（默认 zlib 6 / zstd 9）')
+        parser.add_argument('--dry-run', action='store_true', help='只统计候选文件，不做任何改动')
+
+    def handle(self, *args, **options):
+        if not get_attachment_storage().is_local:
+            raise CommandError('压缩存储直接操作磁盘文件，只支持本地存储后端（ATTACHMENT_STORAGE_BACKEND=local）')
+        codec = options['codec'] or getattr(settings, 'ATTACHMENT_COMPRESSION_CODEC', 'zstd')
+        try:
+            codec = resolve_codec(codec)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        cutoff = datetime.now() - timedelta(days=max(options['cold_days'], 0))
+        candidates = AttachmentBlob.objects.filter(codec='', size__gte=COMPRESS_MIN_SIZE).filter(
+            Q(last_access_time__lt=cutoff) | Q(last_access_time__isnull=True, create_time__lt=cutoff))
+        if options['dry_run']:
+            total = candidates.aggregate(count=Count('id'), size=Sum('size'))
+            self.stdout.write(f"候选冷附件：{total['count'] or 0}个，共{human_size(total['size'] or 0)}")
+            return
+
+        limit = options['limit']
+        stats = {'compressed': 0, 'skipped': 0, 'failed': 0, 'saved': 0}
+        started = time.monotonic()
+        processed = 0
+        cursor = 0  # 失败的文件本次跳过，下次执行重试
+        while not limit or processed < limit:
+            size = min(100, limit - processed) if limit else 100
+            blob_ids = list(candidates.filter(id__gt=cursor).order_by('id').values_list('id', flat=True)[:size])
+            if not blob_ids:
+                break
+            cursor = blob_ids[-1]
+            for blob_id in blob_ids:
+                processed += 1
+                try:
+                    saved = compress_blob(blob_id, codec=codec, level=options['level'])
+                except Exception as e:
+                    stats['failed'] += 1
+                    self.stderr.write(f'压缩实体文件{blob_id}失败：{e}')
+                    continue
+                if saved:
+                    stats['compressed'] += 1
+                    stats['saved'] += saved
+                else:
+                    stats['skipped'] += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"压缩完成（{codec}）：压缩{stats['compressed']}个，不值得压缩{stats['skipped']}个，失败{stats['failed']}个，"
+            f"节省{human_size(stats['saved'])}，耗时{time.monotonic() - started:.1f}秒"))
@@ -0,0 +1,344 @@
+# ===================== 压测数据生成命令 =====================
+# 用法：python manage.py generate_bench_data                 # 默认规模：50万物料/200万附件/2万用户/500角色/1000流程/100万审批实例
+#       python manage.py generate_bench_data --scale 0.01    # 按比例缩小，本地快速验证
+#       python manage.py generate_bench_data --clear-only    # 只清理之前生成的数据
+# 生成的数据都带固定前缀（物料编码 BENCH-、用户/角色/流程 bench_），重复执行前会先清理上一次的数据，
+# 不影响手工录入的数据。写入方式与物料导入相同：预编译 INSERT + executemany，每批一个事务。
+# 附件只生成数据库记录（file_path 指向不存在的文件），用于列表/分页/统计类接口的压测。
+import random
+import time
+from datetime import datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from myerpapp.models import (
+    ACTION_CHOICES, FORM_CHOICES, ApprovalFlow, ApprovalInstance, ApprovalNode, ApprovalRecord, ApprovalTask,
+    ApprovalToken, ERPUser, Material, MaterialFile, PermissionConfig, Role,
+)
+from myerpapp.permission_cache import invalidate_permission_cache
+
+MATERIAL_CODE_PREFIX = 'BENCH-'
+NAME_PREFIX = 'bench_'
+BENCH_PASSWORD = 'bench123'
+BATCH_SIZE = 5000
+
+DEFAULT_COUNTS = {
+    'materials': 500000,
+    'files': 2000000,
+    'users': 20000,
+    'roles': 500,
+    'flows': 1000,
+    'instances': 1000000,
+}
+
+# 物料名称由 "材质 + 品名 + 规格" 组合，分类/供应商/单位取自固定词表，贴近真实数据的重复度
+MATERIALS = ['不锈钢', '碳钢', '镀锌', '铝合金', '黄铜', '紫铜', '尼龙', '聚氨酯', '橡胶', '陶瓷', '钛合金', '铸铁']
+ITEMS = {
+    '五金': ['六角螺栓', '内六角螺钉', '平垫圈', '弹簧垫圈', '法兰螺母', '膨胀螺丝', '铆钉', '销轴'],
+    '管件': ['弯头', '三通', '异径管', '法兰', '球阀', '截止阀', '止回阀', '管卡'],
+    '轴承': ['深沟球轴承', '圆锥滚子轴承', '推力轴承', '滚针轴承', '直线轴承', '带座轴承'],
+    '电气': ['接触器', '断路器', '继电器', '接近开关', '电缆', '端子排', '变频器', '按钮开关'],
+    '密封件': ['O型圈', '油封', '骨架油封', '密封垫片', '机械密封', '防尘圈'],
+    '包材': ['纸箱', '珍珠棉', '缠绕膜', '打包带', '木托盘', '气泡袋'],
+}
+CATEGORIES = list(ITEMS)
+UNITS = ['个', '件', '套', '只', '米', '卷', '箱', 'kg']
+SUPPLIERS = [
+    f'{city}{name}{suffix}'
+    for city in ['上海', '苏州', '宁波', '东莞', '天津', '青岛', '成都', '武汉']
+    for name in ['精工', '恒达', '华联', '鑫源', '永固', '东方']
+    for suffix in ['机械有限公司', '五金制品厂']
+]
+FILE_TYPES = [('.pdf', '规格书'), ('.jpg', '实物图'), ('.png', '尺寸图'), ('.xlsx', '检测报告'), ('.docx', '技术协议')]
+PERMISSIONS = [(form, action) for form, _ in FORM_CHOICES for action, _ in ACTION_CHOICES]
+
+
+def spread_times(rng, count, days=365):
+    """在过去 days 天内按序号均匀铺开、带随机抖动的时间（与自增 id 大致同序，符合真实写入规律）"""
+    start = datetime.now() - timedelta(days=days)
+    step = days * 86400 / max(count, 1)
+    for i in range(count):
+        yield start + timedelta(seconds=i * step + rng.random() * step)
+
+
+class Command(BaseCommand):
+    help = '批量生成压测数据（物料/附件/用户/角色/审批流程/审批实例），可按比例缩放'
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_COUNTS.items():
+            parser.add_argument(f'--{name}', type=int, default=default, help=f'生成数量（默认{default}）')
+        parser.add_argument('--scale', type=float, default=1.0, help='所有数量统一乘以该系数')
+        parser.add_argument('--seed', type=int, default=20240101, help='随机种子，相同种子生成相同数据')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='每批写入行数')
+        parser.add_argument('--clear-only', action='store_true', help='只清理已生成的压测数据')
+
+    def handle(self, *args, **options):
+        if options['scale'] <= 0:
+            raise CommandError('--scale 必须大于0')
+        self.rng = random.Random(options['seed'])
+        self.batch_size = max(1, options['batch_size'])
+        counts = {name: max(1, int(options[name] * options['scale'])) for name in DEFAULT_COUNTS}
+
+        started = time.monotonic()
+        self.clear()
+        if options['clear_only']:
+            return
+
+        role_ids = self.generate_roles(counts['roles'])
+        self.generate_users(counts['users'], role_ids)
+        material_ids = self.generate_materials(counts['materials'])
+        self.generate_files(counts['files'], material_ids)
+        flows = self.generate_flows(counts['flows'])
+        self.generate_instances(counts['instances'], flows, counts['users'])
+
+        invalidate_permission_cache()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')  # 更新统计信息，让查询计划与生产规模一致
+        self.stdout.write(self.style.SUCCESS(f'压测数据生成完成，总耗时{time.monotonic() - started:.1f}秒'))
+
+    # ---------- 写入工具 ----------
+    def insert_sql(self, model, fields):
+        meta = model._meta
+        qn = connection.ops.quote_name
+        columns = [meta.get_field(name).column for name in fields]
+        return 'INSERT INTO {} ({}) VALUES ({})'.format(
+            qn(meta.db_table), ', '.join(qn(c) for c in columns), ', '.join(['%s'] * len(columns)))
+
+    def bulk_insert(self, model, fields, rows, label):
+        """rows 为逐行生成器；每 batch_size 行一个事务"""
+        sql = self.insert_sql(model, fields)
+        started = time.monotonic()
+        total = 0
+        batch = []
+
+        def flush():
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, batch)
+
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                flush()
+                total += len(batch)
+                batch = []
+        if batch:
+            flush()
+            total += len(batch)
+        elapsed = time.monotonic() - started
+        rate = int(total / elapsed) if elapsed > 0 else total
+        self.stdout.write(f'{label}：{total}行，耗时{elapsed:.1f}秒（{rate}行/秒）')
+        return total
+
+    def dt(self, value):
+        return connection.ops.adapt_datetimefield_value(value)
+
+    # ---------- 清理 ----------
+    def clear(self):
+        """按外键依赖顺序删除上一次生成的数据（原生 DELETE，不逐行加载模型）"""
+        qn = connection.ops.quote_name
+        material = qn(Material._meta.db_table)
+        flow = qn(ApprovalFlow._meta.db_table)
+        instance = qn(ApprovalInstance._meta.db_table)
+        role = qn(Role._meta.db_table)
+        bench_flows = f'SELECT id FROM {flow} WHERE code LIKE %s'
+        bench_instances = f'SELECT id FROM {instance} WHERE flow_id IN ({bench_flows})'
+        bench_roles = f'SELECT id FROM {role} WHERE role_code LIKE %s'
+        name_like = NAME_PREFIX.replace('_', r'\_') + '%'
+        statements = [
+            (f'DELETE FROM {qn(ApprovalRecord._meta.db_table)} WHERE instance_id IN ({bench_instances})',
+             [name_like]),
+            (f'DELETE FROM {qn(ApprovalTask._meta.db_table)} WHERE instance_id IN ({bench_instances})',
+             [name_like]),
+            (f'DELETE FROM {qn(ApprovalToken._meta.db_table)} WHERE instance_id IN ({bench_instances})',
+             [name_like]),
+            (f'DELETE FROM {instance} WHERE flow_id IN ({bench_flows})', [name_like]),
+            (f'DELETE FROM {qn(ApprovalNode._meta.db_table)} WHERE flow_id IN ({bench_flows})', [name_like]),
+            (f'DELETE FROM {flow} WHERE code LIKE %s', [name_like]),
+            (f'DELETE FROM {qn(MaterialFile._meta.db_table)} WHERE material_id IN '
+             f'(SELECT id FROM {material} WHERE code LIKE %s)', [MATERIAL_CODE_PREFIX + '%']),
+            (f'DELETE FROM {material} WHERE code LIKE %s', [MATERIAL_CODE_PREFIX + '%']),
+            (f'DELETE FROM {qn(ERPUser._meta.db_table)} WHERE username LIKE %s', [name_like]),
+            (f'DELETE FROM {qn(PermissionConfig._meta.db_table)} WHERE role_id IN ({bench_roles})', [name_like]),
+            (f'DELETE FROM {role} WHERE role_code LIKE %s', [name_like]),
+            (f'DELETE FROM {qn(User._meta.db_table)} WHERE username LIKE %s', [name_like]),
+        ]
+        started = time.monotonic()
+        deleted = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            for sql, params in statements:
+                # LIKE 默认不支持转义下划线，统一声明 ESCAPE
+                cursor.execute(sql.replace('LIKE %s', r"LIKE %s ESCAPE '\'"), params)
+                deleted += max(cursor.rowcount, 0)
+        if deleted:
+            invalidate_permission_cache()
+            self.stdout.write(f'已清理上一次的压测数据：{deleted}行，耗时{time.monotonic() - started:.1f}秒')
+
+    # ---------- 角色/用户 ----------
+    def generate_roles(self, count):
+        rng = self.rng
+        now = self.dt(datetime.now())
+        self.bulk_insert(Role, ['role_name', 'role_code', 'desc', 'create_time'], (
+            (f'{NAME_PREFIX}角色{i:04d}', f'{NAME_PREFIX}r{i:04d}', '压测角色', now) for i in range(count)
+        ), '角色')
+        roles = list(Role.objects.filter(role_code__startswith=NAME_PREFIX).values_list('id', 'role_name', 'role_code'))
+
+        form_names = dict(FORM_CHOICES)
+        action_names = dict(ACTION_CHOICES)
+
+        def permissions():
+            for role_id, role_name, role_code in roles:
+                # 每个角色随机拥有 1/4 ~ 3/4 的权限；大多数角色能查看物料
+                granted = set(rng.sample(PERMISSIONS, rng.randint(len(PERMISSIONS) // 4, len(PERMISSIONS) * 3 // 4)))
+                if rng.random() < 0.8:
+                    granted.add(('material', 'view'))
+                for form, action in sorted(granted):
+                    yield (role_id, form, action, f'{role_name}-{form_names[form]}-{action_names[action]}',
+                           f'{role_code}_{form}_{action}'.lower(), '', now)
+
+        self.bulk_insert(PermissionConfig, ['role', 'form_name', 'action', 'name', 'code', 'desc', 'create_time'],
+                         permissions(), '权限配置')
+        return [role_id for role_id, _, _ in roles]
+
+    def generate_users(self, count, role_ids):
+        rng = self.rng
+        times = spread_times(rng, count)
+        self.bulk_insert(ERPUser, ['username', 'password', 'email', 'role', 'create_time', 'is_active'], (
+            (f'{NAME_PREFIX}user{i:06d}', BENCH_PASSWORD, f'{NAME_PREFIX}user{i:06d}@example.com',
+             rng.choice(role_ids), self.dt(next(times)), rng.random() > 0.05)
+            for i in range(count)
+        ), 'ERP用户')
+
+    # ---------- 物料/附件 ----------
+    def generate_materials(self, count):
+        rng = self.rng
+
+        def rows():
+            for i, created in enumerate(spread_times(rng, count)):
+                category = rng.choice(CATEGORIES)
+                item = rng.choice(ITEMS[category])
+                spec = f'M{rng.choice([3, 4, 5, 6, 8, 10, 12, 16, 20])}×{rng.randint(1, 20) * 5}'
+                updated = created + timedelta(days=rng.random() * 30) if rng.random() < 0.3 else created
+                yield (
+                    f'{rng.choice(MATERIALS)}{item} {spec}',
+                    f'{MATERIAL_CODE_PREFIX}{i:08d}',
+                    category,
+                    rng.choice(UNITS),
+                    rng.choice(SUPPLIERS),
+                    int(rng.paretovariate(1.2) * 10),
+                    f'{item}，规格{spec}，适用于{rng.choice(["产线设备", "仓储物流", "维修备件", "出口包装"])}',
+                    self.dt(created),
+                    self.dt(updated),
+                )
+
+        self.bulk_insert(Material, ['name', 'code', 'category', 'unit', 'supplier', 'quantity', 'desc',
+                                    'create_time', 'update_time'], rows(), '物料')
+        return list(Material.objects.filter(code__startswith=MATERIAL_CODE_PREFIX).values_list('id', flat=True))
+
+    def generate_files(self, count, material_ids):
+        rng = self.rng
+        # 附件数量长尾分布：少数物料附件很多，多数只有几个
+        weights = [rng.paretovariate(1.5) for _ in material_ids]
+
+        def rows():
+            chosen = rng.choices(material_ids, weights=weights, k=count)
+            for i, (material_id, uploaded) in enumerate(zip(chosen, spread_times(rng, count))):
+                ext, title = rng.choice(FILE_TYPES)
+                yield (
+                    material_id,
+                    f'materials/bench/{uploaded:%Y/%m/%d}/{i:08x}{ext}',
+                    f'{title}{i}{ext}',
+                    int(rng.lognormvariate(12, 1.5)),
+                    self.dt(uploaded),
+                )
+
+        self.bulk_insert(MaterialFile, ['material', 'file_path', 'name', 'size', 'upload_time'], rows(), '物料附件')
+
+    # ---------- 审批 ----------
+    def generate_flows(self, count):
+        """每个流程：开始 → 2~4 个审批节点 → 结束；返回 [(flow_id, [节点id...], 结束节点id)]"""
+        rng = self.rng
+        flows = ApprovalFlow.objects.bulk_create([
+            ApprovalFlow(name=f'{NAME_PREFIX}流程{i:04d}', code=f'{NAME_PREFIX}flow{i:04d}', is_active=rng.random() > 0.1)
+            for i in range(count)
+        ], batch_size=self.batch_size)
+
+        nodes = []
+        for flow in flows:
+            approvers = rng.randint(2, 4)
+            keys = ['start'] + [f'step{step + 1}' for step in range(approvers)] + ['end']
+            nodes.append(ApprovalNode(flow=flow, node_key='start', name='开始', node_type='start', sort=0,
+                                      next_nodes={'next': [keys[1]]}))
+            for step in range(approvers):
+                nodes.append(ApprovalNode(flow=flow, node_key=keys[step + 1], name=f'第{step + 1}级审批',
+                                          node_type='approver', sort=step + 1, approver_config={'type': 'user'},
+                                          next_nodes={'next': [keys[step + 2]]}))
+            nodes.append(ApprovalNode(flow=flow, node_key='end', name='结束', node_type='end', sort=approvers + 1))
+        with transaction.atomic():
+            nodes = ApprovalNode.objects.bulk_create(nodes, batch_size=self.batch_size)
+
+        result = []
+        by_flow = {}
+        for node in nodes:
+            by_flow.setdefault(node.flow_id, []).append(node)
+        for flow_id, flow_nodes in by_flow.items():
+            approvers = [n.id for n in flow_nodes if n.node_type == 'approver']
+            result.append((flow_id, approvers, flow_nodes[-1].id))
+        self.stdout.write(f'审批流程：{len(flows)}个，节点{len(nodes)}个')
+        return result
+
+    def generate_instances(self, count, flows, user_count):
+        """审批实例：60% 审批中、25% 已通过、15% 已驳回；已结束的实例带对应的审批记录"""
+        rng = self.rng
+        applicants = User.objects.bulk_create([
+            User(username=f'{NAME_PREFIX}applicant{i:05d}', password='!')
+            for i in range(max(1, user_count // 10))
+        ], batch_size=self.batch_size)
+        user_ids = list(User.objects.filter(username__startswith=NAME_PREFIX).values_list('id', flat=True))
+        self.stdout.write(f'审批用户：{len(applicants)}个')
+
+        plans = []  # (flow, status, 当前节点, 已审批到第几个节点)
+
+        def instance_rows():
+            for created in spread_times(rng, count):
+                flow_id, approvers, end_id = rng.choice(flows)
+                roll = rng.random()
+                if roll < 0.6:
+                    status, done = 'running', rng.randrange(len(approvers))
+                    node_id = approvers[done]
+                elif roll < 0.85:
+                    status, done, node_id = 'approved', len(approvers), end_id
+                else:
+                    status, done = 'rejected', rng.randrange(len(approvers))
+                    node_id = approvers[done]
+                plans.append((approvers, status, done))
+                updated = created + timedelta(hours=rng.random() * 72)
+                yield (flow_id, rng.choice(user_ids), node_id, status, self.dt(created), self.dt(updated))
+
+        self.bulk_insert(ApprovalInstance, ['flow', 'create_user', 'current_node', 'status', 'create_time',
+                                            'update_time'], instance_rows(), '审批实例')
+
+        instance_ids = ApprovalInstance.objects.filter(
+            flow__code__startswith=NAME_PREFIX).order_by('id').values_list('id', 'create_time')
+
+        def record_rows():
+            for (instance_id, created), (approvers, status, done) in zip(instance_ids.iterator(chunk_size=10000), plans):
+                operated = created
+                for step in range(done):
+                    operated += timedelta(minutes=rng.randint(5, 600))
+                    yield (instance_id, approvers[step], rng.choice(user_ids), 'approve', '同意', self.dt(operated))
+                if status == 'rejected':
+                    operated += timedelta(minutes=rng.randint(5, 600))
+                    yield (instance_id, approvers[done], rng.choice(user_ids), 'reject', '资料不全，驳回',
+                           self.dt(operated))
+
+        self.bulk_insert(ApprovalRecord, ['instance', 'node', 'approver', 'action', 'comment', 'operate_time'],
+                         record_rows(), '审批记录')
+
+        running = ApprovalInstance.objects.filter(flow__code__startswith=NAME_PREFIX, status='running').order_by(
+            'id').values_list('id', 'current_node_id', 'update_time')
+        self.bulk_insert(ApprovalToken, ['instance', 'node', 'status', 'arrived', 'create_time', 'update_time'], (
+            (instance_id, node_id, 'active', 0, self.dt(updated), self.dt(updated))
+            for instance_id, node_id, updated in running.iterator(chunk_size=10000)
+        ), '审批令牌')
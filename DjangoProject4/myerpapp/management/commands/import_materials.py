@@ -0,0 +1,44 @@
+# ===================== 物料批量导入命令 =====================
+# 用法：python manage.py import_materials 供应商目录.xlsx --mode upsert --report errors.csv
+# 与 import-materials/ 接口共用 MaterialImporter：流式读取、分批校验、分批事务写入。
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from myerpapp.material_import import (
+    IMPORT_BATCH_SIZE, IMPORT_MODES, MaterialImporter, MaterialImportError, iter_spreadsheet_rows,
+)
+from myerpapp.streaming import SpreadsheetError
+
+
+class Command(BaseCommand):
+    help = '从 CSV/XLSX 批量导入物料（首行为表头），出错的行写入错误报告'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV 或 XLSX 文件路径')
+        parser.add_argument('--mode', choices=IMPORT_MODES, default='skip',
+                            help='skip：已存在的编码记为错误；upsert：已存在则覆盖更新')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='每批写入行数')
+        parser.add_argument('--report', default=None, help='错误报告输出路径（默认写入 MEDIA_ROOT/import_reports/）')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'文件不存在：{path}')
+
+        importer = MaterialImporter(mode=options['mode'], batch_size=options['batch_size'],
+                                    report_file=options['report'])
+        try:
+            with open(path, 'rb') as fp:
+                result = importer.run(iter_spreadsheet_rows(fp, path))
+        except (MaterialImportError, SpreadsheetError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            f"共{result['total']}行：新增{result['created']}，更新{result['updated']}，失败{result['failed']}；"
+            f"耗时{result['elapsed']}秒（{result['rows_per_second']}行/秒）"
+        )
+        if result['report_file']:
+            self.stdout.write(self.style.WARNING(f"错误报告：{result['report_file']}"))
+        else:
+            self.stdout.write(self.style.SUCCESS('全部导入成功'))
@@ -0,0 +1,104 @@
+# ===================== 旧附件迁移到分片目录 =====================
+# 用法：python manage.py migrate_attachment_layout [--batch-size 200] [--limit N] [--sleep 0.2] [--dry-run]
+# 去重存储上线前的附件（MaterialFile.blob 为空）平铺在 material_files/ 下，文件名为 <原名>_<时间戳>。
+# 本命令逐批把它们收进内容地址存储 material_files/ab/cd/<sha256>，并改写 file_path：
+# - 在线执行：文件先硬链接到新位置，记录提交后才删除旧路径，迁移过程中下载不受影响
+# - 可随时中断：每批一个短事务，已迁移的记录不再是旧附件，重新执行会从剩下的继续
+# - 相同内容的旧附件迁移后自动去重；多条记录指向同一个旧文件时一起迁移
+# - 磁盘上已找不到的文件跳过并计数，留给附件对账清理
+import os
+import shutil
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from myerpapp.attachment_storage import get_attachment_storage
+from myerpapp.attachments import (
+    acquire_blob, attachment_full_path, file_sha256, new_attachment_relpath, release_material_files,
+    remove_attachment_file, store_blob,
+)
+from myerpapp.models import MaterialFile
+
+
+def link_or_copy(src, dst):
+    """硬链接（不拷贝数据）；文件系统不支持时退回拷贝"""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+class Command(BaseCommand):
+    help = '把平铺存放的旧附件逐批迁移到内容地址分片目录（可中断、可重复执行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='每批迁移的附件记录数')
+        parser.add_argument('--limit', type=int, default=0, help='本次最多迁移多少条记录（0 为不限）')
+        parser.add_argument('--sleep', type=float, default=0.0, help='每批之间暂停秒数，降低对线上服务的影响')
+        parser.add_argument('--dry-run', action='store_true', help='只统计待迁移的记录，不做任何改动')
+
+    def handle(self, *args, **options):
+        if not get_attachment_storage().is_local:
+            raise CommandError('旧附件迁移直接操作磁盘文件，只支持本地存储后端（ATTACHMENT_STORAGE_BACKEND=local）')
+        legacy = MaterialFile.objects.filter(blob__isnull=True)
+        if options['dry_run']:
+            self.stdout.write(f'待迁移旧附件记录：{legacy.count()}条')
+            return
+
+        batch_size = max(options['batch_size'], 1)
+        limit = options['limit']
+        stats = {'rows': 0, 'files': 0, 'bytes': 0, 'missing': 0, 'failed': 0}
+        started = time.monotonic()
+        cursor = 0  # 本次执行内跳过失败/缺失的记录，下次执行会重试
+        while not limit or stats['rows'] + stats['missing'] < limit:
+            size = min(batch_size, limit - stats['rows'] - stats['missing']) if limit else batch_size
+            batch = list(legacy.filter(id__gt=cursor).order_by('id').values_list('id', 'file_path')[:size])
+            if not batch:
+                break
+            cursor = batch[-1][0]
+            self.migrate_batch({path for _, path in batch}, stats)
+            self.stdout.write(f"已迁移{stats['rows']}条记录（{stats['files']}个文件，{stats['bytes'] / 1024 / 1024:.1f}MB），"
+                              f"缺失{stats['missing']}，失败{stats['failed']}")
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"迁移完成：{stats['rows']}条记录，耗时{time.monotonic() - started:.1f}秒；剩余旧附件{legacy.count()}条"))
+
+    def migrate_batch(self, paths, stats):
+        for path in sorted(paths):
+            source = attachment_full_path(path)
+            # 同一个旧文件的所有记录一起迁移（旧命名规则下同名同秒上传会共用路径）
+            ids = list(MaterialFile.objects.filter(blob__isnull=True, file_path=path).values_list('id', flat=True))
+            if not ids:
+                continue  # 批次查询之后已被删除或迁移
+            if not os.path.isfile(source):
+                stats['missing'] += len(ids)
+                continue
+
+            staged = new_attachment_relpath(os.path.basename(path))
+            try:
+                # 哈希和建链接都在事务外完成，事务里只有 rename 和几条 UPDATE
+                sha256, size = file_sha256(source)
+                link_or_copy(source, attachment_full_path(staged))
+                # 刷新修改时间：硬链接保留旧文件的 mtime，提交前会被对账当成超龄的孤儿文件
+                os.utime(attachment_full_path(staged))
+                with transaction.atomic():
+                    blob = store_blob(staged, sha256, size)
+                    for _ in ids[1:]:
+                        acquire_blob(sha256)
+                    updated = MaterialFile.objects.filter(id__in=ids, blob__isnull=True).update(
+                        blob=blob, file_path=blob.path, sha256=sha256, size=size)
+                    # 迁移期间有记录被删除：多加的引用还回去
+                    release_material_files([(blob.id, blob.path)] * (len(ids) - updated))
+                    transaction.on_commit(lambda p=path: remove_attachment_file(p))
+            except Exception as e:
+                remove_attachment_file(staged)
+                stats['failed'] += len(ids)
+                self.stderr.write(f'迁移{path}失败：{e}')
+                continue
+            stats['rows'] += updated
+            stats['files'] += 1
+            stats['bytes'] += size
@@ -0,0 +1,17 @@
+# ===================== 重建审批待办 =====================
+# 用法：python manage.py rebuild_approval_tasks
+# 待办平时随实例流转同步写入；升级到待办表后、或绕过接口直接改了实例/流程数据后执行一次即可。
+import time
+
+from django.core.management.base import BaseCommand
+
+from myerpapp.approval_tasks import rebuild_tasks
+
+
+class Command(BaseCommand):
+    help = '按审批中实例各分支所在节点重建全部待办'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = rebuild_tasks()
+        self.stdout.write(self.style.SUCCESS(f'已重建{count}条审批待办，耗时{time.monotonic() - started:.2f}秒'))
@@ -0,0 +1,20 @@
+# ===================== 重建物料检索索引 =====================
+# 用法：python manage.py rebuild_material_index
+# 索引平时由触发器自动同步；绕过触发器直接改库、或从备份恢复数据后执行一次即可。
+import time
+
+from django.core.management.base import BaseCommand
+
+from myerpapp.material_search import get_search_index
+
+
+class Command(BaseCommand):
+    help = '按物料表全量重建全文检索索引'
+
+    def handle(self, *args, **options):
+        index = get_search_index()
+        started = time.monotonic()
+        count = index.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'{type(index).__name__}：已重建{count}条物料索引，耗时{time.monotonic() - started:.2f}秒'
+        ))
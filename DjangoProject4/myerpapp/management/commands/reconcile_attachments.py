@@ -0,0 +1,282 @@
+# ===================== 附件对账 / 孤儿文件清理 =====================
+# 用法：python manage.py reconcile_attachments [--action report|quarantine|delete] [--units 16] [--rows 50000]
+#                                             [--fix-refcounts] [--min-age-hours 1] [--json]
+# 定时任务示例（每小时处理 16 个分片目录，约 16 小时扫完一轮）：
+#   0 * * * * python manage.py reconcile_attachments --action quarantine --units 16 --rows 50000
+#
+# 1. 磁盘 → 数据库：os.scandir 遍历 material_files/，每 1000 个文件一批，
+#    用 path__in / file_path__in 索引查询做集合差，找出没有任何记录引用的孤儿文件；
+#    内存只与批大小有关，与文件总数无关。早于 --min-age-hours 的文件才处理（避开正在上传的文件）。
+#    孤儿文件按 --action 只报告、移到隔离区 MEDIA_ROOT/attachment_quarantine/<日期>/（保留 --quarantine-days 天）或直接删除。
+# 2. 数据库 → 磁盘：按 id 分批检查 MaterialFile 的文件是否存在，更新 file_missing 标记。
+# 3. --fix-refcounts：按实际引用的 MaterialFile 数修正 AttachmentBlob.ref_count，没有引用的实体文件一并清理。
+# 4. 清理过期的断点续传会话，以及没有会话记录的 upload_parts/*.part 临时文件。
+# 增量执行：material_files 按 根目录平铺文件 + 256 个一级分片目录 划分为扫描单元，
+# --units / --rows 限制单次工作量，进度保存在 cache/attachment_reconcile.json，下次从断点继续。
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from myerpapp.attachment_storage import get_attachment_storage
+from myerpapp.attachments import ATTACHMENT_DIR, attachment_full_path, purge_blobs
+from myerpapp.models import AttachmentBlob, MaterialFile, MaterialUpload
+from myerpapp.upload_views import UPLOAD_PART_DIR, clean_expired_uploads
+
+ACTIONS = ('report', 'quarantine', 'delete')
+QUARANTINE_DIR = 'attachment_quarantine'
+STATE_FILE = os.path.join(settings.BASE_DIR, 'cache', 'attachment_reconcile.json')
+SCAN_BATCH_SIZE = 1000
+ROW_BATCH_SIZE = 1000
+REPORT_SAMPLES = 20
+
+
+def load_state():
+    try:
+        with open(STATE_FILE, encoding='utf-8') as fp:
+            return json.load(fp)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    tmp = STATE_FILE + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fp:
+        json.dump(state, fp, ensure_ascii=False)
+    os.replace(tmp, STATE_FILE)
+
+
+def scan_units():
+    """扫描单元：'.' 表示 material_files 根目录下的平铺文件（旧附件），其余为一级分片目录名（'.' 排在最前）"""
+    root = attachment_full_path(ATTACHMENT_DIR)
+    try:
+        with os.scandir(root) as it:
+            shards = sorted(entry.name for entry in it if entry.is_dir(follow_symlinks=False))
+    except FileNotFoundError:
+        shards = []
+    return ['.'] + shards
+
+
+def iter_unit_files(unit):
+    """产出扫描单元内的 (相对路径, mtime)；分片目录深度优先遍历，DirEntry 自带类型信息，不额外 stat"""
+    base = ATTACHMENT_DIR if unit == '.' else f'{ATTACHMENT_DIR}/{unit}'
+    stack = [base]
+    while stack:
+        relpath = stack.pop()
+        try:
+            with os.scandir(attachment_full_path(relpath)) as it:
+                for entry in it:
+                    child = f'{relpath}/{entry.name}'
+                    if entry.is_dir(follow_symlinks=False):
+                        if unit != '.':  # 根目录单元只看平铺文件，子目录属于各自的分片单元
+                            stack.append(child)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield child, entry.stat(follow_symlinks=False).st_mtime
+        except FileNotFoundError:
+            continue
+
+
+def referenced_paths(paths):
+    """一批路径中被 AttachmentBlob 或 MaterialFile 引用的部分（两条 IN 查询，都走索引）"""
+    return (set(AttachmentBlob.objects.filter(path__in=paths).values_list('path', flat=True))
+            | set(MaterialFile.objects.filter(file_path__in=paths).values_list('file_path', flat=True)))
+
+
+class Command(BaseCommand):
+    help = '附件对账：清理孤儿文件、标记缺失文件、修正引用计数、清理过期上传临时文件'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--action', choices=ACTIONS, default='report',
+                            help='孤儿文件处理方式：report 只报告，quarantine 移到隔离区，delete 直接删除')
+        parser.add_argument('--units', type=int, default=0, help='本次最多扫描多少个目录单元（0 为全部，共 257 个）')
+        parser.add_argument('--rows', type=int, default=0, help='本次最多检查多少条附件记录（0 为全部）')
+        parser.add_argument('--min-age-hours', type=float, default=1.0, help='只处理修改时间早于此的文件')
+        parser.add_argument('--quarantine-days', type=int, default=30, help='隔离区文件保留天数')
+        parser.add_argument('--fix-refcounts', action='store_true', help='按实际引用修正 AttachmentBlob.ref_count')
+        parser.add_argument('--reset', action='store_true', help='忽略上次进度，从头开始')
+        parser.add_argument('--json', action='store_true', help='以 JSON 输出')
+
+    def handle(self, *args, **options):
+        if not get_attachment_storage().is_local:
+            raise CommandError('附件对账直接操作磁盘文件，只支持本地存储后端（ATTACHMENT_STORAGE_BACKEND=local）')
+        started = time.monotonic()
+        state = {} if options['reset'] else load_state()
+        self.action = options['action']
+        self.cutoff = time.time() - options['min_age_hours'] * 3600
+        self.quarantine_day = datetime.now().strftime('%Y%m%d')
+        report = {
+            'scanned_files': 0, 'orphan_files': 0, 'orphan_bytes': 0, 'orphan_samples': [],
+            'checked_rows': 0, 'missing_rows': 0, 'recovered_rows': 0,
+            'refcount_fixed': 0, 'dead_blobs': 0,
+            'expired_uploads': 0, 'stale_parts': 0, 'purged_quarantine': 0,
+        }
+
+        state['unit_cursor'] = self.scan_disk(state.get('unit_cursor', ''), options['units'], report)
+        state['row_cursor'] = self.check_rows(state.get('row_cursor', 0), options['rows'], report)
+        if options['fix_refcounts']:
+            self.fix_refcounts(report)
+        self.clean_uploads(report)
+        if self.action == 'quarantine':
+            self.purge_quarantine(options['quarantine_days'], report)
+        save_state(state)
+
+        report['action'] = self.action
+        report['elapsed'] = round(time.monotonic() - started, 2)
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+        handled = {'report': '未处理', 'quarantine': '已移到隔离区', 'delete': '已删除'}[self.action]
+        self.stdout.write(f"扫描文件{report['scanned_files']}个：孤儿文件{report['orphan_files']}个"
+                          f"（{report['orphan_bytes'] / 1024 / 1024:.1f}MB，{handled}）")
+        for path in report['orphan_samples']:
+            self.stdout.write(f'  {path}')
+        self.stdout.write(f"检查附件记录{report['checked_rows']}条：新发现缺失{report['missing_rows']}条，"
+                          f"恢复{report['recovered_rows']}条")
+        if options['fix_refcounts']:
+            self.stdout.write(f"修正引用计数{report['refcount_fixed']}个，清理无引用实体文件{report['dead_blobs']}个")
+        self.stdout.write(f"过期上传会话{report['expired_uploads']}个、残留临时文件{report['stale_parts']}个（{handled}）")
+        self.stdout.write(self.style.SUCCESS(f"对账完成，耗时{report['elapsed']}秒"))
+
+    # ---------- 1. 磁盘 → 数据库：孤儿文件 ----------
+    def scan_disk(self, cursor, max_units, report):
+        """从 cursor 之后的单元开始扫描，返回下次的起点（扫完一轮返回空串，从根目录重新开始）"""
+        units = scan_units()
+        start = next((i for i, unit in enumerate(units) if unit > cursor), 0) if cursor else 0
+        todo = units[start:start + max_units] if max_units else units[start:]
+        for unit in todo:
+            batch = []
+            for item in iter_unit_files(unit):
+                batch.append(item)
+                if len(batch) >= SCAN_BATCH_SIZE:
+                    self.handle_scan_batch(batch, report)
+                    batch = []
+            if batch:
+                self.handle_scan_batch(batch, report)
+        if not todo or start + len(todo) >= len(units):
+            return ''
+        return todo[-1]
+
+    def handle_scan_batch(self, batch, report):
+        report['scanned_files'] += len(batch)
+        candidates = [path for path, mtime in batch if mtime < self.cutoff]
+        if not candidates:
+            return
+        orphans = set(candidates) - referenced_paths(candidates)
+        for path in sorted(orphans):
+            full_path = attachment_full_path(path)
+            try:
+                size = os.path.getsize(full_path)
+                if self.action == 'quarantine':
+                    target = os.path.join(settings.MEDIA_ROOT, QUARANTINE_DIR, self.quarantine_day, *path.split('/'))
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    os.replace(full_path, target)
+                elif self.action == 'delete':
+                    os.remove(full_path)
+            except FileNotFoundError:
+                continue
+            report['orphan_files'] += 1
+            report['orphan_bytes'] += size
+            if len(report['orphan_samples']) < REPORT_SAMPLES:
+                report['orphan_samples'].append(path)
+
+    # ---------- 2. 数据库 → 磁盘：缺失文件 ----------
+    def check_rows(self, cursor, max_rows, report):
+        """从 id > cursor 开始检查，返回下次的起点（查完一轮返回 0）"""
+        checked = 0
+        while not max_rows or checked < max_rows:
+            size = min(ROW_BATCH_SIZE, max_rows - checked) if max_rows else ROW_BATCH_SIZE
+            rows = list(MaterialFile.objects.filter(id__gt=cursor).order_by('id')
+                        .values_list('id', 'file_path', 'file_missing')[:size])
+            if not rows:
+                return 0
+            cursor = rows[-1][0]
+            checked += len(rows)
+            report['checked_rows'] += len(rows)
+            exists = {path: os.path.isfile(attachment_full_path(path)) for path in {row[1] for row in rows}}
+            missing_ids = [pk for pk, path, flagged in rows if not exists[path] and not flagged]
+            recovered_ids = [pk for pk, path, flagged in rows if exists[path] and flagged]
+            missing_paths = [path for path, ok in exists.items() if not ok]
+            if missing_ids:
+                # 只标记路径仍未变化的记录（对账期间可能刚被迁移到新路径）
+                report['missing_rows'] += MaterialFile.objects.filter(
+                    id__in=missing_ids, file_path__in=missing_paths).update(file_missing=True)
+            if recovered_ids:
+                report['recovered_rows'] += MaterialFile.objects.filter(id__in=recovered_ids).update(file_missing=False)
+        return cursor
+
+    # ---------- 3. 引用计数 ----------
+    def fix_refcounts(self, report):
+        actual = (MaterialFile.objects.filter(blob=OuterRef('pk')).order_by()
+                  .values('blob').annotate(n=Count('id')).values('n'))
+        cursor = 0
+        while True:
+            blobs = list(AttachmentBlob.objects.filter(id__gt=cursor).order_by('id')
+                         .annotate(actual=Coalesce(Subquery(actual), 0))
+                         .values_list('id', 'ref_count', 'actual')[:ROW_BATCH_SIZE])
+            if not blobs:
+                break
+            cursor = blobs[-1][0]
+            drifted = [pk for pk, ref_count, n in blobs if ref_count != n]
+            if drifted:
+                with transaction.atomic():
+                    # 单条 UPDATE 按子查询重新计数，不会覆盖并发上传刚加上的引用
+                    report['refcount_fixed'] += AttachmentBlob.objects.filter(id__in=drifted).update(
+                        ref_count=Coalesce(Subquery(actual), 0))
+            # 没有引用的实体文件（含提交后删除文件失败留下的记录）：purge_blobs 按 ref_count <= 0 条件删除
+            unreferenced = [pk for pk, _, n in blobs if n == 0]
+            if unreferenced:
+                report['dead_blobs'] += purge_blobs(unreferenced)
+
+    # ---------- 4. 断点续传临时文件 ----------
+    def clean_uploads(self, report):
+        """report 模式只统计，不删除"""
+        if self.action == 'report':
+            report['expired_uploads'] = MaterialUpload.objects.filter(expire_time__lt=timezone.now()).count()
+        else:
+            while True:
+                cleaned = clean_expired_uploads(limit=1000)
+                report['expired_uploads'] += cleaned
+                if cleaned < 1000:
+                    break
+        part_dir = attachment_full_path(UPLOAD_PART_DIR)
+        try:
+            with os.scandir(part_dir) as it:
+                parts = [(entry.name[:-len('.part')], entry.path) for entry in it
+                         if entry.name.endswith('.part') and entry.stat().st_mtime < self.cutoff]
+        except FileNotFoundError:
+            return
+        for start in range(0, len(parts), SCAN_BATCH_SIZE):
+            chunk = parts[start:start + SCAN_BATCH_SIZE]
+            alive = set(MaterialUpload.objects.filter(upload_id__in=[uid for uid, _ in chunk])
+                        .values_list('upload_id', flat=True))
+            for upload_id, path in chunk:
+                if upload_id in alive:
+                    continue
+                try:
+                    if self.action != 'report':
+                        os.remove(path)
+                    report['stale_parts'] += 1
+                except FileNotFoundError:
+                    pass
+
+    # ---------- 隔离区过期清理 ----------
+    def purge_quarantine(self, days, report):
+        root = os.path.join(settings.MEDIA_ROOT, QUARANTINE_DIR)
+        oldest = (datetime.now() - timedelta(days=days)).strftime('%Y%m%d')
+        try:
+            with os.scandir(root) as it:
+                expired = [entry.path for entry in it if entry.is_dir() and entry.name < oldest]
+        except FileNotFoundError:
+            return
+        for path in expired:
+            shutil.rmtree(path, ignore_errors=True)
+            report['purged_quarantine'] += 1
@@ -0,0 +1,127 @@
+# ===================== 物料全文检索 =====================
+# get_materials / 物料导出的 keyword= 参数走这里。索引实现可替换：
+#   MATERIAL_SEARCH_INDEX = 'myerpapp.material_search.SQLiteFTS5Index'（默认，SQLite）
+#   MATERIAL_SEARCH_INDEX = 'myerpapp.material_search.LikeSearchIndex'（任意数据库，全表扫描）
+#
+# SQLiteFTS5Index 使用 FTS5 trigram 分词（外部内容表，不重复存储物料数据）：
+# - 中文不需要分词词典，任意 ≥3 个字符的子串都能命中索引
+# - 增删改由数据库触发器同步（见迁移 0012），bulk_create / update() / 导入的原生 SQL 同样生效
+# - 结果按 bm25 相关度排序，名称/编码命中的权重高于描述
+# - 少于 3 个字符的词 trigram 无法索引，退化为在候选集上做 LIKE 过滤
+import logging
+import re
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Material
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'myerpapp_material_fts'
+# 与 FTS 表列顺序一致（迁移 0012）
+FTS_COLUMNS = ['name', 'code', 'category', 'supplier', 'desc']
+# bm25 列权重：名称 > 编码 > 分类/供应商 > 描述
+FTS_WEIGHTS = [10.0, 5.0, 2.0, 2.0, 1.0]
+TRIGRAM_MIN_LENGTH = 3
+MAX_KEYWORD_TERMS = 8
+
+
+def split_keyword(keyword):
+    """按空白拆词（多个词之间是"且"的关系），去重并限制词数"""
+    terms = []
+    for term in re.split(r'\s+', (keyword or '').strip()):
+        if term and term not in terms:
+            terms.append(term)
+    return terms[:MAX_KEYWORD_TERMS]
+
+
+def like_filter(terms):
+    """每个词都要在任一检索字段中出现"""
+    condition = Q()
+    for term in terms:
+        term_q = Q()
+        for column in FTS_COLUMNS:
+            term_q |= Q(**{f'{column}__icontains': term})
+        condition &= term_q
+    return condition
+
+
+class LikeSearchIndex:
+    """兜底实现：icontains 过滤，没有相关度（rank 恒为 0）"""
+
+    def search(self, queryset, keyword):
+        terms = split_keyword(keyword)
+        if not terms:
+            return queryset
+        return queryset.filter(like_filter(terms)).annotate(rank=Value(0.0, output_field=FloatField()))
+
+    def rebuild(self):
+        return 0
+
+
+class SQLiteFTS5Index(LikeSearchIndex):
+    """SQLite FTS5 trigram 索引：MATCH 取候选集，bm25 排序"""
+
+    @staticmethod
+    def match_expression(terms):
+        """每个词作为一个 FTS5 短语（内部双引号转义），短语之间默认为 AND"""
+        return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+    def search(self, queryset, keyword):
+        terms = split_keyword(keyword)
+        indexed = [t for t in terms if len(t) >= TRIGRAM_MIN_LENGTH]
+        short = [t for t in terms if len(t) < TRIGRAM_MIN_LENGTH]
+        if not indexed:
+            return super().search(queryset, keyword)
+
+        match = self.match_expression(indexed)
+        table = Material._meta.db_table
+        weights = ', '.join(str(w) for w in FTS_WEIGHTS)
+        queryset = queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        ).annotate(
+            # bm25 越小越相关；候选集已由上面的 MATCH 限定，这里只按 rowid 取分
+            rank=RawSQL(
+                f'(SELECT bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id)',
+                [match],
+                output_field=FloatField(),
+            )
+        )
+        if short:
+            queryset = queryset.filter(like_filter(short))
+        return queryset
+
+    def rebuild(self):
+        """按物料表全量重建索引并合并段，返回索引行数"""
+        connection = connections[router.db_for_write(Material)]
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+            cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE}')
+            return cursor.fetchone()[0]
+
+
+_index = None
+
+
+def get_search_index():
+    """按配置加载检索实现；非 SQLite 数据库自动退回 LikeSearchIndex"""
+    global _index
+    if _index is None:
+        path = getattr(settings, 'MATERIAL_SEARCH_INDEX', 'myerpapp.material_search.SQLiteFTS5Index')
+        index_class = import_string(path)
+        if issubclass(index_class, SQLiteFTS5Index) and \
+                connections[router.db_for_read(Material)].vendor != 'sqlite':
+            logger.warning('当前数据库不是SQLite，物料检索退回 LIKE 模式')
+            index_class = LikeSearchIndex
+        _index = index_class()
+    return _index
+
+
+def search_materials(queryset, keyword):
+    return get_search_index().search(queryset, keyword)
@@ -0,0 +1,226 @@
+# ===================== 接口性能指标（Prometheus 文本格式） =====================
+# ERP_METRICS_ENABLED = True 时启用 MetricsMiddleware，按路由（URL 模式，而非具体路径）统计：
+#   - 请求耗时直方图、按状态码的请求数
+#   - 每个请求的 SQL 条数（直方图）与 SQL 总耗时
+#   - 响应体大小直方图（流式响应在发送完毕时统计）
+# 指标通过 /api/metrics/ 输出：ERP 管理员登录态，或 Authorization: Bearer <ERP_METRICS_TOKEN>。
+# 未启用时中间件在启动阶段抛出 MiddlewareNotUsed，从调用链中移除，请求路径上零开销。
+#
+# 统计数据保存在进程内存中，多进程部署时每个 worker 各自统计，需要逐个抓取或只开一个 worker 采样。
+import hmac
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_http_methods
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+class Histogram:
+    """固定桶直方图：只记非累计计数，输出时再累加"""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一格是 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for idx, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[idx] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+class RouteStats:
+    __slots__ = ('latency', 'queries', 'query_seconds', 'size', 'statuses')
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.query_seconds = 0.0
+        self.size = Histogram(SIZE_BUCKETS)
+        self.statuses = {}
+
+
+class MetricsRegistry:
+    """进程内指标表：(route, method) -> RouteStats"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route, method, status, seconds, query_count, query_seconds, size):
+        with self._lock:
+            stats = self._routes.get((route, method))
+            if stats is None:
+                stats = self._routes[(route, method)] = RouteStats()
+            stats.latency.observe(seconds)
+            stats.queries.observe(query_count)
+            stats.query_seconds += query_seconds
+            stats.size.observe(size)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    def render(self):
+        """输出 Prometheus 文本格式（text/plain; version=0.0.4）"""
+        with self._lock:
+            items = sorted(self._routes.items())
+            families = {
+                'erp_http_requests_total': ('counter', '按路由/方法/状态码统计的请求数', []),
+                'erp_http_request_duration_seconds': ('histogram', '请求处理耗时（秒）', []),
+                'erp_db_queries_per_request': ('histogram', '每个请求执行的SQL条数', []),
+                'erp_db_query_duration_seconds_total': ('counter', 'SQL累计耗时（秒）', []),
+                'erp_http_response_size_bytes': ('histogram', '响应体大小（字节）', []),
+            }
+            for (route, method), stats in items:
+                labels = f'route="{_escape_label(route)}",method="{method}"'
+                for status, count in sorted(stats.statuses.items()):
+                    families['erp_http_requests_total'][2].append(
+                        f'erp_http_requests_total{{{labels},status="{status}"}} {count}'
+                    )
+                families['erp_http_request_duration_seconds'][2].extend(
+                    stats.latency.render('erp_http_request_duration_seconds', labels))
+                families['erp_db_queries_per_request'][2].extend(
+                    stats.queries.render('erp_db_queries_per_request', labels))
+                families['erp_db_query_duration_seconds_total'][2].append(
+                    f'erp_db_query_duration_seconds_total{{{labels}}} {stats.query_seconds:.6f}')
+                families['erp_http_response_size_bytes'][2].extend(
+                    stats.size.render('erp_http_response_size_bytes', labels))
+
+        lines = []
+        for name, (metric_type, help_text, samples) in families.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+class QueryTracker:
+    """挂到数据库连接上的 execute_wrapper：统计本请求的 SQL 条数与耗时"""
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+    def track(self):
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(self))
+        return stack
+
+
+def route_of(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match is not None and match.route else UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """按路由记录耗时/SQL/响应大小；放在 ERPCorsMiddleware 之后"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'ERP_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed('ERP_METRICS_ENABLED 未开启')
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        tracker = QueryTracker()
+        with tracker.track():
+            response = self.get_response(request)
+
+        if response.streaming:
+            response.streaming_content = self._measure_stream(
+                request, response, response.streaming_content, tracker, started)
+        else:
+            self._record(request, response, tracker, started, len(response.content))
+        return response
+
+    def _measure_stream(self, request, response, content, tracker, started):
+        """流式响应（导出/下载）：迭代过程中的 SQL 与字节数也计入，发送结束时记录"""
+        size = 0
+        try:
+            with tracker.track():
+                for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+        finally:
+            self._record(request, response, tracker, started, size)
+
+    def _record(self, request, response, tracker, started, size):
+        registry.record(
+            route_of(request), request.method, response.status_code,
+            time.perf_counter() - started, tracker.count, tracker.seconds, size,
+        )
+
+
+# ===================== 指标输出接口 =====================
+def _metrics_authorized(request):
+    token = getattr(settings, 'ERP_METRICS_TOKEN', '')
+    auth = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and auth.startswith('Bearer ') and hmac.compare_digest(auth[7:].strip(), token):
+        return True
+    user = request.erp_user
+    return bool(user) and user.role is not None and user.role.role_code == 'admin'
+
+
+@require_http_methods(["GET"])
+def metrics_view(request):
+    """Prometheus 抓取接口（仅管理员或持有 ERP_METRICS_TOKEN）；
+    出错时与其他接口一样返回 HTTP 200 + code，Prometheus 解析不了 JSON 同样记为抓取失败"""
+    if not getattr(settings, 'ERP_METRICS_ENABLED', False):
+        return JsonResponse({
+            'code': 404,
+            'msg': '未开启接口指标统计（ERP_METRICS_ENABLED）',
+            'data': {}
+        }, json_dumps_params={'ensure_ascii': False})
+    if not _metrics_authorized(request):
+        return JsonResponse({
+            'code': 403,
+            'msg': '仅管理员可查看接口指标',
+            'data': {}
+        }, json_dumps_params={'ensure_ascii': False})
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
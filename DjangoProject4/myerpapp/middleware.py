@@ -0,0 +1,121 @@
+# ===================== 统一跨域/登录中间件 =====================
+# 取代各视图模块里重复的 add_cors_headers / erp_login_required：
+# - ERPCorsMiddleware 放在最前面，OPTIONS 预检直接返回预先拼好的响应头，
+#   不加载 Session、不查库、不进视图；浏览器按 Access-Control-Max-Age 缓存预检结果
+# - ERPAuthMiddleware 放在 SessionMiddleware 之后，每个请求最多解析一次 ERP 用户，
+#   挂到 request.erp_user 上（惰性加载），/api/ 下除白名单外的接口统一做登录校验；
+#   白名单（settings.ERP_AUTH_EXEMPT_PATHS）里的审批实例接口用 JWT 认证，由 DRF 在视图里校验
+import logging
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import SimpleLazyObject
+
+from .models import ERPUser
+
+logger = logging.getLogger(__name__)
+
+
+class AnonymousERPUser:
+    """未登录用户占位对象（与 django AnonymousUser 用法一致）"""
+    id = None
+    pk = None
+    username = ''
+    role_id = None
+    is_authenticated = False
+
+    def has_permission(self, form_name, action):
+        return False
+
+    def __bool__(self):
+        return False
+
+
+def unauthorized_response():
+    """统一的未登录响应（保持原接口约定：HTTP 200 + code 401）"""
+    return JsonResponse({
+        'code': 401,
+        'msg': '请先登录ERP系统！',
+        'data': {}
+    }, status=200, json_dumps_params={'ensure_ascii': False})
+
+
+def get_erp_user(request):
+    """从 Session 解析当前 ERP 用户，同一请求只查一次库"""
+    if not hasattr(request, '_cached_erp_user'):
+        user = None
+        user_id = request.session.get('erp_user_id')
+        if user_id:
+            user = ERPUser.objects.select_related('role').filter(id=user_id).first()
+            if user is None:
+                # 防止session篡改/用户已删除：清空无效session
+                request.session.flush()
+        request._cached_erp_user = user or AnonymousERPUser()
+    return request._cached_erp_user
+
+
+class ERPCorsMiddleware:
+    """跨域中间件：预检请求短路返回，普通响应只补必要的跨域头"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.allowed_origins = frozenset(getattr(settings, 'CORS_ALLOWED_ORIGINS', []))
+        self.allow_credentials = getattr(settings, 'CORS_ALLOW_CREDENTIALS', False)
+        # 预检响应头只在启动时拼一次
+        self.preflight_headers = {
+            'Access-Control-Allow-Methods': ', '.join(getattr(settings, 'CORS_ALLOW_METHODS', [])),
+            'Access-Control-Allow-Headers': ', '.join(getattr(settings, 'CORS_ALLOW_HEADERS', [])),
+            'Access-Control-Max-Age': str(getattr(settings, 'CORS_PREFLIGHT_MAX_AGE', 86400)),
+        }
+        expose_headers = getattr(settings, 'CORS_EXPOSE_HEADERS', [])
+        self.expose_headers = ', '.join(expose_headers) if expose_headers else ''
+
+    def _origin_headers(self, origin):
+        headers = {'Access-Control-Allow-Origin': origin}
+        if self.allow_credentials:
+            headers['Access-Control-Allow-Credentials'] = 'true'
+        return headers
+
+    def __call__(self, request):
+        origin = request.META.get('HTTP_ORIGIN')
+        allowed = origin in self.allowed_origins
+
+        if request.method == 'OPTIONS':
+            response = HttpResponse(status=200)
+            if allowed:
+                for key, value in self.preflight_headers.items():
+                    response[key] = value
+                for key, value in self._origin_headers(origin).items():
+                    response[key] = value
+            patch_vary_headers(response, ('Origin',))
+            return response
+
+        response = self.get_response(request)
+        if allowed:
+            for key, value in self._origin_headers(origin).items():
+                response[key] = value
+            if self.expose_headers:
+                response['Access-Control-Expose-Headers'] = self.expose_headers
+            patch_vary_headers(response, ('Origin',))
+        return response
+
+
+class ERPAuthMiddleware:
+    """登录中间件：解析 request.erp_user，并对受保护接口统一做登录校验"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.protected_prefix = getattr(settings, 'ERP_AUTH_PROTECTED_PREFIX', '/api/')
+        self.exempt_paths = frozenset(getattr(settings, 'ERP_AUTH_EXEMPT_PATHS', []))
+
+    def __call__(self, request):
+        request.erp_user = SimpleLazyObject(lambda: get_erp_user(request))
+
+        path = request.path_info
+        if path.startswith(self.protected_prefix) and path not in self.exempt_paths:
+            if not request.erp_user.is_authenticated:
+                logger.warning(f"未登录访问受保护接口：{request.path}，IP：{request.META.get('REMOTE_ADDR')}")
+                return unauthorized_response()
+
+        return self.get_response(request)
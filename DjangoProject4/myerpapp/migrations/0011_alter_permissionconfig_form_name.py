@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myerpapp', '0010_approvalflow_remove_processedge_process_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='permissionconfig',
+            name='form_name',
+            field=models.CharField(choices=[('material', '物料表单'), ('order', '订单表单'), ('erp_user', 'ERP用户表单'), ('product', '产品表单'), ('role', '角色表单'), ('contract', '合同表单'), ('approval', '审批表单')], max_length=20, verbose_name='表单名称'),
+        ),
+    ]
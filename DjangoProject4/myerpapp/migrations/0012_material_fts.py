@@ -0,0 +1,64 @@
+# 物料全文检索索引：SQLite FTS5 trigram 外部内容表 + 同步触发器
+# 非 SQLite 数据库跳过（检索自动退回 LIKE 模式，见 myerpapp.material_search）
+# 注意：SQLite 修改字段时 Django 会整表重建 myerpapp_material，触发器随旧表一起删除，
+# 此类迁移之后需要重新创建下面的触发器，并执行 manage.py rebuild_material_index
+
+from django.db import migrations
+
+FTS_TABLE = 'myerpapp_material_fts'
+MATERIAL_TABLE = 'myerpapp_material'
+COLUMNS = 'name, code, category, supplier, "desc"'
+NEW_VALUES = 'new.name, new.code, new.category, new.supplier, new."desc"'
+OLD_VALUES = 'old.name, old.code, old.category, old.supplier, old."desc"'
+
+CREATE_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {COLUMNS}, content='{MATERIAL_TABLE}', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {MATERIAL_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {COLUMNS}) VALUES (new.id, {NEW_VALUES});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {MATERIAL_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {COLUMNS}) VALUES ('delete', old.id, {OLD_VALUES});
+    END""",
+    # 只有检索字段变化才重建该行索引（改数量等不触发）
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+        AFTER UPDATE OF name, code, category, supplier, "desc" ON {MATERIAL_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {COLUMNS}) VALUES ('delete', old.id, {OLD_VALUES});
+        INSERT INTO {FTS_TABLE}(rowid, {COLUMNS}) VALUES (new.id, {NEW_VALUES});
+    END""",
+    # 已有数据建索引
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myerpapp', '0011_alter_permissionconfig_form_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myerpapp', '0012_material_fts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='approvalinstance',
+            options={'verbose_name': '审批实例', 'verbose_name_plural': '审批实例'},
+        ),
+        migrations.AlterModelOptions(
+            name='approvalnode',
+            options={'verbose_name': '审批节点', 'verbose_name_plural': '审批节点'},
+        ),
+        migrations.AddField(
+            model_name='approvalinstance',
+            name='update_time',
+            field=models.DateTimeField(auto_now=True, verbose_name='更新时间'),
+        ),
+        migrations.AddField(
+            model_name='approvalnode',
+            name='create_time',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='创建时间'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='approvalnode',
+            name='update_time',
+            field=models.DateTimeField(auto_now=True, verbose_name='更新时间'),
+        ),
+        migrations.AddField(
+            model_name='approvalnode',
+            name='x',
+            field=models.FloatField(default=100.0, verbose_name='节点X坐标'),
+        ),
+        migrations.AddField(
+            model_name='approvalnode',
+            name='y',
+            field=models.FloatField(default=100.0, verbose_name='节点Y坐标'),
+        ),
+        migrations.AlterField(
+            model_name='approvalinstance',
+            name='create_time',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='创建时间'),
+        ),
+        migrations.AlterField(
+            model_name='approvalinstance',
+            name='create_user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='创建人'),
+        ),
+        migrations.AlterField(
+            model_name='approvalinstance',
+            name='flow',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myerpapp.approvalflow', verbose_name='所属流程'),
+        ),
+        migrations.AlterField(
+            model_name='approvalinstance',
+            name='status',
+            field=models.CharField(choices=[('running', '审批中'), ('approved', '已通过'), ('rejected', '已驳回')], default='running', max_length=20, verbose_name='审批状态'),
+        ),
+        migrations.AlterField(
+            model_name='approvalnode',
+            name='approver_config',
+            field=models.JSONField(default=dict, verbose_name='审批人配置'),
+        ),
+        migrations.AlterField(
+            model_name='approvalnode',
+            name='name',
+            field=models.CharField(max_length=100, verbose_name='节点名称'),
+        ),
+        migrations.AlterField(
+            model_name='approvalnode',
+            name='next_nodes',
+            field=models.JSONField(default=dict, verbose_name='下一个节点配置'),
+        ),
+        migrations.AlterField(
+            model_name='approvalnode',
+            name='node_type',
+            field=models.CharField(choices=[('start', '开始节点'), ('approver', '审批节点'), ('end', '结束节点')], default='approver', max_length=20, verbose_name='节点类型'),
+        ),
+        migrations.AlterField(
+            model_name='approvalnode',
+            name='sort',
+            field=models.IntegerField(default=0, verbose_name='排序'),
+        ),
+        migrations.AlterField(
+            model_name='approvalrecord',
+            name='action',
+            field=models.CharField(choices=[('approve', '同意'), ('reject', '驳回')], max_length=20, verbose_name='审批操作'),
+        ),
+        migrations.AlterField(
+            model_name='approvalrecord',
+            name='comment',
+            field=models.TextField(blank=True, null=True, verbose_name='审批意见'),
+        ),
+    ]
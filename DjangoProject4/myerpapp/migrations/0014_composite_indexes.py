@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myerpapp', '0013_sync_approval_models'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='approvalflow',
+            index=models.Index(fields=['create_time'], name='approvalflow_ctime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='approvalnode',
+            index=models.Index(fields=['flow', 'sort'], name='approvalnode_flow_sort_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='approvalrecord',
+            index=models.Index(fields=['instance', 'operate_time'], name='approvalrecord_inst_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='approvalrecord',
+            index=models.Index(fields=['operate_time', 'id'], name='approvalrecord_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['create_time', 'id'], name='material_ctime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['update_time', 'id'], name='material_utime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['name', 'id'], name='material_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['quantity', 'id'], name='material_qty_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['category', 'create_time', 'id'], name='material_cat_ctime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['supplier', 'create_time', 'id'], name='material_sup_ctime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='materialfile',
+            index=models.Index(fields=['material', 'upload_time'], name='materialfile_mat_time_idx'),
+        ),
+    ]
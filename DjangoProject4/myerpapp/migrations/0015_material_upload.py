@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myerpapp', '0014_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaterialUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('upload_id', models.CharField(max_length=32, unique=True, verbose_name='上传会话ID')),
+                ('name', models.CharField(max_length=255, verbose_name='文件原始名称')),
+                ('size', models.BigIntegerField(verbose_name='文件大小（字节）')),
+                ('chunk_size', models.IntegerField(verbose_name='分块大小（字节）')),
+                ('checksum', models.CharField(blank=True, default='', max_length=64, verbose_name='整个文件的SHA-256')),
+                ('create_time', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('expire_time', models.DateTimeField(db_index=True, verbose_name='过期时间')),
+                ('creator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myerpapp.erpuser', verbose_name='上传人')),
+                ('material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='myerpapp.material', verbose_name='关联物料')),
+            ],
+            options={
+                'verbose_name': '附件上传会话',
+                'verbose_name_plural': '附件上传会话',
+            },
+        ),
+        migrations.CreateModel(
+            name='MaterialUploadChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.IntegerField(verbose_name='分块序号')),
+                ('size', models.IntegerField(verbose_name='分块大小（字节）')),
+                ('checksum', models.CharField(max_length=64, verbose_name='分块SHA-256')),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='myerpapp.materialupload', verbose_name='上传会话')),
+            ],
+            options={
+                'verbose_name': '附件上传分块',
+                'verbose_name_plural': '附件上传分块',
+                'unique_together': {('upload', 'index')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myerpapp', '0015_material_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='materialfile',
+            name='sha256',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='文件SHA-256'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myerpapp', '0016_materialfile_sha256'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttachmentBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='文件SHA-256')),
+                ('size', models.BigIntegerField(verbose_name='文件大小（字节）')),
+                ('path', models.CharField(max_length=500, verbose_name='存储路径')),
+                ('ref_count', models.IntegerField(default=0, verbose_name='引用数')),
+                ('create_time', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name': '附件实体文件',
+                'verbose_name_plural': '附件实体文件',
+            },
+        ),
+        migrations.AddField(
+            model_name='materialfile',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='files', to='myerpapp.attachmentblob', verbose_name='实体文件'),
+        ),
+    ]
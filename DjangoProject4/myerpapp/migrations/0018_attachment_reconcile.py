@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myerpapp', '0017_attachment_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='materialfile',
+            name='file_missing',
+            field=models.BooleanField(default=False, verbose_name='文件缺失'),
+        ),
+        migrations.AlterField(
+            model_name='attachmentblob',
+            name='path',
+            field=models.CharField(db_index=True, max_length=500, verbose_name='存储路径'),
+        ),
+        migrations.AddIndex(
+            model_name='materialfile',
+            index=models.Index(fields=['file_path'], name='materialfile_path_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:33
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def init_stored_size(apps, schema_editor):
+    # 已有的实体文件都是未压缩存储，磁盘占用即原始大小
+    AttachmentBlob = apps.get_model('myerpapp', 'AttachmentBlob')
+    AttachmentBlob.objects.update(stored_size=F('size'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myerpapp', '0018_attachment_reconcile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachmentblob',
+            name='codec',
+            field=models.CharField(blank=True, default='', max_length=10, verbose_name='存储编码'),
+        ),
+        migrations.AddField(
+            model_name='attachmentblob',
+            name='last_access_time',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='最近下载时间'),
+        ),
+        migrations.AddField(
+            model_name='attachmentblob',
+            name='stored_size',
+            field=models.BigIntegerField(default=0, verbose_name='磁盘占用（字节）'),
+        ),
+        migrations.RunPython(init_stored_size, migrations.RunPython.noop),
+    ]
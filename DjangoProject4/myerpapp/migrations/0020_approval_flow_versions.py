@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:43
+
+import myerpapp.models
+from django.db import migrations, models
+
+
+def init_node_keys(apps, schema_editor):
+    """已有节点：node_key 取 n<id>，next_nodes 里的节点ID换成对应的 node_key（指向不存在节点的引用原样保留）"""
+    ApprovalNode = apps.get_model('myerpapp', 'ApprovalNode')
+    flows = {}
+    for node_id, flow_id in ApprovalNode.objects.values_list('id', 'flow_id').iterator(chunk_size=2000):
+        flows.setdefault(flow_id, set()).add(node_id)
+
+    batch = []
+    for node in ApprovalNode.objects.only('id', 'flow_id', 'next_nodes').iterator(chunk_size=2000):
+        node.node_key = f'n{node.id}'
+        next_nodes = node.next_nodes if isinstance(node.next_nodes, dict) else {}
+        refs = next_nodes.get('next', [])
+        if isinstance(refs, list):
+            converted = []
+            for ref in refs:
+                ref_id = int(ref) if isinstance(ref, int) or (isinstance(ref, str) and ref.isdigit()) else None
+                converted.append(f'n{ref_id}' if ref_id in flows[node.flow_id] else ref)
+            node.next_nodes = {**next_nodes, 'next': converted}
+        batch.append(node)
+        if len(batch) >= 2000:
+            ApprovalNode.objects.bulk_update(batch, ['node_key', 'next_nodes'])
+            batch = []
+    if batch:
+        ApprovalNode.objects.bulk_update(batch, ['node_key', 'next_nodes'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myerpapp', '0019_attachment_compression'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='approvalnode',
+            name='approvalnode_flow_sort_idx',
+        ),
+        migrations.AddField(
+            model_name='approvalflow',
+            name='version',
+            field=models.PositiveIntegerField(default=1, verbose_name='当前版本'),
+        ),
+        migrations.AddField(
+            model_name='approvalinstance',
+            name='flow_version',
+            field=models.PositiveIntegerField(default=1, verbose_name='流程版本'),
+        ),
+        migrations.AddField(
+            model_name='approvalnode',
+            name='node_key',
+            field=models.CharField(default=myerpapp.models.new_node_key, max_length=32, verbose_name='节点标识'),
+        ),
+        migrations.AddField(
+            model_name='approvalnode',
+            name='since_version',
+            field=models.PositiveIntegerField(default=1, verbose_name='起始版本'),
+        ),
+        migrations.AddField(
+            model_name='approvalnode',
+            name='until_version',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='失效版本'),
+        ),
+        migrations.RunPython(init_node_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='approvalnode',
+            index=models.Index(fields=['flow', 'until_version', 'sort'], name='approvalnode_flow_cur_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='approvalnode',
+            constraint=models.UniqueConstraint(fields=('flow', 'node_key', 'since_version'), name='approvalnode_key_version_uniq'),
+        ),
+    ]
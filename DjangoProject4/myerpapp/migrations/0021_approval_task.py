@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myerpapp', '0020_approval_flow_versions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApprovalTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', '待处理'), ('done', '已处理'), ('cancelled', '已取消')], default='pending', max_length=20, verbose_name='待办状态')),
+                ('create_time', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('finish_time', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+                ('approver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='审批人')),
+                ('instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='myerpapp.approvalinstance', verbose_name='审批实例')),
+                ('node', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myerpapp.approvalnode', verbose_name='审批节点')),
+            ],
+            options={
+                'verbose_name': '审批待办',
+                'verbose_name_plural': '审批待办',
+                'indexes': [models.Index(fields=['approver', 'status', 'id'], name='approvaltask_inbox_idx'), models.Index(fields=['instance', 'status'], name='approvaltask_inst_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def init_tokens(apps, schema_editor):
+    """审批中的实例：在当前节点放一个活动令牌"""
+    ApprovalInstance = apps.get_model('myerpapp', 'ApprovalInstance')
+    ApprovalToken = apps.get_model('myerpapp', 'ApprovalToken')
+    running = ApprovalInstance.objects.filter(status='running', current_node__isnull=False).values_list(
+        'id', 'current_node_id')
+    batch = []
+    for instance_id, node_id in running.iterator(chunk_size=2000):
+        batch.append(ApprovalToken(instance_id=instance_id, node_id=node_id, status='active'))
+        if len(batch) >= 2000:
+            ApprovalToken.objects.bulk_create(batch)
+            batch = []
+    ApprovalToken.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myerpapp', '0021_approval_task'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='approvalnode',
+            name='join_mode',
+            field=models.CharField(choices=[('all', '会签'), ('any', '或签')], default='all', max_length=10, verbose_name='汇聚方式'),
+        ),
+        migrations.AlterField(
+            model_name='approvalnode',
+            name='node_type',
+            field=models.CharField(choices=[('start', '开始节点'), ('approver', '审批节点'), ('join', '汇聚节点'), ('end', '结束节点')], default='approver', max_length=20, verbose_name='节点类型'),
+        ),
+        migrations.CreateModel(
+            name='ApprovalToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('active', '待审批'), ('waiting', '等待汇聚'), ('done', '已完成'), ('cancelled', '已取消')], default='active', max_length=20, verbose_name='令牌状态')),
+                ('arrived', models.PositiveIntegerField(default=0, verbose_name='已到达分支数')),
+                ('create_time', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('update_time', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tokens', to='myerpapp.approvalinstance', verbose_name='审批实例')),
+                ('node', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myerpapp.approvalnode', verbose_name='所在节点')),
+            ],
+            options={
+                'verbose_name': '审批令牌',
+                'verbose_name_plural': '审批令牌',
+                'indexes': [models.Index(fields=['instance', 'status'], name='approvaltoken_inst_status_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('arrived__gt', 0)), fields=('instance', 'node'), name='approvaltoken_join_uniq')],
+            },
+        ),
+        migrations.RunPython(init_tokens, migrations.RunPython.noop),
+    ]
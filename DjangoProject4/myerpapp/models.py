@@ -1,226 +1,409 @@
-from django.db import models
-from django.apps import apps
-from django.utils.translation import gettext_lazy as _
-import os
-import uuid
-from datetime import datetime
-from django.contrib.auth.models import User
-
-# ========== 全局枚举 ==========
-FORM_CHOICES = [
-    ('material', '物料表单'),
-    ('order', '订单表单'),
-    ('erp_user', 'ERP用户表单'),
-    ('product', '产品表单'),
-    ('role', '角色表单'),
-    ('contract', '合同表单')
-]
-
-ACTION_CHOICES = [
-    ('view', '查看'),
-    ('add', '新增'),
-    ('edit', '修改'),
-    ('delete', '删除'),
-    ('export', '导出')
-]
-
-# ========== 工具函数 ==========
-def material_file_path(instance, filename):
-    ext = os.path.splitext(filename)[1].lower()
-    unique_filename = f"{uuid.uuid4()}{ext}"
-    date_path = datetime.now().strftime('%Y/%m/%d')
-    return f"materials/{date_path}/{unique_filename}"
-
-# ========== 基础模型（保留原有逻辑） ==========
-class Role(models.Model):
-    """角色模型"""
-    role_name = models.CharField(max_length=50, unique=True, verbose_name=_("角色名称"))
-    role_code = models.CharField(max_length=20, unique=True, verbose_name=_("角色编码"))
-    desc = models.TextField(blank=True, verbose_name=_("角色描述"))
-    create_time = models.DateTimeField(auto_now_add=True, verbose_name=_("创建时间"))
-
-    class Meta:
-        db_table = "erp_role"
-        verbose_name = _("角色")
-        verbose_name_plural = _("角色")
-
-    def __str__(self):
-        return self.role_name
-
-    def has_permission(self, form_name, action):
-        if self.role_code == 'admin':
-            return True
-        return self.permissions.filter(
-            form_name=form_name,
-            action=action
-        ).exists()
-
-class ERPUser(models.Model):
-    """ERP用户模型"""
-    username = models.CharField(max_length=50, unique=True, verbose_name=_('用户名'))
-    password = models.CharField(max_length=128, verbose_name=_('密码'))
-    email = models.EmailField(blank=True, null=True, verbose_name=_('邮箱'))
-    role = models.ForeignKey(
-        Role,
-        on_delete=models.SET_NULL,
-        null=True,
-        blank=True,
-        verbose_name=_('所属角色')
-    )
-    create_time = models.DateTimeField(auto_now_add=True, verbose_name=_('创建时间'))
-    is_active = models.BooleanField(default=True, verbose_name=_('是否激活'))
-
-    class Meta:
-        verbose_name = _('ERP用户')
-        verbose_name_plural = _('ERP用户')
-
-    def __str__(self):
-        return self.username
-
-    def has_permission(self, form_name, action):
-        if not self.role:
-            return False
-        return self.role.has_permission(form_name, action)
-
-class Material(models.Model):
-    name = models.CharField(max_length=100, verbose_name="物料名称")
-    code = models.CharField(max_length=50, unique=True, verbose_name="物料编码")
-    category = models.CharField(max_length=50, default='', verbose_name="物料分类")
-    unit = models.CharField(max_length=20, default='', verbose_name="单位")
-    supplier = models.CharField(max_length=100, default='', verbose_name="供应商")
-    quantity = models.IntegerField(default=0, verbose_name="数量")
-    desc = models.TextField(default='', verbose_name="特征描述")
-    create_time = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
-    update_time = models.DateTimeField(auto_now=True, verbose_name="更新时间")
-
-    class Meta:
-        db_table = "myerpapp_material"
-        verbose_name = "物料"
-        verbose_name_plural = "物料"
-
-    def __str__(self):
-        return f"{self.name}({self.code})"
-
-class MaterialFile(models.Model):
-    material = models.ForeignKey(Material, on_delete=models.CASCADE, verbose_name="关联物料")
-    file_path = models.CharField(max_length=500, verbose_name="文件路径")
-    name = models.CharField(
-        max_length=255,
-        verbose_name="文件原始名称",
-        default="",
-        blank=True
-    )
-    size = models.BigIntegerField(
-        verbose_name="文件大小（字节）",
-        default=0,
-        blank=True
-    )
-    upload_time = models.DateTimeField(auto_now_add=True, verbose_name="上传时间")
-
-    class Meta:
-        verbose_name = "物料附件"
-        verbose_name_plural = "物料附件"
-        db_table = "myerpapp_materialfile"
-
-    def __str__(self):
-        return self.name
-
-class PermissionConfig(models.Model):
-    """权限配置模型"""
-    role = models.ForeignKey(
-        Role,
-        on_delete=models.CASCADE,
-        verbose_name=_("关联角色"),
-        related_name="permissions"
-    )
-    form_name = models.CharField(max_length=20, choices=FORM_CHOICES, verbose_name=_("表单名称"))
-    action = models.CharField(max_length=10, choices=ACTION_CHOICES, verbose_name=_("操作权限"))
-    name = models.CharField(max_length=100, verbose_name=_("权限名称"), blank=True, editable=False)
-    code = models.CharField(max_length=50, unique=True, verbose_name=_("权限编码"), blank=True, editable=False)
-    desc = models.TextField(blank=True, null=True, verbose_name=_("权限描述"))
-    create_time = models.DateTimeField(auto_now_add=True, verbose_name=_("创建时间"))
-
-    class Meta:
-        verbose_name = _("权限配置")
-        verbose_name_plural = _("权限配置")
-        unique_together = ('role', 'form_name', 'action')
-        db_table = "erp_permission_config"
-
-    def save(self, *args, **kwargs):
-        form_name_cn = dict(FORM_CHOICES).get(self.form_name, self.form_name)
-        action_cn = dict(ACTION_CHOICES).get(self.action, self.action)
-        self.name = f"{self.role.role_name}-{form_name_cn}-{action_cn}"
-        self.code = f"{self.role.role_code}_{self.form_name}_{self.action}".lower()
-        super().save(*args, **kwargs)
-
-    def __str__(self):
-        return self.name
-
-from django.db import models
-
-class ApprovalFlow(models.Model):
-    """审批流程主表"""
-    name = models.CharField(max_length=100, verbose_name="流程名称")
-    code = models.CharField(max_length=50, unique=True, verbose_name="流程编码")
-    is_active = models.BooleanField(default=True, verbose_name="是否启用")
-    create_time = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
-    update_time = models.DateTimeField(auto_now=True, verbose_name="更新时间")
-
-    class Meta:
-        verbose_name = "审批流程"
-        verbose_name_plural = "审批流程"
-
-class ApprovalNode(models.Model):
-    """审批流程节点表"""
-    flow = models.ForeignKey(ApprovalFlow, on_delete=models.CASCADE, related_name="nodes", verbose_name="所属流程")
-    name = models.CharField(max_length=100, verbose_name="节点名称")
-    node_type = models.CharField(
-        max_length=20,
-        choices=[("start", "开始节点"), ("approver", "审批节点"), ("end", "结束节点")],
-        default="approver",
-        verbose_name="节点类型"
-    )
-    approver_config = models.JSONField(default=dict, verbose_name="审批人配置")  # 存储审批人类型、用户ID等
-    next_nodes = models.JSONField(default=dict, verbose_name="下一个节点配置")     # 存储后续节点ID列表
-    sort = models.IntegerField(default=0, verbose_name="排序")
-    # 新增画布坐标字段
-    x = models.FloatField(default=100.0, verbose_name="节点X坐标")
-    y = models.FloatField(default=100.0, verbose_name="节点Y坐标")
-    create_time = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
-    update_time = models.DateTimeField(auto_now=True, verbose_name="更新时间")
-
-    class Meta:
-        verbose_name = "审批节点"
-        verbose_name_plural = "审批节点"
-
-class ApprovalInstance(models.Model):
-    """审批实例表"""
-    flow = models.ForeignKey(ApprovalFlow, on_delete=models.CASCADE, verbose_name="所属流程")
-    create_user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="创建人")
-    current_node = models.ForeignKey(ApprovalNode, on_delete=models.SET_NULL, null=True, verbose_name="当前节点")
-    status = models.CharField(
-        max_length=20,
-        choices=[("running", "审批中"), ("approved", "已通过"), ("rejected", "已驳回")],
-        default="running",
-        verbose_name="审批状态"
-    )
-    create_time = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
-    update_time = models.DateTimeField(auto_now=True, verbose_name="更新时间")
-
-    class Meta:
-        verbose_name = "审批实例"
-        verbose_name_plural = "审批实例"
-
-class ApprovalRecord(models.Model):
-    """审批记录"""
-    instance = models.ForeignKey(ApprovalInstance, on_delete=models.CASCADE, related_name="records", verbose_name="审批实例")
-    node = models.ForeignKey(ApprovalNode, on_delete=models.CASCADE, verbose_name="审批节点")
-    approver = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="审批人")
-    action = models.CharField(max_length=20, choices=[("approve", "同意"), ("reject", "驳回")], verbose_name="审批操作")
-    comment = models.TextField(blank=True, null=True, verbose_name="审批意见")
-    operate_time = models.DateTimeField(auto_now_add=True, verbose_name="操作时间")
-
-    class Meta:
-        verbose_name = "审批记录"
-        verbose_name_plural = "审批记录"
-
+from django.db import models
+from django.apps import apps
+from django.utils.translation import gettext_lazy as _
+import os
+import uuid
+from datetime import datetime
+from django.contrib.auth.models import User
+
+# ========== 全局枚举 ==========
+FORM_CHOICES = [
+    ('material', '物料表单'),
+    ('order', '订单表单'),
+    ('erp_user', 'ERP用户表单'),
+    ('product', '产品表单'),
+    ('role', '角色表单'),
+    ('contract', '合同表单'),
+    ('approval', '审批表单')  # 追加在末尾，不改变已有表单的权限位
+]
+
+ACTION_CHOICES = [
+    ('view', '查看'),
+    ('add', '新增'),
+    ('edit', '修改'),
+    ('delete', '删除'),
+    ('export', '导出')
+]
+
+# ========== 工具函数 ==========
+# 仅供历史迁移 0005 引用；附件实际的存储路径见 attachments.py（内容地址分片目录）
+def material_file_path(instance, filename):
+    ext = os.path.splitext(filename)[1].lower()
+    unique_filename = f"{uuid.uuid4()}{ext}"
+    date_path = datetime.now().strftime('%Y/%m/%d')
+    return f"materials/{date_path}/{unique_filename}"
+
+
+def new_node_key():
+    """审批节点的稳定标识：同一节点在各个流程版本中保持不变"""
+    return uuid.uuid4().hex
+
+# ========== 基础模型（保留原有逻辑） ==========
+class Role(models.Model):
+    """角色模型"""
+    role_name = models.CharField(max_length=50, unique=True, verbose_name=_("角色名称"))
+    role_code = models.CharField(max_length=20, unique=True, verbose_name=_("角色编码"))
+    desc = models.TextField(blank=True, verbose_name=_("角色描述"))
+    create_time = models.DateTimeField(auto_now_add=True, verbose_name=_("创建时间"))
+
+    class Meta:
+        db_table = "erp_role"
+        verbose_name = _("角色")
+        verbose_name_plural = _("角色")
+
+    def __str__(self):
+        return self.role_name
+
+    def has_permission(self, form_name, action):
+        if self.role_code == 'admin':
+            return True
+        # 走权限位图缓存，不再逐次查询 PermissionConfig
+        from .permission_cache import role_has_permission
+        return role_has_permission(self.id, form_name, action)
+
+class ERPUser(models.Model):
+    """ERP用户模型"""
+    username = models.CharField(max_length=50, unique=True, verbose_name=_('用户名'))
+    password = models.CharField(max_length=128, verbose_name=_('密码'))
+    email = models.EmailField(blank=True, null=True, verbose_name=_('邮箱'))
+    role = models.ForeignKey(
+        Role,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name=_('所属角色')
+    )
+    create_time = models.DateTimeField(auto_now_add=True, verbose_name=_('创建时间'))
+    is_active = models.BooleanField(default=True, verbose_name=_('是否激活'))
+
+    class Meta:
+        verbose_name = _('ERP用户')
+        verbose_name_plural = _('ERP用户')
+
+    def __str__(self):
+        return self.username
+
+    @property
+    def is_authenticated(self):
+        """与 AnonymousERPUser 对应，中间件据此判断登录态"""
+        return True
+
+    def has_permission(self, form_name, action):
+        # 只用 role_id，避免为取角色再查一次 erp_role 表
+        if not self.role_id:
+            return False
+        from .permission_cache import role_has_permission
+        return role_has_permission(self.role_id, form_name, action)
+
+class Material(models.Model):
+    name = models.CharField(max_length=100, verbose_name="物料名称")
+    code = models.CharField(max_length=50, unique=True, verbose_name="物料编码")
+    category = models.CharField(max_length=50, default='', verbose_name="物料分类")
+    unit = models.CharField(max_length=20, default='', verbose_name="单位")
+    supplier = models.CharField(max_length=100, default='', verbose_name="供应商")
+    quantity = models.IntegerField(default=0, verbose_name="数量")
+    desc = models.TextField(default='', verbose_name="特征描述")
+    create_time = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    update_time = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        db_table = "myerpapp_material"
+        verbose_name = "物料"
+        verbose_name_plural = "物料"
+        # 与 get_materials 的排序/筛选对应：(排序字段, id) 保证 keyset 分页走索引且无需额外排序
+        indexes = [
+            models.Index(fields=['create_time', 'id'], name='material_ctime_idx'),
+            models.Index(fields=['update_time', 'id'], name='material_utime_idx'),
+            models.Index(fields=['name', 'id'], name='material_name_idx'),
+            models.Index(fields=['quantity', 'id'], name='material_qty_idx'),
+            models.Index(fields=['category', 'create_time', 'id'], name='material_cat_ctime_idx'),
+            models.Index(fields=['supplier', 'create_time', 'id'], name='material_sup_ctime_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name}({self.code})"
+
+class AttachmentBlob(models.Model):
+    """内容寻址的附件实体文件：相同内容只存一份，ref_count 为引用它的 MaterialFile 数"""
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name="文件SHA-256")
+    size = models.BigIntegerField(verbose_name="文件大小（字节）")
+    path = models.CharField(max_length=500, db_index=True, verbose_name="存储路径")
+    ref_count = models.IntegerField(default=0, verbose_name="引用数")
+    create_time = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    # 压缩存储（attachment_codec.py）：'' 未评估，'identity' 评估后不值得压缩，'zlib'/'zstd' 已压缩
+    codec = models.CharField(max_length=10, default='', blank=True, verbose_name="存储编码")
+    stored_size = models.BigIntegerField(default=0, verbose_name="磁盘占用（字节）")
+    last_access_time = models.DateTimeField(null=True, blank=True, verbose_name="最近下载时间")  # 按天更新
+
+    class Meta:
+        verbose_name = "附件实体文件"
+        verbose_name_plural = "附件实体文件"
+
+    def __str__(self):
+        return self.sha256
+
+
+class MaterialFile(models.Model):
+    material = models.ForeignKey(Material, on_delete=models.CASCADE, verbose_name="关联物料")
+    # 为空表示去重存储上线前的旧附件（file_path 独占一个文件）
+    blob = models.ForeignKey(AttachmentBlob, on_delete=models.PROTECT, null=True, blank=True,
+                             related_name="files", verbose_name="实体文件")
+    file_path = models.CharField(max_length=500, verbose_name="文件路径")
+    name = models.CharField(
+        max_length=255,
+        verbose_name="文件原始名称",
+        default="",
+        blank=True
+    )
+    size = models.BigIntegerField(
+        verbose_name="文件大小（字节）",
+        default=0,
+        blank=True
+    )
+    sha256 = models.CharField(max_length=64, default='', blank=True, verbose_name="文件SHA-256")
+    upload_time = models.DateTimeField(auto_now_add=True, verbose_name="上传时间")
+    # 附件对账（reconcile_attachments）或下载时发现磁盘上找不到文件时置为 True
+    file_missing = models.BooleanField(default=False, verbose_name="文件缺失")
+
+    class Meta:
+        verbose_name = "物料附件"
+        verbose_name_plural = "物料附件"
+        db_table = "myerpapp_materialfile"
+        indexes = [
+            models.Index(fields=['material', 'upload_time'], name='materialfile_mat_time_idx'),
+            models.Index(fields=['file_path'], name='materialfile_path_idx'),  # 对账时按路径批量比对
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class MaterialUpload(models.Model):
+    """断点续传上传会话：分块写入同一个预分配的临时文件，全部到齐后生成 MaterialFile"""
+    upload_id = models.CharField(max_length=32, unique=True, verbose_name="上传会话ID")
+    material = models.ForeignKey(Material, on_delete=models.CASCADE, related_name="uploads", verbose_name="关联物料")
+    creator = models.ForeignKey(ERPUser, on_delete=models.CASCADE, verbose_name="上传人")
+    name = models.CharField(max_length=255, verbose_name="文件原始名称")
+    size = models.BigIntegerField(verbose_name="文件大小（字节）")
+    chunk_size = models.IntegerField(verbose_name="分块大小（字节）")
+    checksum = models.CharField(max_length=64, blank=True, default='', verbose_name="整个文件的SHA-256")
+    create_time = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    expire_time = models.DateTimeField(db_index=True, verbose_name="过期时间")
+
+    class Meta:
+        verbose_name = "附件上传会话"
+        verbose_name_plural = "附件上传会话"
+
+    def __str__(self):
+        return f"{self.name}({self.upload_id})"
+
+    @property
+    def chunk_count(self):
+        return max(1, -(-self.size // self.chunk_size))
+
+    def chunk_length(self, index):
+        """第 index 块应有的字节数（最后一块可能不足 chunk_size）"""
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+
+class MaterialUploadChunk(models.Model):
+    """已写入并校验通过的分块"""
+    upload = models.ForeignKey(MaterialUpload, on_delete=models.CASCADE, related_name="chunks", verbose_name="上传会话")
+    index = models.IntegerField(verbose_name="分块序号")
+    size = models.IntegerField(verbose_name="分块大小（字节）")
+    checksum = models.CharField(max_length=64, verbose_name="分块SHA-256")
+
+    class Meta:
+        verbose_name = "附件上传分块"
+        verbose_name_plural = "附件上传分块"
+        unique_together = ('upload', 'index')
+
+
+class PermissionConfig(models.Model):
+    """权限配置模型"""
+    role = models.ForeignKey(
+        Role,
+        on_delete=models.CASCADE,
+        verbose_name=_("关联角色"),
+        related_name="permissions"
+    )
+    form_name = models.CharField(max_length=20, choices=FORM_CHOICES, verbose_name=_("表单名称"))
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES, verbose_name=_("操作权限"))
+    name = models.CharField(max_length=100, verbose_name=_("权限名称"), blank=True, editable=False)
+    code = models.CharField(max_length=50, unique=True, verbose_name=_("权限编码"), blank=True, editable=False)
+    desc = models.TextField(blank=True, null=True, verbose_name=_("权限描述"))
+    create_time = models.DateTimeField(auto_now_add=True, verbose_name=_("创建时间"))
+
+    class Meta:
+        verbose_name = _("权限配置")
+        verbose_name_plural = _("权限配置")
+        unique_together = ('role', 'form_name', 'action')
+        db_table = "erp_permission_config"
+
+    def save(self, *args, **kwargs):
+        form_name_cn = dict(FORM_CHOICES).get(self.form_name, self.form_name)
+        action_cn = dict(ACTION_CHOICES).get(self.action, self.action)
+        self.name = f"{self.role.role_name}-{form_name_cn}-{action_cn}"
+        self.code = f"{self.role.role_code}_{self.form_name}_{self.action}".lower()
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name
+
+from django.db import models
+
+class ApprovalFlow(models.Model):
+    """审批流程主表"""
+    name = models.CharField(max_length=100, verbose_name="流程名称")
+    code = models.CharField(max_length=50, unique=True, verbose_name="流程编码")
+    desc = models.TextField(blank=True, verbose_name="流程描述")
+    is_active = models.BooleanField(default=True, verbose_name="是否启用")
+    # 当前版本号：节点的审批语义（名称、类型、审批人、连线）变化时递增，已发布的版本不再修改
+    version = models.PositiveIntegerField(default=1, verbose_name="当前版本")
+    create_time = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    update_time = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "审批流程"
+        verbose_name_plural = "审批流程"
+        indexes = [
+            # filter(is_active=True) 生成的是 WHERE "is_active"，SQLite 无法用复合索引定位，
+            # 按创建时间索引倒序扫描即可（停用的流程很少）
+            models.Index(fields=['create_time'], name='approvalflow_ctime_idx'),
+        ]
+
+class ApprovalNode(models.Model):
+    """审批流程节点表
+
+    每行是节点在一段版本区间 [since_version, until_version) 内的内容，until_version 为空表示属于当前版本。
+    节点修改时旧行只写上 until_version、另插一行新内容，审批中的实例仍指向旧行，不受流程修改影响。
+    """
+    flow = models.ForeignKey(ApprovalFlow, on_delete=models.CASCADE, related_name="nodes", verbose_name="所属流程")
+    node_key = models.CharField(max_length=32, default=new_node_key, verbose_name="节点标识")
+    since_version = models.PositiveIntegerField(default=1, verbose_name="起始版本")
+    until_version = models.PositiveIntegerField(null=True, blank=True, verbose_name="失效版本")
+    name = models.CharField(max_length=100, verbose_name="节点名称")
+    node_type = models.CharField(
+        max_length=20,
+        choices=[("start", "开始节点"), ("approver", "审批节点"), ("join", "汇聚节点"), ("end", "结束节点")],
+        default="approver",
+        verbose_name="节点类型"
+    )
+    # 汇聚节点的汇聚方式：all 会签（所有分支都通过才继续）/ any 或签（任一分支通过即继续，其余分支取消）
+    join_mode = models.CharField(
+        max_length=10, choices=[("all", "会签"), ("any", "或签")], default="all", verbose_name="汇聚方式"
+    )
+    approver_config = models.JSONField(default=dict, verbose_name="审批人配置")  # 存储审批人类型、用户ID等
+    next_nodes = models.JSONField(default=dict, verbose_name="下一个节点配置")     # {'next': [后续节点的 node_key, ...]}
+    sort = models.IntegerField(default=0, verbose_name="排序")
+    # 新增画布坐标字段
+    x = models.FloatField(default=100.0, verbose_name="节点X坐标")
+    y = models.FloatField(default=100.0, verbose_name="节点Y坐标")
+    create_time = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    update_time = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "审批节点"
+        verbose_name_plural = "审批节点"
+        indexes = [
+            # 当前版本的节点：flow_id = ? AND until_version IS NULL ORDER BY sort
+            models.Index(fields=['flow', 'until_version', 'sort'], name='approvalnode_flow_cur_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['flow', 'node_key', 'since_version'], name='approvalnode_key_version_uniq'),
+        ]
+
+class ApprovalInstance(models.Model):
+    """审批实例表"""
+    flow = models.ForeignKey(ApprovalFlow, on_delete=models.CASCADE, verbose_name="所属流程")
+    create_user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="创建人")
+    # 关联的业务单据（前端按业务单据查询/发起审批）
+    business_id = models.CharField(max_length=100, verbose_name="业务单据ID")
+    business_type = models.CharField(max_length=50, verbose_name="业务类型")
+    flow_version = models.PositiveIntegerField(default=1, verbose_name="流程版本")  # 创建时固定，之后修改流程不影响本实例
+    # 最近进入的节点；并行审批时各分支所在节点见 tokens
+    current_node = models.ForeignKey(ApprovalNode, on_delete=models.SET_NULL, null=True, verbose_name="当前节点")
+    status = models.CharField(
+        max_length=20,
+        choices=[("running", "审批中"), ("approved", "已通过"), ("rejected", "已驳回")],
+        default="running",
+        verbose_name="审批状态"
+    )
+    create_time = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    update_time = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "审批实例"
+        verbose_name_plural = "审批实例"
+
+class ApprovalToken(models.Model):
+    """审批令牌：实例在每条并行分支上的位置（见 approval_actions.py）
+
+    审批节点上的令牌 arrived 为 0；汇聚节点每个实例只有一个令牌，arrived 记录已到达的分支数。
+    """
+    instance = models.ForeignKey(ApprovalInstance, on_delete=models.CASCADE, related_name="tokens", verbose_name="审批实例")
+    node = models.ForeignKey(ApprovalNode, on_delete=models.CASCADE, verbose_name="所在节点")
+    status = models.CharField(
+        max_length=20,
+        choices=[("active", "待审批"), ("waiting", "等待汇聚"), ("done", "已完成"), ("cancelled", "已取消")],
+        default="active",
+        verbose_name="令牌状态"
+    )
+    arrived = models.PositiveIntegerField(default=0, verbose_name="已到达分支数")
+    create_time = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    update_time = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "审批令牌"
+        verbose_name_plural = "审批令牌"
+        indexes = [
+            # 审批时读取实例的活动令牌：instance_id IN (...) AND status = 'active'
+            models.Index(fields=['instance', 'status'], name='approvaltoken_inst_status_idx'),
+        ]
+        constraints = [
+            # 每个实例在同一汇聚节点只有一个计数令牌
+            models.UniqueConstraint(fields=['instance', 'node'], condition=models.Q(arrived__gt=0),
+                                    name='approvaltoken_join_uniq'),
+        ]
+
+class ApprovalTask(models.Model):
+    """审批待办：实例流转到节点时，按节点审批人物化出的分配记录（见 approval_tasks.py）"""
+    instance = models.ForeignKey(ApprovalInstance, on_delete=models.CASCADE, related_name="tasks", verbose_name="审批实例")
+    node = models.ForeignKey(ApprovalNode, on_delete=models.CASCADE, verbose_name="审批节点")
+    approver = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="审批人")
+    status = models.CharField(
+        max_length=20,
+        choices=[("pending", "待处理"), ("done", "已处理"), ("cancelled", "已取消")],
+        default="pending",
+        verbose_name="待办状态"
+    )
+    create_time = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    finish_time = models.DateTimeField(null=True, blank=True, verbose_name="完成时间")
+
+    class Meta:
+        verbose_name = "审批待办"
+        verbose_name_plural = "审批待办"
+        indexes = [
+            # 我的待办：approver_id = ? AND status = 'pending' ORDER BY id DESC
+            models.Index(fields=['approver', 'status', 'id'], name='approvaltask_inbox_idx'),
+            # 实例流转时关闭本实例的待办
+            models.Index(fields=['instance', 'status'], name='approvaltask_inst_status_idx'),
+        ]
+
+class ApprovalRecord(models.Model):
+    """审批记录"""
+    instance = models.ForeignKey(ApprovalInstance, on_delete=models.CASCADE, related_name="records", verbose_name="审批实例")
+    node = models.ForeignKey(ApprovalNode, on_delete=models.CASCADE, verbose_name="审批节点")
+    approver = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="审批人")
+    action = models.CharField(max_length=20, choices=[("approve", "同意"), ("reject", "驳回")], verbose_name="审批操作")
+    comment = models.TextField(blank=True, null=True, verbose_name="审批意见")
+    operate_time = models.DateTimeField(auto_now_add=True, verbose_name="操作时间")
+
+    class Meta:
+        verbose_name = "审批记录"
+        verbose_name_plural = "审批记录"
+        indexes = [
+            models.Index(fields=['instance', 'operate_time'], name='approvalrecord_inst_time_idx'),
+            models.Index(fields=['operate_time', 'id'], name='approvalrecord_time_idx'),
+        ]
+
@@ -0,0 +1,128 @@
+# ===================== 角色权限位图缓存 =====================
+# 7个表单 × 5种操作 = 35个权限位，每个角色编译成一个整数掩码：
+#   bit = 表单序号 * 操作数量 + 操作序号
+# 权限校验只做一次位运算，不再查询 PermissionConfig / ERPUser。
+#
+# 用户所属角色直接取 request.erp_user.role_id（ERPAuthMiddleware 每个请求已加载），这里只缓存角色掩码。
+#
+# 缓存带版本号：角色权限变更时调用 invalidate_permission_cache() 递增版本号。
+# 版本号存放在 PERMISSION_CACHE_ALIAS 指定的缓存中，该缓存必须是各 worker 进程共享的
+# （单机用文件缓存，多机用 Redis/Memcached），否则失效只对当前进程生效，被收回的权限在其他进程里仍然有效。
+# 各进程最多每 PERMISSION_CACHE_CHECK_INTERVAL 秒读一次版本号，发现变化后丢弃本地编译结果重新加载。
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+from .models import FORM_CHOICES, ACTION_CHOICES, Role, PermissionConfig
+
+logger = logging.getLogger(__name__)
+
+FORM_INDEX = {form: idx for idx, (form, _) in enumerate(FORM_CHOICES)}
+ACTION_INDEX = {action: idx for idx, (action, _) in enumerate(ACTION_CHOICES)}
+ALL_PERMISSIONS_MASK = (1 << (len(FORM_INDEX) * len(ACTION_INDEX))) - 1
+
+VERSION_CACHE_KEY = 'erp:permission_cache:version'
+
+_lock = threading.Lock()
+_state = {
+    'version': None,     # 本地编译结果对应的版本号
+    'checked_at': 0.0,   # 上次读取版本号的时间（time.monotonic）
+    'role_masks': None,  # role_id -> 权限掩码（整表一次性编译）
+}
+
+
+def permission_bit(form_name, action):
+    """返回 (表单, 操作) 对应的权限位，未知表单/操作返回 0"""
+    form_idx = FORM_INDEX.get(form_name)
+    action_idx = ACTION_INDEX.get(action)
+    if form_idx is None or action_idx is None:
+        return 0
+    return 1 << (form_idx * len(ACTION_INDEX) + action_idx)
+
+
+def version_cache():
+    """存放版本号的共享缓存；配置成进程内缓存时直接报错，避免权限收回后其他 worker 仍然放行"""
+    cache = caches[getattr(settings, 'PERMISSION_CACHE_ALIAS', 'permissions')]
+    if isinstance(cache, LocMemCache) and not getattr(settings, 'PERMISSION_CACHE_ALLOW_LOCAL', False):
+        raise RuntimeError('PERMISSION_CACHE_ALIAS 必须指向多进程共享的缓存（文件缓存/Redis/Memcached）')
+    return cache
+
+
+def _current_version():
+    cache = version_cache()
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(VERSION_CACHE_KEY, 1, timeout=None)
+        version = cache.get(VERSION_CACHE_KEY, 1)
+    return version
+
+
+def _sync():
+    """版本号变化时清空本地缓存（每 PERMISSION_CACHE_CHECK_INTERVAL 秒最多读一次共享缓存）"""
+    now = time.monotonic()
+    interval = getattr(settings, 'PERMISSION_CACHE_CHECK_INTERVAL', 1.0)
+    if _state['version'] is not None and now - _state['checked_at'] < interval:
+        return
+    version = _current_version()
+    with _lock:
+        if _state['version'] != version:
+            _state['role_masks'] = None
+            _state['version'] = version
+        _state['checked_at'] = now
+
+
+def _compile_role_masks():
+    """一次查询编译所有角色的权限掩码"""
+    masks = {}
+    for role_id, role_code in Role.objects.values_list('id', 'role_code'):
+        masks[role_id] = ALL_PERMISSIONS_MASK if role_code == 'admin' else 0
+    for role_id, form_name, action in PermissionConfig.objects.values_list('role_id', 'form_name', 'action'):
+        if role_id in masks:
+            masks[role_id] |= permission_bit(form_name, action)
+    logger.info(f"权限位图缓存已编译：{len(masks)}个角色，版本{_state['version']}")
+    return masks
+
+
+def get_role_mask(role_id):
+    """获取角色权限掩码（角色不存在返回 0）"""
+    _sync()
+    masks = _state['role_masks']
+    if masks is None:
+        with _lock:
+            masks = _state['role_masks']
+            if masks is None:
+                masks = _compile_role_masks()
+                _state['role_masks'] = masks
+    return masks.get(role_id, 0)
+
+
+def role_has_permission(role_id, form_name, action):
+    bit = permission_bit(form_name, action)
+    return bool(bit) and bool(get_role_mask(role_id) & bit)
+
+
+def role_permission_codes(role_id):
+    """把角色掩码还原成 ['material_view', ...] 形式的权限编码列表"""
+    mask = get_role_mask(role_id)
+    return [
+        f"{form}_{action}"
+        for form, form_idx in FORM_INDEX.items()
+        for action, action_idx in ACTION_INDEX.items()
+        if mask & (1 << (form_idx * len(ACTION_INDEX) + action_idx))
+    ]
+
+
+def invalidate_permission_cache():
+    """角色权限变更后调用：递增共享版本号，所有进程下次校验时重新编译"""
+    cache = version_cache()
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, 2, timeout=None)
+    with _lock:
+        _state['role_masks'] = None
+        _state['version'] = None
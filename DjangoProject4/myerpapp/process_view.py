@@ -1,435 +1,431 @@
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework import status
-from django.utils.decorators import method_decorator
-from django.views.decorators.csrf import csrf_exempt
-from django.contrib.auth.models import User
-from .models import ApprovalFlow, ApprovalNode, ApprovalInstance, ApprovalRecord
-from .serializers import (
-    ApprovalFlowSerializer, ApprovalNodeSerializer,
-    ApprovalInstanceSerializer, ApprovalRecordSerializer
-)
-import uuid
-
-# ========== 全局跨域装饰器（优化） ==========
-def drf_cors_decorator(func):
-    def wrapper(request, *args, **kwargs):
-        response = func(request, *args, **kwargs)
-        response['Access-Control-Allow-Origin'] = 'http://localhost:5173'
-        response['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-        response['Access-Control-Allow-Headers'] = 'Content-Type, X-CSRFToken, X-Requested-With, Authorization'
-        response['Access-Control-Allow-Credentials'] = 'true'
-        return response
-    return wrapper
-
-# ========== 登录态校验装饰器（新增：适配DRF） ==========
-from rest_framework.decorators import authentication_classes, permission_classes
-from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
-
-# 简化登录校验：使用DRF内置权限类 + JWT认证
-def login_required(view_func):
-    """DRF视图登录校验装饰器"""
-    @authentication_classes([JWTAuthentication])
-    @permission_classes([IsAuthenticated])
-    def wrapper(request, *args, **kwargs):
-        return view_func(request, *args, **kwargs)
-    return wrapper
-
-# ========== 审批流程CRUD视图（修复版） ==========
-@method_decorator(csrf_exempt, name='dispatch')
-class ApprovalFlowListView(APIView):
-    """审批流程列表接口"""
-    @drf_cors_decorator
-    def get(self, request):
-        try:
-            flows = ApprovalFlow.objects.filter(is_active=True).order_by('-create_time')
-            serializer = ApprovalFlowSerializer(flows, many=True)
-            return Response({
-                'code': 200,
-                'msg': 'success',
-                'data': serializer.data
-            }, status=status.HTTP_200_OK)
-        except Exception as e:
-            return Response({
-                'code': 500,
-                'msg': f'获取流程列表失败：{str(e)}',
-                'data': []
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    @drf_cors_decorator
-    def options(self, request):
-        return Response({}, status=status.HTTP_200_OK)
-
-@method_decorator(csrf_exempt, name='dispatch')
-class ApprovalFlowDetailView(APIView):
-    """审批流程详情接口（含节点）"""
-    @drf_cors_decorator
-    def get(self, request, pk):
-        try:
-            flow = ApprovalFlow.objects.get(id=pk)
-            nodes = ApprovalNode.objects.filter(flow=flow).order_by('sort')
-            return Response({
-                'code': 200,
-                'msg': 'success',
-                'data': {
-                    'info': ApprovalFlowSerializer(flow).data,
-                    'nodes': ApprovalNodeSerializer(nodes, many=True).data
-                }
-            }, status=status.HTTP_200_OK)
-        except ApprovalFlow.DoesNotExist:
-            return Response({
-                'code': 404,
-                'msg': '流程不存在',
-                'data': {}
-            }, status=status.HTTP_404_NOT_FOUND)
-        except Exception as e:
-            return Response({
-                'code': 500,
-                'msg': f'获取流程详情失败：{str(e)}',
-                'data': {}
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    @drf_cors_decorator
-    def options(self, request, pk):
-        return Response({}, status=status.HTTP_200_OK)
-
-@method_decorator(csrf_exempt, name='dispatch')
-class ApprovalFlowCreateView(APIView):
-    """创建审批流程接口"""
-    @drf_cors_decorator
-    def post(self, request):
-        try:
-            # 1. 构造流程数据（自动生成唯一编码）
-            flow_data = request.data.get('info', {})
-            if not flow_data.get('code'):
-                flow_data['code'] = f"FLOW_{uuid.uuid4().hex[:8].upper()}"
-            flow_data.setdefault('is_active', True)
-
-            # 2. 验证并保存流程
-            serializer = ApprovalFlowSerializer(data=flow_data)
-            if serializer.is_valid():
-                flow = serializer.save()
-
-                # 3. 批量保存节点（兼容前端空ID节点）
-                nodes = request.data.get('nodes', [])
-                node_list = []
-                for idx, item in enumerate(nodes):
-                    # 兼容approver_config格式（前端可能传数组）
-                    approver_config = item.get('approver_config', {})
-                    if isinstance(approver_config, list):
-                        approver_config = {}
-
-                    # 不强制要求ID，由数据库自增生成
-                    node_list.append(ApprovalNode(
-                        flow=flow,
-                        name=item.get('name', ''),
-                        node_type=item.get('node_type', 'approver'),
-                        approver_config=approver_config,
-                        next_nodes=item.get('next_nodes', {}),
-                        sort=item.get('sort', idx),
-                        x=item.get('x', 100),
-                        y=item.get('y', 100)
-                    ))
-                ApprovalNode.objects.bulk_create(node_list)
-
-                return Response({
-                    'code': 200,
-                    'msg': '流程创建成功',
-                    'data': {'id': flow.id, 'code': flow.code}
-                }, status=status.HTTP_200_OK)
-            else:
-                # 返回详细的验证错误信息
-                return Response({
-                    'code': 400,
-                    'msg': '参数验证失败',
-                    'data': {
-                        'errors': serializer.errors,
-                        'request_data': request.data
-                    }
-                }, status=status.HTTP_400_BAD_REQUEST)
-        except Exception as e:
-            return Response({
-                'code': 500,
-                'msg': f'创建流程失败：{str(e)}',
-                'data': {}
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    @drf_cors_decorator
-    def options(self, request):
-        return Response({}, status=status.HTTP_200_OK)
-
-@method_decorator(csrf_exempt, name='dispatch')
-class ApprovalFlowUpdateView(APIView):
-    """更新审批流程接口"""
-    @drf_cors_decorator
-    def put(self, request, pk):
-        try:
-            flow = ApprovalFlow.objects.get(id=pk)
-            flow_data = request.data.get('info', {})
-            flow_data.pop('code', None)  # 禁止修改流程编码
-
-            # 验证并更新流程
-            serializer = ApprovalFlowSerializer(flow, data=flow_data, partial=True)
-            if serializer.is_valid():
-                serializer.save()
-
-                # 重置节点（先删后加）
-                ApprovalNode.objects.filter(flow=flow).delete()
-                nodes = request.data.get('nodes', [])
-                node_list = []
-                for idx, item in enumerate(nodes):
-                    # 兼容approver_config格式
-                    approver_config = item.get('approver_config', {})
-                    if isinstance(approver_config, list):
-                        approver_config = {}
-
-                    # 兼容前端空ID节点
-                    node_list.append(ApprovalNode(
-                        flow=flow,
-                        name=item.get('name', ''),
-                        node_type=item.get('node_type', 'approver'),
-                        approver_config=approver_config,
-                        next_nodes=item.get('next_nodes', {}),
-                        sort=item.get('sort', idx),
-                        x=item.get('x', 100),
-                        y=item.get('y', 100)
-                    ))
-                ApprovalNode.objects.bulk_create(node_list)
-
-                return Response({
-                    'code': 200,
-                    'msg': '流程更新成功',
-                    'data': {'id': flow.id}
-                }, status=status.HTTP_200_OK)
-            else:
-                # 返回详细的验证错误信息
-                return Response({
-                    'code': 400,
-                    'msg': '参数验证失败',
-                    'data': {
-                        'errors': serializer.errors,
-                        'request_data': request.data
-                    }
-                }, status=status.HTTP_400_BAD_REQUEST)
-        except ApprovalFlow.DoesNotExist:
-            return Response({
-                'code': 404,
-                'msg': '流程不存在',
-                'data': {}
-            }, status=status.HTTP_404_NOT_FOUND)
-        except Exception as e:
-            return Response({
-                'code': 500,
-                'msg': f'更新流程失败：{str(e)}',
-                'data': {}
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    @drf_cors_decorator
-    def options(self, request, pk):
-        return Response({}, status=status.HTTP_200_OK)
-
-# ========== 审批节点视图 ==========
-@method_decorator(csrf_exempt, name='dispatch')
-class ApprovalNodeListView(APIView):
-    """获取流程节点列表"""
-    @drf_cors_decorator
-    def get(self, request, flow_id):
-        try:
-            nodes = ApprovalNode.objects.filter(flow_id=flow_id).order_by('sort')
-            serializer = ApprovalNodeSerializer(nodes, many=True)
-            return Response({
-                'code': 200,
-                'msg': 'success',
-                'data': serializer.data
-            }, status=status.HTTP_200_OK)
-        except Exception as e:
-            return Response({
-                'code': 500,
-                'msg': f'获取节点列表失败：{str(e)}',
-                'data': []
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    @drf_cors_decorator
-    def options(self, request, flow_id):
-        return Response({}, status=status.HTTP_200_OK)
-
-@method_decorator(csrf_exempt, name='dispatch')
-class ApprovalNodeSaveView(APIView):
-    """批量保存节点"""
-    @drf_cors_decorator
-    def post(self, request):
-        flow_id = request.data.get("flow_id")
-        nodes = request.data.get("nodes", [])
-        try:
-            flow = ApprovalFlow.objects.get(id=flow_id)
-            # 先删除旧节点
-            ApprovalNode.objects.filter(flow=flow).delete()
-            # 批量创建新节点
-            node_list = [
-                ApprovalNode(
-                    flow=flow,
-                    name=item["name"],
-                    node_type=item["node_type"],
-                    approver_config=item.get("approver_config", {}),
-                    next_nodes=item.get("next_nodes", {}),
-                    sort=item["sort"],
-                    x=item.get("x", 100),
-                    y=item.get("y", 100)
-                ) for item in nodes
-            ]
-            ApprovalNode.objects.bulk_create(node_list)
-            return Response({
-                'code': 200,
-                'msg': "节点保存成功",
-                'data': {}
-            }, status=status.HTTP_200_OK)
-        except Exception as e:
-            return Response({
-                'code': 500,
-                'msg': str(e),
-                'data': {}
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    @drf_cors_decorator
-    def options(self, request):
-        return Response({}, status=status.HTTP_200_OK)
-
-# ========== 审批实例视图（修复登录态校验） ==========
-@method_decorator(csrf_exempt, name='dispatch')
-class ApprovalInstanceCreateView(APIView):
-    """创建审批实例（适配DRF登录校验）"""
-    # 使用JWT认证 + 登录权限校验
-    authentication_classes = [JWTAuthentication]
-    permission_classes = [IsAuthenticated]
-
-    @drf_cors_decorator
-    def post(self, request):
-        try:
-            request.data['create_user'] = request.user.id
-            serializer = ApprovalInstanceSerializer(data=request.data)
-            if serializer.is_valid():
-                instance = serializer.save()
-                return Response({
-                    'code': 200,
-                    'msg': '实例创建成功',
-                    'data': {'id': instance.id}
-                }, status=status.HTTP_200_OK)
-            return Response({
-                'code': 400,
-                'msg': '参数验证失败',
-                'data': serializer.errors
-            }, status=status.HTTP_400_BAD_REQUEST)
-        except Exception as e:
-            return Response({
-                'code': 500,
-                'msg': f'创建实例失败：{str(e)}',
-                'data': {}
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    @drf_cors_decorator
-    def options(self, request):
-        return Response({}, status=status.HTTP_200_OK)
-
-@method_decorator(csrf_exempt, name='dispatch')
-class ApprovalInstanceOperateView(APIView):
-    """审批操作（同意/驳回）"""
-    authentication_classes = [JWTAuthentication]
-    permission_classes = [IsAuthenticated]
-
-    @drf_cors_decorator
-    def post(self, request):
-        instance_id = request.data.get("instance_id")
-        action = request.data.get("action")
-        comment = request.data.get("comment", "")
-        approver = request.user
-
-        try:
-            instance = ApprovalInstance.objects.get(id=instance_id)
-            # 验证审批实例状态
-            if instance.status != 'running':
-                return Response({
-                    'code': 400,
-                    'msg': '审批已结束，无法操作',
-                    'data': {}
-                }, status=status.HTTP_400_BAD_REQUEST)
-
-            current_node = instance.current_node
-            # 记录审批操作
-            ApprovalRecord.objects.create(
-                instance=instance,
-                node=current_node,
-                approver=approver,
-                action=action,
-                comment=comment
-            )
-
-            # 处理流转逻辑
-            if action == "approve":
-                next_node_ids = current_node.next_nodes.get("next", [])
-                if next_node_ids:
-                    next_node = ApprovalNode.objects.get(id=next_node_ids[0])
-                    instance.current_node = next_node
-                    # 如果是结束节点，更新状态为已通过
-                    if next_node.node_type == "end":
-                        instance.status = "approved"
-                instance.save()
-            elif action == "reject":
-                instance.status = "rejected"
-                instance.save()
-
-            return Response({
-                'code': 200,
-                'msg': "操作成功",
-                'data': {"status": instance.status}
-            }, status=status.HTTP_200_OK)
-        except ApprovalInstance.DoesNotExist:
-            return Response({
-                'code': 404,
-                'msg': '审批实例不存在',
-                'data': {}
-            }, status=status.HTTP_404_NOT_FOUND)
-        except Exception as e:
-            return Response({
-                'code': 500,
-                'msg': str(e),
-                'data': {}
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    @drf_cors_decorator
-    def options(self, request):
-        return Response({}, status=status.HTTP_200_OK)
-
-@method_decorator(csrf_exempt, name='dispatch')
-class ApprovalInstanceDetailView(APIView):
-    """审批实例详情（含审批记录）"""
-    @drf_cors_decorator
-    def get(self, request, pk):
-        try:
-            instance = ApprovalInstance.objects.get(id=pk)
-            # 获取审批记录（按操作时间倒序）
-            records = ApprovalRecord.objects.filter(instance=instance).order_by('-operate_time')
-            return Response({
-                'code': 200,
-                'msg': 'success',
-                'data': {
-                    'instance': ApprovalInstanceSerializer(instance).data,
-                    'records': ApprovalRecordSerializer(records, many=True).data
-                }
-            }, status=status.HTTP_200_OK)
-        except ApprovalInstance.DoesNotExist:
-            return Response({
-                'code': 404,
-                'msg': '审批实例不存在',
-                'data': {}
-            }, status=status.HTTP_404_NOT_FOUND)
-        except Exception as e:
-            return Response({
-                'code': 500,
-                'msg': f'获取实例详情失败：{str(e)}',
-                'data': {}
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    @drf_cors_decorator
-    def options(self, request, pk):
-        return Response({}, status=status.HTTP_200_OK)
\ No newline at end of file
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from django.contrib.auth.models import User
+from django.db import transaction
+from .approval_actions import ACTIONS, MAX_BATCH_SIZE, ActionRejected, operate_instances, start_instance
+from .approval_versions import current_nodes, nodes_for_editor, save_flow_nodes
+from .models import ApprovalFlow, ApprovalInstance, ApprovalRecord, ApprovalTask, ApprovalToken
+from .serializers import (
+    ApprovalFlowSerializer, ApprovalNodeSerializer,
+    ApprovalInstanceSerializer, ApprovalRecordSerializer
+)
+import uuid
+from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+
+# 跨域与ERP登录态由 myerpapp.middleware 统一处理
+from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+# ========== 审批流程CRUD视图（修复版） ==========
+@method_decorator(csrf_exempt, name='dispatch')
+class ApprovalFlowListView(APIView):
+    """审批流程列表接口"""
+    def get(self, request):
+        try:
+            flows = ApprovalFlow.objects.filter(is_active=True).order_by('-create_time')
+            serializer = ApprovalFlowSerializer(flows, many=True)
+            return Response({
+                'code': 200,
+                'msg': 'success',
+                'data': serializer.data
+            }, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({
+                'code': 500,
+                'msg': f'获取流程列表失败：{str(e)}',
+                'data': []
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ApprovalFlowDetailView(APIView):
+    """审批流程详情接口（含节点）"""
+    def get(self, request, pk):
+        try:
+            flow = ApprovalFlow.objects.get(id=pk)
+            nodes = current_nodes(flow.id)
+            return Response({
+                'code': 200,
+                'msg': 'success',
+                'data': {
+                    'info': ApprovalFlowSerializer(flow).data,
+                    'nodes': nodes_for_editor(ApprovalNodeSerializer(nodes, many=True).data)
+                }
+            }, status=status.HTTP_200_OK)
+        except ApprovalFlow.DoesNotExist:
+            return Response({
+                'code': 404,
+                'msg': '流程不存在',
+                'data': {}
+            }, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            return Response({
+                'code': 500,
+                'msg': f'获取流程详情失败：{str(e)}',
+                'data': {}
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ApprovalFlowCreateView(APIView):
+    """创建审批流程接口"""
+    def post(self, request):
+        try:
+            # 1. 构造流程数据（自动生成唯一编码）
+            flow_data = request.data.get('info', {})
+            if not flow_data.get('code'):
+                flow_data['code'] = f"FLOW_{uuid.uuid4().hex[:8].upper()}"
+            flow_data.setdefault('is_active', True)
+
+            # 2. 验证并保存流程
+            serializer = ApprovalFlowSerializer(data=flow_data)
+            if serializer.is_valid():
+                with transaction.atomic():
+                    flow = serializer.save()
+                    # 3. 保存节点（新流程的节点直接作为第1版，兼容前端空ID节点）
+                    save_flow_nodes(flow, request.data.get('nodes', []))
+
+                return Response({
+                    'code': 200,
+                    'msg': '流程创建成功',
+                    'data': {'id': flow.id, 'code': flow.code}
+                }, status=status.HTTP_200_OK)
+            else:
+                # 返回详细的验证错误信息
+                return Response({
+                    'code': 400,
+                    'msg': '参数验证失败',
+                    'data': {
+                        'errors': serializer.errors,
+                        'request_data': request.data
+                    }
+                }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({
+                'code': 500,
+                'msg': f'创建流程失败：{str(e)}',
+                'data': {}
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ApprovalFlowUpdateView(APIView):
+    """更新审批流程接口"""
+    def put(self, request, pk):
+        try:
+            flow = ApprovalFlow.objects.get(id=pk)
+            flow_data = request.data.get('info', {})
+            flow_data.pop('code', None)  # 禁止修改流程编码
+
+            # 验证并更新流程
+            serializer = ApprovalFlowSerializer(flow, data=flow_data, partial=True)
+            if serializer.is_valid():
+                with transaction.atomic():
+                    # 锁住流程行，并发保存时版本号不会重复
+                    serializer.instance = ApprovalFlow.objects.select_for_update().get(id=pk)
+                    flow = serializer.save()
+                    # 按差量保存节点：只写变化的节点，审批中的实例仍按原版本流转
+                    changes = save_flow_nodes(flow, request.data.get('nodes', []))
+
+                return Response({
+                    'code': 200,
+                    'msg': '流程更新成功',
+                    'data': {'id': flow.id, **changes}
+                }, status=status.HTTP_200_OK)
+            else:
+                # 返回详细的验证错误信息
+                return Response({
+                    'code': 400,
+                    'msg': '参数验证失败',
+                    'data': {
+                        'errors': serializer.errors,
+                        'request_data': request.data
+                    }
+                }, status=status.HTTP_400_BAD_REQUEST)
+        except ApprovalFlow.DoesNotExist:
+            return Response({
+                'code': 404,
+                'msg': '流程不存在',
+                'data': {}
+            }, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            return Response({
+                'code': 500,
+                'msg': f'更新流程失败：{str(e)}',
+                'data': {}
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+# ========== 审批节点视图 ==========
+@method_decorator(csrf_exempt, name='dispatch')
+class ApprovalNodeListView(APIView):
+    """获取流程节点列表"""
+    def get(self, request, flow_id):
+        try:
+            serializer = ApprovalNodeSerializer(current_nodes(flow_id), many=True)
+            return Response({
+                'code': 200,
+                'msg': 'success',
+                'data': nodes_for_editor(serializer.data)
+            }, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({
+                'code': 500,
+                'msg': f'获取节点列表失败：{str(e)}',
+                'data': []
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ApprovalNodeSaveView(APIView):
+    """批量保存节点"""
+    def post(self, request):
+        flow_id = request.data.get("flow_id")
+        nodes = request.data.get("nodes", [])
+        try:
+            with transaction.atomic():
+                flow = ApprovalFlow.objects.select_for_update().get(id=flow_id)
+                changes = save_flow_nodes(flow, nodes)
+            return Response({
+                'code': 200,
+                'msg': "节点保存成功",
+                'data': changes
+            }, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({
+                'code': 500,
+                'msg': str(e),
+                'data': {}
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+# ========== 审批实例视图（修复登录态校验） ==========
+@method_decorator(csrf_exempt, name='dispatch')
+class ApprovalInstanceCreateView(APIView):
+    """创建审批实例（适配DRF登录校验）"""
+    # 使用JWT认证 + 登录权限校验
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            request.data['create_user'] = request.user.id
+            serializer = ApprovalInstanceSerializer(data=request.data)
+            if serializer.is_valid():
+                try:
+                    with transaction.atomic():
+                        # 实例固定在创建时的流程版本，之后修改流程不影响本实例的流转；
+                        # 状态由流转决定，客户端传的 current_node 在 start_instance 里按该版本的流程图校验
+                        instance = serializer.save(flow_version=serializer.validated_data['flow'].version,
+                                                   status='running')
+                        start_instance(instance)
+                except ActionRejected as e:
+                    return Response({
+                        'code': e.code,
+                        'msg': e.msg,
+                        'data': {}
+                    }, status=e.code)
+                return Response({
+                    'code': 200,
+                    'msg': '实例创建成功',
+                    'data': {'id': instance.id}
+                }, status=status.HTTP_200_OK)
+            return Response({
+                'code': 400,
+                'msg': '参数验证失败',
+                'data': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({
+                'code': 500,
+                'msg': f'创建实例失败：{str(e)}',
+                'data': {}
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ApprovalInstanceOperateView(APIView):
+    """审批操作（同意/驳回）"""
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        instance_id = request.data.get("instance_id")
+        action = request.data.get("action")
+        comment = request.data.get("comment", "")
+        approver = request.user
+
+        if action not in ACTIONS:
+            return Response({
+                'code': 400,
+                'msg': '审批操作只能是 approve 或 reject',
+                'data': {}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            instance_id = int(instance_id)
+            # 并行审批时可指定审批哪个节点，不传则取第一个可审批的分支
+            node_id = int(request.data["node_id"]) if request.data.get("node_id") not in (None, '') else None
+        except (TypeError, ValueError):
+            return Response({
+                'code': 400,
+                'msg': '审批实例ID和节点ID必须是整数',
+                'data': {}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # 流转逻辑与批量审批共用（approval_actions.py），条件更新防止并发重复流转
+            result = operate_instances(approver, [instance_id], action, comment, node_id)[0]
+            return Response({
+                'code': result['code'],
+                'msg': result['msg'],
+                'data': {"status": result['status']} if result['code'] == 200 else {}
+            }, status=result['code'])
+        except Exception as e:
+            return Response({
+                'code': 500,
+                'msg': str(e),
+                'data': {}
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ApprovalInstanceBatchOperateView(APIView):
+    """批量审批（同意/驳回）：一个事务内处理，返回每个实例的结果"""
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        instance_ids = request.data.get("instance_ids")
+        action = request.data.get("action")
+        comment = request.data.get("comment", "")
+
+        if action not in ACTIONS:
+            return Response({
+                'code': 400,
+                'msg': '审批操作只能是 approve 或 reject',
+                'data': {}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            if not isinstance(instance_ids, list):
+                raise TypeError
+            # 去重并保持顺序
+            instance_ids = list(dict.fromkeys(int(i) for i in instance_ids))
+        except (TypeError, ValueError):
+            return Response({
+                'code': 400,
+                'msg': 'instance_ids 必须是审批实例ID列表',
+                'data': {}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not instance_ids or len(instance_ids) > MAX_BATCH_SIZE:
+            return Response({
+                'code': 400,
+                'msg': f'每次批量审批 1~{MAX_BATCH_SIZE} 个实例',
+                'data': {}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            results = operate_instances(request.user, instance_ids, action, comment)
+            succeeded = sum(1 for result in results if result['code'] == 200)
+            return Response({
+                'code': 200,
+                'msg': f'成功{succeeded}个，失败{len(results) - succeeded}个',
+                'data': {
+                    'succeeded': succeeded,
+                    'failed': len(results) - succeeded,
+                    'results': results
+                }
+            }, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({
+                'code': 500,
+                'msg': f'批量审批失败：{str(e)}',
+                'data': {}
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ApprovalInstanceDetailView(APIView):
+    """审批实例详情（含审批记录）"""
+    def get(self, request, pk):
+        try:
+            instance = ApprovalInstance.objects.get(id=pk)
+            # 获取审批记录（按操作时间倒序）
+            records = ApprovalRecord.objects.filter(instance=instance).order_by('-operate_time')
+            # 各并行分支当前所在的审批节点
+            branches = ApprovalToken.objects.filter(instance=instance, status='active').values(
+                'node_id', 'node__name')
+            return Response({
+                'code': 200,
+                'msg': 'success',
+                'data': {
+                    'instance': ApprovalInstanceSerializer(instance).data,
+                    'records': ApprovalRecordSerializer(records, many=True).data,
+                    'branches': [{'node_id': b['node_id'], 'node_name': b['node__name']} for b in branches]
+                }
+            }, status=status.HTTP_200_OK)
+        except ApprovalInstance.DoesNotExist:
+            return Response({
+                'code': 404,
+                'msg': '审批实例不存在',
+                'data': {}
+            }, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            return Response({
+                'code': 500,
+                'msg': f'获取实例详情失败：{str(e)}',
+                'data': {}
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ApprovalInboxView(APIView):
+    """我的待办（分页）：只查当前用户的 pending 待办，不扫描审批中的实例"""
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            page = int(request.GET.get('page', 1))
+            page_size = int(request.GET.get('page_size', 10))
+            page = 1 if page < 1 else page
+            page_size = 10 if page_size < 1 or page_size > 100 else page_size
+
+            tasks = ApprovalTask.objects.filter(approver=request.user, status='pending').select_related(
+                'instance__flow', 'instance__create_user', 'node').order_by('-id')
+            paginator = Paginator(tasks, page_size)
+            try:
+                page_obj = paginator.page(page)
+            except PageNotAnInteger:
+                page_obj = paginator.page(1)
+            except EmptyPage:
+                page_obj = paginator.page(paginator.num_pages)
+
+            task_list = [{
+                'id': task.id,
+                'instance_id': task.instance_id,
+                'flow_id': task.instance.flow_id,
+                'flow_name': task.instance.flow.name,
+                'node_id': task.node_id,
+                'node_name': task.node.name,
+                'create_user': task.instance.create_user.username,
+                'instance_create_time': task.instance.create_time.strftime('%Y-%m-%d %H:%M:%S'),
+                'create_time': task.create_time.strftime('%Y-%m-%d %H:%M:%S'),
+            } for task in page_obj.object_list]
+
+            return Response({
+                'code': 200,
+                'msg': 'success',
+                'data': {
+                    'list': task_list,
+                    'total': paginator.count,
+                    'page': page_obj.number,
+                    'page_size': page_size,
+                    'total_pages': paginator.num_pages
+                }
+            }, status=status.HTTP_200_OK)
+        except ValueError:
+            return Response({
+                'code': 400,
+                'msg': '分页参数必须是整数',
+                'data': {}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({
+                'code': 500,
+                'msg': f'获取待办列表失败：{str(e)}',
+                'data': {}
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,203 @@
+# ===================== 缓存优先 + 合并写回的 Session 引擎 =====================
+# SESSION_ENGINE = 'myerpapp.session_backend'
+#
+# 读：先查 SESSION_CACHE_ALIAS 指向的缓存（默认文件缓存，可换成 Redis/Memcached），
+#     命中则完全不读 django_session；未命中才回源数据库并回填缓存。
+# 写：只有数据真的变化才写；写操作立即更新缓存，数据库写入进入进程内队列，
+#     攒够 SESSION_WRITE_BEHIND_BATCH 条或超过 SESSION_WRITE_BEHIND_INTERVAL 秒后
+#     在一个事务里批量 upsert，SQLite 写锁只抢一次。进程退出时会把队列刷干净。
+#
+# 注意：缓存是 Session 的"主副本"，多进程部署时必须使用进程间共享的缓存
+# （文件缓存/Redis），不能用 LocMemCache，否则其它进程会从数据库读到旧数据。
+import atexit
+import copy
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import CreateError
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.core.cache import caches
+from django.db import DatabaseError, connections, router, transaction
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'myerpapp.session_backend:'
+# 删除标记：登出后缓存里留一个墓碑，防止队列里晚到的写回让已删除的Session"复活"
+TOMBSTONE = {'__session_deleted__': True}
+
+
+class WriteBehindQueue:
+    """Session 写回队列：session_key -> (session_data, expire_date)，同一个key只保留最后一次"""
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._first_enqueued = None
+        self._timer = None
+        self.flush_count = 0
+
+    @property
+    def batch_size(self):
+        return getattr(settings, 'SESSION_WRITE_BEHIND_BATCH', 50)
+
+    @property
+    def interval(self):
+        return getattr(settings, 'SESSION_WRITE_BEHIND_INTERVAL', 2.0)
+
+    def __contains__(self, session_key):
+        return session_key in self._pending
+
+    def get(self, session_key):
+        return self._pending.get(session_key)
+
+    def enqueue(self, session_key, session_data, expire_date):
+        with self._lock:
+            self._pending[session_key] = (session_data, expire_date)
+            if self._first_enqueued is None:
+                self._first_enqueued = time.monotonic()
+            due = (len(self._pending) >= self.batch_size
+                   or time.monotonic() - self._first_enqueued >= self.interval)
+            if not due and self._timer is None:
+                # 空闲时也要按时落库
+                self._timer = threading.Timer(self.interval, self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            connections.close_all()  # 只关闭定时器线程自己的连接
+
+    def discard(self, session_key):
+        with self._lock:
+            self._pending.pop(session_key, None)
+
+    def flush(self):
+        """把队列里的 Session 在一个事务里批量写入数据库"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._first_enqueued = None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return 0
+
+        model = DBStore.get_model_class()
+        objs = [
+            model(session_key=key, session_data=data, expire_date=expire_date)
+            for key, (data, expire_date) in pending.items()
+        ]
+        try:
+            with transaction.atomic(using=router.db_for_write(model)):
+                model.objects.bulk_create(
+                    objs,
+                    update_conflicts=True,
+                    unique_fields=['session_key'],
+                    update_fields=['session_data', 'expire_date'],
+                )
+        except DatabaseError:
+            logger.exception(f"Session批量写库失败，{len(objs)}条重新入队")
+            with self._lock:
+                for key, value in pending.items():
+                    self._pending.setdefault(key, value)
+                if self._first_enqueued is None:
+                    self._first_enqueued = time.monotonic()
+            return 0
+        self.flush_count += 1
+        return len(objs)
+
+
+write_behind_queue = WriteBehindQueue()
+atexit.register(write_behind_queue.flush)
+
+
+class SessionStore(DBStore):
+    """cached_db 风格的 Session：缓存读、变更检测、数据库合并写回"""
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        self._cache = caches[settings.SESSION_CACHE_ALIAS]
+        self._persisted = None  # 最近一次从存储读到/写入的数据快照，用于变更检测
+        super().__init__(session_key)
+
+    @property
+    def cache_key(self):
+        return self.cache_key_prefix + self._get_or_create_session_key()
+
+    def _remember(self, data):
+        self._persisted = copy.deepcopy(data)
+
+    def load(self):
+        try:
+            data = self._cache.get(self.cache_key)
+        except Exception:
+            data = None
+
+        if data == TOMBSTONE:
+            self._session_key = None
+            data = {}
+        elif data is None:
+            pending = write_behind_queue.get(self.session_key)
+            if pending is not None:
+                # 还没落库的写入，以队列为准
+                data = self.decode(pending[0])
+            else:
+                s = self._get_session_from_db()
+                if s:
+                    data = self.decode(s.session_data)
+                    self._cache.set(self.cache_key, data, self.get_expiry_age(expiry=s.expire_date))
+                else:
+                    data = {}
+        self._remember(data)
+        return data
+
+    def exists(self, session_key):
+        if not session_key:
+            return False
+        return (
+            (self.cache_key_prefix + session_key) in self._cache
+            or session_key in write_behind_queue
+            or super().exists(session_key)
+        )
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+
+        # 数据没有变化：不写缓存也不写库
+        if not must_create and self._persisted is not None and data == self._persisted:
+            return
+
+        expiry_age = self.get_expiry_age()
+        if must_create:
+            # 新建Session：用缓存的原子 add 保证 key 不冲突
+            if self.session_key in write_behind_queue or not self._cache.add(self.cache_key, data, expiry_age):
+                raise CreateError
+        else:
+            self._cache.set(self.cache_key, data, expiry_age)
+
+        write_behind_queue.enqueue(self.session_key, self.encode(data), self.get_expiry_date())
+        self._remember(data)
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        write_behind_queue.discard(session_key)
+        self._cache.set(self.cache_key_prefix + session_key, TOMBSTONE, settings.SESSION_COOKIE_AGE)
+        super().delete(session_key)
+
+    def flush(self):
+        """清空当前Session并更换key"""
+        self.clear()
+        self.delete(self.session_key)
+        self._session_key = None
+        self._persisted = None
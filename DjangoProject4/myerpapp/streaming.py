@@ -0,0 +1,362 @@
+# ===================== 流式读写工具（CSV / XLSX / ZIP） =====================
+# 输出函数都是生成器，按块产出 bytes，交给 StreamingHttpResponse 边生成边发送；
+# 读取函数逐行产出 list[str]。内存占用与总行数无关。
+import csv
+import io
+import os
+import posixpath
+import re
+import zipfile
+from datetime import datetime, date
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+CSV_ROWS_PER_CHUNK = 500
+XLSX_ROWS_PER_CHUNK = 500
+ZIP_READ_BLOCK_SIZE = 1024 * 1024
+ZIP_DEFLATE_LEVEL = 1  # 最快档：文本类附件仍能压缩一半以上，CPU 约为默认档的三分之一
+# 本身已压缩的格式再 deflate 几乎不变小，只浪费 CPU，直接存储（ZIP_STORED）
+ZIP_STORED_EXTENSIONS = {
+    '.zip', '.rar', '.7z', '.gz', '.tgz', '.bz2', '.xz', '.zst', '.lz4',
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic',
+    '.mp3', '.aac', '.mp4', '.mov', '.avi', '.mkv', '.webm',
+    '.pdf', '.docx', '.xlsx', '.pptx', '.odt', '.ods', '.dwg', '.dwfx', '.3mf',
+}
+
+
+class ZipStreamSink:
+    """
+    zipfile 的只写输出目标：只提供 write/tell/flush，不提供 seek，
+    zipfile 会自动改用数据描述符(data descriptor)写法，可以边压缩边输出。
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """取走已写入的数据"""
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+# ===================== CSV =====================
+class _Echo:
+    """csv.writer 的伪文件：writerow 直接返回格式化后的行"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(header, rows):
+    """逐块产出 CSV（带 UTF-8 BOM，Excel 直接打开中文不乱码）"""
+    writer = csv.writer(_Echo())
+    yield ('﻿' + writer.writerow(header)).encode('utf-8')
+    buffer = []
+    for row in rows:
+        buffer.append(writer.writerow([format_cell(v) for v in row]))
+        if len(buffer) >= CSV_ROWS_PER_CHUNK:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+# ===================== XLSX =====================
+# 只写最小可用的 SpreadsheetML：单个工作表，字符串用 inlineStr，
+# 不生成共享字符串表，因此不需要把全部数据留在内存里。
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+_XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+    '<borders count="1"><border/></borders>'
+    '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+    '<cellXfs count="2"><xf fontId="0"/><xf fontId="1" applyFont="1"/></cellXfs>'
+    '</styleSheet>'
+)
+_XLSX_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_XLSX_SHEET_TAIL = '</sheetData></worksheet>'
+
+# XML 1.0 不允许的控制字符
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _xlsx_workbook(sheet_name):
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+
+def _xlsx_row(values, style=0):
+    style_attr = f' s="{style}"' if style else ''
+    cells = []
+    for value in values:
+        if isinstance(value, bool):
+            value = format_cell(value)
+        if isinstance(value, (int, float)):
+            cells.append(f'<c{style_attr}><v>{value}</v></c>')
+        else:
+            text = _ILLEGAL_XML_CHARS.sub('', format_cell(value))
+            cells.append(f'<c{style_attr} t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>')
+    return f"<row>{''.join(cells)}</row>"
+
+
+def iter_xlsx(header, rows, sheet_name='Sheet1'):
+    """逐块产出 XLSX 文件（zip 流式写出，内存恒定）"""
+    sink = ZipStreamSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', _XLSX_CONTENT_TYPES)
+        zf.writestr('_rels/.rels', _XLSX_ROOT_RELS)
+        zf.writestr('xl/workbook.xml', _xlsx_workbook(sheet_name))
+        zf.writestr('xl/_rels/workbook.xml.rels', _XLSX_WORKBOOK_RELS)
+        zf.writestr('xl/styles.xml', _XLSX_STYLES)
+        yield sink.drain()
+
+        with zf.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((_XLSX_SHEET_HEAD + _xlsx_row(header, style=1)).encode('utf-8'))
+            buffer = []
+            for row in rows:
+                buffer.append(_xlsx_row(row))
+                if len(buffer) >= XLSX_ROWS_PER_CHUNK:
+                    sheet.write(''.join(buffer).encode('utf-8'))
+                    buffer = []
+                    data = sink.drain()
+                    if data:
+                        yield data
+            if buffer:
+                sheet.write(''.join(buffer).encode('utf-8'))
+            sheet.write(_XLSX_SHEET_TAIL.encode('utf-8'))
+        yield sink.drain()
+    # 关闭时写出中央目录
+    yield sink.drain()
+
+
+# ===================== ZIP =====================
+def zip_compress_type(name):
+    ext = posixpath.splitext(name.lower())[1]
+    return zipfile.ZIP_STORED if ext in ZIP_STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+def open_binary(path):
+    return open(path, 'rb')
+
+
+def iter_zip(entries, missing_name='缺失文件.txt', opener=open_binary):
+    """逐块产出 ZIP 文件，entries 为 (压缩包内路径, 文件路径, date_time) 的可迭代对象
+
+    文件按 1MB 分块读入、写出，内存占用与文件大小无关；大于 4GB 的文件和压缩包自动使用 ZIP64。
+    opener(path) 返回可 seek 的二进制文件对象（附件可能压缩存储或在对象存储上，由调用方传入对应的 opener）。
+    找不到的文件跳过，最后把缺失清单写入 missing_name。
+    """
+    sink = ZipStreamSink()
+    missing = []
+    with zipfile.ZipFile(sink, 'w', compresslevel=ZIP_DEFLATE_LEVEL) as zf:
+        for arcname, path, date_time in entries:
+            try:
+                fp = opener(path)
+            except FileNotFoundError:
+                missing.append(arcname)
+                continue
+            with fp:
+                info = zipfile.ZipInfo(arcname, date_time=date_time)
+                info.compress_type = zip_compress_type(arcname)
+                info.file_size = fp.seek(0, os.SEEK_END)  # 预先告知大小，zipfile 据此决定是否用 ZIP64
+                fp.seek(0)
+                with zf.open(info, 'w') as member:
+                    for block in iter(lambda: fp.read(ZIP_READ_BLOCK_SIZE), b''):
+                        member.write(block)
+                        data = sink.drain()
+                        if data:
+                            yield data
+            yield sink.drain()
+        if missing:
+            zf.writestr(missing_name, '以下附件在服务器上已找不到，未能打包：\n' + '\n'.join(missing) + '\n')
+    # 关闭时写出中央目录
+    yield sink.drain()
+
+
+# ===================== 读取 CSV / XLSX =====================
+CSV_SNIFF_BYTES = 64 * 1024
+_XLSX_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_XLSX_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_XLSX_PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+
+class SpreadsheetError(ValueError):
+    """上传的表格文件无法解析"""
+
+
+def iter_csv_rows(binary_file):
+    """逐行读取 CSV；先按 UTF-8 解码，失败则按 GB18030（Excel 中文版默认另存编码）"""
+    head = binary_file.read(CSV_SNIFF_BYTES)
+    binary_file.seek(0)
+    encoding = 'utf-8-sig'
+    try:
+        head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # 截断在多字节字符中间不算错
+        if e.start < len(head) - 3:
+            encoding = 'gb18030'
+    text = io.TextIOWrapper(binary_file, encoding=encoding, newline='')
+    try:
+        yield from csv.reader(text)
+    except UnicodeDecodeError:
+        raise SpreadsheetError('CSV文件编码无法识别，请另存为UTF-8编码')
+    finally:
+        text.detach()
+
+
+def _xlsx_column_index(ref):
+    """单元格引用 'AB12' -> 列序号 27（从0开始）"""
+    index = 0
+    for ch in ref:
+        if not ch.isalpha():
+            break
+        index = index * 26 + (ord(ch.upper()) - 64)
+    return index - 1
+
+
+def _xlsx_first_sheet(zf):
+    """按 workbook.xml 的顺序找到第一个工作表在压缩包内的路径"""
+    workbook = ElementTree.fromstring(zf.read('xl/workbook.xml'))
+    sheet = workbook.find(f'{_XLSX_NS}sheets/{_XLSX_NS}sheet')
+    if sheet is None:
+        raise SpreadsheetError('XLSX文件中没有工作表')
+    rel_id = sheet.get(f'{_XLSX_REL_NS}id')
+    rels = ElementTree.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+    for rel in rels.iter(f'{_XLSX_PKG_REL_NS}Relationship'):
+        if rel.get('Id') == rel_id:
+            target = rel.get('Target')
+            return target.lstrip('/') if target.startswith('/') else posixpath.normpath(f'xl/{target}')
+    raise SpreadsheetError('XLSX工作表关系缺失')
+
+
+def _xlsx_shared_strings(zf):
+    if 'xl/sharedStrings.xml' not in zf.namelist():
+        return []
+    strings = []
+    with zf.open('xl/sharedStrings.xml') as fp:
+        for _, elem in ElementTree.iterparse(fp):
+            if elem.tag == f'{_XLSX_NS}si':
+                # 富文本拆成多个 <r><t>，拼接即可；忽略注音 <rPh>
+                parts = []
+                for child in elem:
+                    if child.tag == f'{_XLSX_NS}r':
+                        child = child.find(f'{_XLSX_NS}t')
+                    if child is not None and child.tag == f'{_XLSX_NS}t':
+                        parts.append(child.text or '')
+                strings.append(''.join(parts))
+                elem.clear()
+    return strings
+
+
+def iter_xlsx_rows(binary_file):
+    """
+    逐行读取 XLSX 第一个工作表（iterparse 流式解析，处理完的行立即释放）
+    只有共享字符串表需要常驻内存；空单元格补空字符串，数值按原文返回
+    """
+    try:
+        zf = zipfile.ZipFile(binary_file)
+        sheet_path = _xlsx_first_sheet(zf)
+        shared = _xlsx_shared_strings(zf)
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError):
+        raise SpreadsheetError('XLSX文件格式错误')
+
+    with zf, zf.open(sheet_path) as fp:
+        sheet_data = None
+        try:
+            for event, elem in ElementTree.iterparse(fp, events=('start', 'end')):
+                if event == 'start':
+                    if elem.tag == f'{_XLSX_NS}sheetData':
+                        sheet_data = elem
+                    continue
+                if elem.tag != f'{_XLSX_NS}row':
+                    continue
+                row = []
+                for cell in elem.iter(f'{_XLSX_NS}c'):
+                    ref = cell.get('r')
+                    if ref:
+                        row.extend([''] * (_xlsx_column_index(ref) - len(row)))
+                    cell_type = cell.get('t')
+                    if cell_type == 'inlineStr':
+                        value = ''.join(t.text or '' for t in cell.iter(f'{_XLSX_NS}t'))
+                    else:
+                        v = cell.find(f'{_XLSX_NS}v')
+                        value = (v.text or '') if v is not None else ''
+                        if cell_type == 's' and value:
+                            value = shared[int(value)]
+                        elif cell_type == 'b':
+                            value = 'TRUE' if value == '1' else 'FALSE'
+                    row.append(value)
+                yield row
+                if sheet_data is not None:
+                    sheet_data.clear()
+        except (ElementTree.ParseError, IndexError, ValueError):
+            raise SpreadsheetError('XLSX工作表内容格式错误')
+
+
+# ===================== 公共 =====================
+def format_cell(value):
+    """统一单元格格式：时间转字符串、None 转空、布尔转 是/否"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return '是' if value else '否'
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    return value if isinstance(value, (int, float)) else str(value)
@@ -1,3 +1,1792 @@
-from django.test import TestCase
-
-# Create your tests here.
+import base64
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+from datetime import datetime
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import approval_actions, approval_graph, attachment_storage, attachments, metrics, permission_cache
+from .approval_graph import get_flow_graph
+from .approval_versions import save_flow_nodes
+from .attachment_codec import COMPRESSED_SUFFIX, FRAME_SIZE
+from .attachments import blob_relpath, open_attachment
+from .material_search import FTS_TABLE, search_materials
+from .material_import import REPORT_EXPIRE_HOURS, MaterialImporter, report_path
+from .models import (
+    AttachmentBlob, Material, MaterialFile, ApprovalFlow, ApprovalNode, ApprovalInstance, ApprovalRecord,
+    ApprovalTask, ApprovalToken, ERPUser, MaterialUpload, PermissionConfig, Role,
+)
+from .session_backend import TOMBSTONE, SessionStore, write_behind_queue
+from .streaming import CSV_ROWS_PER_CHUNK, ZIP_READ_BLOCK_SIZE, iter_csv_rows, iter_xlsx, iter_xlsx_rows, iter_zip
+from .upload_views import MIN_CHUNK_SIZE
+
+try:
+    from moto import mock_aws  # 本地 S3 替身，未安装时跳过对象存储测试
+except ImportError:
+    mock_aws = None
+
+
+# ===================== 列表接口查询计划回归 =====================
+# 通过测试客户端真实调用各列表接口，抓取执行的 SQL 做 EXPLAIN QUERY PLAN，
+# 核心表出现无索引全表扫描或整表排序（USE TEMP B-TREE FOR ORDER BY）即失败。
+CORE_TABLES = (
+    'myerpapp_material', 'myerpapp_materialfile', 'myerpapp_erpuser',
+    'myerpapp_approvalinstance', 'myerpapp_approvalrecord',
+    'myerpapp_approvalflow', 'myerpapp_approvalnode', 'myerpapp_approvaltask', 'myerpapp_approvaltoken',
+)
+FULL_SCAN_RE = re.compile(r'^SCAN (\w+)$')
+TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+@override_settings(SESSION_WRITE_BEHIND_BATCH=1)  # Session 同步落库，不起后台线程
+class QueryPlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.material = Material.objects.create(name='不锈钢螺丝', code='M001', category='五金', supplier='华东')
+        Material.objects.create(name='铜螺母', code='M002', category='五金', supplier='华南')
+        MaterialFile.objects.create(material=cls.material, file_path='material_files/a.pdf', name='a.pdf', size=1)
+
+        cls.approver = user = User.objects.create_user(username='approver', password='approver123')
+        flow = ApprovalFlow.objects.create(name='采购审批', code='purchase')
+        node = ApprovalNode.objects.create(flow=flow, name='主管审批', sort=1)
+        cls.instance = ApprovalInstance.objects.create(flow=flow, create_user=user, current_node=node)
+        ApprovalRecord.objects.create(instance=cls.instance, node=node, approver=user, action='approve')
+        ApprovalTask.objects.create(instance=cls.instance, node=node, approver=user)
+
+    def setUp(self):
+        response = self.client.post('/api/login/', data=json.dumps({'username': 'admin', 'password': '123456'}),
+                                    content_type='application/json')
+        self.assertEqual(response.json()['code'], 200)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[3] for row in cursor.fetchall()]
+
+    def capture(self, url, params=None):
+        """请求接口，返回访问核心表的 SELECT 语句（COUNT 走 SQLite 计数优化，不检查）"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params or {})
+            if hasattr(response, 'streaming_content'):
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        statements = [
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].startswith('SELECT')
+            and 'COUNT(*)' not in q['sql']
+            and any(f'"{table}"' in q['sql'] for table in CORE_TABLES)
+        ]
+        self.assertTrue(statements, f'{url} 没有访问核心表的查询')
+        return statements
+
+    def assertIndexedPlan(self, url, params=None, allow_scan=(), allow_sort=False):
+        for sql in self.capture(url, params):
+            plan = self.explain(sql)
+            for detail in plan:
+                match = FULL_SCAN_RE.match(detail)
+                if match and match.group(1) in CORE_TABLES and match.group(1) not in allow_scan:
+                    self.fail(f'{url} {params} 全表扫描 {match.group(1)}：\n{sql}\n{plan}')
+                if not allow_sort and detail == TEMP_SORT:
+                    self.fail(f'{url} {params} 整表排序：\n{sql}\n{plan}')
+
+    def test_material_list_sorts(self):
+        for sort in ('', '-create_time', 'create_time', '-update_time', 'name', '-quantity', 'code'):
+            with self.subTest(sort=sort):
+                self.assertIndexedPlan('/api/get-materials/', {'sort': sort})
+
+    def test_material_cursor_pages_seek(self):
+        """游标翻页必须在索引上定位（SEARCH），不能从头扫描到游标位置"""
+        for sort in ('-create_time', 'name', 'quantity'):
+            with self.subTest(sort=sort):
+                first = self.client.get('/api/get-materials/', {'sort': sort, 'cursor': '', 'page_size': 1}).json()
+                cursor = first['data']['next_cursor']
+                self.assertTrue(cursor)
+                statements = self.capture('/api/get-materials/', {'sort': sort, 'cursor': cursor, 'page_size': 1})
+                for sql in [s for s in statements if 'FROM "myerpapp_material"' in s]:
+                    plan = self.explain(sql)
+                    self.assertTrue(plan[0].startswith('SEARCH myerpapp_material USING INDEX'), plan)
+                    self.assertNotIn(TEMP_SORT, plan)
+
+    def test_material_filters(self):
+        self.assertIndexedPlan('/api/get-materials/', {'category': '五金'})
+        self.assertIndexedPlan('/api/get-materials/', {'supplier': '华东', 'sort': 'create_time'})
+
+    def test_material_keyword_uses_fts(self):
+        # 相关度排序只对命中的候选集排序，允许临时排序
+        statements = self.capture('/api/get-materials/', {'keyword': '不锈钢'})
+        self.assertTrue(any('VIRTUAL TABLE INDEX' in d for sql in statements for d in self.explain(sql)))
+        self.assertIndexedPlan('/api/get-materials/', {'keyword': '不锈钢'}, allow_sort=True)
+
+    def test_material_files(self):
+        self.assertIndexedPlan(f'/api/get-material-files/{self.material.id}/')
+
+    def test_erp_users(self):
+        # 按主键顺序分页，LIMIT 后即停止，不是整表排序
+        self.assertIndexedPlan('/api/erp-users/', allow_scan=('myerpapp_erpuser',))
+
+    def test_approval_lists(self):
+        self.assertIndexedPlan('/api/approval/flows/')
+        self.assertIndexedPlan(f'/api/approval/flow/detail/{self.instance.flow_id}/')
+        self.assertIndexedPlan(f'/api/approval/instances/{self.instance.id}/')
+
+    def test_approval_inbox(self):
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {AccessToken.for_user(self.approver)}'
+        self.assertIndexedPlan('/api/approval/inbox/')
+
+    def test_exports(self):
+        self.assertIndexedPlan('/api/export-materials/', {'category': '五金'})
+        self.assertIndexedPlan('/api/approval/records/export/', {'instance_id': self.instance.id})
+
+
+# ===================== 物料列表游标分页 =====================
+@override_settings(SESSION_WRITE_BEHIND_BATCH=1)
+class MaterialCursorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # 数量、名称大量重复，验证排序字段相同时靠 id 兜底，翻页不丢行不重行
+        Material.objects.bulk_create([
+            Material(name=f'物料{i % 3}', code=f'C{i:03d}', quantity=i % 4) for i in range(23)
+        ])
+
+    def setUp(self):
+        response = self.client.post('/api/login/', data=json.dumps({'username': 'admin', 'password': '123456'}),
+                                    content_type='application/json')
+        self.assertEqual(response.json()['code'], 200)
+
+    def get(self, **params):
+        return self.client.get('/api/get-materials/', params).json()
+
+    def walk(self, sort, page_size=4):
+        ids, cursor = [], ''
+        while cursor is not None:
+            data = self.get(sort=sort, cursor=cursor, page_size=page_size)
+            self.assertEqual(data['code'], 200, data['msg'])
+            ids.extend(item['id'] for item in data['data']['list'])
+            cursor = data['data']['next_cursor']
+        return ids
+
+    def test_mixed_directions_with_ties(self):
+        for sort, ordering in (
+            ('quantity,-name', ('quantity', '-name', '-id')),
+            ('-quantity,name', ('-quantity', 'name', 'id')),
+            ('-quantity', ('-quantity', '-id')),
+        ):
+            with self.subTest(sort=sort):
+                expected = list(Material.objects.order_by(*ordering).values_list('id', flat=True))
+                self.assertEqual(self.walk(sort), expected)
+
+    def test_tampered_cursor(self):
+        cursor = self.get(sort='quantity,-name', cursor='', page_size=4)['data']['next_cursor']
+        self.assertEqual(self.get(sort='quantity,-name', cursor=cursor[:-3] + 'A!b')['code'], 400)
+        self.assertEqual(self.get(sort='quantity,-name', cursor='not-a-cursor')['code'], 400)
+        # 换了排序方式不能复用旧游标
+        self.assertEqual(self.get(sort='-quantity,name', cursor=cursor)['code'], 400)
+
+    def test_unknown_sort_field(self):
+        data = self.get(sort='-password', cursor='')
+        self.assertEqual(data['code'], 400)
+        self.assertIn('password', data['msg'])
+
+
+# ===================== 物料全文检索 =====================
+@override_settings(SESSION_WRITE_BEHIND_BATCH=1)
+class MaterialSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bolt = Material.objects.create(name='不锈钢六角螺栓', code='BOLT-001', category='五金', supplier='华东')
+        cls.nut = Material.objects.create(name='铜螺母', code='NUT-002', category='五金', supplier='华南',
+                                          desc='适配不锈钢螺栓')
+        cls.cable = Material.objects.create(name='铜芯电缆', code='CBL-003', category='电气', supplier='华东')
+
+    def search(self, keyword):
+        return list(search_materials(Material.objects.all(), keyword).order_by('rank', 'id').values_list('code', flat=True))
+
+    def test_match_ordered_by_bm25(self):
+        """名称命中的权重高于描述命中"""
+        self.assertEqual(self.search('不锈钢'), ['BOLT-001', 'NUT-002'])
+        ranks = dict(search_materials(Material.objects.all(), '不锈钢').values_list('code', 'rank'))
+        self.assertLess(ranks['BOLT-001'], ranks['NUT-002'])
+
+        self.client.post('/api/login/', data=json.dumps({'username': 'admin', 'password': '123456'}),
+                         content_type='application/json')
+        data = self.client.get('/api/get-materials/', {'keyword': '不锈钢', 'cursor': ''}).json()['data']
+        self.assertEqual([item['code'] for item in data['list']], ['BOLT-001', 'NUT-002'])
+
+    def test_terms_are_anded(self):
+        self.assertEqual(self.search('不锈钢 六角螺'), ['BOLT-001'])
+        self.assertEqual(self.search('不锈钢 电缆线'), [])
+        self.assertEqual(self.search('"不锈钢'), [])  # 引号按字面量处理，不报语法错误
+
+    def test_short_terms_fall_back_to_like(self):
+        """少于 3 个字符的词 trigram 无法索引：只有短词时全部走 LIKE，混合时在候选集上再做 LIKE 过滤"""
+        self.assertEqual(self.search('电缆'), ['CBL-003'])
+        self.assertEqual(set(self.search('华东')), {'BOLT-001', 'CBL-003'})
+        self.assertEqual(self.search('不锈钢 螺母'), ['NUT-002'])
+        self.assertEqual(set(search_materials(Material.objects.all(), '铜').values_list('rank', flat=True)), {0.0})
+
+    def test_update_reindexes(self):
+        Material.objects.filter(id=self.cable.id).update(name='不锈钢铠装电缆')
+        self.assertEqual(self.search('铜芯电'), [])
+        self.assertIn('CBL-003', self.search('铠装电缆'))
+        self.assertEqual(set(self.search('不锈钢')), {'BOLT-001', 'NUT-002', 'CBL-003'})
+        # 只改非检索字段不影响索引
+        Material.objects.filter(id=self.bolt.id).update(quantity=99)
+        self.assertIn('BOLT-001', self.search('六角螺栓'))
+
+    def test_delete_removes_from_index(self):
+        self.bolt.delete()
+        self.assertEqual(self.search('不锈钢'), ['NUT-002'])
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH '\"六角螺栓\"'")
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+
+# ===================== 跨域/登录中间件 =====================
+@override_settings(SESSION_WRITE_BEHIND_BATCH=1)
+class MiddlewareTests(TestCase):
+    ALLOWED = 'http://localhost:5173'
+    DISALLOWED = 'http://evil.example.com'
+
+    def test_preflight_short_circuit(self):
+        """预检请求不进视图、不查库、不建 Session，路由不存在也直接返回"""
+        with self.assertNumQueries(0):
+            response = self.client.options('/api/no-such-endpoint/', HTTP_ORIGIN=self.ALLOWED,
+                                           HTTP_ACCESS_CONTROL_REQUEST_METHOD='PUT')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Access-Control-Allow-Origin'], self.ALLOWED)
+        self.assertEqual(response['Access-Control-Allow-Credentials'], 'true')
+        self.assertIn('PUT', response['Access-Control-Allow-Methods'])
+        self.assertIn('Authorization', response['Access-Control-Allow-Headers'])
+        self.assertEqual(response['Access-Control-Max-Age'], '86400')
+        self.assertIn('Origin', response['Vary'])
+        self.assertNotIn('sessionid', response.cookies)
+
+    def test_preflight_disallowed_origin(self):
+        response = self.client.options('/api/get-materials/', HTTP_ORIGIN=self.DISALLOWED)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Access-Control-Allow-Origin', response)
+        self.assertNotIn('Access-Control-Allow-Methods', response)
+        self.assertIn('Origin', response['Vary'])
+
+    def test_response_origin_headers(self):
+        response = self.client.get('/api/get-materials/', HTTP_ORIGIN=self.ALLOWED)
+        self.assertEqual(response['Access-Control-Allow-Origin'], self.ALLOWED)
+        self.assertIn('Content-Disposition', response['Access-Control-Expose-Headers'])
+        self.assertIn('Origin', response['Vary'])
+
+        response = self.client.get('/api/get-materials/', HTTP_ORIGIN=self.DISALLOWED)
+        self.assertNotIn('Access-Control-Allow-Origin', response)
+        self.assertNotIn('Access-Control-Expose-Headers', response)
+
+    def test_login_required(self):
+        """未登录：保持原接口约定 HTTP 200 + code 401"""
+        response = self.client.get('/api/get-materials/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['code'], 401)
+
+    def test_jwt_views_exempt(self):
+        """审批实例接口只校验 JWT，不要求 ERP 登录态"""
+        user = User.objects.create_user('alice', password='x')
+        response = self.client.get('/api/approval/inbox/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['code'], 200)
+        # 没有 JWT 时由 DRF 拒绝
+        self.assertEqual(self.client.get('/api/approval/inbox/').status_code, 401)
+
+
+# ===================== 接口性能指标 =====================
+# MetricsMiddleware 在客户端首次请求时按当前设置装载，ERP_METRICS_ENABLED 在类上打开，每个测试用新客户端。
+@override_settings(SESSION_WRITE_BEHIND_BATCH=1, ERP_METRICS_ENABLED=True, ERP_METRICS_TOKEN='scrape-secret')
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        metrics.registry.reset()
+        self.client = Client()
+        response = self.client.post('/api/login/', data=json.dumps({'username': 'admin', 'password': '123456'}),
+                                    content_type='application/json')
+        self.assertEqual(response.json()['code'], 200)
+
+    def sample(self, name, route, **labels):
+        """从 /api/metrics/ 的输出里取一个样本值，没有该样本返回 None"""
+        label = ','.join(f'{key}="{value}"' for key, value in {'route': route, 'method': 'GET', **labels}.items())
+        match = re.search(rf'^{re.escape(name)}{{{re.escape(label)}}} (\S+)$', metrics.registry.render(), re.M)
+        return float(match.group(1)) if match else None
+
+    def route_queries(self, url, route):
+        """请求一次接口，返回中间件记录的该次 SQL 条数"""
+        before = self.sample('erp_db_queries_per_request_sum', route) or 0
+        response = self.client.get(url)
+        self.assertEqual(response.json()['code'], 200)
+        return self.sample('erp_db_queries_per_request_sum', route) - before
+
+    def add_roles_and_users(self, count, prefix):
+        for idx in range(count):
+            role = Role.objects.create(role_name=f'{prefix}角色{idx}', role_code=f'{prefix}_role_{idx}')
+            PermissionConfig.objects.create(role=role, form_name='material', action='view')
+            ERPUser.objects.create(username=f'{prefix}_user_{idx}', password='x', role=role)
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        """get_roles 预取权限、get_erp_users 关联角色：SQL 条数与行数无关"""
+        self.add_roles_and_users(2, 'a')
+        roles = self.route_queries('/api/roles/', 'api/roles/')
+        users = self.route_queries('/api/erp-users/', 'api/erp-users/')
+        self.add_roles_and_users(8, 'b')
+        self.assertEqual(self.route_queries('/api/roles/', 'api/roles/'), roles)
+        self.assertEqual(self.route_queries('/api/erp-users/', 'api/erp-users/'), users)
+        self.assertLessEqual(roles, 6)
+        self.assertLessEqual(users, 6)
+
+    def test_latency_and_status(self):
+        self.client.get('/api/roles/')
+        self.client.get('/api/roles/')
+        self.assertEqual(self.sample('erp_http_requests_total', 'api/roles/', status=200), 2)
+        self.assertEqual(self.sample('erp_http_request_duration_seconds_count', 'api/roles/'), 2)
+        self.assertEqual(self.sample('erp_http_request_duration_seconds_bucket', 'api/roles/', le='+Inf'), 2)
+        self.assertGreater(self.sample('erp_http_request_duration_seconds_sum', 'api/roles/'), 0)
+        self.assertGreater(self.sample('erp_http_response_size_bytes_sum', 'api/roles/'), 0)
+        # 未匹配路由的请求归到同一个标签下，不按具体路径膨胀
+        self.client.get('/api/no-such-endpoint/1/')
+        self.client.get('/api/no-such-endpoint/2/')
+        self.assertEqual(self.sample('erp_http_request_duration_seconds_count', '<unmatched>'), 2)
+
+    def test_streaming_response_measured_when_sent(self):
+        response = self.client.get('/api/roles/export/')
+        self.assertTrue(response.streaming)
+        self.assertIsNone(self.sample('erp_http_response_size_bytes_count', 'api/roles/export/'))
+        body = b''.join(response.streaming_content)
+        self.assertEqual(self.sample('erp_http_response_size_bytes_sum', 'api/roles/export/'), len(body))
+        # 迭代过程中查询角色的 SQL 也计入
+        self.assertGreaterEqual(self.sample('erp_db_queries_per_request_sum', 'api/roles/export/'), 1)
+
+    def test_endpoint_access(self):
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('# TYPE erp_http_request_duration_seconds histogram', response.content.decode())
+
+        anonymous = Client()
+        self.assertEqual(anonymous.get('/api/metrics/').json()['code'], 403)
+        self.assertEqual(anonymous.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer wrong').json()['code'], 403)
+        response = anonymous.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertIn('# TYPE', response.content.decode())
+
+        role = Role.objects.create(role_name='普通', role_code='staff')
+        ERPUser.objects.create(username='staff', password='staff123', role=role)
+        staff = Client()
+        staff.post('/api/login/', data=json.dumps({'username': 'staff', 'password': 'staff123'}),
+                   content_type='application/json')
+        response = staff.get('/api/metrics/')
+        self.assertEqual((response.status_code, response.json()['code']), (200, 403))
+
+    @override_settings(ERP_METRICS_ENABLED=False)
+    def test_disabled(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            metrics.MetricsMiddleware(lambda request: None)
+        response = self.client.get('/api/metrics/')
+        self.assertEqual((response.status_code, response.json()['code']), (200, 404))
+
+
+# ===================== 权限缓存失效 =====================
+@override_settings(SESSION_WRITE_BEHIND_BATCH=1, PERMISSION_CACHE_CHECK_INTERVAL=0)
+class PermissionCacheTests(TestCase):
+    URL = '/api/roles/export/'  # 需要 role:export 权限
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.role = Role.objects.create(role_name='导出员', role_code='exporter')
+        PermissionConfig.objects.create(role=cls.role, form_name='role', action='export')
+        cls.other_role = Role.objects.create(role_name='访客', role_code='guest')
+        cls.user = ERPUser.objects.create(username='exporter', password='exporter123', role=cls.role)
+
+    def setUp(self):
+        permission_cache.invalidate_permission_cache()
+        self.client = self.login('admin', '123456')
+        self.user_client = self.login('exporter', 'exporter123')
+
+    def login(self, username, password):
+        client = Client()
+        response = client.post('/api/login/', data=json.dumps({'username': username, 'password': password}),
+                               content_type='application/json')
+        self.assertEqual(response.json()['code'], 200)
+        return client
+
+    def allowed(self):
+        """无权限时返回 code=403 的 JSON，有权限时返回导出文件流"""
+        response = self.user_client.get(self.URL)
+        if hasattr(response, 'streaming_content'):
+            b''.join(response.streaming_content)
+            return True
+        self.assertEqual(response.json()['code'], 403)
+        return False
+
+    def update_role(self, permission_config, expected_code=200):
+        """权限缓存在事务提交后失效，测试里显式执行 on_commit 回调"""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(f'/api/roles/update/{self.role.id}/', content_type='application/json',
+                                       data=json.dumps({'role_name': self.role.role_name,
+                                                        'permission_config': permission_config}))
+        self.assertEqual(response.json()['code'], expected_code)
+
+    def test_role_edit_invalidates(self):
+        self.assertTrue(self.allowed())
+        self.update_role({'material': ['view']})
+        self.assertFalse(self.allowed())
+        self.update_role({'role': ['export']})
+        self.assertTrue(self.allowed())
+
+    def test_failed_update_keeps_permissions(self):
+        """删除旧权限后插入失败：整体回滚，角色保留原有权限，缓存不失效"""
+        self.assertTrue(self.allowed())
+        with mock.patch('myerpapp.role_views.PermissionConfig.objects.create', side_effect=RuntimeError('disk full')):
+            with mock.patch('myerpapp.role_views.invalidate_permission_cache') as invalidate:
+                self.update_role({'material': ['view']}, expected_code=500)
+        invalidate.assert_not_called()
+        self.assertEqual(list(PermissionConfig.objects.filter(role=self.role).values_list('form_name', 'action')),
+                         [('role', 'export')])
+        self.assertTrue(self.allowed())
+
+    def test_add_role_invalidates_on_commit(self):
+        data = {'role_name': '审计员', 'role_code': 'auditor', 'permission_config': {'role': ['export']}}
+        with mock.patch('myerpapp.role_views.invalidate_permission_cache') as invalidate:
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.client.post('/api/roles/add/', content_type='application/json', data=json.dumps(data))
+                self.assertEqual(response.json()['code'], 200)
+            invalidate.assert_not_called()
+            for callback in callbacks:
+                callback()
+        invalidate.assert_called_once()
+        role = Role.objects.get(role_code='auditor')
+        self.assertTrue(permission_cache.role_has_permission(role.id, 'role', 'export'))
+
+    def test_user_role_change_takes_effect(self):
+        """用户角色取自每个请求加载的 request.erp_user，改角色不依赖缓存失效"""
+        self.assertTrue(self.allowed())
+        ERPUser.objects.filter(id=self.user.id).update(role=self.other_role)
+        self.assertFalse(self.allowed())
+        ERPUser.objects.filter(id=self.user.id).update(role=None)
+        self.assertFalse(self.allowed())
+
+    def test_version_bump_from_other_process(self):
+        """其他进程递增共享缓存里的版本号后，本进程丢弃已编译的掩码"""
+        self.assertTrue(permission_cache.role_has_permission(self.role.id, 'role', 'export'))
+        PermissionConfig.objects.filter(role=self.role).delete()
+        # 本地编译结果仍在，版本号未变时继续使用
+        self.assertTrue(permission_cache.role_has_permission(self.role.id, 'role', 'export'))
+        permission_cache.version_cache().incr(permission_cache.VERSION_CACHE_KEY)
+        self.assertFalse(permission_cache.role_has_permission(self.role.id, 'role', 'export'))
+
+    @override_settings(PERMISSION_CACHE_ALIAS='default')
+    def test_local_cache_rejected(self):
+        with self.assertRaises(RuntimeError):
+            permission_cache.version_cache()
+
+
+# ===================== Session 合并写回 =====================
+# 批量阈值和间隔调大，队列只在测试里显式 flush；缓存用进程内缓存，不碰 cache/sessions 目录。
+@override_settings(SESSION_CACHE_ALIAS='default', SESSION_WRITE_BEHIND_BATCH=100,
+                   SESSION_WRITE_BEHIND_INTERVAL=3600)
+class SessionWriteBehindTests(TestCase):
+
+    def setUp(self):
+        write_behind_queue.flush()
+        self.addCleanup(write_behind_queue.flush)
+
+    def create(self, **data):
+        session = SessionStore()
+        session.update(data)
+        session.create()
+        return session
+
+    def test_writes_are_batched(self):
+        sessions = [self.create(erp_user_id=i) for i in range(3)]
+        keys = [s.session_key for s in sessions]
+        self.assertFalse(Session.objects.filter(session_key__in=keys).exists())
+        # 还没落库也能从缓存读到
+        self.assertEqual(SessionStore(keys[1])['erp_user_id'], 1)
+
+        flush_count = write_behind_queue.flush_count
+        self.assertEqual(write_behind_queue.flush(), 3)
+        self.assertEqual(write_behind_queue.flush_count, flush_count + 1)
+        self.assertEqual(Session.objects.filter(session_key__in=keys).count(), 3)
+
+        # 再次修改走 upsert，同一个key只保留最后一次
+        session = SessionStore(keys[0])
+        session['erp_user_id'] = 10
+        session.save()
+        session['erp_user_id'] = 11
+        session.save()
+        self.assertEqual(write_behind_queue.flush(), 1)
+        self.assertEqual(Session.objects.get(session_key=keys[0]).get_decoded()['erp_user_id'], 11)
+
+    def test_unchanged_session_not_written(self):
+        key = self.create(erp_user_id=1).session_key
+        write_behind_queue.flush()
+        session = SessionStore(key)
+        self.assertEqual(session['erp_user_id'], 1)
+        session.save()
+        self.assertNotIn(key, write_behind_queue)
+
+    def test_cache_miss_reads_queue_then_db(self):
+        session = self.create(erp_user_id=7)
+        key, cache = session.session_key, session._cache
+        cache.delete(session.cache_key)
+        self.assertEqual(SessionStore(key)['erp_user_id'], 7)  # 队列里还没落库的数据
+        write_behind_queue.flush()
+        cache.delete(session.cache_key)
+        with self.assertNumQueries(1):
+            self.assertEqual(SessionStore(key)['erp_user_id'], 7)  # 回源数据库并回填缓存
+        with self.assertNumQueries(0):
+            self.assertEqual(SessionStore(key)['erp_user_id'], 7)
+
+    def test_delete_leaves_tombstone(self):
+        session = self.create(erp_user_id=3)
+        key = session.session_key
+        session.delete()
+        # 队列里未落库的写入被丢弃，flush 后也不会"复活"
+        self.assertNotIn(key, write_behind_queue)
+        write_behind_queue.flush()
+        self.assertFalse(Session.objects.filter(session_key=key).exists())
+        self.assertEqual(session._cache.get(session.cache_key_prefix + key), TOMBSTONE)
+        reloaded = SessionStore(key)
+        self.assertEqual(reloaded.load(), {})
+        self.assertIsNone(reloaded.session_key)  # 墓碑命中后换新key，不会沿用已删除的Session
+
+    def test_logout_flow(self):
+        response = self.client.post('/api/login/', data=json.dumps({'username': 'admin', 'password': '123456'}),
+                                    content_type='application/json')
+        self.assertEqual(response.json()['code'], 200)
+        key = self.client.session.session_key
+        write_behind_queue.flush()
+        self.assertTrue(Session.objects.filter(session_key=key).exists())
+        self.client.session.flush()
+        self.assertFalse(Session.objects.filter(session_key=key).exists())
+        self.assertEqual(self.client.get('/api/get-materials/').json()['code'], 401)
+
+
+# ===================== 流式导出 =====================
+@override_settings(SESSION_WRITE_BEHIND_BATCH=1)
+class ExportTests(TestCase):
+    ROWS = CSV_ROWS_PER_CHUNK * 2 + 7
+
+    @classmethod
+    def setUpTestData(cls):
+        Material.objects.bulk_create([
+            Material(name=f'物料<{i}>&"x"', code=f'E{i:05d}', category='五金' if i % 2 else '电子', quantity=i)
+            for i in range(cls.ROWS)
+        ])
+        Material.objects.create(name='控制\x01字符', code='X-CTRL', category='其他')
+
+    def setUp(self):
+        response = self.client.post('/api/login/', data=json.dumps({'username': 'admin', 'password': '123456'}),
+                                    content_type='application/json')
+        self.assertEqual(response.json()['code'], 200)
+
+    def export(self, **params):
+        response = self.client.get('/api/export-materials/', params)
+        if not response.streaming:
+            self.fail(response.json())
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        self.assertIn("filename*=UTF-8''", response['Content-Disposition'])
+        chunks = list(response.streaming_content)
+        return response, chunks
+
+    def test_csv(self):
+        response, chunks = self.export(category='五金')
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertGreater(len(chunks), 2)  # 按块输出，不是一次性拼好
+        content = b''.join(chunks)
+        self.assertTrue(content.startswith('\ufeff'.encode('utf-8')))
+        rows = list(iter_csv_rows(io.BytesIO(content)))
+        self.assertEqual(rows[0][:3], ['ID', '物料名称', '物料编码'])
+        self.assertEqual(len(rows) - 1, Material.objects.filter(category='五金').count())
+        self.assertIn('物料<1>&"x"', {row[1] for row in rows[1:]})
+
+    def test_xlsx(self):
+        response, chunks = self.export(format='xlsx', sort='code')
+        self.assertEqual(response['Content-Type'], 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        rows = list(iter_xlsx_rows(io.BytesIO(b''.join(chunks))))
+        self.assertEqual(len(rows) - 1, self.ROWS + 1)
+        self.assertEqual(rows[1][1:3], ['物料<0>&"x"', 'E00000'])
+        self.assertEqual(rows[2][6], '1')  # 数值单元格
+        self.assertIn('控制字符', {row[1] for row in rows})  # XML 不允许的控制字符被剔除
+
+    def test_bad_params(self):
+        self.assertEqual(self.client.get('/api/export-materials/', {'format': 'pdf'}).json()['code'], 400)
+        self.assertEqual(self.client.get('/api/export-materials/', {'sort': '-password'}).json()['code'], 400)
+
+    def test_xlsx_is_lazy(self):
+        """文件头先输出，数据行按需从迭代器读取"""
+        consumed = []
+
+        def rows():
+            for i in range(3):
+                consumed.append(i)
+                yield [i, f'行{i}']
+
+        stream = iter_xlsx(['序号', '名称'], rows())
+        next(stream)
+        self.assertEqual(consumed, [])
+        rest = b''.join(stream)
+        self.assertEqual(consumed, [0, 1, 2])
+        self.assertTrue(rest)
+
+
+# ===================== 物料批量导入 =====================
+@override_settings(SESSION_WRITE_BEHIND_BATCH=1)
+class MaterialImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Material.objects.create(name='旧名称', code='IM001', category='五金', quantity=1)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        response = self.client.post('/api/login/', data=json.dumps({'username': 'admin', 'password': '123456'}),
+                                    content_type='application/json')
+        self.assertEqual(response.json()['code'], 200)
+
+    def import_csv(self, text, mode='skip'):
+        upload = SimpleUploadedFile('物料.csv', text.encode('utf-8'), content_type='text/csv')
+        return self.client.post('/api/import-materials/', {'file': upload, 'mode': mode}).json()
+
+    def test_upsert_and_error_report(self):
+        data = self.import_csv(
+            '物料名称,物料编码,物料分类,数量\n'
+            '新名称,IM001,五金,5\n'
+            '新物料,IM002,电子,3\n'
+            ',IM003,电子,1\n'
+            '重复,IM002,电子,1\n'
+            '负数,IM004,电子,-1\n', mode='upsert')
+        self.assertEqual(data['code'], 200, data)
+        result = data['data']
+        self.assertEqual((result['total'], result['created'], result['updated'], result['failed']), (5, 1, 1, 3))
+        self.assertEqual(Material.objects.get(code='IM001').name, '新名称')
+        self.assertEqual(Material.objects.get(code='IM002').quantity, 3)
+        self.assertFalse(Material.objects.filter(code__in=['IM003', 'IM004']).exists())
+
+        response = self.client.get(f"/api/import-materials/report/{result['report_id']}/")
+        rows = list(iter_csv_rows(io.BytesIO(b''.join(response.streaming_content))))
+        self.assertEqual(rows[0][:2], ['行号', '错误原因'])
+        self.assertEqual([row[0] for row in rows[1:]], ['4', '5', '6'])
+        self.assertIn('重复', rows[2][1])
+
+    def test_skip_mode_rejects_existing(self):
+        result = self.import_csv('name,code\n新名称,IM001\n')['data']
+        self.assertEqual((result['created'], result['failed']), (0, 1))
+        self.assertEqual(Material.objects.get(code='IM001').name, '旧名称')
+
+    def test_quantity_out_of_range(self):
+        """inf、1e30 等超出整数列范围的数量记入错误报告，不中断导入"""
+        max_quantity = 2 ** 63 - 1
+        result = self.import_csv(
+            'name,code,quantity\n'
+            f'最大,Q1,{max_quantity}\n'
+            'inf,Q2,inf\n'
+            '科学计数,Q3,1e30\n'
+            f'越界,Q4,{max_quantity + 1}\n'
+            'nan,Q5,nan\n'
+            '小数,Q6,12.0\n')['data']
+        self.assertEqual((result['total'], result['created'], result['failed']), (6, 2, 4))
+        self.assertEqual(Material.objects.get(code='Q1').quantity, max_quantity)
+        self.assertEqual(Material.objects.get(code='Q6').quantity, 12)
+
+        with open(report_path(result['report_id']), encoding='utf-8-sig') as fp:
+            rows = list(csv.reader(fp))[1:]
+        self.assertEqual([row[0] for row in rows], ['3', '4', '5', '6'])
+        self.assertIn('数字', rows[0][1])
+        self.assertIn('超出范围', rows[1][1])
+
+    def test_write_overflow_reported_per_row(self):
+        """校验放过的超范围取值在写库时溢出：整批退化为逐行写入，只有该行进错误报告"""
+        rows = [['name', 'code', 'quantity'], ['正常', 'W1', '1'], ['溢出', 'W2', '1e30'], ['正常', 'W3', '2']]
+        with mock.patch.object(MaterialImporter, '_quantity_max', return_value=10 ** 40):
+            result = MaterialImporter().run(rows)
+        self.assertEqual((result['created'], result['failed']), (2, 1))
+        self.assertEqual(set(Material.objects.filter(code__startswith='W').values_list('code', flat=True)),
+                         {'W1', 'W3'})
+
+    def test_report_expires(self):
+        old_id = self.import_csv('name,code\n,X1\n')['data']['report_id']
+        old_path = report_path(old_id)
+        stale = time.time() - REPORT_EXPIRE_HOURS * 3600 - 60
+        os.utime(old_path, (stale, stale))
+        data = self.client.get(f'/api/import-materials/report/{old_id}/').json()
+        self.assertEqual(data['code'], 404)
+
+        # 生成新报告时顺带删除过期的
+        new_id = self.import_csv('name,code\n,X2\n')['data']['report_id']
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(report_path(new_id)))
+
+
+# ===================== 附件存储后端 =====================
+# 通过接口完整走一遍 上传 → 下载 → 打包 → 去重 → 删除，本地存储和 S3（moto 替身）各一遍。
+# 附件写到临时 MEDIA_ROOT，不碰项目目录下的文件。
+S3_BUCKET = 'erp-attachments-test'
+
+
+class AttachmentTestMixin:
+    """临时 MEDIA_ROOT + 登录 + 上传/删除辅助方法"""
+    content = b''.join(f'{i},物料{i}\n'.encode() for i in range(20000))
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, SESSION_WRITE_BEHIND_BATCH=1,
+                                              **self.storage_settings())
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.media_root = media_root
+        self.material = Material.objects.create(name='附件测试', code='F001')
+        response = self.client.post('/api/login/', data=json.dumps({'username': 'admin', 'password': '123456'}),
+                                    content_type='application/json')
+        self.assertEqual(response.json()['code'], 200)
+
+    def storage_settings(self):
+        return {}
+
+    def upload(self, name):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/upload-material-files/{self.material.id}/',
+                                        {'files': [SimpleUploadedFile(name, self.content)]})
+        self.assertEqual(response.json()['code'], 200)
+        return MaterialFile.objects.get(id=response.json()['data'][0]['id'])
+
+    def delete(self, material_file):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'/api/delete-material-file/{self.material.id}/{material_file.id}/')
+        self.assertEqual(response.json()['code'], 200)
+
+    def local_files(self):
+        return [name for _, _, names in os.walk(self.media_root) for name in names]
+
+
+class AttachmentStorageTestMixin(AttachmentTestMixin):
+
+    def test_zip_and_open(self):
+        material_file = self.upload('a.csv')
+        with open_attachment(material_file.file_path) as fp:
+            fp.seek(1000)
+            self.assertEqual(fp.read(500), self.content[1000:1500])
+        response = self.client.get(f'/api/download-material-files-zip/{self.material.id}/')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(archive.read('a.csv'), self.content)
+
+    def test_dedup_and_delete(self):
+        first, second = self.upload('a.csv'), self.upload('b.csv')
+        self.assertEqual(first.file_path, second.file_path)
+        self.assertEqual(AttachmentBlob.objects.get(id=first.blob_id).ref_count, 2)
+        storage = attachment_storage.get_attachment_storage()
+        self.delete(first)
+        self.assertTrue(storage.exists(first.file_path))
+        self.delete(second)
+        self.assertFalse(storage.exists(first.file_path))
+        self.assertFalse(AttachmentBlob.objects.exists())
+
+
+class LocalAttachmentStorageTests(AttachmentStorageTestMixin, TestCase):
+
+    def test_download_served_by_django(self):
+        material_file = self.upload('a.csv')
+        self.assertEqual(self.local_files(), [hashlib.sha256(self.content).hexdigest()])
+        response = self.client.get(f'/api/material-file-url/{self.material.id}/{material_file.id}/')
+        self.assertIsNone(response.json()['data']['url'])
+
+        url = f'/api/download-material-file/{self.material.id}/{material_file.id}/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        response = self.client.get(url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.content[100:200])
+
+
+@skipUnless(mock_aws and attachment_storage.boto3, '需要安装 boto3 和 moto')
+class S3AttachmentStorageTests(AttachmentStorageTestMixin, TestCase):
+
+    def setUp(self):
+        mock = mock_aws()
+        mock.start()
+        self.addCleanup(mock.stop)
+        attachment_storage._storages.clear()  # 客户端要在 mock 启动后创建
+        self.addCleanup(attachment_storage._storages.clear)
+        super().setUp()
+        self.s3 = attachment_storage.get_attachment_storage().client
+        self.s3.create_bucket(Bucket=S3_BUCKET)
+
+    def storage_settings(self):
+        return {
+            'ATTACHMENT_STORAGE_BACKEND': 's3',
+            'ATTACHMENT_S3_BUCKET': S3_BUCKET,
+            'ATTACHMENT_S3_PREFIX': 'erp/',
+            'ATTACHMENT_S3_REGION': 'us-east-1',
+            'ATTACHMENT_S3_ACCESS_KEY': 'testing',
+            'ATTACHMENT_S3_SECRET_KEY': 'testing',
+            'ATTACHMENT_PRESIGNED_URL_EXPIRE': 120,
+        }
+
+    def test_upload_goes_to_bucket(self):
+        material_file = self.upload('a.csv')
+        self.assertEqual(material_file.file_path, blob_relpath(hashlib.sha256(self.content).hexdigest()))
+        body = self.s3.get_object(Bucket=S3_BUCKET, Key='erp/' + material_file.file_path)['Body'].read()
+        self.assertEqual(body, self.content)
+        self.assertEqual(self.local_files(), [])  # 本地暂存文件上传后即删除
+
+    def bucket_keys(self):
+        return [obj['Key'] for obj in self.s3.list_objects_v2(Bucket=S3_BUCKET).get('Contents', [])]
+
+    def test_failed_upload_removes_staged_objects(self):
+        """第二个文件失败时，第一个已提前上传的对象要删掉；已有记录引用的内容不能删"""
+        existing = self.upload('a.csv')
+        stage_blob = attachments.stage_blob
+        calls = []
+
+        def flaky_stage(relpath, sha256):
+            calls.append(sha256)
+            if len(calls) == 3:
+                raise OSError('network down')
+            return stage_blob(relpath, sha256)
+
+        files = [SimpleUploadedFile('a.csv', self.content), SimpleUploadedFile('new.csv', b'new content'),
+                 SimpleUploadedFile('c.csv', b'third')]
+        with mock.patch('myerpapp.file_view.stage_blob', side_effect=flaky_stage):
+            response = self.client.post(f'/api/upload-material-files/{self.material.id}/', {'files': files})
+        self.assertEqual(response.json()['code'], 500)
+        self.assertEqual(self.bucket_keys(), ['erp/' + existing.file_path])
+        self.assertEqual(MaterialFile.objects.count(), 1)
+        self.assertEqual(self.local_files(), [])
+
+    def test_failed_complete_removes_staged_object(self):
+        upload = self.client.post(f'/api/upload-sessions/create/{self.material.id}/', content_type='application/json',
+                                  data=json.dumps({'name': 'big.csv', 'size': len(self.content),
+                                                   'chunk_size': len(self.content)})).json()['data']
+        self.client.put(f"/api/upload-sessions/{upload['upload_id']}/chunk/", data=self.content,
+                        content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET='0')
+        with mock.patch('myerpapp.upload_views.store_blob', side_effect=OSError('disk full')):
+            data = self.client.post(f"/api/upload-sessions/{upload['upload_id']}/complete/").json()
+        self.assertEqual(data['code'], 500)
+        self.assertEqual(self.bucket_keys(), [])
+        self.assertFalse(AttachmentBlob.objects.exists())
+
+    def test_download_redirects_to_presigned_url(self):
+        material_file = self.upload('图纸.csv')
+        response = self.client.get(f'/api/download-material-file/{self.material.id}/{material_file.id}/')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('X-Amz-Signature=', response['Location'])
+        self.assertIn('X-Amz-Expires=120', response['Location'])
+        self.assertIn('response-content-disposition=', response['Location'])
+
+        data = self.client.get(f'/api/material-file-url/{self.material.id}/{material_file.id}/').json()['data']
+        self.assertIn('X-Amz-Signature=', data['url'])
+        self.assertEqual(data['expires_in'], 120)
+
+
+# ===================== 附件引用计数 =====================
+class AttachmentRefCountTests(AttachmentTestMixin, TestCase):
+
+    def test_reupload_before_purge_keeps_file(self):
+        """引用数降到 0 后、提交回调删文件前又上传了同样内容：文件和记录都要保留"""
+        material_file = self.upload('a.csv')
+        storage = attachment_storage.get_attachment_storage()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.client.delete(f'/api/delete-material-file/{self.material.id}/{material_file.id}/')
+        self.assertEqual(response.json()['code'], 200)
+        again = self.upload('b.csv')
+        for callback in callbacks:
+            callback()
+        self.assertTrue(storage.exists(again.file_path))
+        self.assertEqual(AttachmentBlob.objects.get(id=again.blob_id).ref_count, 1)
+
+        self.delete(again)
+        self.assertFalse(storage.exists(again.file_path))
+        self.assertFalse(AttachmentBlob.objects.exists())
+
+    def test_delete_material_releases_refs(self):
+        shared = self.upload('a.csv')
+        other = Material.objects.create(name='另一个物料', code='F002')
+        MaterialFile.objects.create(material=other, blob_id=shared.blob_id, name='b.csv', file_path=shared.file_path,
+                                    size=shared.size, sha256=shared.sha256)
+        AttachmentBlob.objects.filter(id=shared.blob_id).update(ref_count=2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'/api/delete-material/{self.material.id}/')
+        self.assertEqual(response.json()['code'], 200)
+        self.assertEqual(AttachmentBlob.objects.get(id=shared.blob_id).ref_count, 1)
+        self.assertTrue(attachment_storage.get_attachment_storage().exists(shared.file_path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/delete-material/{other.id}/')
+        self.assertFalse(AttachmentBlob.objects.exists())
+        self.assertEqual(self.local_files(), [])
+
+
+# ===================== 打包下载 =====================
+class AttachmentZipTests(AttachmentTestMixin, TestCase):
+
+    def download_zip(self, url):
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_multiple_materials(self):
+        first = self.upload('图纸.csv')
+        self.upload('图纸.csv')
+        self.upload('a/b.png')
+        other = Material.objects.create(name='螺母', code='F002')
+        MaterialFile.objects.create(material=other, blob_id=first.blob_id, name='图纸.csv', file_path=first.file_path,
+                                    size=first.size, sha256=first.sha256)
+        MaterialFile.objects.create(material=other, name='丢了.txt', file_path='material_files/00/00/gone.txt', size=1)
+
+        archive = self.download_zip(f'/api/download-material-files-zip/?material_ids={self.material.id},{other.id}')
+        self.assertEqual(archive.namelist(), [
+            'F001_附件测试/图纸.csv', 'F001_附件测试/图纸 (2).csv', 'F001_附件测试/b.png',
+            'F002_螺母/图纸.csv', '缺失文件.txt',
+        ])
+        self.assertEqual(archive.read('F002_螺母/图纸.csv'), self.content)
+        self.assertIn('F002_螺母/丢了.txt', archive.read('缺失文件.txt').decode())
+        # 已压缩格式直接存储，文本 deflate
+        self.assertEqual(archive.getinfo('F001_附件测试/b.png').compress_type, zipfile.ZIP_STORED)
+        self.assertEqual(archive.getinfo('F001_附件测试/图纸.csv').compress_type, zipfile.ZIP_DEFLATED)
+        self.assertIsNone(archive.testzip())
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get('/api/download-material-files-zip/').json()['code'], 400)
+        self.assertEqual(self.client.get('/api/download-material-files-zip/?material_ids=1,x').json()['code'], 400)
+        self.assertEqual(self.client.get(f'/api/download-material-files-zip/{self.material.id}/').json()['code'], 404)
+
+    def test_streams_in_blocks(self):
+        """大文件按块读、按块输出：第一块数据产出时文件还没读完"""
+        path = os.path.join(self.media_root, 'big.bin')
+        with open(path, 'wb') as fp:
+            fp.write(os.urandom(3 * ZIP_READ_BLOCK_SIZE))
+        reads = []
+
+        def opener(p):
+            fp = open(p, 'rb')
+            original = fp.read
+            fp.read = lambda n=-1: reads.append(n) or original(n)
+            return fp
+
+        stream = iter_zip([('big.bin', path, (2024, 1, 1, 0, 0, 0))], opener=opener)
+        first = next(stream)
+        self.assertTrue(first)
+        self.assertLess(len(reads), 4)
+        chunks = [first] + list(stream)
+        self.assertGreater(len(chunks), 3)
+        self.assertTrue(all(n == ZIP_READ_BLOCK_SIZE for n in reads))
+        with open(path, 'rb') as fp:
+            self.assertEqual(zipfile.ZipFile(io.BytesIO(b''.join(chunks))).read('big.bin'), fp.read())
+
+
+# ===================== 旧附件迁移 =====================
+class MigrateAttachmentLayoutTests(AttachmentTestMixin, TestCase):
+
+    def legacy_file(self, relpath, content, *names):
+        full_path = os.path.join(self.media_root, *relpath.split('/'))
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as fp:
+            fp.write(content)
+        return [MaterialFile.objects.create(material=self.material, name=name, file_path=relpath, size=len(content))
+                for name in names]
+
+    def download(self, material_file):
+        response = self.client.get(f'/api/download-material-file/{self.material.id}/{material_file.id}/')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def migrate(self, **options):
+        out = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('migrate_attachment_layout', stdout=out, stderr=io.StringIO(), **options)
+        return out.getvalue()
+
+    def test_round_trip(self):
+        other = b'other content'
+        shared = self.legacy_file('material_files/图纸.csv_20240101', self.content, '图纸.csv', '图纸副本.csv')
+        same = self.legacy_file('material_files/另一份.csv_20240102', self.content, '另一份.csv')
+        single = self.legacy_file('material_files/b.txt_20240103', other, 'b.txt')
+        missing = MaterialFile.objects.create(material=self.material, name='丢了.txt',
+                                              file_path='material_files/gone.txt_1', size=1)
+        files = shared + same + single
+        before = {f.id: self.download(f) for f in files}
+
+        self.assertIn('待迁移旧附件记录：5条', self.migrate(dry_run=True))
+        self.assertIn('剩余旧附件1条', self.migrate(batch_size=1))
+
+        sha256 = hashlib.sha256(self.content).hexdigest()
+        for material_file in files:
+            material_file.refresh_from_db()
+            self.assertIsNotNone(material_file.blob_id)
+            self.assertEqual(material_file.file_path, blob_relpath(material_file.sha256))
+            self.assertEqual(self.download(material_file), before[material_file.id])
+        # 相同内容去重为一份，引用数等于记录数
+        self.assertEqual(AttachmentBlob.objects.get(sha256=sha256).ref_count, 3)
+        self.assertEqual(AttachmentBlob.objects.get(sha256=hashlib.sha256(other).hexdigest()).ref_count, 1)
+        self.assertEqual(sorted(self.local_files()), sorted([sha256, hashlib.sha256(other).hexdigest()]))
+        # 找不到文件的保持原样，留给对账处理；重复执行不再改动
+        missing.refresh_from_db()
+        self.assertIsNone(missing.blob_id)
+        self.assertIn('迁移完成：0条记录', self.migrate())
+
+    def test_limit(self):
+        for i in range(3):
+            self.legacy_file(f'material_files/{i}.txt_1', f'内容{i}'.encode(), f'{i}.txt')
+        self.migrate(limit=2)
+        self.assertEqual(MaterialFile.objects.filter(blob__isnull=True).count(), 1)
+
+
+# ===================== 附件对账 =====================
+class ReconcileAttachmentsTests(AttachmentTestMixin, TestCase):
+    OLD = time.time() - 2 * 3600  # 早于默认 --min-age-hours 1
+
+    def setUp(self):
+        super().setUp()
+        state_file = os.path.join(self.media_root, 'attachment_reconcile.json')
+        self.enterContext(mock.patch('myerpapp.management.commands.reconcile_attachments.STATE_FILE', state_file))
+
+    def write(self, relpath, content=b'x', mtime=OLD):
+        full_path = os.path.join(self.media_root, *relpath.split('/'))
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as fp:
+            fp.write(content)
+        os.utime(full_path, (mtime, mtime))
+        return full_path
+
+    def reconcile(self, *args):
+        out = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('reconcile_attachments', '--json', '--reset', *args, stdout=out)
+        return json.loads(out.getvalue())
+
+    def test_orphans(self):
+        kept = self.upload('a.csv')
+        os.utime(os.path.join(self.media_root, *kept.file_path.split('/')), (self.OLD, self.OLD))
+        orphan = self.write('material_files/ab/cd/orphan')
+        legacy_orphan = self.write('material_files/old.txt_1')
+        fresh = self.write('material_files/ab/cd/uploading', mtime=time.time())
+
+        report = self.reconcile()
+        self.assertEqual(report['orphan_files'], 2)
+        self.assertEqual(sorted(report['orphan_samples']), ['material_files/ab/cd/orphan', 'material_files/old.txt_1'])
+        self.assertTrue(os.path.exists(orphan))  # report 只报告
+
+        report = self.reconcile('--action', 'quarantine')
+        self.assertEqual(report['orphan_files'], 2)
+        self.assertFalse(os.path.exists(orphan) or os.path.exists(legacy_orphan))
+        day = datetime.now().strftime('%Y%m%d')
+        self.assertTrue(os.path.exists(os.path.join(
+            self.media_root, 'attachment_quarantine', day, 'material_files', 'ab', 'cd', 'orphan')))
+        self.assertTrue(os.path.exists(fresh))  # 刚写入的文件可能是正在上传的
+        with open_attachment(kept.file_path) as fp:
+            self.assertEqual(fp.read(), self.content)
+
+        self.write('material_files/ef/01/orphan2')
+        self.assertEqual(self.reconcile('--action', 'delete')['orphan_files'], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'material_files', 'ef', '01', 'orphan2')))
+
+    def test_missing_rows(self):
+        material_file = self.upload('a.csv')
+        full_path = os.path.join(self.media_root, *material_file.file_path.split('/'))
+        moved = full_path + '.bak'
+        os.rename(full_path, moved)
+        self.assertEqual(self.reconcile()['missing_rows'], 1)
+        self.assertTrue(MaterialFile.objects.get(id=material_file.id).file_missing)
+        os.rename(moved, full_path)
+        self.assertEqual(self.reconcile()['recovered_rows'], 1)
+        self.assertFalse(MaterialFile.objects.get(id=material_file.id).file_missing)
+
+    def test_fix_refcounts(self):
+        drifted = self.upload('a.csv')
+        AttachmentBlob.objects.filter(id=drifted.blob_id).update(ref_count=5)
+        # 提交后删除文件失败留下的无引用记录
+        leftover = AttachmentBlob.objects.create(sha256='f' * 64, size=1, stored_size=1, ref_count=0,
+                                                 path=blob_relpath('f' * 64))
+        leftover_path = self.write(leftover.path)
+
+        report = self.reconcile('--action', 'delete', '--fix-refcounts')
+        self.assertEqual(report['refcount_fixed'], 1)
+        self.assertEqual(report['dead_blobs'], 1)
+        self.assertEqual(AttachmentBlob.objects.get(id=drifted.blob_id).ref_count, 1)
+        self.assertFalse(AttachmentBlob.objects.filter(id=leftover.id).exists())
+        self.assertFalse(os.path.exists(leftover_path))
+
+    def test_stale_parts_and_incremental_units(self):
+        stale = self.write('upload_parts/' + 'a' * 32 + '.part')
+        for shard in ('00', '01', '02'):
+            self.write(f'material_files/{shard}/00/orphan')
+        out = io.StringIO()
+        call_command('reconcile_attachments', '--json', '--reset', '--units', '2', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['stale_parts'], 1)
+        self.assertTrue(os.path.exists(stale))  # report 只统计
+        self.assertEqual(report['orphan_files'], 1)  # 根目录单元 + 分片 00
+
+        out = io.StringIO()
+        call_command('reconcile_attachments', '--json', '--units', '2', '--action', 'delete', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['orphan_files'], 2)  # 从上次进度继续：分片 01、02
+        self.assertFalse(os.path.exists(stale))
+
+
+# ===================== 压缩存储 =====================
+class CompressedAttachmentTests(AttachmentTestMixin, TestCase):
+    # 跨越多个 1MB 帧，Range 需要在帧边界两侧各解压一帧
+    content = b''.join(f'{i:08d},物料{i % 997},规格{i % 13}\n'.encode() for i in range(120000))
+
+    def setUp(self):
+        super().setUp()
+        self.material_file = self.upload('明细.csv')
+        out = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('compress_attachments', '--cold-days', '0', '--codec', 'zlib', stdout=out)
+        self.material_file.refresh_from_db()
+        self.url = f'/api/download-material-file/{self.material.id}/{self.material_file.id}/'
+
+    def get(self, **headers):
+        response = self.client.get(self.url, **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_compress_round_trip(self):
+        self.assertGreater(len(self.content), 2 * FRAME_SIZE)
+        blob = AttachmentBlob.objects.get(id=self.material_file.blob_id)
+        self.assertEqual((blob.codec, blob.path), ('zlib', blob_relpath(blob.sha256) + COMPRESSED_SUFFIX))
+        self.assertEqual(self.material_file.file_path, blob.path)
+        self.assertLess(blob.stored_size, blob.size // 2)
+        self.assertEqual(self.local_files(), [blob.sha256 + COMPRESSED_SUFFIX])  # 原文件提交后删除
+
+        response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+        self.assertEqual(body, self.content)
+        # 打包下载同样按原始内容
+        response = self.client.get(f'/api/download-material-files-zip/{self.material.id}/')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(archive.read('明细.csv'), self.content)
+        # 再执行一次不会重复压缩
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('compress_attachments', '--cold-days', '0', '--codec', 'zlib', stdout=io.StringIO())
+        self.assertEqual(AttachmentBlob.objects.get(id=blob.id).path, blob.path)
+
+    def test_range_across_frames(self):
+        start, end = FRAME_SIZE - 100, FRAME_SIZE + 99
+        response, body = self.get(HTTP_RANGE=f'bytes={start}-{end}')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes {start}-{end}/{len(self.content)}')
+        self.assertEqual(body, self.content[start:end + 1])
+
+        response, body = self.get(HTTP_RANGE='bytes=-10')
+        self.assertEqual(body, self.content[-10:])
+        response, body = self.get(HTTP_RANGE=f'bytes={2 * FRAME_SIZE}-')
+        self.assertEqual(body, self.content[2 * FRAME_SIZE:])
+
+    def test_if_range(self):
+        etag = f'"{self.material_file.sha256}"'
+        response, body = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual((response.status_code, body), (206, self.content[:10]))
+        # 版本不一致：忽略 Range，返回完整文件
+        response, body = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual((response.status_code, body), (200, self.content))
+        response, _ = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_unsatisfiable_range(self):
+        response, _ = self.get(HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')  # 原始大小，不是压缩后大小
+
+
+# ===================== 断点续传 / 秒传 =====================
+class ChunkedUploadTests(AttachmentTestMixin, TestCase):
+    chunk_size = MIN_CHUNK_SIZE
+
+    def create_session(self, **extra):
+        data = {'name': '大文件.csv', 'size': len(self.content), 'chunk_size': self.chunk_size, **extra}
+        response = self.client.post(f'/api/upload-sessions/create/{self.material.id}/', data=json.dumps(data),
+                                    content_type='application/json').json()
+        self.assertEqual(response['code'], 200, response)
+        return response['data']
+
+    def put_chunk(self, upload_id, index, data=None, checksum=None):
+        offset = index * self.chunk_size
+        data = self.content[offset:offset + self.chunk_size] if data is None else data
+        digest = base64.b64encode(hashlib.sha256(checksum or data).digest()).decode()
+        return self.client.put(f'/api/upload-sessions/{upload_id}/chunk/', data=data,
+                               content_type='application/offset+octet-stream',
+                               HTTP_UPLOAD_OFFSET=str(offset), HTTP_UPLOAD_CHECKSUM=f'sha256 {digest}').json()
+
+    def complete(self, upload_id):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f'/api/upload-sessions/{upload_id}/complete/').json()
+
+    def test_resume(self):
+        session = self.create_session(checksum=hashlib.sha256(self.content).hexdigest())
+        upload_id = session['upload_id']
+        self.assertEqual(session['chunk_count'], 2)
+
+        # 后一块先到，进度里只缺第 0 块，tus 偏移停在 0
+        self.assertEqual(self.put_chunk(upload_id, 1)['code'], 200)
+        response = self.client.get(f'/api/upload-sessions/{upload_id}/')
+        self.assertEqual(response.json()['data']['missing_chunks'], [0])
+        self.assertEqual(response['Upload-Offset'], '0')
+        self.assertEqual(self.complete(upload_id)['code'], 400)
+
+        # 校验和不对的块不记进度
+        self.assertEqual(self.put_chunk(upload_id, 0, checksum=b'other')['code'], 400)
+        self.assertEqual(self.client.get(f'/api/upload-sessions/{upload_id}/').json()['data']['missing_chunks'], [0])
+
+        self.assertEqual(self.put_chunk(upload_id, 0)['code'], 200)
+        data = self.complete(upload_id)
+        self.assertEqual(data['code'], 200, data)
+        material_file = MaterialFile.objects.get(id=data['data']['id'])
+        with open_attachment(material_file.file_path) as fp:
+            self.assertEqual(fp.read(), self.content)
+        # 临时文件直接 rename 为内容地址，不留副本
+        self.assertEqual(self.local_files(), [hashlib.sha256(self.content).hexdigest()])
+        self.assertFalse(MaterialUpload.objects.exists())
+        self.assertEqual(self.complete(upload_id)['code'], 404)
+
+    def test_wrong_checksum_rejected_at_complete(self):
+        upload_id = self.create_session(checksum='0' * 64)['upload_id']
+        for index in range(2):
+            self.assertEqual(self.put_chunk(upload_id, index)['code'], 200)
+        self.assertEqual(self.complete(upload_id)['code'], 400)
+        self.assertFalse(MaterialFile.objects.exists())
+
+    def test_concurrent_complete(self):
+        """两个请求同时提交：后到的请求读到的会话已被先到的删除，只能生成一个附件"""
+        upload_id = self.create_session()['upload_id']
+        for index in range(2):
+            self.put_chunk(upload_id, index)
+        stale = MaterialUpload.objects.get(upload_id=upload_id)
+        self.assertEqual(self.complete(upload_id)['code'], 200)
+        with mock.patch('myerpapp.upload_views.get_user_upload', return_value=stale), \
+                mock.patch('myerpapp.upload_views.upload_progress', return_value={'missing_chunks': []}), \
+                mock.patch('myerpapp.upload_views.file_sha256',
+                           return_value=(hashlib.sha256(self.content).hexdigest(), len(self.content))), \
+                mock.patch('myerpapp.upload_views.stage_blob', side_effect=lambda relpath, sha256: relpath):
+            data = self.complete(upload_id)
+        self.assertEqual(data, {'code': 404, 'msg': '上传会话已完成', 'data': {}})
+        self.assertEqual(MaterialFile.objects.count(), 1)
+        self.assertEqual(AttachmentBlob.objects.get().ref_count, 1)
+
+
+class PrecheckUploadTests(AttachmentTestMixin, TestCase):
+
+    def precheck(self, files):
+        return self.client.post(f'/api/upload-material-files/precheck/{self.material.id}/',
+                                data=json.dumps({'files': files}), content_type='application/json').json()
+
+    def test_links_existing_content(self):
+        existing = self.upload('a.csv')
+        sha256 = hashlib.sha256(self.content).hexdigest()
+        data = self.precheck([
+            {'name': '新的.csv', 'size': len(self.content), 'sha256': sha256},
+            {'name': '没有的.csv', 'size': 10, 'sha256': '1' * 64},
+            {'name': '大小不符.csv', 'size': len(self.content) - 1, 'sha256': sha256},
+        ])
+        self.assertEqual(data['code'], 200, data)
+        self.assertEqual([item['index'] for item in data['data']['linked']], [0])
+        self.assertEqual(data['data']['missing'], [1, 2])
+
+        linked = MaterialFile.objects.get(id=data['data']['linked'][0]['id'])
+        self.assertEqual((linked.name, linked.blob_id, linked.file_path), ('新的.csv', existing.blob_id, existing.file_path))
+        self.assertEqual(AttachmentBlob.objects.get(id=existing.blob_id).ref_count, 2)
+        self.assertEqual(len(self.local_files()), 1)  # 只加引用，不多存一份
+
+    def test_missing_file_not_linked(self):
+        """实体文件丢失（磁盘与数据库不一致）时按未命中处理，让客户端重新上传"""
+        existing = self.upload('a.csv')
+        attachment_storage.get_attachment_storage().delete(existing.file_path)
+        data = self.precheck([{'name': 'b.csv', 'size': len(self.content), 'sha256': existing.sha256}])
+        self.assertEqual(data['data'], {'linked': [], 'missing': [0]})
+        self.assertEqual(AttachmentBlob.objects.get(id=existing.blob_id).ref_count, 1)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.precheck([])['code'], 400)
+        self.assertEqual(self.precheck([{'name': 'a.csv', 'size': 1, 'sha256': 'xyz'}])['code'], 400)
+        response = self.client.post('/api/upload-material-files/precheck/999999/', content_type='application/json',
+                                    data=json.dumps({'files': [{'name': 'a', 'size': 1, 'sha256': '1' * 64}]}))
+        self.assertEqual(response.json()['code'], 404)
+
+
+# ===================== 审批流转 =====================
+# 流程图缓存 approval_graph._graphs 按 (flow_id, 版本号) 进程内共享，测试回滚后流程ID会复用，每个测试前清空。
+# 审批实例接口只用 JWT 认证（按用户名带上各自的 JWT）；流程编辑接口走 ERP 登录态，用单独登录 admin 的客户端。
+class ApprovalTestMixin:
+
+    def setUp(self):
+        approval_graph._graphs.clear()
+        self.users = {name: User.objects.create_user(name, password='x') for name in ('alice', 'bob', 'carol')}
+        self.editor = Client()
+        response = self.editor.post('/api/login/', data=json.dumps({'username': 'admin', 'password': '123456'}),
+                                    content_type='application/json')
+        self.assertEqual(response.json()['code'], 200)
+
+    def node(self, key, node_type='approver', approvers=(), next_keys=(), join_mode='all'):
+        """编辑器提交的节点：审批人按用户名指定，连线按 node_key 指定"""
+        return {'node_key': key, 'name': key, 'node_type': node_type, 'join_mode': join_mode,
+                'approver_config': {'type': 'user', 'user_ids': [self.users[name].id for name in approvers]},
+                'next_nodes': {'next': list(next_keys)}}
+
+    def make_flow(self, *nodes, code='purchase'):
+        flow = ApprovalFlow.objects.create(name='采购审批', code=code)
+        save_flow_nodes(flow, list(nodes))
+        return flow
+
+    def save_nodes(self, flow, nodes):
+        """流程编辑器保存节点，返回各类变更数量"""
+        response = self.editor.post('/api/approval/nodes/save/', data=json.dumps({'flow_id': flow.id, 'nodes': nodes}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        flow.refresh_from_db()
+        return response.json()['data']
+
+    def api(self, username, url, data):
+        user = self.users[username]
+        return self.client.post(url, data=json.dumps(data), content_type='application/json',
+                                HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+    def create(self, flow, username='carol', **extra):
+        response = self.api(username, '/api/approval/instances/create/', {'flow': flow.id, **extra})
+        self.assertEqual(response.status_code, 200, response.content)
+        return ApprovalInstance.objects.get(id=response.json()['data']['id'])
+
+    def operate(self, username, instance, action='approve', node=None):
+        data = {'instance_id': instance.id, 'action': action}
+        if node is not None:
+            data['node_id'] = self.node_id(instance, node)
+        return self.api(username, '/api/approval/instances/operate/', data)
+
+    def node_id(self, instance, key):
+        """实例所在流程版本中 node_key 对应的节点ID"""
+        graph = get_flow_graph(instance.flow_id, instance.flow_version)
+        return next(node.id for node in graph.nodes.values() if node.key == key)
+
+    def active_nodes(self, instance):
+        return set(ApprovalToken.objects.filter(instance=instance, status='active').values_list(
+            'node__node_key', flat=True))
+
+    def inbox(self, username):
+        """我的待办接口：[(实例ID, 节点名称)]"""
+        user = self.users[username]
+        response = self.client.get('/api/approval/inbox/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        self.assertEqual(response.status_code, 200)
+        return [(task['instance_id'], task['node_name']) for task in response.json()['data']['list']]
+
+    def pending(self, instance=None):
+        """pending 待办：{(节点 node_key, 审批人用户名)}"""
+        tasks = ApprovalTask.objects.filter(status='pending')
+        if instance is not None:
+            tasks = tasks.filter(instance=instance)
+        return set(tasks.values_list('node__node_key', 'approver__username'))
+
+
+@override_settings(SESSION_WRITE_BEHIND_BATCH=1)
+class ApprovalGraphTests(ApprovalTestMixin, TestCase):
+
+    def linear_flow(self):
+        return self.make_flow(
+            self.node('start', 'start', next_keys=['manager']),
+            self.node('manager', approvers=['alice'], next_keys=['end']),
+            self.node('end', 'end'),
+        )
+
+    def test_compile(self):
+        flow = self.make_flow(
+            self.node('start', 'start', next_keys=['a', 'b']),
+            self.node('a', approvers=['alice'], next_keys=['join']),
+            self.node('b', next_keys=['join', 'missing']),
+            self.node('join', 'join', next_keys=['end']),
+            self.node('end', 'end'),
+        )
+        graph = get_flow_graph(flow.id, flow.version)
+        nodes = {node.key: node for node in graph.nodes.values()}
+        self.assertEqual(graph.start_id, nodes['start'].id)
+        self.assertEqual([node.key for node in graph.targets(nodes['start'].id)], ['a', 'b'])
+        self.assertEqual(nodes['a'].approver_ids, {self.users['alice'].id})
+        self.assertIsNone(nodes['b'].approver_ids)
+        self.assertEqual(nodes['join'].in_degree, 2)
+        self.assertEqual(nodes['join'].upstream_ids, {nodes['start'].id, nodes['a'].id, nodes['b'].id})
+        with self.assertRaises(ValueError):
+            graph.targets(nodes['b'].id)
+
+    def test_graph_cached_per_version(self):
+        flow = self.linear_flow()
+        graph = get_flow_graph(flow.id, flow.version)
+        with self.assertNumQueries(0):
+            self.assertIs(get_flow_graph(flow.id, flow.version), graph)
+        self.assertIsNot(get_flow_graph(flow.id, flow.version + 1), graph)
+
+    def test_create_starts_at_start_node(self):
+        """未指定当前节点：从开始节点自动流转到第一个审批节点"""
+        instance = self.create(self.linear_flow())
+        self.assertEqual(instance.status, 'running')
+        self.assertEqual(instance.current_node.node_key, 'manager')
+        self.assertEqual(self.active_nodes(instance), {'manager'})
+        self.assertEqual(self.pending(instance), {('manager', 'alice')})
+
+        self.assertEqual(self.operate('alice', instance).json()['data']['status'], 'approved')
+
+    def test_start_straight_to_end(self):
+        flow = self.make_flow(self.node('start', 'start', next_keys=['end']), self.node('end', 'end'))
+        instance = self.create(flow)
+        self.assertEqual(instance.status, 'approved')
+        self.assertEqual(self.active_nodes(instance), set())
+
+    def test_flow_without_start_node(self):
+        flow = self.make_flow(self.node('manager', approvers=['alice'], next_keys=['end']), self.node('end', 'end'))
+        response = self.api('carol', '/api/approval/instances/create/', {'flow': flow.id})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ApprovalInstance.objects.exists())
+
+
+@override_settings(SESSION_WRITE_BEHIND_BATCH=1)
+class ApprovalVersionTests(ApprovalTestMixin, TestCase):
+
+    def nodes(self, manager='主管审批', manager_approvers=('alice',), extra=False, x=100):
+        manager_node = self.node('manager', approvers=manager_approvers, next_keys=['director' if extra else 'end'])
+        manager_node.update(name=manager, x=x)
+        nodes = [self.node('start', 'start', next_keys=['manager']), manager_node, self.node('end', 'end')]
+        if extra:
+            nodes.insert(2, self.node('director', approvers=['bob'], next_keys=['end']))
+        return nodes
+
+    def test_rename_bumps_version(self):
+        flow = self.make_flow(*self.nodes())
+        changes = self.save_nodes(flow, self.nodes(manager='部门经理审批'))
+        self.assertEqual((changes['version'], changes['changed']), (2, 1))
+        self.assertEqual(flow.version, 2)
+        old, new = ApprovalNode.objects.filter(flow=flow, node_key='manager').order_by('since_version')
+        self.assertEqual((old.name, old.until_version), ('主管审批', 2))
+        self.assertEqual((new.name, new.since_version, new.until_version), ('部门经理审批', 2, None))
+        # 未修改的节点沿用原来的行
+        self.assertEqual(ApprovalNode.objects.filter(flow=flow, node_key='start').count(), 1)
+
+    def test_noop_save_keeps_version(self):
+        flow = self.make_flow(*self.nodes())
+        rows = ApprovalNode.objects.count()
+        self.assertEqual(self.save_nodes(flow, self.nodes()),
+                         {'version': 1, 'added': 0, 'changed': 0, 'removed': 0, 'relaid': 0})
+        # 只移动画布坐标：原地更新，不产生新版本
+        self.assertEqual(self.save_nodes(flow, self.nodes(x=300))['relaid'], 1)
+        self.assertEqual(flow.version, 1)
+        self.assertEqual(ApprovalNode.objects.count(), rows)
+        self.assertEqual(ApprovalNode.objects.get(node_key='manager').x, 300)
+
+    def test_pinned_instance_advances_on_old_version(self):
+        flow = self.make_flow(*self.nodes())
+        old_instance = self.create(flow)
+        # 新版本：主管改为 bob，主管之后加一级总监审批
+        self.save_nodes(flow, self.nodes(manager_approvers=('bob',), extra=True))
+        self.assertEqual(flow.version, 2)
+        new_instance = self.create(flow)
+        self.assertEqual((old_instance.flow_version, new_instance.flow_version), (1, 2))
+
+        # 旧实例仍按版本1的节点审批：alice 审批后直接结束，不经过新加的总监节点
+        self.assertEqual(self.operate('bob', old_instance).status_code, 403)
+        self.assertEqual(self.operate('alice', old_instance).json()['data']['status'], 'approved')
+
+        # 新实例按版本2流转
+        self.assertEqual(self.operate('alice', new_instance).status_code, 403)
+        self.assertEqual(self.operate('bob', new_instance).json()['data']['status'], 'running')
+        self.assertEqual(self.active_nodes(new_instance), {'director'})
+        self.assertEqual(self.pending(new_instance), {('director', 'bob')})
+
+
+@override_settings(SESSION_WRITE_BEHIND_BATCH=1)
+class ApprovalTaskTests(ApprovalTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.flow = self.make_flow(
+            self.node('start', 'start', next_keys=['manager']),
+            self.node('manager', approvers=['alice', 'bob'], next_keys=['director']),
+            self.node('director', approvers=['carol'], next_keys=['end']),
+            self.node('end', 'end'),
+        )
+
+    def task_states(self, instance, key):
+        return dict(ApprovalTask.objects.filter(instance=instance, node__node_key=key).values_list(
+            'approver__username', 'status'))
+
+    def test_tasks_open_on_enter(self):
+        instance = self.create(self.flow)
+        self.assertEqual(self.pending(instance), {('manager', 'alice'), ('manager', 'bob')})
+        self.assertEqual(self.inbox('alice'), [(instance.id, 'manager')])
+        self.assertEqual(self.inbox('carol'), [])
+
+    def test_inactive_approver_not_assigned(self):
+        User.objects.filter(username='bob').update(is_active=False)
+        instance = self.create(self.flow)
+        self.assertEqual(self.pending(instance), {('manager', 'alice')})
+
+    def test_approve_closes_tasks(self):
+        instance = self.create(self.flow)
+        self.assertEqual(self.operate('alice', instance).status_code, 200)
+        self.assertEqual(self.task_states(instance, 'manager'), {'alice': 'done', 'bob': 'cancelled'})
+        self.assertEqual(self.pending(instance), {('director', 'carol')})
+        self.assertEqual(self.inbox('bob'), [])
+        self.assertEqual(self.inbox('carol'), [(instance.id, 'director')])
+
+        self.assertEqual(self.operate('carol', instance).json()['data']['status'], 'approved')
+        self.assertEqual(self.task_states(instance, 'director'), {'carol': 'done'})
+        self.assertEqual(self.pending(instance), set())
+
+    def test_reject_closes_tasks(self):
+        instance = self.create(self.flow)
+        self.assertEqual(self.operate('bob', instance, 'reject').json()['data']['status'], 'rejected')
+        self.assertEqual(self.task_states(instance, 'manager'), {'alice': 'cancelled', 'bob': 'done'})
+        self.assertEqual(self.pending(), set())
+
+    def test_cancelled_branch_closes_tasks(self):
+        """或签放行后，其他分支上的待办记为已取消"""
+        flow = self.make_flow(
+            self.node('start', 'start', next_keys=['a', 'b']),
+            self.node('a', approvers=['alice'], next_keys=['join']),
+            self.node('b', approvers=['bob'], next_keys=['join']),
+            self.node('join', 'join', next_keys=['director'], join_mode='any'),
+            self.node('director', approvers=['carol'], next_keys=['end']),
+            self.node('end', 'end'),
+            code='parallel',
+        )
+        instance = self.create(flow)
+        self.assertEqual(self.pending(instance), {('a', 'alice'), ('b', 'bob')})
+        self.assertEqual(self.operate('alice', instance).status_code, 200)
+        self.assertEqual(self.task_states(instance, 'b'), {'bob': 'cancelled'})
+        self.assertEqual(self.pending(instance), {('director', 'carol')})
+
+    def test_rebuild_reproduces_inbox(self):
+        fresh = self.create(self.flow)
+        advanced = self.create(self.flow)
+        self.operate('alice', advanced)
+        rejected = self.create(self.flow)
+        self.operate('alice', rejected, 'reject')
+
+        def snapshot():
+            return sorted(ApprovalTask.objects.filter(status='pending').values_list(
+                'instance_id', 'node_id', 'approver_id'))
+
+        expected = snapshot()
+        self.assertEqual({row[0] for row in expected}, {fresh.id, advanced.id})
+        inboxes = {name: self.inbox(name) for name in self.users}
+        closed = ApprovalTask.objects.exclude(status='pending').count()
+
+        ApprovalTask.objects.filter(status='pending').delete()
+        approval_graph._graphs.clear()
+        call_command('rebuild_approval_tasks', stdout=io.StringIO())
+
+        self.assertEqual(snapshot(), expected)
+        self.assertEqual(ApprovalTask.objects.exclude(status='pending').count(), closed)
+        for name, inbox in inboxes.items():
+            self.assertCountEqual(self.inbox(name), inbox)
+
+
+@override_settings(SESSION_WRITE_BEHIND_BATCH=1)
+class ApprovalBatchTests(ApprovalTestMixin, TestCase):
+    URL = '/api/approval/instances/batch-operate/'
+
+    def setUp(self):
+        super().setUp()
+        self.flow = self.make_flow(
+            self.node('start', 'start', next_keys=['manager']),
+            self.node('manager', approvers=['alice', 'bob'], next_keys=['director']),
+            self.node('director', approvers=['carol'], next_keys=['end']),
+            self.node('end', 'end'),
+        )
+        self.single = self.make_flow(
+            self.node('start', 'start', next_keys=['manager']),
+            self.node('manager', approvers=['alice', 'bob'], next_keys=['end']),
+            self.node('end', 'end'),
+            code='single',
+        )
+
+    def batch(self, username, instance_ids, action='approve'):
+        return self.api(username, self.URL, {'instance_ids': instance_ids, 'action': action})
+
+    def test_per_item_results(self):
+        ok = self.create(self.flow)
+        forbidden = self.create(self.flow)
+        self.operate('alice', forbidden)  # 已到总监节点，alice 不是审批人
+        finished = self.create(self.single)
+        self.operate('bob', finished)
+        missing = ApprovalInstance.objects.order_by('-id').first().id + 100
+
+        response = self.batch('alice', [ok.id, forbidden.id, missing, finished.id, ok.id])
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual([(r['instance_id'], r['code']) for r in data['results']],
+                         [(ok.id, 200), (forbidden.id, 403), (missing, 404), (finished.id, 400)])
+        self.assertEqual((data['succeeded'], data['failed']), (1, 3))
+        self.assertEqual(data['results'][0]['status'], 'running')
+        # 失败的实例不留审批记录，成功的实例正常流转
+        self.assertEqual(list(ApprovalRecord.objects.filter(approver__username='alice').values_list(
+            'instance_id', flat=True).order_by('id')), [forbidden.id, ok.id])
+        self.assertEqual(self.active_nodes(ok), {'director'})
+        self.assertEqual(self.active_nodes(forbidden), {'director'})
+
+    def race(self, instance, competitor):
+        """alice 读出实例和令牌之后、条件更新之前，competitor 先审批了同一实例，返回 alice 得到的 code"""
+        row = ApprovalInstance.objects.values_list('flow_id', 'flow_version', 'status').get(id=instance.id)
+        tokens = list(ApprovalToken.objects.filter(instance=instance, status='active').values_list('id', 'node_id'))
+        self.assertEqual(self.operate(competitor, instance).status_code, 200)
+        try:
+            with transaction.atomic():
+                approval_actions.operate_one(instance.id, row, tokens, self.users['alice'], 'approve', None,
+                                             timezone.now())
+        except approval_actions.ActionRejected as e:
+            return e.code
+        return 200
+
+    def test_double_approve_conflicts(self):
+        """令牌已被消耗：实例行条件更新成功，令牌条件更新失败"""
+        instance = self.create(self.flow)
+        self.assertEqual(self.race(instance, 'bob'), 409)
+        self.assertEqual(ApprovalRecord.objects.filter(instance=instance).count(), 1)
+        self.assertEqual(self.active_nodes(instance), {'director'})
+        self.assertEqual(ApprovalToken.objects.filter(instance=instance, node__node_key='director').count(), 1)
+        self.assertEqual(self.task_status(instance, 'alice'), 'cancelled')
+
+    def test_approve_after_finish_conflicts(self):
+        """实例已结束：实例行条件更新失败"""
+        instance = self.create(self.single)
+        self.assertEqual(self.race(instance, 'bob'), 409)
+        instance.refresh_from_db()
+        self.assertEqual(instance.status, 'approved')
+        self.assertEqual(ApprovalRecord.objects.filter(instance=instance).count(), 1)
+        self.assertEqual(self.task_status(instance, 'alice'), 'cancelled')
+
+    def task_status(self, instance, username):
+        return ApprovalTask.objects.get(instance=instance, approver__username=username).status
+
+    def test_batch_size_limit(self):
+        ids = list(range(1, approval_actions.MAX_BATCH_SIZE + 2))
+        self.assertEqual(self.batch('alice', ids).status_code, 400)
+        self.assertEqual(self.batch('alice', []).status_code, 400)
+        self.assertEqual(self.batch('alice', 'abc').status_code, 400)
+        # 重复ID去重后在上限内
+        response = self.batch('alice', ids[:-1] + ids[:10])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['data']['results']), approval_actions.MAX_BATCH_SIZE)
+
+
+@override_settings(SESSION_WRITE_BEHIND_BATCH=1)
+class ApprovalParallelTests(ApprovalTestMixin, TestCase):
+
+    def parallel_flow(self, join_mode, branches=('a', 'b'), code='parallel'):
+        """开始节点分叉到各分支（分支 a/b/c 的审批人依次为 alice/bob/carol），汇聚后到总监审批"""
+        approvers = dict(zip(('a', 'b', 'c'), ('alice', 'bob', 'carol')))
+        return self.make_flow(
+            self.node('start', 'start', next_keys=list(branches)),
+            *(self.node(key, approvers=[approvers[key]], next_keys=['join']) for key in branches),
+            self.node('join', 'join', next_keys=['director'], join_mode=join_mode),
+            self.node('director', approvers=['carol'], next_keys=['end']),
+            self.node('end', 'end'),
+            code=code,
+        )
+
+    def join_token(self, instance):
+        return ApprovalToken.objects.values_list('arrived', 'status').get(instance=instance, node__node_key='join')
+
+    def test_all_join_waits_for_every_branch(self):
+        instance = self.create(self.parallel_flow('all', ('a', 'b', 'c')))
+        self.assertEqual(self.active_nodes(instance), {'a', 'b', 'c'})
+        self.assertEqual(self.pending(instance), {('a', 'alice'), ('b', 'bob'), ('c', 'carol')})
+
+        self.assertEqual(self.operate('alice', instance).json()['data']['status'], 'running')
+        self.assertEqual(self.join_token(instance), (1, 'waiting'))
+        self.assertEqual(self.operate('bob', instance).status_code, 200)
+        self.assertEqual(self.join_token(instance), (2, 'waiting'))
+        self.assertEqual(self.active_nodes(instance), {'c'})
+        self.assertEqual(self.pending(instance), {('c', 'carol')})
+
+        self.assertEqual(self.operate('carol', instance, node='c').status_code, 200)
+        self.assertEqual(self.join_token(instance), (3, 'done'))
+        self.assertEqual(self.active_nodes(instance), {'director'})
+        self.assertEqual(self.pending(instance), {('director', 'carol')})
+        self.assertEqual(self.operate('carol', instance).json()['data']['status'], 'approved')
+
+    def test_join_counter_single_row(self):
+        """直接调用 arrive_at_join：后到（含同时到达）的分支插入冲突后在库里计数，只有一行计数令牌，只有满员的那次放行"""
+        flow = self.parallel_flow('all', ('a', 'b', 'c'))
+        instance = self.create(flow)
+        join = get_flow_graph(flow.id, flow.version).nodes[self.node_id(instance, 'join')]
+        now = timezone.now()
+        self.assertEqual([approval_actions.arrive_at_join(instance.id, join, now) for _ in range(4)],
+                         [False, False, True, False])
+        self.assertEqual(self.join_token(instance), (3, 'done'))
+        # 数据库层面保证每个实例在汇聚节点只有一行计数令牌
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ApprovalToken.objects.create(instance=instance, node_id=join.id, arrived=1, status='waiting')
+
+    def test_any_join_cancels_other_branches(self):
+        instance = self.create(self.parallel_flow('any'))
+        self.assertEqual(self.operate('alice', instance).status_code, 200)
+        self.assertEqual(self.join_token(instance), (1, 'done'))
+        self.assertEqual(self.active_nodes(instance), {'director'})
+        self.assertEqual(ApprovalToken.objects.get(instance=instance, node__node_key='b').status, 'cancelled')
+        self.assertEqual(ApprovalTask.objects.get(instance=instance, node__node_key='b').status, 'cancelled')
+        self.assertEqual(self.pending(instance), {('director', 'carol')})
+        # 被取消的分支不能再审批
+        self.assertEqual(self.operate('bob', instance, node='b').status_code, 400)
+
+    def test_reject_cancels_other_branches(self):
+        instance = self.create(self.parallel_flow('all'))
+        self.assertEqual(self.operate('bob', instance, 'reject').json()['data']['status'], 'rejected')
+        self.assertEqual(set(ApprovalToken.objects.filter(instance=instance).values_list('node__node_key', 'status')),
+                         {('a', 'cancelled'), ('b', 'done')})
+        self.assertEqual(ApprovalTask.objects.get(instance=instance, node__node_key='a').status, 'cancelled')
+        self.assertEqual(self.pending(), set())
+        self.assertEqual(self.operate('alice', instance).status_code, 400)
+
+    def test_client_current_node_validated(self):
+        flow = self.parallel_flow('all')
+        other = self.parallel_flow('all', code='other')
+        for key, target_flow in (('a', other), ('end', flow), ('join', flow)):
+            node_id = ApprovalNode.objects.get(flow=target_flow, node_key=key).id
+            response = self.api('carol', '/api/approval/instances/create/', {'flow': flow.id, 'current_node': node_id})
+            self.assertEqual(response.status_code, 400, key)
+        # 旧版本的节点
+        old_node = ApprovalNode.objects.get(flow=flow, node_key='a').id
+        self.save_nodes(flow, [
+            self.node('start', 'start', next_keys=['a']),
+            self.node('a', approvers=['bob'], next_keys=['end']),
+            self.node('end', 'end'),
+        ])
+        response = self.api('carol', '/api/approval/instances/create/', {'flow': flow.id, 'current_node': old_node})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ApprovalInstance.objects.exists())
+
+    def test_client_current_node_and_status(self):
+        """合法的 current_node 从该节点开始；客户端传的状态被忽略"""
+        flow = self.parallel_flow('all')
+        node_id = ApprovalNode.objects.get(flow=flow, node_key='b').id
+        instance = self.create(flow, current_node=node_id, status='approved')
+        self.assertEqual(instance.status, 'running')
+        self.assertEqual(self.active_nodes(instance), {'b'})
+        self.assertEqual(self.pending(instance), {('b', 'bob')})
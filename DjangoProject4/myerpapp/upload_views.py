@@ -0,0 +1,376 @@
+# ===================== 附件断点续传（tus 风格） =====================
+# 大文件不再一次 multipart 上传，断线后可以从已收到的分块继续：
+#   1. POST   upload-sessions/create/<material_id>/   {name, size, chunk_size?, checksum?} 创建上传会话
+#   2. PUT    upload-sessions/<upload_id>/chunk/      请求体为分块原始字节，可多个分块并行上传
+#             Upload-Offset: 分块起始偏移（必须是 chunk_size 的整数倍）
+#             Upload-Checksum: sha256 <base64>（可选，tus checksum 扩展格式，不匹配则该块作废）
+#   3. GET    upload-sessions/<upload_id>/            查询进度（已收到字节数、缺失的分块序号）
+#   4. POST   upload-sessions/<upload_id>/complete/   分块到齐后落成 MaterialFile
+#      DELETE upload-sessions/<upload_id>/            放弃上传
+# 秒传：上传前先 POST upload-material-files/precheck/<material_id>/ 提交各文件的 SHA-256 和大小，
+# 服务器已有的内容直接关联到物料（只加引用，不传字节），客户端只上传返回的 missing 部分。
+# 所有分块直接按偏移写入同一个预分配的临时文件（稀疏文件），完成时只需 rename 为内容地址（见 attachments.py），
+# 不做二次拷贝；各分块写入互不依赖，吞吐随并行连接数增加。
+import base64
+import hashlib
+import json
+import logging
+import os
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from .attachment_storage import get_attachment_storage
+from .attachments import (
+    acquire_blob, attachment_full_path, discard_staged_blobs, file_sha256, stage_blob, store_blob,
+)
+from .models import AttachmentBlob, Material, MaterialFile, MaterialUpload, MaterialUploadChunk
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_PART_DIR = 'upload_parts'
+UPLOAD_MAX_SIZE = getattr(settings, 'MATERIAL_UPLOAD_MAX_SIZE', 5 * 1024 * 1024 * 1024)
+UPLOAD_EXPIRE_HOURS = getattr(settings, 'MATERIAL_UPLOAD_EXPIRE_HOURS', 24)
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+READ_BLOCK_SIZE = 1024 * 1024
+PRECHECK_MAX_FILES = 200
+
+
+def json_response(code, msg, data=None):
+    return JsonResponse({
+        'code': code,
+        'msg': msg,
+        'data': data if data is not None else {}
+    }, status=200, json_dumps_params={'ensure_ascii': False})
+
+
+def part_relpath(upload_id):
+    return f'{UPLOAD_PART_DIR}/{upload_id}.part'
+
+
+def part_path(upload_id):
+    return attachment_full_path(part_relpath(upload_id))
+
+
+def remove_part(upload_id):
+    try:
+        os.remove(part_path(upload_id))
+    except FileNotFoundError:
+        pass
+
+
+def clean_expired_uploads(limit=100):
+    """清理过期未完成的上传会话及其临时文件（创建新会话时顺带执行，每次最多 limit 个）"""
+    expired = list(MaterialUpload.objects.filter(expire_time__lt=timezone.now())
+                   .values_list('id', 'upload_id')[:limit])
+    if not expired:
+        return 0
+    MaterialUpload.objects.filter(id__in=[pk for pk, _ in expired]).delete()
+    for _, upload_id in expired:
+        remove_part(upload_id)
+    logger.info(f"清理过期上传会话{len(expired)}个")
+    return len(expired)
+
+
+def get_user_upload(request, upload_id):
+    """只能操作自己创建的、未过期的上传会话"""
+    return MaterialUpload.objects.filter(
+        upload_id=upload_id, creator_id=request.erp_user.id, expire_time__gte=timezone.now()
+    ).first()
+
+
+def is_sha256_hex(value):
+    return len(value) == 64 and all(c in '0123456789abcdef' for c in value)
+
+
+def parse_checksum(header):
+    """解析 'sha256 <base64>'，返回十六进制摘要；未提供返回空串，格式错误返回 None"""
+    if not header:
+        return ''
+    algorithm, _, value = header.strip().partition(' ')
+    if algorithm.lower() != 'sha256':
+        return None
+    try:
+        digest = base64.b64decode(value.strip(), validate=True)
+    except (ValueError, TypeError):
+        return None
+    return digest.hex() if len(digest) == 32 else None
+
+
+def upload_progress(upload):
+    chunks = dict(upload.chunks.values_list('index', 'size'))
+    missing = [i for i in range(upload.chunk_count) if i not in chunks]
+    return {
+        'upload_id': upload.upload_id,
+        'material_id': upload.material_id,
+        'name': upload.name,
+        'size': upload.size,
+        'chunk_size': upload.chunk_size,
+        'chunk_count': upload.chunk_count,
+        'received_size': sum(chunks.values()),
+        'missing_chunks': missing,
+        'expire_time': upload.expire_time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def material_file_data(material_file):
+    return {
+        'id': material_file.id,
+        'name': material_file.name,
+        'size': material_file.size,
+        'upload_time': material_file.upload_time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+# ===================== 0. 秒传预检 =====================
+@csrf_exempt
+@require_http_methods(["POST"])
+def precheck_upload(request, material_id):
+    """请求体 {files: [{name, size, sha256}, ...]}，返回 {linked: [...], missing: [下标, ...]}
+
+    SHA-256 与大小都匹配且实体文件仍在磁盘上才算命中；命中的文件立即生成 MaterialFile，
+    linked 中每项带 index（对应请求中的下标）。附件本来就对所有登录用户可见，
+    凭摘要关联已有内容不会暴露额外数据。
+    """
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return json_response(400, '请求数据格式错误（需为合法JSON）')
+    entries = data.get('files') if isinstance(data, dict) else None
+    if not isinstance(entries, list) or not entries:
+        return json_response(400, 'files 不能为空')
+    if len(entries) > PRECHECK_MAX_FILES:
+        return json_response(400, f'单次最多预检{PRECHECK_MAX_FILES}个文件')
+
+    if not Material.objects.filter(id=material_id).exists():
+        return json_response(404, '物料不存在，无法上传附件')
+
+    files = []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            return json_response(400, f'第{index + 1}个文件信息格式错误')
+        name = os.path.basename(str(entry.get('name', '')).strip())
+        sha256 = str(entry.get('sha256', '')).strip().lower()
+        try:
+            size = int(entry.get('size', -1))
+        except (TypeError, ValueError):
+            size = -1
+        if not name or size < 0 or not is_sha256_hex(sha256):
+            return json_response(400, f'第{index + 1}个文件需提供 name、size 和 SHA-256 十六进制摘要')
+        files.append((index, name, size, sha256))
+
+    blobs = {blob.sha256: blob for blob in AttachmentBlob.objects.filter(sha256__in={f[3] for f in files})}
+    # 实体文件被误删（磁盘与数据库不一致）时不能秒传，按未命中处理让客户端重新上传
+    storage = get_attachment_storage()
+    present = {sha256 for sha256, blob in blobs.items() if storage.exists(blob.path)}
+    hits = [f for f in files if f[3] in present and blobs[f[3]].size == f[2]]
+
+    linked = []
+    if hits:
+        with transaction.atomic():
+            new_files = []
+            for index, name, size, sha256 in hits:
+                blob = acquire_blob(sha256)
+                if blob is None:  # 预检期间最后一个引用被删除，按未命中处理
+                    continue
+                new_files.append((index, MaterialFile(
+                    material_id=material_id, blob=blob, name=name, file_path=blob.path, size=size, sha256=sha256)))
+            MaterialFile.objects.bulk_create([material_file for _, material_file in new_files])
+        linked = [{'index': index, **material_file_data(material_file)} for index, material_file in new_files]
+
+    linked_indexes = {item['index'] for item in linked}
+    missing = [f[0] for f in files if f[0] not in linked_indexes]
+    if linked:
+        saved = sum(item['size'] for item in linked)
+        logger.info(f"用户{request.erp_user.username}为物料{material_id}秒传附件{len(linked)}个，省去上传{saved}字节")
+    return json_response(200, 'success', {'linked': linked, 'missing': missing})
+
+
+# ===================== 1. 创建上传会话 =====================
+@csrf_exempt
+@require_http_methods(["POST"])
+def create_upload(request, material_id):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return json_response(400, '请求数据格式错误（需为合法JSON）')
+
+    if not Material.objects.filter(id=material_id).exists():
+        return json_response(404, '物料不存在，无法上传附件')
+
+    name = os.path.basename(str(data.get('name', '')).strip())
+    if not name:
+        return json_response(400, '文件名不能为空')
+    try:
+        size = int(data.get('size', -1))
+        chunk_size = int(data.get('chunk_size') or DEFAULT_CHUNK_SIZE)
+    except (TypeError, ValueError):
+        return json_response(400, 'size/chunk_size 必须是整数')
+    if size < 0:
+        return json_response(400, '文件大小不能为负数')
+    if size > UPLOAD_MAX_SIZE:
+        return json_response(400, f'文件{name}超过{UPLOAD_MAX_SIZE // (1024 * 1024)}MB大小限制')
+    if not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+        return json_response(400, f'分块大小需在{MIN_CHUNK_SIZE}~{MAX_CHUNK_SIZE}字节之间')
+    checksum = str(data.get('checksum', '')).strip().lower()
+    if checksum and not is_sha256_hex(checksum):
+        return json_response(400, 'checksum 需为文件的 SHA-256 十六进制摘要')
+
+    clean_expired_uploads()
+
+    upload = MaterialUpload.objects.create(
+        upload_id=uuid.uuid4().hex,
+        material_id=material_id,
+        creator_id=request.erp_user.id,
+        name=name,
+        size=size,
+        chunk_size=chunk_size,
+        checksum=checksum,
+        expire_time=timezone.now() + timedelta(hours=UPLOAD_EXPIRE_HOURS),
+    )
+    # 预分配临时文件：各分块按偏移直接写入，无需最后再拼接
+    path = part_path(upload.upload_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as fp:
+        fp.truncate(size)
+
+    logger.info(f"用户{request.erp_user.username}创建物料{material_id}附件上传会话{upload.upload_id}：{name}，{size}字节")
+    return json_response(200, '上传会话创建成功', upload_progress(upload))
+
+
+# ===================== 2. 上传分块 =====================
+@csrf_exempt
+@require_http_methods(["PUT"])
+def upload_chunk(request, upload_id):
+    upload = get_user_upload(request, upload_id)
+    if upload is None:
+        return json_response(404, '上传会话不存在或已过期')
+
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return json_response(400, '缺少 Upload-Offset 请求头')
+    if offset < 0 or offset % upload.chunk_size or offset >= max(upload.size, 1):
+        return json_response(400, f'Upload-Offset 必须是分块大小{upload.chunk_size}的整数倍且小于文件大小')
+    index = offset // upload.chunk_size
+    expected = upload.chunk_length(index)
+
+    checksum = parse_checksum(request.headers.get('Upload-Checksum'))
+    if checksum is None:
+        return json_response(400, 'Upload-Checksum 格式应为：sha256 <base64>')
+    try:
+        content_length = int(request.META.get('CONTENT_LENGTH') or -1)
+    except ValueError:
+        content_length = -1
+    if content_length != expected:
+        return json_response(400, f'第{index}块应为{expected}字节，实际Content-Length为{content_length}')
+
+    # 重传已确认的分块会覆盖原数据：先撤销确认，写入并校验通过后再重新记录
+    MaterialUploadChunk.objects.filter(upload=upload, index=index).delete()
+
+    # 边读边写边算摘要，不把分块整体读进内存
+    digest = hashlib.sha256()
+    received = 0
+    try:
+        with open(part_path(upload_id), 'r+b') as fp:
+            fp.seek(offset)
+            while received < expected:
+                block = request.read(min(READ_BLOCK_SIZE, expected - received))
+                if not block:
+                    break
+                fp.write(block)
+                digest.update(block)
+                received += len(block)
+            fp.flush()
+            os.fsync(fp.fileno())  # 分块确认前先落盘，确认过的进度不会因宕机丢失
+    except FileNotFoundError:
+        return json_response(404, '上传会话已结束')
+
+    if received != expected:
+        return json_response(400, f'第{index}块数据不完整：收到{received}/{expected}字节，请重传该块')
+    actual = digest.hexdigest()
+    if checksum and checksum != actual:
+        logger.warning(f"上传会话{upload_id}第{index}块校验和不匹配")
+        return json_response(400, f'第{index}块校验和不匹配，请重传该块')
+
+    # 同一块被并发重传时以后写入的为准
+    MaterialUploadChunk.objects.update_or_create(
+        upload=upload, index=index, defaults={'size': received, 'checksum': actual})
+    return json_response(200, '分块上传成功', {'index': index, 'size': received, 'checksum': actual})
+
+
+# ===================== 3. 查询进度 / 放弃上传 =====================
+@csrf_exempt
+@require_http_methods(["GET", "DELETE"])
+def upload_session(request, upload_id):
+    upload = get_user_upload(request, upload_id)
+    if upload is None:
+        return json_response(404, '上传会话不存在或已过期')
+
+    if request.method == 'DELETE':
+        upload.delete()
+        remove_part(upload_id)
+        logger.info(f"用户{request.erp_user.username}放弃上传会话{upload_id}")
+        return json_response(200, '已取消上传')
+
+    progress = upload_progress(upload)
+    response = json_response(200, 'success', progress)
+    # tus 兼容：连续已收到的字节数（串行上传的客户端可以直接从这里续传）
+    first_missing = progress['missing_chunks'][0] if progress['missing_chunks'] else upload.chunk_count
+    response['Upload-Offset'] = str(min(first_missing * upload.chunk_size, upload.size))
+    response['Upload-Length'] = str(upload.size)
+    return response
+
+
+# ===================== 4. 完成上传 =====================
+@csrf_exempt
+@require_http_methods(["POST"])
+def complete_upload(request, upload_id):
+    upload = get_user_upload(request, upload_id)
+    if upload is None:
+        return json_response(404, '上传会话不存在或已过期')
+
+    progress = upload_progress(upload)
+    if progress['missing_chunks']:
+        return json_response(400, f"还有{len(progress['missing_chunks'])}个分块未上传", progress)
+
+    # 整个文件再算一遍 SHA-256：用于去重存储，客户端提供了 checksum 时顺带校验
+    sha256, _ = file_sha256(part_path(upload_id))
+    if upload.checksum and sha256 != upload.checksum:
+        return json_response(400, '文件校验和不匹配，请重新上传', progress)
+
+    relpath = part_relpath(upload_id)
+    try:
+        # 对象存储后端：新内容先在事务外上传
+        relpath = stage_blob(relpath, sha256)
+        with transaction.atomic():
+            # 先删会话行：并发重复提交时只有一个请求能删到并继续
+            if not MaterialUpload.objects.filter(id=upload.id).delete()[0]:
+                discard_staged_blobs([(part_relpath(upload_id), relpath)])
+                return json_response(404, '上传会话已完成')
+            # 临时文件直接 rename 为内容地址（内容已存在则只增加引用），不拷贝数据
+            blob = store_blob(relpath, sha256, upload.size)
+            material_file = MaterialFile.objects.create(
+                material_id=upload.material_id,
+                blob=blob,
+                name=upload.name,
+                file_path=blob.path,
+                size=upload.size,
+                sha256=sha256,
+            )
+    except Exception as e:
+        # 对象存储：删除已提前上传、但没有建档的对象
+        discard_staged_blobs([(part_relpath(upload_id), relpath)])
+        logger.error(f"上传会话{upload_id}落盘失败：{str(e)}", exc_info=True)
+        return json_response(500, f'文件保存失败：{str(e)}')
+
+    logger.info(f"用户{request.erp_user.username}为物料{upload.material_id}断点续传上传附件{material_file.id}：{upload.name}")
+    return json_response(200, '文件上传成功', material_file_data(material_file))
@@ -1,754 +1,846 @@
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
-from functools import wraps
-from .models import Material, ERPUser  # 导入自定义模型
-import json
-import logging
-from django.contrib.auth.models import User
-from django.http import JsonResponse
-
-# ===================== 关键修复：初始化 logger =====================
-# 全局 logger 初始化（解决 NameError: name 'logger' is not defined）
-logger = logging.getLogger(__name__)
-
-
-# ===================== 跨域响应头装饰器（修复：支持Cookie跨域） =====================
-def add_cors_headers(view_func):
-    """
-    修复：添加跨域响应头，支持Cookie跨域传递
-    """
-
-    @wraps(view_func)
-    def wrapper(request, *args, **kwargs):
-        # 先执行原视图函数
-        response = view_func(request, *args, **kwargs)
-
-        # 核心修复：指定前端实际域名（替换为你的前端地址，如http://localhost:5173）
-        response['Access-Control-Allow-Origin'] = 'http://localhost:5173'
-        response['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-        response['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-        # 允许跨域携带Cookie（关键）
-        response['Access-Control-Allow-Credentials'] = 'true'
-
-        return response
-
-    return wrapper
-
-
-# ===================== 核心：登录校验装饰器（增强版+统一提示） =====================
-def erp_login_required(view_func):
-    """
-    自定义装饰器：校验ERP用户登录状态
-    - 未登录返回统一提示：请先登录ERP系统！
-    - 记录未登录访问日志
-    """
-
-    @wraps(view_func)
-    def wrapper(request, *args, **kwargs):
-        # 检查session中的登录标识
-        if not request.session.get('erp_user_id'):
-            logger.warning(f"未登录访问受保护接口：{request.path}，IP：{request.META.get('REMOTE_ADDR')}")
-            response = JsonResponse({
-                'code': 401,
-                'msg': '请先登录ERP系统！',  # 统一提示文案
-                'data': {}
-            }, status=200, json_dumps_params={'ensure_ascii': False})  # 统一200状态码
-            # 跨域头（修复：指定前端域名）
-            response['Access-Control-Allow-Origin'] = 'http://localhost:5173'
-            response['Access-Control-Allow-Credentials'] = 'true'
-            return response
-
-        # 验证用户是否存在（防止session篡改）
-        try:
-            ERPUser.objects.get(id=request.session['erp_user_id'])
-        except ERPUser.DoesNotExist:
-            request.session.flush()  # 清空无效session
-            response = JsonResponse({
-                'code': 401,
-                'msg': '请先登录ERP系统！',  # 统一提示文案
-                'data': {}
-            }, status=200, json_dumps_params={'ensure_ascii': False})
-            # 跨域头（修复：指定前端域名）
-            response['Access-Control-Allow-Origin'] = 'http://localhost:5173'
-            response['Access-Control-Allow-Credentials'] = 'true'
-            return response
-
-        return view_func(request, *args, **kwargs)
-
-    return wrapper
-
-
-# ===================== 辅助函数：初始化默认管理员（明文版） =====================
-def init_default_admin():
-    """
-    初始化默认管理员账号：admin/123456（密码明文存储）
-    - 仅首次运行创建
-    - 生产环境建议删除此函数
-    """
-    try:
-        if not ERPUser.objects.filter(username='admin').exists():
-            ERPUser.objects.create(
-                username='admin',
-                password='123456'  # 明文存储
-            )
-            # 同步创建Django User
-            if not User.objects.filter(username='admin').exists():
-                User.objects.create_user(username='admin', password='123456')
-            logger.info("✅ 默认管理员账号已创建：admin/123456（明文密码）")
-    except Exception as e:
-        logger.error(f"初始化默认管理员失败：{str(e)}")
-
-
-# ===================== 注册接口（修复版：跨域+关联ERPUser+完整校验） =====================
-@csrf_exempt
-@require_http_methods(["POST", "OPTIONS"])  # 新增OPTIONS支持
-@add_cors_headers  # 新增跨域装饰器
-def user_register(request):
-    """
-    ERP用户注册接口
-    - 支持跨域
-    - 同步创建Django User和ERPUser
-    - 完整参数校验
-    """
-    # 处理OPTIONS预检请求
-    if request.method == 'OPTIONS':
-        response = JsonResponse({
-            'code': 200,
-            'msg': '预检成功',
-            'data': {}
-        }, status=200)
-        response['Access-Control-Allow-Origin'] = 'http://localhost:5173'
-        response['Access-Control-Allow-Credentials'] = 'true'
-        return response
-
-    try:
-        # 1. 解析请求数据
-        if request.content_type == 'application/json':
-            data = json.loads(request.body)
-        else:
-            data = request.POST.dict()
-
-        username = data.get('username', '').strip()
-        password = data.get('password', '').strip()
-
-        # 2. 完整参数校验
-        if not username:
-            return JsonResponse({
-                'code': 400,
-                'msg': '请设置注册账号',
-                'data': {}
-            }, json_dumps_params={'ensure_ascii': False})
-
-        if not password:
-            return JsonResponse({
-                'code': 400,
-                'msg': '请设置登录密码',
-                'data': {}
-            }, json_dumps_params={'ensure_ascii': False})
-
-        # 检查用户名是否已存在（双重检查）
-        if User.objects.filter(username=username).exists():
-            return JsonResponse({
-                'code': 400,
-                'msg': '用户名已存在',
-                'data': {}
-            }, json_dumps_params={'ensure_ascii': False})
-
-        if ERPUser.objects.filter(username=username).exists():
-            return JsonResponse({
-                'code': 400,
-                'msg': '账号已存在，请更换账号注册',
-                'data': {}
-            }, json_dumps_params={'ensure_ascii': False})
-
-        # 检查密码长度
-        if len(password) < 6:
-            return JsonResponse({
-                'code': 400,
-                'msg': '密码长度不能少于6位',
-                'data': {}
-            }, json_dumps_params={'ensure_ascii': False})
-
-        # 账号格式校验（字母/数字/下划线，4-20位）
-        import re
-        username_reg = re.compile(r'^[a-zA-Z0-9_]{4,20}$')
-        if not username_reg.match(username):
-            return JsonResponse({
-                'code': 400,
-                'msg': '账号格式错误：仅支持字母、数字、下划线，长度4-20位',
-                'data': {}
-            }, json_dumps_params={'ensure_ascii': False})
-
-        # 3. 创建用户（同步Django User和ERPUser）
-        # 创建Django User（密码加密存储）
-        django_user = User.objects.create_user(username=username, password=password)
-        # 创建ERPUser（明文存储，兼容登录逻辑）
-        erp_user = ERPUser.objects.create(
-            username=username,
-            password=password
-        )
-
-        logger.info(f"ERP用户注册成功：{username}")
-        return JsonResponse({
-            'code': 200,
-            'msg': '注册成功',
-            'data': {
-                'username': username,
-                'user_id': erp_user.id
-            }
-        }, json_dumps_params={'ensure_ascii': False})
-
-    except json.JSONDecodeError:
-        return JsonResponse({
-            'code': 400,
-            'msg': '请求数据格式错误（需为合法JSON）',
-            'data': {}
-        }, json_dumps_params={'ensure_ascii': False})
-    except Exception as e:
-        logger.error(f"注册失败：{str(e)}", exc_info=True)
-        return JsonResponse({
-            'code': 500,
-            'msg': f'注册失败：{str(e)}',
-            'data': {}
-        }, json_dumps_params={'ensure_ascii': False})
-
-
-# ===================== 登录接口（明文密码版+跨域支持+返回Session ID） =====================
-@csrf_exempt
-@require_http_methods(["POST", "OPTIONS"])  # 新增OPTIONS方法支持
-@add_cors_headers  # 新增跨域装饰器
-def user_login(request):
-    """
-    登录接口
-    - 支持JSON格式请求
-    - 密码明文验证
-    - 默认账号：admin/123456
-    - 新增：返回Session ID供前端同步
-    """
-    # 处理OPTIONS预检请求（新增核心逻辑）
-    if request.method == 'OPTIONS':
-        response = JsonResponse({
-            'code': 200,
-            'msg': '预检成功',
-            'data': {}
-        }, status=200)
-        response['Access-Control-Allow-Origin'] = 'http://localhost:5173'
-        response['Access-Control-Allow-Credentials'] = 'true'
-        return response
-
-    # 首次访问自动创建默认管理员
-    init_default_admin()
-
-    try:
-        # 1. 解析请求数据（兼容form-data和json）
-        if request.content_type == 'application/json':
-            data = json.loads(request.body)
-        else:
-            data = request.POST.dict()
-
-        username = data.get('username', '').strip()
-        password = data.get('password', '').strip()
-
-        # 2. 基础校验
-        if not username or not password:
-            return JsonResponse({
-                'code': 400,
-                'msg': '账号和密码不能为空',
-                'data': {}
-            }, status=200, json_dumps_params={'ensure_ascii': False})
-
-        # 3. 验证用户（明文密码校验）
-        try:
-            user = ERPUser.objects.get(username=username)
-            # 明文对比密码
-            if password != user.password:
-                logger.warning(f"用户{username}密码错误")
-                raise ValueError("密码错误")
-        except ERPUser.DoesNotExist:
-            logger.warning(f"不存在的用户登录：{username}")
-            return JsonResponse({
-                'code': 401,
-                'msg': '账号不存在',
-                'data': {}
-            }, status=200, json_dumps_params={'ensure_ascii': False})
-        except ValueError:
-            return JsonResponse({
-                'code': 401,
-                'msg': '账号或密码错误（默认：admin/123456）',
-                'data': {}
-            }, status=200, json_dumps_params={'ensure_ascii': False})
-
-        # 4. 创建登录会话（增强：确保Session立即生效）
-        request.session['erp_user_id'] = user.id
-        request.session['erp_username'] = user.username
-        request.session.set_expiry(3600 * 24)  # 24小时过期
-        request.session.modified = True  # 强制更新Session
-
-        logger.info(f"用户{username}登录成功，IP：{request.META.get('REMOTE_ADDR')}")
-        return JsonResponse({
-            'code': 200,
-            'msg': '登录成功',
-            'data': {
-                'username': user.username,
-                'user_id': user.id,
-                'session_id': request.session.session_key  # 新增：返回Session ID
-            }
-        }, status=200, json_dumps_params={'ensure_ascii': False})
-
-    except json.JSONDecodeError:
-        logger.error("登录请求JSON格式错误")
-        return JsonResponse({
-            'code': 400,
-            'msg': '请求数据格式错误（需为合法JSON）',
-            'data': {}
-        }, status=200, json_dumps_params={'ensure_ascii': False})
-    except Exception as e:
-        logger.error(f"登录接口异常：{str(e)}", exc_info=True)
-        return JsonResponse({
-            'code': 500,
-            'msg': '服务器内部错误，请稍后重试',
-            'data': {}
-        }, status=200, json_dumps_params={'ensure_ascii': False})
-
-
-# ===================== 退出登录接口（增强版+跨域支持） =====================
-@csrf_exempt
-@require_http_methods(["POST", "OPTIONS"])  # 新增OPTIONS支持
-@erp_login_required
-@add_cors_headers  # 新增跨域装饰器
-def user_logout(request):
-    """退出登录接口：安全清空session"""
-    # 处理OPTIONS预检请求
-    if request.method == 'OPTIONS':
-        response = JsonResponse({
-            'code': 200,
-            'msg': '预检成功',
-            'data': {}
-        }, status=200)
-        response['Access-Control-Allow-Origin'] = 'http://localhost:5173'
-        response['Access-Control-Allow-Credentials'] = 'true'
-        return response
-
-    try:
-        username = request.session.get('erp_username', '未知用户')
-        request.session.flush()
-        logger.info(f"用户{username}退出登录")
-
-        return JsonResponse({
-            'code': 200,
-            'msg': '退出成功',
-            'data': {}
-        }, json_dumps_params={'ensure_ascii': False})
-    except Exception as e:
-        logger.error(f"退出登录异常：{str(e)}", exc_info=True)
-        return JsonResponse({
-            'code': 500,
-            'msg': '退出失败，请稍后重试',
-            'data': {}
-        }, status=200, json_dumps_params={'ensure_ascii': False})
-
-
-# ===================== 物料列表分页接口（优化版+跨域支持） =====================
-@csrf_exempt
-@require_http_methods(["GET", "OPTIONS"])  # 新增OPTIONS支持
-@erp_login_required
-@add_cors_headers  # 新增跨域装饰器
-def get_materials(request):
-    """
-    物料列表分页接口
-    - 支持页码/页大小参数
-    - 处理页码越界/非法参数
-    - 优化数据序列化
-    """
-    # 处理OPTIONS预检请求
-    if request.method == 'OPTIONS':
-        response = JsonResponse({
-            'code': 200,
-            'msg': '预检成功',
-            'data': {}
-        }, status=200)
-        response['Access-Control-Allow-Origin'] = 'http://localhost:5173'
-        response['Access-Control-Allow-Credentials'] = 'true'
-        return response
-
-    try:
-        # 1. 获取分页参数（处理非法值）
-        page = request.GET.get('page', 1)
-        page_size = request.GET.get('page_size', 10)
-
-        # 类型转换+合法性校验
-        try:
-            page = int(page) if page else 1
-            page_size = int(page_size) if page_size else 10
-            page = 1 if page < 1 else page
-            page_size = 10 if page_size < 1 or page_size > 100 else page_size
-        except (ValueError, TypeError):
-            page = 1
-            page_size = 10
-
-        # 2. 查询物料
-        materials = Material.objects.all().order_by('-create_time')
-        paginator = Paginator(materials, page_size)
-
-        # 3. 处理页码异常
-        try:
-            page_obj = paginator.page(page)
-        except PageNotAnInteger:
-            page_obj = paginator.page(1)
-        except EmptyPage:
-            page_obj = paginator.page(paginator.num_pages)
-
-        # 4. 序列化数据
-        material_list = []
-        for item in page_obj.object_list:
-            material_list.append({
-                'id': item.id,
-                'name': item.name,
-                'code': item.code,
-                'category': item.category,
-                'unit': item.unit,
-                'supplier': item.supplier,
-                'quantity': item.quantity,
-                'desc': item.desc or '',
-                'create_time': item.create_time.strftime('%Y-%m-%d %H:%M:%S') if item.create_time else ''
-            })
-
-        # 5. 返回分页数据
-        return JsonResponse({
-            'code': 200,
-            'msg': 'success',
-            'data': {
-                'list': material_list,
-                'total': paginator.count,
-                'page': page_obj.number,
-                'page_size': page_size,
-                'total_pages': paginator.num_pages
-            }
-        }, json_dumps_params={'ensure_ascii': False})
-
-    except Exception as e:
-        logger.error(f"获取物料列表异常：{str(e)}", exc_info=True)
-        return JsonResponse({
-            'code': 500,
-            'msg': '获取物料列表失败，请稍后重试',
-            'data': {}
-        }, status=200, json_dumps_params={'ensure_ascii': False})
-
-
-# ===================== 新增物料接口（优化版+跨域支持） =====================
-@csrf_exempt
-@require_http_methods(["POST", "OPTIONS"])  # 新增OPTIONS支持
-@erp_login_required
-@add_cors_headers  # 新增跨域装饰器
-def save_material(request):
-    """新增物料接口：增强参数校验+防重复编码"""
-    # 处理OPTIONS预检请求
-    if request.method == 'OPTIONS':
-        response = JsonResponse({
-            'code': 200,
-            'msg': '预检成功',
-            'data': {}
-        }, status=200)
-        response['Access-Control-Allow-Origin'] = 'http://localhost:5173'
-        response['Access-Control-Allow-Credentials'] = 'true'
-        return response
-
-    try:
-        # 1. 解析请求数据
-        if request.content_type == 'application/json':
-            data = json.loads(request.body)
-        else:
-            data = request.POST.dict()
-
-        # 2. 核心参数校验
-        name = data.get('name', '').strip()
-        code = data.get('code', '').strip()
-
-        if not name:
-            return JsonResponse({
-                'code': 400,
-                'msg': '物料名称不能为空',
-                'data': {}
-            }, status=200, json_dumps_params={'ensure_ascii': False})
-
-        if not code:
-            return JsonResponse({
-                'code': 400,
-                'msg': '物料编码不能为空',
-                'data': {}
-            }, status=200, json_dumps_params={'ensure_ascii': False})
-
-        # 3. 防重复编码
-        if Material.objects.filter(code=code).exists():
-            return JsonResponse({
-                'code': 400,
-                'msg': f'物料编码{code}已存在，请更换编码',
-                'data': {}
-            }, status=200, json_dumps_params={'ensure_ascii': False})
-
-        # 4. 处理可选参数
-        try:
-            quantity = int(data.get('quantity', 0))
-            quantity = quantity if quantity >= 0 else 0
-        except (ValueError, TypeError):
-            quantity = 0
-
-        # 5. 创建物料
-        material = Material.objects.create(
-            name=name,
-            code=code,
-            category=data.get('category', '').strip(),
-            unit=data.get('unit', '').strip(),
-            supplier=data.get('supplier', '').strip(),
-            quantity=quantity,
-            desc=data.get('desc', '').strip()
-        )
-
-        logger.info(f"用户{request.session['erp_username']}新增物料：{code}-{name}")
-        return JsonResponse({
-            'code': 200,
-            'msg': '新增物料成功',
-            'data': {'id': material.id, 'code': material.code}
-        }, json_dumps_params={'ensure_ascii': False})
-
-    except json.JSONDecodeError:
-        return JsonResponse({
-            'code': 400,
-            'msg': '请求数据格式错误（需为合法JSON）',
-            'data': {}
-        }, status=200, json_dumps_params={'ensure_ascii': False})
-    except Exception as e:
-        logger.error(f"新增物料异常：{str(e)}", exc_info=True)
-        return JsonResponse({
-            'code': 500,
-            'msg': '新增物料失败，请稍后重试',
-            'data': {}
-        }, status=200, json_dumps_params={'ensure_ascii': False})
-
-
-# ===================== 获取物料详情接口（优化版+跨域支持） =====================
-@csrf_exempt
-@require_http_methods(["GET", "OPTIONS"])  # 新增OPTIONS支持
-@erp_login_required
-@add_cors_headers  # 新增跨域装饰器
-def get_material(request, material_id):
-    """获取物料详情接口：增强ID校验"""
-    # 处理OPTIONS预检请求
-    if request.method == 'OPTIONS':
-        response = JsonResponse({
-            'code': 200,
-            'msg': '预检成功',
-            'data': {}
-        }, status=200)
-        response['Access-Control-Allow-Origin'] = 'http://localhost:5173'
-        response['Access-Control-Allow-Credentials'] = 'true'
-        return response
-
-    # 1. 校验物料ID
-    try:
-        material_id = int(material_id)
-        if material_id <= 0:
-            raise ValueError("ID必须为正整数")
-    except (ValueError, TypeError):
-        return JsonResponse({
-            'code': 400,
-            'msg': '物料ID必须为有效正整数',
-            'data': {}
-        }, status=200, json_dumps_params={'ensure_ascii': False})
-
-    # 2. 查询物料详情
-    try:
-        mat = Material.objects.get(id=material_id)
-        data = {
-            'id': mat.id,
-            'name': mat.name,
-            'code': mat.code,
-            'category': mat.category,
-            'unit': mat.unit,
-            'supplier': mat.supplier,
-            'quantity': mat.quantity,
-            'desc': mat.desc or '',
-            'create_time': mat.create_time.strftime('%Y-%m-%d %H:%M:%S') if mat.create_time else ''
-        }
-        return JsonResponse({
-            'code': 200,
-            'msg': 'success',
-            'data': data
-        }, json_dumps_params={'ensure_ascii': False})
-
-    except Material.DoesNotExist:
-        logger.warning(f"查询不存在的物料：ID={material_id}")
-        return JsonResponse({
-            'code': 404,
-            'msg': '物料不存在',
-            'data': {}
-        }, status=200, json_dumps_params={'ensure_ascii': False})
-    except Exception as e:
-        logger.error(f"获取物料详情异常：ID={material_id}，错误：{str(e)}", exc_info=True)
-        return JsonResponse({
-            'code': 500,
-            'msg': '获取物料详情失败，请稍后重试',
-            'data': {}
-        }, status=200, json_dumps_params={'ensure_ascii': False})
-
-
-# ===================== 更新物料接口（优化版+跨域支持） =====================
-@csrf_exempt
-@require_http_methods(["PUT", "POST", "OPTIONS"])  # 新增POST支持（兼容前端误传）
-@erp_login_required
-@add_cors_headers  # 新增跨域装饰器
-def update_material(request, material_id):
-    """更新物料接口：支持部分字段更新+防重复编码+兼容POST/PUT"""
-    # 处理OPTIONS预检请求
-    if request.method == 'OPTIONS':
-        response = JsonResponse({
-            'code': 200,
-            'msg': '预检成功',
-            'data': {}
-        }, status=200)
-        response['Access-Control-Allow-Origin'] = 'http://localhost:5173'
-        response['Access-Control-Allow-Credentials'] = 'true'
-        return response
-
-    # 1. 校验物料ID
-    try:
-        material_id = int(material_id)
-        if material_id <= 0:
-            raise ValueError("ID必须为正整数")
-    except (ValueError, TypeError):
-        return JsonResponse({
-            'code': 400,
-            'msg': '物料ID必须为有效正整数',
-            'data': {}
-        }, status=200, json_dumps_params={'ensure_ascii': False})
-
-    # 2. 解析更新数据
-    try:
-        update_data = json.loads(request.body) if request.content_type == 'application/json' else request.POST.dict()
-    except json.JSONDecodeError:
-        return JsonResponse({
-            'code': 400,
-            'msg': '请求数据格式错误（需为合法JSON）',
-            'data': {}
-        }, status=200, json_dumps_params={'ensure_ascii': False})
-
-    # 3. 查询物料并更新
-    try:
-        material = Material.objects.get(id=material_id)
-
-        # 4. 处理编码重复
-        new_code = update_data.get('code', '').strip()
-        if new_code and new_code != material.code:
-            if Material.objects.filter(code=new_code).exclude(id=material_id).exists():
-                return JsonResponse({
-                    'code': 400,
-                    'msg': f'物料编码{new_code}已存在，请更换编码',
-                    'data': {}
-                }, status=200, json_dumps_params={'ensure_ascii': False})
-
-        # 5. 字段更新
-        if 'name' in update_data:
-            material.name = update_data['name'].strip() or material.name
-        if 'code' in update_data:
-            material.code = update_data['code'].strip() or material.code
-        if 'category' in update_data:
-            material.category = update_data['category'].strip()
-        if 'unit' in update_data:
-            material.unit = update_data['unit'].strip()
-        if 'supplier' in update_data:
-            material.supplier = update_data['supplier'].strip()
-        if 'quantity' in update_data:
-            try:
-                quantity = int(update_data['quantity'])
-                material.quantity = quantity if quantity >= 0 else 0
-            except (ValueError, TypeError):
-                pass
-        if 'desc' in update_data:
-            material.desc = update_data['desc'].strip()
-
-        material.save()
-
-        logger.info(f"用户{request.session['erp_username']}更新物料：ID={material_id}")
-        return JsonResponse({
-            'code': 200,
-            'msg': '物料修改保存成功',
-            'data': {'id': material.id, 'code': material.code}
-        }, json_dumps_params={'ensure_ascii': False})
-
-    except Material.DoesNotExist:
-        logger.warning(f"更新不存在的物料：ID={material_id}")
-        return JsonResponse({
-            'code': 404,
-            'msg': '待修改的物料不存在',
-            'data': {}
-        }, status=200, json_dumps_params={'ensure_ascii': False})
-    except Exception as e:
-        logger.error(f"更新物料异常：ID={material_id}，错误：{str(e)}", exc_info=True)
-        return JsonResponse({
-            'code': 500,
-            'msg': '修改物料失败，请稍后重试',
-            'data': {}
-        }, status=200, json_dumps_params={'ensure_ascii': False})
-
-
-# ===================== 删除物料接口（优化版+跨域支持） =====================
-@csrf_exempt
-@require_http_methods(["DELETE", "OPTIONS"])  # 新增OPTIONS支持
-@erp_login_required
-@add_cors_headers  # 新增跨域装饰器
-def delete_material(request, material_id):
-    """删除物料接口：增强日志+安全校验"""
-    # 处理OPTIONS预检请求
-    if request.method == 'OPTIONS':
-        response = JsonResponse({
-            'code': 200,
-            'msg': '预检成功',
-            'data': {}
-        }, status=200)
-        response['Access-Control-Allow-Origin'] = 'http://localhost:5173'
-        response['Access-Control-Allow-Credentials'] = 'true'
-        return response
-
-    # 1. 校验物料ID
-    try:
-        material_id = int(material_id)
-        if material_id <= 0:
-            raise ValueError("物料ID必须为正整数")
-    except (ValueError, TypeError):
-        return JsonResponse({
-            "code": 400,
-            "msg": "物料ID格式错误（必须为正整数）",
-            "data": {}
-        }, status=200, json_dumps_params={'ensure_ascii': False})
-
-    # 2. 执行删除
-    try:
-        material = Material.objects.get(id=material_id)
-        material_name = material.name
-        material_code = material.code
-        material.delete()
-
-        logger.info(f"用户{request.session['erp_username']}删除物料：{material_code}-{material_name}（ID={material_id}）")
-        return JsonResponse({
-            "code": 200,
-            "msg": "物料删除成功",
-            "data": {}
-        }, json_dumps_params={'ensure_ascii': False})
-
-    except Material.DoesNotExist:
-        logger.warning(f"删除不存在的物料：ID={material_id}")
-        return JsonResponse({
-            "code": 404,
-            "msg": "待删除的物料不存在",
-            "data": {}
-        }, status=200, json_dumps_params={'ensure_ascii': False})
-    except Exception as e:
-        logger.error(f"删除物料异常：ID={material_id}，错误：{str(e)}", exc_info=True)
-        return JsonResponse({
-            "code": 500,
-            "msg": "删除物料失败，请稍后重试",
-            "data": {}
-        }, status=200, json_dumps_params={'ensure_ascii': False})
-
-
+from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from django.db import transaction
+from django.db.models import Q
+from datetime import datetime
+from .models import Material, MaterialFile, ERPUser  # 导入自定义模型
+from .attachments import release_material_files
+from .material_search import search_materials
+from .material_import import MaterialImporter, MaterialImportError, iter_spreadsheet_rows, report_expired, report_path
+from .role_views import permission_required
+from .streaming import SpreadsheetError
+import base64
+import binascii
+import json
+import logging
+import os
+from django.contrib.auth.models import User
+from django.http import JsonResponse, FileResponse
+
+# ===================== 关键修复：初始化 logger =====================
+# 全局 logger 初始化（解决 NameError: name 'logger' is not defined）
+logger = logging.getLogger(__name__)
+
+
+# ===================== 辅助函数：初始化默认管理员（明文版） =====================
+def init_default_admin():
+    """
+    初始化默认管理员账号：admin/123456（密码明文存储）
+    - 仅首次运行创建
+    - 生产环境建议删除此函数
+    """
+    try:
+        if not ERPUser.objects.filter(username='admin').exists():
+            ERPUser.objects.create(
+                username='admin',
+                password='123456'  # 明文存储
+            )
+            # 同步创建Django User
+            if not User.objects.filter(username='admin').exists():
+                User.objects.create_user(username='admin', password='123456')
+            logger.info("✅ 默认管理员账号已创建：admin/123456（明文密码）")
+    except Exception as e:
+        logger.error(f"初始化默认管理员失败：{str(e)}")
+
+
+# ===================== 注册接口（修复版：跨域+关联ERPUser+完整校验） =====================
+@csrf_exempt
+@require_http_methods(["POST"])
+def user_register(request):
+    """
+    ERP用户注册接口
+    - 支持跨域
+    - 同步创建Django User和ERPUser
+    - 完整参数校验
+    """
+
+    try:
+        # 1. 解析请求数据
+        if request.content_type == 'application/json':
+            data = json.loads(request.body)
+        else:
+            data = request.POST.dict()
+
+        username = data.get('username', '').strip()
+        password = data.get('password', '').strip()
+
+        # 2. 完整参数校验
+        if not username:
+            return JsonResponse({
+                'code': 400,
+                'msg': '请设置注册账号',
+                'data': {}
+            }, json_dumps_params={'ensure_ascii': False})
+
+        if not password:
+            return JsonResponse({
+                'code': 400,
+                'msg': '请设置登录密码',
+                'data': {}
+            }, json_dumps_params={'ensure_ascii': False})
+
+        # 检查用户名是否已存在（双重检查）
+        if User.objects.filter(username=username).exists():
+            return JsonResponse({
+                'code': 400,
+                'msg': '用户名已存在',
+                'data': {}
+            }, json_dumps_params={'ensure_ascii': False})
+
+        if ERPUser.objects.filter(username=username).exists():
+            return JsonResponse({
+                'code': 400,
+                'msg': '账号已存在，请更换账号注册',
+                'data': {}
+            }, json_dumps_params={'ensure_ascii': False})
+
+        # 检查密码长度
+        if len(password) < 6:
+            return JsonResponse({
+                'code': 400,
+                'msg': '密码长度不能少于6位',
+                'data': {}
+            }, json_dumps_params={'ensure_ascii': False})
+
+        # 账号格式校验（字母/数字/下划线，4-20位）
+        import re
+        username_reg = re.compile(r'^[a-zA-Z0-9_]{4,20}$')
+        if not username_reg.match(username):
+            return JsonResponse({
+                'code': 400,
+                'msg': '账号格式错误：仅支持字母、数字、下划线，长度4-20位',
+                'data': {}
+            }, json_dumps_params={'ensure_ascii': False})
+
+        # 3. 创建用户（同步Django User和ERPUser）
+        # 创建Django User（密码加密存储）
+        django_user = User.objects.create_user(username=username, password=password)
+        # 创建ERPUser（明文存储，兼容登录逻辑）
+        erp_user = ERPUser.objects.create(
+            username=username,
+            password=password
+        )
+
+        logger.info(f"ERP用户注册成功：{username}")
+        return JsonResponse({
+            'code': 200,
+            'msg': '注册成功',
+            'data': {
+                'username': username,
+                'user_id': erp_user.id
+            }
+        }, json_dumps_params={'ensure_ascii': False})
+
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'code': 400,
+            'msg': '请求数据格式错误（需为合法JSON）',
+            'data': {}
+        }, json_dumps_params={'ensure_ascii': False})
+    except Exception as e:
+        logger.error(f"注册失败：{str(e)}", exc_info=True)
+        return JsonResponse({
+            'code': 500,
+            'msg': f'注册失败：{str(e)}',
+            'data': {}
+        }, json_dumps_params={'ensure_ascii': False})
+
+
+# ===================== 登录接口（明文密码版+跨域支持+返回Session ID） =====================
+@csrf_exempt
+@require_http_methods(["POST"])
+def user_login(request):
+    """
+    登录接口
+    - 支持JSON格式请求
+    - 密码明文验证
+    - 默认账号：admin/123456
+    - 新增：返回Session ID供前端同步
+    """
+
+    # 首次访问自动创建默认管理员
+    init_default_admin()
+
+    try:
+        # 1. 解析请求数据（兼容form-data和json）
+        if request.content_type == 'application/json':
+            data = json.loads(request.body)
+        else:
+            data = request.POST.dict()
+
+        username = data.get('username', '').strip()
+        password = data.get('password', '').strip()
+
+        # 2. 基础校验
+        if not username or not password:
+            return JsonResponse({
+                'code': 400,
+                'msg': '账号和密码不能为空',
+                'data': {}
+            }, status=200, json_dumps_params={'ensure_ascii': False})
+
+        # 3. 验证用户（明文密码校验）
+        try:
+            user = ERPUser.objects.get(username=username)
+            # 明文对比密码
+            if password != user.password:
+                logger.warning(f"用户{username}密码错误")
+                raise ValueError("密码错误")
+        except ERPUser.DoesNotExist:
+            logger.warning(f"不存在的用户登录：{username}")
+            return JsonResponse({
+                'code': 401,
+                'msg': '账号不存在',
+                'data': {}
+            }, status=200, json_dumps_params={'ensure_ascii': False})
+        except ValueError:
+            return JsonResponse({
+                'code': 401,
+                'msg': '账号或密码错误（默认：admin/123456）',
+                'data': {}
+            }, status=200, json_dumps_params={'ensure_ascii': False})
+
+        # 4. 创建登录会话（增强：确保Session立即生效）
+        request.session['erp_user_id'] = user.id
+        request.session['erp_username'] = user.username
+        request.session.set_expiry(3600 * 24)  # 24小时过期（赋值已标记modified，无需强制写Session）
+
+        logger.info(f"用户{username}登录成功，IP：{request.META.get('REMOTE_ADDR')}")
+        return JsonResponse({
+            'code': 200,
+            'msg': '登录成功',
+            'data': {
+                'username': user.username,
+                'user_id': user.id,
+                'session_id': request.session.session_key  # 新增：返回Session ID
+            }
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+
+    except json.JSONDecodeError:
+        logger.error("登录请求JSON格式错误")
+        return JsonResponse({
+            'code': 400,
+            'msg': '请求数据格式错误（需为合法JSON）',
+            'data': {}
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+    except Exception as e:
+        logger.error(f"登录接口异常：{str(e)}", exc_info=True)
+        return JsonResponse({
+            'code': 500,
+            'msg': '服务器内部错误，请稍后重试',
+            'data': {}
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+
+
+# ===================== 退出登录接口（增强版+跨域支持） =====================
+@csrf_exempt
+@require_http_methods(["POST"])
+def user_logout(request):
+    """退出登录接口：安全清空session"""
+
+    try:
+        username = request.session.get('erp_username', '未知用户')
+        request.session.flush()
+        logger.info(f"用户{username}退出登录")
+
+        return JsonResponse({
+            'code': 200,
+            'msg': '退出成功',
+            'data': {}
+        }, json_dumps_params={'ensure_ascii': False})
+    except Exception as e:
+        logger.error(f"退出登录异常：{str(e)}", exc_info=True)
+        return JsonResponse({
+            'code': 500,
+            'msg': '退出失败，请稍后重试',
+            'data': {}
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+
+
+# ===================== 物料列表排序/游标辅助函数 =====================
+# 允许排序的字段（字段名 -> 游标值类型）
+MATERIAL_SORT_FIELDS = {
+    'create_time': 'datetime',
+    'update_time': 'datetime',
+    'code': 'str',
+    'name': 'str',
+    'quantity': 'int',
+    'rank': 'float',  # 检索相关度，仅 keyword 检索时可用
+}
+MATERIAL_DEFAULT_SORT = '-create_time'
+MATERIAL_SEARCH_SORT = 'rank'
+MATERIAL_MAX_SORT_COLUMNS = 3
+
+
+class InvalidCursor(ValueError):
+    """游标/排序参数非法"""
+
+
+def parse_material_sort(sort_param, default=MATERIAL_DEFAULT_SORT):
+    """
+    解析排序参数：逗号分隔的字段列表，字段前加 - 表示倒序
+    例：sort=-quantity,code
+    返回 [(字段名, 是否倒序), ...]，末尾自动追加 id 作为唯一性兜底
+    """
+    sort_param = (sort_param or '').strip() or default
+    columns = []
+    for part in sort_param.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        desc = part.startswith('-')
+        field = part.lstrip('-+')
+        if field not in MATERIAL_SORT_FIELDS:
+            raise InvalidCursor(f'不支持的排序字段：{field}')
+        if any(f == field for f, _ in columns):
+            continue
+        columns.append((field, desc))
+    if not columns:
+        columns.append(('create_time', True))
+    if len(columns) > MATERIAL_MAX_SORT_COLUMNS:
+        raise InvalidCursor(f'最多支持{MATERIAL_MAX_SORT_COLUMNS}个排序字段')
+    # id 跟随最后一个排序字段的方向，保证 (sort_key, id) 全序
+    columns.append(('id', columns[-1][1]))
+    return columns
+
+
+def sort_spec(columns):
+    """排序字段规范化字符串（写入游标，防止换排序后复用旧游标）"""
+    return ','.join(f"{'-' if desc else ''}{field}" for field, desc in columns)
+
+
+def encode_cursor(columns, item):
+    """根据最后一行数据生成不透明游标"""
+    values = []
+    for field, _ in columns:
+        value = getattr(item, field)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        values.append(value)
+    payload = json.dumps({'s': sort_spec(columns), 'v': values}, ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(columns, cursor):
+    """解析游标，返回与 columns 一一对应的取值列表"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        values = payload['v']
+    except (ValueError, TypeError, KeyError, UnicodeError, binascii.Error):
+        raise InvalidCursor('游标格式错误')
+    if payload.get('s') != sort_spec(columns) or not isinstance(values, list) or len(values) != len(columns):
+        raise InvalidCursor('游标与当前排序方式不匹配，请从第一页重新加载')
+
+    parsed = []
+    for (field, _), value in zip(columns, values):
+        value_type = MATERIAL_SORT_FIELDS.get(field, 'int')
+        try:
+            if value_type == 'datetime':
+                value = datetime.fromisoformat(value)
+            elif value_type == 'int':
+                value = int(value)
+            elif value_type == 'float':
+                value = float(value)
+            else:
+                value = str(value)
+        except (ValueError, TypeError):
+            raise InvalidCursor('游标格式错误')
+        parsed.append(value)
+    return parsed
+
+
+def keyset_filter(columns, values):
+    """
+    构造 keyset 条件：取排在游标之后的行
+    (c1 > v1) OR (c1 = v1 AND c2 > v2) OR ...（倒序字段用 <）
+    外层再 AND 一个 c1 >= v1：OR 链本身无法让 SQLite 在索引上定位起点，
+    加上这个冗余范围条件后是 SEARCH ... (c1>?) 而不是从头扫描索引
+    """
+    condition = Q()
+    equal_prefix = {}
+    for (field, desc), value in zip(columns, values):
+        lookup = 'lt' if desc else 'gt'
+        condition |= Q(**equal_prefix, **{f'{field}__{lookup}': value})
+        equal_prefix[field] = value
+    first_field, first_desc = columns[0]
+    return Q(**{f"{first_field}__{'lte' if first_desc else 'gte'}": values[0]}) & condition
+
+
+def material_queryset(params):
+    """
+    按列表接口的查询参数构造物料查询集（列表/导出共用，保证两者筛选口径一致）
+    返回 (queryset, columns)；排序参数非法时抛出 InvalidCursor
+    """
+    keyword = params.get('keyword', '').strip()
+    # 有检索词时默认按相关度排序
+    columns = parse_material_sort(params.get('sort'), MATERIAL_SEARCH_SORT if keyword else MATERIAL_DEFAULT_SORT)
+    if not keyword and any(field == 'rank' for field, _ in columns):
+        raise InvalidCursor('按相关度排序需要提供检索关键词 keyword')
+
+    queryset = Material.objects.all()
+    # 精确筛选（配合 material_cat_ctime_idx / material_sup_ctime_idx）
+    for field in ('category', 'supplier'):
+        value = params.get(field, '').strip()
+        if value:
+            queryset = queryset.filter(**{field: value})
+    if keyword:
+        queryset = search_materials(queryset, keyword)
+    queryset = queryset.order_by(
+        *[f"{'-' if desc else ''}{field}" for field, desc in columns]
+    )
+    return queryset, columns
+
+
+def serialize_material(item):
+    """物料列表/导出统一序列化"""
+    return {
+        'id': item.id,
+        'name': item.name,
+        'code': item.code,
+        'category': item.category,
+        'unit': item.unit,
+        'supplier': item.supplier,
+        'quantity': item.quantity,
+        'desc': item.desc or '',
+        'create_time': item.create_time.strftime('%Y-%m-%d %H:%M:%S') if item.create_time else ''
+    }
+
+
+# ===================== 物料列表分页接口（优化版+跨域支持） =====================
+@csrf_exempt
+@require_http_methods(["GET"])
+def get_materials(request):
+    """
+    物料列表分页接口
+    - 页码模式：page/page_size（兼容旧版，返回 total/total_pages）
+    - 游标模式：传 cursor 参数（首页传空字符串），按 (排序字段, id) 做 keyset 分页，
+      不做 OFFSET 扫描和 COUNT(*)，返回 next_cursor（为 null 表示已到末页）
+    - sort：排序字段，可选 create_time/update_time/code/name/quantity，
+      多字段逗号分隔，前缀 - 表示倒序，默认 -create_time
+    - category / supplier：按物料分类、供应商精确筛选
+    - keyword：全文检索（名称/编码/分类/供应商/描述），空格分隔多个词；
+      有 keyword 时默认按相关度 rank 排序，也可显式传 sort
+    """
+
+    try:
+        # 1. 获取分页参数（处理非法值）
+        page = request.GET.get('page', 1)
+        page_size = request.GET.get('page_size', 10)
+
+        # 类型转换+合法性校验
+        try:
+            page = int(page) if page else 1
+            page_size = int(page_size) if page_size else 10
+            page = 1 if page < 1 else page
+            page_size = 10 if page_size < 1 or page_size > 100 else page_size
+        except (ValueError, TypeError):
+            page = 1
+            page_size = 10
+
+        # 2. 解析排序/游标参数
+        try:
+            materials, columns = material_queryset(request.GET)
+            cursor = request.GET.get('cursor')
+            cursor_values = decode_cursor(columns, cursor) if cursor else None
+        except InvalidCursor as e:
+            return JsonResponse({
+                'code': 400,
+                'msg': str(e),
+                'data': {}
+            }, status=200, json_dumps_params={'ensure_ascii': False})
+
+        # 3. 游标模式：keyset 分页（多取一条判断是否还有下一页）
+        if cursor is not None:
+            if cursor_values is not None:
+                materials = materials.filter(keyset_filter(columns, cursor_values))
+            rows = list(materials[:page_size + 1])
+            has_more = len(rows) > page_size
+            rows = rows[:page_size]
+            return JsonResponse({
+                'code': 200,
+                'msg': 'success',
+                'data': {
+                    'list': [serialize_material(item) for item in rows],
+                    'page_size': page_size,
+                    'sort': sort_spec(columns[:-1]),
+                    'has_more': has_more,
+                    'next_cursor': encode_cursor(columns, rows[-1]) if has_more else None
+                }
+            }, json_dumps_params={'ensure_ascii': False})
+
+        # 4. 页码模式（兼容旧版）
+        paginator = Paginator(materials, page_size)
+
+        # 处理页码异常
+        try:
+            page_obj = paginator.page(page)
+        except PageNotAnInteger:
+            page_obj = paginator.page(1)
+        except EmptyPage:
+            page_obj = paginator.page(paginator.num_pages)
+
+        # 5. 返回分页数据
+        return JsonResponse({
+            'code': 200,
+            'msg': 'success',
+            'data': {
+                'list': [serialize_material(item) for item in page_obj.object_list],
+                'total': paginator.count,
+                'page': page_obj.number,
+                'page_size': page_size,
+                'total_pages': paginator.num_pages
+            }
+        }, json_dumps_params={'ensure_ascii': False})
+
+    except Exception as e:
+        logger.error(f"获取物料列表异常：{str(e)}", exc_info=True)
+        return JsonResponse({
+            'code': 500,
+            'msg': '获取物料列表失败，请稍后重试',
+            'data': {}
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+
+
+# ===================== 新增物料接口（优化版+跨域支持） =====================
+@csrf_exempt
+@require_http_methods(["POST"])
+def save_material(request):
+    """新增物料接口：增强参数校验+防重复编码"""
+
+    try:
+        # 1. 解析请求数据
+        if request.content_type == 'application/json':
+            data = json.loads(request.body)
+        else:
+            data = request.POST.dict()
+
+        # 2. 核心参数校验
+        name = data.get('name', '').strip()
+        code = data.get('code', '').strip()
+
+        if not name:
+            return JsonResponse({
+                'code': 400,
+                'msg': '物料名称不能为空',
+                'data': {}
+            }, status=200, json_dumps_params={'ensure_ascii': False})
+
+        if not code:
+            return JsonResponse({
+                'code': 400,
+                'msg': '物料编码不能为空',
+                'data': {}
+            }, status=200, json_dumps_params={'ensure_ascii': False})
+
+        # 3. 防重复编码
+        if Material.objects.filter(code=code).exists():
+            return JsonResponse({
+                'code': 400,
+                'msg': f'物料编码{code}已存在，请更换编码',
+                'data': {}
+            }, status=200, json_dumps_params={'ensure_ascii': False})
+
+        # 4. 处理可选参数
+        try:
+            quantity = int(data.get('quantity', 0))
+            quantity = quantity if quantity >= 0 else 0
+        except (ValueError, TypeError):
+            quantity = 0
+
+        # 5. 创建物料
+        material = Material.objects.create(
+            name=name,
+            code=code,
+            category=data.get('category', '').strip(),
+            unit=data.get('unit', '').strip(),
+            supplier=data.get('supplier', '').strip(),
+            quantity=quantity,
+            desc=data.get('desc', '').strip()
+        )
+
+        logger.info(f"用户{request.session['erp_username']}新增物料：{code}-{name}")
+        return JsonResponse({
+            'code': 200,
+            'msg': '新增物料成功',
+            'data': {'id': material.id, 'code': material.code}
+        }, json_dumps_params={'ensure_ascii': False})
+
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'code': 400,
+            'msg': '请求数据格式错误（需为合法JSON）',
+            'data': {}
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+    except Exception as e:
+        logger.error(f"新增物料异常：{str(e)}", exc_info=True)
+        return JsonResponse({
+            'code': 500,
+            'msg': '新增物料失败，请稍后重试',
+            'data': {}
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+
+
+# ===================== 获取物料详情接口（优化版+跨域支持） =====================
+@csrf_exempt
+@require_http_methods(["GET"])
+def get_material(request, material_id):
+    """获取物料详情接口：增强ID校验"""
+
+    # 1. 校验物料ID
+    try:
+        material_id = int(material_id)
+        if material_id <= 0:
+            raise ValueError("ID必须为正整数")
+    except (ValueError, TypeError):
+        return JsonResponse({
+            'code': 400,
+            'msg': '物料ID必须为有效正整数',
+            'data': {}
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+
+    # 2. 查询物料详情
+    try:
+        mat = Material.objects.get(id=material_id)
+        data = {
+            'id': mat.id,
+            'name': mat.name,
+            'code': mat.code,
+            'category': mat.category,
+            'unit': mat.unit,
+            'supplier': mat.supplier,
+            'quantity': mat.quantity,
+            'desc': mat.desc or '',
+            'create_time': mat.create_time.strftime('%Y-%m-%d %H:%M:%S') if mat.create_time else ''
+        }
+        return JsonResponse({
+            'code': 200,
+            'msg': 'success',
+            'data': data
+        }, json_dumps_params={'ensure_ascii': False})
+
+    except Material.DoesNotExist:
+        logger.warning(f"查询不存在的物料：ID={material_id}")
+        return JsonResponse({
+            'code': 404,
+            'msg': '物料不存在',
+            'data': {}
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+    except Exception as e:
+        logger.error(f"获取物料详情异常：ID={material_id}，错误：{str(e)}", exc_info=True)
+        return JsonResponse({
+            'code': 500,
+            'msg': '获取物料详情失败，请稍后重试',
+            'data': {}
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+
+
+# ===================== 更新物料接口（优化版+跨域支持） =====================
+@csrf_exempt
+@require_http_methods(["PUT", "POST"])  # 新增POST支持（兼容前端误传）
+def update_material(request, material_id):
+    """更新物料接口：支持部分字段更新+防重复编码+兼容POST/PUT"""
+
+    # 1. 校验物料ID
+    try:
+        material_id = int(material_id)
+        if material_id <= 0:
+            raise ValueError("ID必须为正整数")
+    except (ValueError, TypeError):
+        return JsonResponse({
+            'code': 400,
+            'msg': '物料ID必须为有效正整数',
+            'data': {}
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+
+    # 2. 解析更新数据
+    try:
+        update_data = json.loads(request.body) if request.content_type == 'application/json' else request.POST.dict()
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'code': 400,
+            'msg': '请求数据格式错误（需为合法JSON）',
+            'data': {}
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+
+    # 3. 查询物料并更新
+    try:
+        material = Material.objects.get(id=material_id)
+
+        # 4. 处理编码重复
+        new_code = update_data.get('code', '').strip()
+        if new_code and new_code != material.code:
+            if Material.objects.filter(code=new_code).exclude(id=material_id).exists():
+                return JsonResponse({
+                    'code': 400,
+                    'msg': f'物料编码{new_code}已存在，请更换编码',
+                    'data': {}
+                }, status=200, json_dumps_params={'ensure_ascii': False})
+
+        # 5. 字段更新
+        if 'name' in update_data:
+            material.name = update_data['name'].strip() or material.name
+        if 'code' in update_data:
+            material.code = update_data['code'].strip() or material.code
+        if 'category' in update_data:
+            material.category = update_data['category'].strip()
+        if 'unit' in update_data:
+            material.unit = update_data['unit'].strip()
+        if 'supplier' in update_data:
+            material.supplier = update_data['supplier'].strip()
+        if 'quantity' in update_data:
+            try:
+                quantity = int(update_data['quantity'])
+                material.quantity = quantity if quantity >= 0 else 0
+            except (ValueError, TypeError):
+                pass
+        if 'desc' in update_data:
+            material.desc = update_data['desc'].strip()
+
+        material.save()
+
+        logger.info(f"用户{request.session['erp_username']}更新物料：ID={material_id}")
+        return JsonResponse({
+            'code': 200,
+            'msg': '物料修改保存成功',
+            'data': {'id': material.id, 'code': material.code}
+        }, json_dumps_params={'ensure_ascii': False})
+
+    except Material.DoesNotExist:
+        logger.warning(f"更新不存在的物料：ID={material_id}")
+        return JsonResponse({
+            'code': 404,
+            'msg': '待修改的物料不存在',
+            'data': {}
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+    except Exception as e:
+        logger.error(f"更新物料异常：ID={material_id}，错误：{str(e)}", exc_info=True)
+        return JsonResponse({
+            'code': 500,
+            'msg': '修改物料失败，请稍后重试',
+            'data': {}
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+
+
+# ===================== 删除物料接口（优化版+跨域支持） =====================
+@csrf_exempt
+@require_http_methods(["DELETE"])
+def delete_material(request, material_id):
+    """删除物料接口：增强日志+安全校验"""
+
+    # 1. 校验物料ID
+    try:
+        material_id = int(material_id)
+        if material_id <= 0:
+            raise ValueError("物料ID必须为正整数")
+    except (ValueError, TypeError):
+        return JsonResponse({
+            "code": 400,
+            "msg": "物料ID格式错误（必须为正整数）",
+            "data": {}
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+
+    # 2. 执行删除
+    try:
+        with transaction.atomic():
+            # 先锁物料行：并发上传插入附件记录要等本事务结束（之后外键校验失败），
+            # 下面取出的附件列表就是级联删除的全部记录，引用数不会漏减。
+            # SQLite 没有行锁，但读取后再写入时若已有其他写入提交，本事务会报错回滚，同样不会漏减
+            material = Material.objects.select_for_update().get(id=material_id)
+            material_name = material.name
+            material_code = material.code
+            # 附件记录随物料级联删除，先取出来释放实体文件引用
+            attachments = list(MaterialFile.objects.filter(material_id=material_id).values_list('blob_id', 'file_path'))
+            material.delete()
+            release_material_files(attachments)
+
+        logger.info(f"用户{request.session['erp_username']}删除物料：{material_code}-{material_name}（ID={material_id}）")
+        return JsonResponse({
+            "code": 200,
+            "msg": "物料删除成功",
+            "data": {}
+        }, json_dumps_params={'ensure_ascii': False})
+
+    except Material.DoesNotExist:
+        logger.warning(f"删除不存在的物料：ID={material_id}")
+        return JsonResponse({
+            "code": 404,
+            "msg": "待删除的物料不存在",
+            "data": {}
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+    except Exception as e:
+        logger.error(f"删除物料异常：ID={material_id}，错误：{str(e)}", exc_info=True)
+        return JsonResponse({
+            "code": 500,
+            "msg": "删除物料失败，请稍后重试",
+            "data": {}
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+
+
+# ===================== 物料批量导入接口 =====================
+@csrf_exempt
+@require_http_methods(["POST"])
+@permission_required('material', 'add')
+def import_materials(request):
+    """
+    物料批量导入（multipart/form-data）
+    - file：CSV 或 XLSX，首行为表头（物料名称/物料编码/... 或 name/code/...）
+    - mode：skip（默认，已存在的编码记为错误）/ upsert（已存在则覆盖更新）
+    有错误行时返回 report_id，可通过 import-materials/report/<report_id>/ 下载错误报告
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({
+            'code': 400,
+            'msg': '请选择要导入的文件',
+            'data': {}
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+
+    try:
+        importer = MaterialImporter(mode=request.POST.get('mode', 'skip').strip() or 'skip')
+        result = importer.run(iter_spreadsheet_rows(upload.file, upload.name))
+    except (MaterialImportError, SpreadsheetError) as e:
+        return JsonResponse({
+            'code': 400,
+            'msg': str(e),
+            'data': {}
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+    except Exception as e:
+        logger.error(f"物料导入异常：{str(e)}", exc_info=True)
+        return JsonResponse({
+            'code': 500,
+            'msg': '物料导入失败，请稍后重试',
+            'data': {}
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+
+    result.pop('report_file')
+    logger.info(
+        f"用户{request.session.get('erp_username')}导入物料{upload.name}：共{result['total']}行，"
+        f"新增{result['created']}，更新{result['updated']}，失败{result['failed']}，耗时{result['elapsed']}秒"
+    )
+    return JsonResponse({
+        'code': 200,
+        'msg': '导入完成' if not result['failed'] else f"导入完成，{result['failed']}行有误，请下载错误报告",
+        'data': result
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@permission_required('material', 'add')
+def download_import_report(request, report_id):
+    """下载物料导入错误报告（CSV）"""
+    path = report_path(report_id)
+    try:
+        expired = path is None or report_expired(os.path.getmtime(path))
+    except FileNotFoundError:
+        expired = True
+    if expired:
+        return JsonResponse({
+            'code': 404,
+            'msg': '错误报告不存在或已过期',
+            'data': {}
+        }, status=200, json_dumps_params={'ensure_ascii': False})
+    return FileResponse(open(path, 'rb'), as_attachment=True,
+                        filename=f'物料导入错误报告_{report_id[:8]}.csv', content_type='text/csv; charset=utf-8')
@@ -0,0 +1,120 @@
+import request from '@/utils/request';
+
+// 附件断点续传（对应后端 myerpapp/upload_views.py）：
+// 创建上传会话 → 多个分块并行 PUT（带 SHA-256 校验）→ 完成。
+// 网络中断后再次调用会按 missing_chunks 只补传缺失的分块（会话ID保存在 localStorage）。
+// 秒传：precheckFiles 先提交文件的 SHA-256 和大小，服务器已有的内容直接关联，只需上传剩下的文件。
+const CHUNK_SIZE = 8 * 1024 * 1024;
+const PRECHECK_MAX_SIZE = 512 * 1024 * 1024; // crypto.subtle 需一次读入整个文件，更大的文件直接上传
+const PARALLEL = 4;
+const MAX_RETRIES = 3;
+
+const sessionKey = (materialId, file) =>
+  `upload_session_${materialId}_${file.name}_${file.size}_${file.lastModified}`;
+
+const chunkChecksum = async (blob) => {
+  if (!window.crypto?.subtle) return null; // 非安全上下文（http 非 localhost）不支持，跳过校验
+  const digest = await window.crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+  return btoa(String.fromCharCode(...new Uint8Array(digest)));
+};
+
+const fileSha256 = async (file) => {
+  const digest = await window.crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+  return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('');
+};
+
+const ensureOk = (res, action) => {
+  if (!res || res.code !== 200) {
+    throw new Error(`${action}失败：${res?.msg || '后端未返回错误信息'}`);
+  }
+  return res.data;
+};
+
+const openSession = async (materialId, file) => {
+  const key = sessionKey(materialId, file);
+  const saved = localStorage.getItem(key);
+  if (saved) {
+    const res = await request.get(`/upload-sessions/${saved}/`);
+    if (res?.code === 200) return res.data; // 继续上次未完成的上传
+    localStorage.removeItem(key);
+  }
+  const data = ensureOk(await request.post(`/upload-sessions/create/${materialId}/`, {
+    name: file.name,
+    size: file.size,
+    chunk_size: CHUNK_SIZE
+  }), '创建上传会话');
+  localStorage.setItem(key, data.upload_id);
+  return data;
+};
+
+const putChunk = async (session, file, index) => {
+  const start = index * session.chunk_size;
+  const blob = file.slice(start, Math.min(start + session.chunk_size, file.size));
+  const checksum = await chunkChecksum(blob);
+  const headers = { 'Upload-Offset': String(start) };
+  if (checksum) headers['Upload-Checksum'] = `sha256 ${checksum}`;
+
+  for (let attempt = 1; ; attempt++) {
+    try {
+      const res = await request.put(`/upload-sessions/${session.upload_id}/chunk/`, blob, { headers });
+      ensureOk(res, `上传第${index + 1}块`);
+      return blob.size;
+    } catch (error) {
+      if (attempt >= MAX_RETRIES) throw error;
+      await new Promise(resolve => setTimeout(resolve, 1000 * attempt));
+    }
+  }
+};
+
+/**
+ * 断点续传上传单个文件
+ * @param {number} materialId 物料ID
+ * @param {File} file 文件
+ * @param {(loaded: number, total: number) => void} onProgress 进度回调（字节）
+ * @returns 后端返回的附件信息 {id, name, size, upload_time}
+ */
+export const uploadFileResumable = async (materialId, file, onProgress = () => {}) => {
+  const session = await openSession(materialId, file);
+  const queue = [...session.missing_chunks];
+  let loaded = session.received_size;
+  onProgress(loaded, file.size);
+
+  const worker = async () => {
+    while (queue.length) {
+      const index = queue.shift();
+      loaded += await putChunk(session, file, index);
+      onProgress(loaded, file.size);
+    }
+  };
+  await Promise.all(Array.from({ length: Math.min(PARALLEL, queue.length) }, worker));
+
+  const data = ensureOk(await request.post(`/upload-sessions/${session.upload_id}/complete/`), '完成上传');
+  localStorage.removeItem(sessionKey(materialId, file));
+  return data;
+};
+
+/**
+ * 秒传预检：服务器已有相同内容的文件直接关联到物料
+ * @param {number} materialId 物料ID
+ * @param {File[]} files 待上传文件
+ * @returns {Promise<{linked: object[], remaining: File[]}>} linked 为已关联的附件信息，remaining 为仍需上传的文件
+ */
+export const precheckFiles = async (materialId, files) => {
+  const candidates = files.filter(file => file.size > 0 && file.size <= PRECHECK_MAX_SIZE);
+  if (!window.crypto?.subtle || !candidates.length) return { linked: [], remaining: files };
+
+  try {
+    const hashes = [];
+    for (const file of candidates) { // 逐个计算，避免同时把多个大文件读进内存
+      hashes.push(await fileSha256(file));
+    }
+    const data = ensureOk(await request.post(`/upload-material-files/precheck/${materialId}/`, {
+      files: candidates.map((file, index) => ({ name: file.name, size: file.size, sha256: hashes[index] }))
+    }), '秒传预检');
+    const linkedFiles = new Set(data.linked.map(item => candidates[item.index]));
+    return { linked: data.linked, remaining: files.filter(file => !linkedFiles.has(file)) };
+  } catch (error) {
+    console.warn('秒传预检失败，改为全部上传', error);
+    return { linked: [], remaining: files };
+  }
+};